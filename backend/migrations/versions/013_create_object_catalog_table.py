@@ -0,0 +1,53 @@
+"""创建对象目录表
+
+Revision ID: 013
+Revises: 012
+Create Date: 2025-01-10 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建对象目录表"""
+    op.create_table(
+        'object_catalog',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False, comment='主键ID'),
+        sa.Column('object_key', sa.String(500), nullable=False, comment='对象键'),
+        sa.Column('bucket', sa.String(100), nullable=False, comment='存储桶'),
+        sa.Column('size', sa.BigInteger(), nullable=False, server_default='0', comment='对象大小（字节）'),
+        sa.Column('etag', sa.String(100), nullable=True, comment='ETag'),
+        sa.Column('sha256', sa.String(64), nullable=True, comment='内容SHA-256（上传时计算）'),
+        sa.Column('content_type', sa.String(100), nullable=True, comment='Content-Type'),
+        sa.Column('kind', sa.String(20), nullable=False, server_default='other', comment='对象类型'),
+        sa.Column('owner_id', postgresql.UUID(as_uuid=True), nullable=True, comment='所有者ID'),
+        sa.Column('project_id', postgresql.UUID(as_uuid=True), nullable=True, comment='项目ID'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='更新时间'),
+        sa.UniqueConstraint('bucket', 'object_key', name='uq_object_catalog_bucket_key'),
+    )
+
+    op.create_index('ix_object_catalog_sha256', 'object_catalog', ['sha256'])
+    op.create_index('ix_object_catalog_kind', 'object_catalog', ['kind'])
+    op.create_index('ix_object_catalog_owner_id', 'object_catalog', ['owner_id'])
+    op.create_index('ix_object_catalog_project_id', 'object_catalog', ['project_id'])
+    op.create_index('idx_object_catalog_owner_kind', 'object_catalog', ['owner_id', 'kind'])
+
+
+def downgrade() -> None:
+    """删除对象目录表"""
+    op.drop_index('idx_object_catalog_owner_kind', table_name='object_catalog')
+    op.drop_index('ix_object_catalog_project_id', table_name='object_catalog')
+    op.drop_index('ix_object_catalog_owner_id', table_name='object_catalog')
+    op.drop_index('ix_object_catalog_kind', table_name='object_catalog')
+    op.drop_index('ix_object_catalog_sha256', table_name='object_catalog')
+    op.drop_table('object_catalog')
@@ -0,0 +1,40 @@
+"""创建内容寻址对象表
+
+Revision ID: 014
+Revises: 013
+Create Date: 2025-01-12 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建内容寻址对象表"""
+    op.create_table(
+        'storage_blobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False, comment='主键ID'),
+        sa.Column('bucket', sa.String(100), nullable=False, comment='存储桶'),
+        sa.Column('sha256', sa.String(64), nullable=False, comment='内容SHA-256'),
+        sa.Column('object_key', sa.String(500), nullable=False, comment='对象键'),
+        sa.Column('size', sa.BigInteger(), nullable=False, server_default='0', comment='对象大小（字节）'),
+        sa.Column('content_type', sa.String(100), nullable=True, comment='Content-Type'),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0', comment='引用计数'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='更新时间'),
+        sa.UniqueConstraint('bucket', 'sha256', name='uq_storage_blobs_bucket_sha256'),
+        sa.UniqueConstraint('bucket', 'object_key', name='uq_storage_blobs_bucket_key'),
+    )
+
+
+def downgrade() -> None:
+    """删除内容寻址对象表"""
+    op.drop_table('storage_blobs')
@@ -0,0 +1,53 @@
+"""创建存储源迁移表
+
+Revision ID: 015
+Revises: 014
+Create Date: 2025-01-13 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '015'
+down_revision: Union[str, None] = '014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建存储源迁移表"""
+    op.create_table(
+        'storage_migrations',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False, comment='主键ID'),
+        sa.Column('source_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('storage_sources.id'), nullable=False, comment='源存储源ID'),
+        sa.Column('target_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('storage_sources.id'), nullable=False, comment='目标存储源ID'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending', comment='迁移状态'),
+        sa.Column('prefixes', sa.Text(), nullable=False, server_default='[]', comment='迁移的前缀（JSON数组，空前缀表示整个存储桶）'),
+        sa.Column('dual_read', sa.Boolean(), nullable=False, server_default=sa.true(), comment='过渡期内读取未命中时回退到源存储源'),
+        sa.Column('prefix_index', sa.Integer(), nullable=False, server_default='0', comment='当前前缀序号'),
+        sa.Column('last_key', sa.String(500), nullable=True, comment='当前前缀下最后处理完毕的对象键'),
+        sa.Column('copied', sa.Integer(), nullable=False, server_default='0', comment='已复制对象数'),
+        sa.Column('copied_bytes', sa.BigInteger(), nullable=False, server_default='0', comment='已复制字节数'),
+        sa.Column('skipped', sa.Integer(), nullable=False, server_default='0', comment='目标已存在且一致而跳过的对象数'),
+        sa.Column('failed', sa.Integer(), nullable=False, server_default='0', comment='复制或校验失败的对象数'),
+        sa.Column('last_error', sa.Text(), nullable=True, comment='最近一次错误'),
+        sa.Column('task_id', sa.String(255), nullable=True, comment='Celery任务ID'),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True, comment='开始时间'),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True, comment='结束时间'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='更新时间'),
+    )
+    op.create_index('ix_storage_migrations_source_id', 'storage_migrations', ['source_id'])
+    op.create_index('ix_storage_migrations_target_id', 'storage_migrations', ['target_id'])
+    op.create_index('ix_storage_migrations_status', 'storage_migrations', ['status'])
+
+
+def downgrade() -> None:
+    """删除存储源迁移表"""
+    op.drop_index('ix_storage_migrations_status', table_name='storage_migrations')
+    op.drop_index('ix_storage_migrations_target_id', table_name='storage_migrations')
+    op.drop_index('ix_storage_migrations_source_id', table_name='storage_migrations')
+    op.drop_table('storage_migrations')
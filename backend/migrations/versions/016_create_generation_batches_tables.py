@@ -0,0 +1,69 @@
+"""创建生成批次表
+
+Revision ID: 016
+Revises: 015
+Create Date: 2025-01-14 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '016'
+down_revision: Union[str, None] = '015'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建生成批次表和句子生成记录表"""
+    op.create_table(
+        'generation_batches',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False, comment='主键ID'),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False, comment='用户ID'),
+        sa.Column('kind', sa.String(20), nullable=False, comment='生成类型'),
+        sa.Column('api_key_id', postgresql.UUID(as_uuid=True), nullable=False, comment='API密钥ID'),
+        sa.Column('params', sa.Text(), nullable=False, server_default='{}', comment='生成参数（JSON：model/voice）'),
+        sa.Column('lock_resource', sa.String(64), nullable=False, comment='任务锁资源标识（句子集合摘要）'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending', comment='批次状态'),
+        sa.Column('chunk_size', sa.Integer(), nullable=False, comment='每个分片的句子数'),
+        sa.Column('total', sa.Integer(), nullable=False, server_default='0', comment='句子总数'),
+        sa.Column('succeeded', sa.Integer(), nullable=False, server_default='0', comment='成功数'),
+        sa.Column('failed', sa.Integer(), nullable=False, server_default='0', comment='失败数'),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True, comment='结束时间'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='更新时间'),
+    )
+    op.create_index('ix_generation_batches_user_id', 'generation_batches', ['user_id'])
+    op.create_index('ix_generation_batches_status', 'generation_batches', ['status'])
+
+    op.create_table(
+        'generation_items',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False, comment='主键ID'),
+        sa.Column('batch_id', postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey('generation_batches.id', ondelete='CASCADE'), nullable=False, comment='批次ID'),
+        sa.Column('sentence_id', postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey('sentences.id', ondelete='CASCADE'), nullable=False, comment='句子ID'),
+        sa.Column('chunk_index', sa.Integer(), nullable=False, comment='分片序号'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending', comment='生成状态'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0', comment='已尝试次数'),
+        sa.Column('last_error', sa.Text(), nullable=True, comment='最后一次错误'),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True, comment='完成时间'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='更新时间'),
+        sa.UniqueConstraint('batch_id', 'sentence_id', name='uq_generation_items_batch_sentence'),
+    )
+    op.create_index('idx_generation_items_batch_chunk', 'generation_items', ['batch_id', 'chunk_index'])
+    op.create_index('idx_generation_items_batch_status', 'generation_items', ['batch_id', 'status'])
+
+
+def downgrade() -> None:
+    """删除生成批次表"""
+    op.drop_index('idx_generation_items_batch_status', table_name='generation_items')
+    op.drop_index('idx_generation_items_batch_chunk', table_name='generation_items')
+    op.drop_table('generation_items')
+    op.drop_index('ix_generation_batches_status', table_name='generation_batches')
+    op.drop_index('ix_generation_batches_user_id', table_name='generation_batches')
+    op.drop_table('generation_batches')
@@ -0,0 +1,54 @@
+"""创建章节流水线表
+
+Revision ID: 017
+Revises: 016
+Create Date: 2025-01-15 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '017'
+down_revision: Union[str, None] = '016'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建章节流水线表"""
+    op.create_table(
+        'chapter_pipelines',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False, comment='主键ID'),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('users.id'), nullable=False, comment='用户ID'),
+        sa.Column('project_id', postgresql.UUID(as_uuid=True), nullable=False, comment='项目ID'),
+        sa.Column('chapter_id', postgresql.UUID(as_uuid=True),
+                  sa.ForeignKey('chapters.id', ondelete='CASCADE'), nullable=False, comment='章节ID'),
+        sa.Column('api_key_id', postgresql.UUID(as_uuid=True), nullable=False, comment='API密钥ID'),
+        sa.Column('params', sa.Text(), nullable=False, server_default='{}', comment='各节点参数（JSON）'),
+        sa.Column('status', sa.String(20), nullable=False, server_default='pending', comment='流水线状态'),
+        sa.Column('prompts_status', sa.String(20), nullable=False, server_default='pending', comment='提示词节点状态'),
+        sa.Column('images_status', sa.String(20), nullable=False, server_default='pending', comment='图片节点状态'),
+        sa.Column('audio_status', sa.String(20), nullable=False, server_default='pending', comment='音频节点状态'),
+        sa.Column('video_status', sa.String(20), nullable=False, server_default='pending', comment='视频节点状态'),
+        sa.Column('image_batch_id', postgresql.UUID(as_uuid=True), nullable=True, comment='图片生成批次ID'),
+        sa.Column('audio_batch_id', postgresql.UUID(as_uuid=True), nullable=True, comment='音频生成批次ID'),
+        sa.Column('video_task_id', postgresql.UUID(as_uuid=True), nullable=True, comment='视频任务ID'),
+        sa.Column('error_message', sa.Text(), nullable=True, comment='错误信息'),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True, comment='结束时间'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='更新时间'),
+    )
+    op.create_index('ix_chapter_pipelines_user_id', 'chapter_pipelines', ['user_id'])
+    op.create_index('ix_chapter_pipelines_chapter_id', 'chapter_pipelines', ['chapter_id'])
+    op.create_index('ix_chapter_pipelines_status', 'chapter_pipelines', ['status'])
+
+
+def downgrade() -> None:
+    """删除章节流水线表"""
+    op.drop_index('ix_chapter_pipelines_status', table_name='chapter_pipelines')
+    op.drop_index('ix_chapter_pipelines_chapter_id', table_name='chapter_pipelines')
+    op.drop_index('ix_chapter_pipelines_user_id', table_name='chapter_pipelines')
+    op.drop_table('chapter_pipelines')
@@ -0,0 +1,50 @@
+"""创建任务执行记录表
+
+Revision ID: 018
+Revises: 017
+Create Date: 2025-01-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '018'
+down_revision: Union[str, None] = '017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建任务执行记录表"""
+    op.create_table(
+        'task_runs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, nullable=False, comment='主键ID（Celery任务ID）'),
+        sa.Column('task_name', sa.String(200), nullable=False, comment='任务名称'),
+        sa.Column('state', sa.String(20), nullable=False, server_default='PENDING', comment='任务状态（Celery状态名）'),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=True, comment='用户ID（外键索引，无约束）'),
+        sa.Column('project_id', postgresql.UUID(as_uuid=True), nullable=True, comment='项目ID（外键索引，无约束）'),
+        sa.Column('chapter_id', postgresql.UUID(as_uuid=True), nullable=True, comment='章节ID（外键索引，无约束）'),
+        sa.Column('stage', sa.String(50), nullable=True, comment='当前阶段'),
+        sa.Column('progress', sa.Integer(), nullable=False, server_default='0', comment='进度（0-100）'),
+        sa.Column('retries', sa.Integer(), nullable=False, server_default='0', comment='重试次数'),
+        sa.Column('result', sa.Text(), nullable=True, comment='任务结果（JSON，仅统计类小结果）'),
+        sa.Column('error', sa.Text(), nullable=True, comment='错误信息'),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True, comment='开始时间'),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True, comment='结束时间'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='创建时间'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False, comment='更新时间'),
+    )
+    op.create_index('idx_task_runs_user_created', 'task_runs', ['user_id', 'created_at'])
+    op.create_index('idx_task_runs_project_created', 'task_runs', ['project_id', 'created_at'])
+    op.create_index('idx_task_runs_chapter_created', 'task_runs', ['chapter_id', 'created_at'])
+
+
+def downgrade() -> None:
+    """删除任务执行记录表"""
+    op.drop_index('idx_task_runs_chapter_created', table_name='task_runs')
+    op.drop_index('idx_task_runs_project_created', table_name='task_runs')
+    op.drop_index('idx_task_runs_user_created', table_name='task_runs')
+    op.drop_table('task_runs')
@@ -0,0 +1,28 @@
+"""视频任务和生成批次增加取消请求时间
+
+Revision ID: 019
+Revises: 018
+Create Date: 2025-01-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '019'
+down_revision: Union[str, None] = '018'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """增加 cancel_requested_at 字段"""
+    op.add_column('video_tasks', sa.Column('cancel_requested_at', sa.DateTime(timezone=True), nullable=True, comment='请求取消的时间'))
+    op.add_column('generation_batches', sa.Column('cancel_requested_at', sa.DateTime(timezone=True), nullable=True, comment='请求取消的时间'))
+
+
+def downgrade() -> None:
+    """删除 cancel_requested_at 字段"""
+    op.drop_column('generation_batches', 'cancel_requested_at')
+    op.drop_column('video_tasks', 'cancel_requested_at')
@@ -0,0 +1,99 @@
+"""
+Celery 任务运行时开销基准
+
+对比两种执行异步任务的方式，每个任务只执行一次 SELECT 1：
+- legacy：每个任务 asyncio.run 新建事件循环，重建数据库引擎并查询存储配置（旧 run_async_task）
+- runtime：提交到 Worker 进程的长期事件循环（src.tasks.runtime.WorkerRuntime）
+
+使用方法:
+python scripts/benchmark_task_overhead.py --tasks 200
+python scripts/benchmark_task_overhead.py --tasks 2000 --no-db   # 不连接数据库，只比较事件循环开销
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import text
+
+from src.tasks.runtime import WorkerRuntime
+
+
+async def _select_one():
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        await db.execute(text("SELECT 1"))
+
+
+async def _noop():
+    await asyncio.sleep(0)
+
+
+def _legacy_run(coro, use_db: bool):
+    """旧实现：每个任务新建事件循环并重建连接"""
+
+    async def _wrapper():
+        if use_db:
+            from src.core.database import close_database_connections, create_database_engine, get_async_db
+            from src.utils.storage import reload_storage_config_from_db
+
+            await close_database_connections()
+            await create_database_engine()
+            async with get_async_db() as db:
+                await reload_storage_config_from_db(db)
+        return await coro
+
+    return asyncio.run(_wrapper())
+
+
+class _NoDBRuntime(WorkerRuntime):
+    """不连接数据库的运行时（--no-db）"""
+
+    async def _setup(self):
+        self._storage_loaded_at = float("inf")
+
+    async def _teardown(self):
+        pass
+
+
+def _measure(label: str, run_one, count: int) -> None:
+    durations = []
+    for _ in range(count):
+        started = time.perf_counter()
+        run_one()
+        durations.append((time.perf_counter() - started) * 1000)
+    durations.sort()
+    p95 = durations[int(len(durations) * 0.95) - 1]
+    print(
+        f"{label:<8} 任务数={count:<6} 平均={statistics.mean(durations):8.3f}ms "
+        f"中位数={statistics.median(durations):8.3f}ms p95={p95:8.3f}ms 总计={sum(durations) / 1000:7.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Celery 任务运行时开销基准")
+    parser.add_argument("--tasks", type=int, default=200, help="每种方式执行的任务数")
+    parser.add_argument("--no-db", action="store_true", help="不连接数据库")
+    args = parser.parse_args()
+
+    use_db = not args.no_db
+    payload = _select_one if use_db else _noop
+
+    _measure("legacy", lambda: _legacy_run(payload(), use_db), args.tasks)
+
+    runtime = WorkerRuntime() if use_db else _NoDBRuntime()
+    runtime.start()
+    try:
+        _measure("runtime", lambda: runtime.run(payload()), args.tasks)
+    finally:
+        runtime.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ API依赖注入 - 仅保留实际使用的功能
 
 from typing import Optional
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -85,8 +85,30 @@ async def get_current_user_required(
     return user
 
 
+async def get_current_user_for_media(
+        token: Optional[str] = Depends(oauth2_scheme),
+        access_token: Optional[str] = Query(None, description="访问令牌（<video>/<audio> 无法携带请求头时使用）"),
+        db: AsyncSession = Depends(get_db)
+) -> User:
+    """获取当前认证用户（媒体分发用，允许通过查询参数传递令牌）"""
+    return await get_current_user_required(token=token or access_token, db=db)
+
+
+async def get_idempotency_key(
+        idempotency_key: Optional[str] = Header(
+            None, alias="Idempotency-Key", max_length=128, description="幂等键：相同的键重复提交返回同一个任务"
+        )
+) -> Optional[str]:
+    """读取 Idempotency-Key 请求头"""
+    if idempotency_key is None:
+        return None
+    return idempotency_key.strip() or None
+
+
 __all__ = [
+    "get_idempotency_key",
     "get_current_user_optional",
     "get_current_user_required",
+    "get_current_user_for_media",
     "get_db",
 ]
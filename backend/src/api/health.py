@@ -110,6 +110,18 @@ async def celery_health():
         raise HTTPException(status_code=503, detail="Celery连接失败")
 
 
+@router.get("/storage")
+async def storage_health():
+    """对象存储客户端连接池统计"""
+    from src.utils.storage import storage_client
+
+    return {
+        "status": "healthy",
+        "storage": storage_client.get_pool_stats(),
+        "timestamp": datetime.utcnow().isoformat(),
+    }
+
+
 @router.get("/system")
 async def system_health():
     """系统资源健康检查"""
@@ -84,6 +84,16 @@ from .file import (
     FileUploadResult,
 )
 
+# 断点续传相关
+from .upload import (
+    DirectUploadComplete,
+    DirectUploadCreate,
+    DirectUploadResponse,
+    UploadCompleteResponse,
+    UploadSessionCreate,
+    UploadSessionResponse,
+)
+
 # API密钥相关
 from .api_key import (
     APIKeyCreate,
@@ -95,7 +105,7 @@ from .api_key import (
 )
 
 # 任务相关
-from .task import TaskStatusResponse
+from .task import TaskBulkStatusRequest, TaskBulkStatusResponse, TaskRunStatus, TaskStatusResponse
 
 # 提示词相关
 from .prompt import (
@@ -118,6 +128,7 @@ from .audio import (
 
 # 视频任务相关
 from .video_task import (
+    VideoTaskCancelResponse,
     VideoTaskCreate,
     VideoTaskDeleteResponse,
     VideoTaskListResponse,
@@ -126,6 +137,22 @@ from .video_task import (
     VideoTaskStatsResponse,
 )
 
+# 生成批次相关
+from .generation_batch import (
+    GenerationBatchResponse,
+    GenerationBatchRetryResponse,
+    GenerationItemListResponse,
+    GenerationItemResponse,
+)
+
+# 章节流水线相关
+from .pipeline import (
+    PipelineCreate,
+    PipelineNodeResponse,
+    PipelineResponse,
+    PipelineSubmitResponse,
+)
+
 __all__ = [
     # 认证
     "UserLogin",
@@ -187,6 +214,13 @@ __all__ = [
     "FileIntegrityCheckResult",
     "FileIntegrityCheckResponse",
     "FileType",
+    # 断点续传
+    "UploadSessionCreate",
+    "UploadSessionResponse",
+    "UploadCompleteResponse",
+    "DirectUploadCreate",
+    "DirectUploadResponse",
+    "DirectUploadComplete",
     # API密钥
     "APIKeyCreate",
     "APIKeyUpdate",
@@ -196,6 +230,9 @@ __all__ = [
     "APIKeyUsageResponse",
     # 任务
     "TaskStatusResponse",
+    "TaskBulkStatusRequest",
+    "TaskBulkStatusResponse",
+    "TaskRunStatus",
     # 提示词
     "PromptGenerateRequest",
     "PromptGenerateResponse",
@@ -213,4 +250,15 @@ __all__ = [
     "VideoTaskStatsResponse",
     "VideoTaskDeleteResponse",
     "VideoTaskRetryResponse",
+    "VideoTaskCancelResponse",
+    # 生成批次
+    "GenerationBatchResponse",
+    "GenerationItemResponse",
+    "GenerationItemListResponse",
+    "GenerationBatchRetryResponse",
+    # 章节流水线
+    "PipelineCreate",
+    "PipelineNodeResponse",
+    "PipelineResponse",
+    "PipelineSubmitResponse",
 ]
\ No newline at end of file
@@ -98,6 +98,7 @@ class FileListResponse(PaginatedResponse):
     """文件列表响应模型"""
     files: List[FileInfo] = Field(..., description="文件列表")
     orphaned_count: int = Field(0, description="孤立文件数量")
+    next_token: Optional[str] = Field(None, description="下一页续页令牌（为空表示已是最后一页）")
 
     model_config = {
         "json_schema_extra": {
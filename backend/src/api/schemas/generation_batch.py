@@ -0,0 +1,52 @@
+"""
+批量生成批次相关的Pydantic模式
+"""
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from .base import UUIDMixin
+
+
+class GenerationBatchResponse(UUIDMixin):
+    """生成批次响应模型"""
+    id: UUID = Field(..., description="批次ID（即生成任务ID）")
+    kind: str = Field(..., description="生成类型：image / audio")
+    status: str = Field(..., description="批次状态：pending / running / completed / partial / failed / cancelled")
+    chunk_size: int = Field(..., description="每个分片的句子数")
+    total: int = Field(..., description="句子总数")
+    succeeded: int = Field(0, description="成功句子数（汇总后更新）")
+    failed: int = Field(0, description="失败句子数（汇总后更新）")
+    created_at: datetime = Field(..., description="创建时间")
+    cancel_requested_at: Optional[datetime] = Field(None, description="请求取消的时间")
+    finished_at: Optional[datetime] = Field(None, description="完成时间")
+
+    model_config = {"from_attributes": True}
+
+
+class GenerationItemResponse(UUIDMixin):
+    """批次内单个句子的生成记录"""
+    sentence_id: UUID = Field(..., description="句子ID")
+    chunk_index: int = Field(..., description="分片序号")
+    status: str = Field(..., description="生成状态：pending / succeeded / failed")
+    attempts: int = Field(..., description="已尝试次数")
+    last_error: Optional[str] = Field(None, description="最后一次错误")
+    finished_at: Optional[datetime] = Field(None, description="完成时间")
+
+    model_config = {"from_attributes": True}
+
+
+class GenerationItemListResponse(BaseModel):
+    """批次句子列表响应模型"""
+    batch_id: str = Field(..., description="批次ID")
+    items: List[GenerationItemResponse] = Field(..., description="句子生成记录")
+
+
+class GenerationBatchRetryResponse(BaseModel):
+    """重试失败句子响应模型"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(..., description="响应消息")
+    task_id: Optional[str] = Field(None, description="任务ID（即批次ID）")
+    chunks: List[int] = Field(default_factory=list, description="重新派发的分片序号")
@@ -0,0 +1,72 @@
+"""
+章节流水线相关的Pydantic模式
+"""
+from datetime import datetime
+from typing import Dict, List, Optional
+from uuid import UUID
+
+from pydantic import BaseModel, Field, model_validator
+
+
+class PipelineCreate(BaseModel):
+    """创建流水线请求模型（chapter_id 与 project_id 二选一；按项目时每个章节一条流水线）"""
+    chapter_id: Optional[UUID] = Field(None, description="章节ID")
+    project_id: Optional[UUID] = Field(None, description="项目ID")
+    api_key_id: UUID = Field(..., description="API密钥ID（提示词、图片、音频共用）")
+    style: str = Field("cinematic", description="提示词风格")
+    prompt_model: Optional[str] = Field(None, description="提示词模型")
+    custom_prompt: Optional[str] = Field(None, description="自定义系统提示词")
+    image_model: Optional[str] = Field(None, description="图片模型")
+    voice: str = Field("alloy", description="语音风格")
+    audio_model: str = Field("tts-1", description="语音模型")
+    bgm_id: Optional[UUID] = Field(None, description="BGM ID（可选）")
+    gen_setting: Optional[Dict] = Field(None, description="视频生成设置")
+
+    @model_validator(mode="after")
+    def _check_target(self) -> "PipelineCreate":
+        if (self.chapter_id is None) == (self.project_id is None):
+            raise ValueError("chapter_id 与 project_id 必须且只能提供一个")
+        return self
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "chapter_id": "123e4567-e89b-12d3-a456-426614174000",
+                "api_key_id": "223e4567-e89b-12d3-a456-426614174111",
+                "style": "cinematic",
+                "image_model": "dall-e-3",
+                "voice": "alloy",
+                "audio_model": "tts-1"
+            }
+        }
+    }
+
+
+class PipelineNodeResponse(BaseModel):
+    """流水线节点状态"""
+    name: str = Field(..., description="节点：prompts / images / audio / video")
+    status: str = Field(..., description="节点状态：pending / running / completed / failed")
+    total: int = Field(0, description="句子总数（视频节点为1）")
+    succeeded: int = Field(0, description="已完成数")
+    failed: int = Field(0, description="失败数")
+    ref_id: Optional[str] = Field(None, description="关联ID（生成批次ID / 视频任务ID）")
+    progress: Optional[int] = Field(None, description="视频合成进度（0-100）")
+
+
+class PipelineResponse(BaseModel):
+    """流水线状态响应模型"""
+    id: str = Field(..., description="流水线ID")
+    project_id: str = Field(..., description="项目ID")
+    chapter_id: str = Field(..., description="章节ID")
+    status: str = Field(..., description="流水线状态：pending / running / completed / failed")
+    error_message: Optional[str] = Field(None, description="错误信息")
+    created_at: datetime = Field(..., description="创建时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
+    nodes: List[PipelineNodeResponse] = Field(..., description="各节点状态")
+
+
+class PipelineSubmitResponse(BaseModel):
+    """提交流水线响应模型"""
+    success: bool = Field(..., description="是否成功")
+    message: str = Field(..., description="响应消息")
+    pipeline_ids: List[str] = Field(default_factory=list, description="流水线ID（按章节顺序）")
@@ -2,9 +2,11 @@
 任务相关的Pydantic模式
 """
 
-from typing import Any, Optional
+from datetime import datetime
+from typing import Any, List, Optional
+from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class TaskStatusResponse(BaseModel):
@@ -26,4 +28,51 @@ class TaskStatusResponse(BaseModel):
     }
 
 
-__all__ = ["TaskStatusResponse"]
+class TaskBulkStatusRequest(BaseModel):
+    """批量任务状态请求模型（task_ids / project_id / chapter_id 至少提供一个）"""
+    task_ids: Optional[List[UUID]] = Field(None, max_length=500, description="任务ID列表")
+    project_id: Optional[UUID] = Field(None, description="项目ID")
+    chapter_id: Optional[UUID] = Field(None, description="章节ID")
+    states: Optional[List[str]] = Field(None, description="状态过滤（STARTED / RETRY / SUCCESS / FAILURE / REVOKED）")
+    limit: int = Field(200, ge=1, le=500, description="最多返回的任务数")
+
+    @model_validator(mode="after")
+    def _check_filters(self) -> "TaskBulkStatusRequest":
+        if not (self.task_ids or self.project_id or self.chapter_id):
+            raise ValueError("task_ids、project_id、chapter_id 至少提供一个")
+        return self
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "project_id": "123e4567-e89b-12d3-a456-426614174000",
+                "states": ["STARTED", "RETRY"]
+            }
+        }
+    }
+
+
+class TaskRunStatus(BaseModel):
+    """单个任务的状态"""
+    task_id: str = Field(..., description="任务ID")
+    task_name: Optional[str] = Field(None, description="任务名称")
+    state: str = Field(..., description="任务状态（Celery状态名）")
+    stage: Optional[str] = Field(None, description="当前阶段")
+    progress: int = Field(0, description="进度（0-100）")
+    message: Optional[str] = Field(None, description="最新进度消息")
+    retries: int = Field(0, description="重试次数")
+    project_id: Optional[str] = Field(None, description="项目ID")
+    chapter_id: Optional[str] = Field(None, description="章节ID")
+    result: Optional[Any] = Field(None, description="任务结果（统计信息）")
+    error: Optional[str] = Field(None, description="错误信息")
+    started_at: Optional[datetime] = Field(None, description="开始时间")
+    finished_at: Optional[datetime] = Field(None, description="结束时间")
+    updated_at: Optional[datetime] = Field(None, description="更新时间")
+
+
+class TaskBulkStatusResponse(BaseModel):
+    """批量任务状态响应模型"""
+    tasks: List[TaskRunStatus] = Field(..., description="任务状态（最新的在前）")
+
+
+__all__ = ["TaskBulkStatusRequest", "TaskBulkStatusResponse", "TaskRunStatus", "TaskStatusResponse"]
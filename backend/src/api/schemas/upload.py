@@ -0,0 +1,106 @@
+"""
+断点续传相关的Pydantic模式
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class UploadSessionCreate(BaseModel):
+    """创建上传会话请求模型"""
+    filename: str = Field(..., min_length=1, max_length=255, description="原始文件名")
+    size: int = Field(..., gt=0, description="文件总大小（字节）")
+    purpose: str = Field(..., pattern="^(project_file|bgm)$", description="上传用途：project_file / bgm")
+    content_type: Optional[str] = Field(None, max_length=100, description="Content-Type")
+    sha256: Optional[str] = Field(None, description="整体SHA-256（十六进制），完成时校验")
+    name: Optional[str] = Field(None, max_length=100, description="BGM名称（仅BGM，缺省为文件名）")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "filename": "novel.epub",
+                "size": 157286400,
+                "purpose": "project_file",
+                "sha256": "9f86d081884c7d659a2feaa0c55ad015a3bf4f1b2b0b822cd15d6c15b0f00a08"
+            }
+        }
+    }
+
+
+class UploadCompleteResponse(BaseModel):
+    """上传完成响应模型"""
+    upload_id: str = Field(..., description="上传会话ID")
+    purpose: str = Field(..., description="上传用途")
+    object_key: str = Field(..., description="存储路径键（创建项目时作为 file_path）")
+    size: int = Field(..., description="文件大小（字节）")
+    sha256: str = Field(..., description="文件SHA-256（创建项目时作为 file_hash）")
+    deduplicated: bool = Field(False, description="内容已存在，未重复存储")
+    file_name: str = Field(..., description="原始文件名")
+    file_type: Optional[str] = Field(None, description="文件类型（仅项目文件）")
+    bgm_id: Optional[str] = Field(None, description="创建的BGM ID（仅BGM）")
+    project_id: Optional[str] = Field(None, description="创建的项目ID（仅直传且声明了项目标题）")
+    process_task_id: Optional[str] = Field(None, description="项目解析任务ID")
+
+
+class UploadSessionResponse(BaseModel):
+    """上传会话响应模型"""
+    upload_id: str = Field(..., description="上传会话ID")
+    mode: str = Field(..., description="上传方式：resumable / direct")
+    purpose: str = Field(..., description="上传用途")
+    filename: str = Field(..., description="原始文件名")
+    size: int = Field(..., description="文件总大小（字节）")
+    offset: int = Field(..., description="服务端已接收的字节数（下一个分片的 Upload-Offset）")
+    chunk_size: int = Field(..., description="分片大小（除最后一片外每次 PATCH 的请求体长度）")
+    status: str = Field(..., description="会话状态：uploading / validating / completed / failed")
+    expires_at: str = Field(..., description="会话过期时间（每次上传分片后续期）")
+    result: Optional[UploadCompleteResponse] = Field(None, description="完成结果")
+    error: Optional[str] = Field(None, description="校验失败原因")
+    task_id: Optional[str] = Field(None, description="直传校验任务ID")
+
+
+class DirectUploadCreate(UploadSessionCreate):
+    """创建直传会话请求模型"""
+    title: Optional[str] = Field(None, max_length=200, description="项目标题（项目文件，校验通过后直接创建项目）")
+    description: Optional[str] = Field(None, description="项目描述")
+
+
+class DirectUploadPart(BaseModel):
+    """直传分片"""
+    part_number: int = Field(..., ge=1, le=10000, description="分片号")
+    url: str = Field(..., description="预签名 upload_part URL")
+
+
+class DirectUploadTarget(BaseModel):
+    """直传地址"""
+    method: str = Field(..., description="PUT：单个请求上传；multipart：按分片上传")
+    url: Optional[str] = Field(None, description="预签名PUT URL")
+    headers: Optional[dict] = Field(None, description="PUT 时必须携带的请求头")
+    part_size: Optional[int] = Field(None, description="分片大小（最后一片为剩余长度）")
+    parts: Optional[List[DirectUploadPart]] = Field(None, description="各分片的预签名URL")
+
+
+class DirectUploadResponse(UploadSessionResponse):
+    """创建直传会话响应模型"""
+    upload: DirectUploadTarget = Field(..., description="直传地址")
+
+
+class DirectUploadCompletedPart(BaseModel):
+    """已上传分片（ETag取自对象存储的响应头）"""
+    part_number: int = Field(..., ge=1, le=10000, description="分片号")
+    etag: str = Field(..., description="分片ETag")
+
+
+class DirectUploadComplete(BaseModel):
+    """直传完成请求模型"""
+    parts: Optional[List[DirectUploadCompletedPart]] = Field(None, description="分片直传时各分片的ETag")
+
+
+__all__ = [
+    "UploadSessionCreate",
+    "UploadSessionResponse",
+    "UploadCompleteResponse",
+    "DirectUploadCreate",
+    "DirectUploadResponse",
+    "DirectUploadComplete",
+]
@@ -16,6 +16,7 @@ class VideoTaskCreate(BaseModel):
     api_key_id: Optional[UUID] = Field(None, description="API密钥ID（可选，用于LLM字幕纠错）")
     bgm_id: Optional[UUID] = Field(None, description="BGM ID（可选，用于背景音乐）")
     gen_setting: Optional[Dict] = Field(None, description="生成设置")
+    priority: int = Field(0, ge=0, le=2, description="调度优先级（0普通，1/2用于预览等需要尽快出结果的任务）")
 
     model_config = {
         "json_schema_extra": {
@@ -58,9 +59,14 @@ class VideoTaskResponse(UUIDMixin):
     video_url: Optional[str] = Field(None, description="视频预签名URL")
     video_duration: Optional[int] = Field(None, description="视频时长（秒）")
     error_message: Optional[str] = Field(None, description="错误信息")
+    cancel_requested_at: Optional[str] = Field(None, description="请求取消的时间")
     gen_setting: Optional[Dict] = Field(None, description="生成设置")
     created_at: str = Field(..., description="创建时间")
     updated_at: str = Field(..., description="更新时间")
+
+    # 渲染调度排队信息（仅排队中的任务）
+    queue_position: Optional[int] = Field(None, description="排队位置（从1开始）")
+    eta_seconds: Optional[float] = Field(None, description="预计开始执行的等待秒数（估算）")
     
     # 额外的关联信息
     chapter_title: Optional[str] = Field(None, description="章节标题")
@@ -72,7 +78,7 @@ class VideoTaskResponse(UUIDMixin):
     def from_dict(cls, data: dict) -> "VideoTaskResponse":
         """从字典创建响应对象，处理时间格式"""
         # 处理时间字段
-        time_fields = ['created_at', 'updated_at']
+        time_fields = ['created_at', 'updated_at', 'cancel_requested_at']
         for field in time_fields:
             if field in data and data[field] is not None:
                 if hasattr(data[field], 'isoformat'):
@@ -204,6 +210,27 @@ class VideoTaskRetryResponse(BaseModel):
     }
 
 
+class VideoTaskCancelResponse(BaseModel):
+    """视频任务取消响应模型"""
+    success: bool = Field(True, description="是否成功")
+    message: str = Field("已请求取消", description="响应消息")
+    task: VideoTaskResponse = Field(..., description="任务信息（执行中的任务在下一个检查点停止，状态随后变为 cancelled）")
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "success": True,
+                "message": "已请求取消",
+                "task": {
+                    "id": "uuid-string",
+                    "status": "synthesizing_videos",
+                    "cancel_requested_at": "2024-01-01T00:10:00"
+                }
+            }
+        }
+    }
+
+
 __all__ = [
     "VideoTaskCreate",
     "VideoTaskResponse",
@@ -211,4 +238,5 @@ __all__ = [
     "VideoTaskStatsResponse",
     "VideoTaskDeleteResponse",
     "VideoTaskRetryResponse",
+    "VideoTaskCancelResponse",
 ]
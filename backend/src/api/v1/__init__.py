@@ -34,7 +34,11 @@ from .audio import router as audio_router
 from .bgms import router as bgms_router
 from .tasks import router as tasks_router
 from .video_tasks import router as video_tasks_router  # 新增
+from .media import router as media_router
+from .uploads import router as uploads_router
 from .admin import router as admin_router
+from .generation_batches import router as generation_batches_router
+from .pipelines import router as pipelines_router
 
 # 注册路由
 api_router.include_router(auth_router, prefix="/auth", tags=["认证"])
@@ -51,6 +55,10 @@ api_router.include_router(audio_router, prefix="/audio", tags=["音频生成"])
 api_router.include_router(bgms_router, prefix="/bgms", tags=["BGM管理"])
 api_router.include_router(tasks_router, prefix="/tasks", tags=["任务管理"])
 api_router.include_router(video_tasks_router, prefix="/video-tasks", tags=["视频任务"])  # 新增
+api_router.include_router(media_router, prefix="/media", tags=["媒体分发"])
+api_router.include_router(uploads_router, prefix="/uploads", tags=["断点续传"])
 api_router.include_router(admin_router, prefix="/admin", tags=["管理员"])
+api_router.include_router(generation_batches_router, prefix="/generation-batches", tags=["生成批次"])
+api_router.include_router(pipelines_router, prefix="/pipelines", tags=["章节流水线"])
 
 __all__ = ["api_router"]
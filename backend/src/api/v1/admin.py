@@ -6,7 +6,7 @@
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -115,6 +115,57 @@ class StorageFileInfo(BaseModel):
     url: str
 
 
+class StorageGCRequest(BaseModel):
+    """存储垃圾回收请求"""
+    dry_run: bool = Field(True, description="试运行，只生成报告不删除")
+    grace_hours: Optional[int] = Field(None, ge=1, description="宽限期（小时），默认 STORAGE_GC_GRACE_HOURS")
+    prefixes: Optional[List[str]] = Field(None, description="参与回收的前缀，默认 STORAGE_GC_PREFIXES")
+    max_deletes_per_second: Optional[int] = Field(None, ge=1, description="删除速率上限")
+
+
+class StorageGCResponse(BaseModel):
+    """存储垃圾回收提交响应"""
+    task_id: str = Field(..., description="Celery任务ID，可通过 /tasks/{task_id} 查询报告")
+    dry_run: bool
+
+
+class StorageMigrationCreateRequest(BaseModel):
+    """创建存储源迁移请求"""
+    source_id: UUID = Field(..., description="源存储源ID")
+    target_id: UUID = Field(..., description="目标存储源ID")
+    prefixes: Optional[List[str]] = Field(None, description="迁移的前缀，默认整个存储桶")
+    dual_read: bool = Field(True, description="启用目标存储源后，读取未命中的对象回退到源存储源")
+
+
+class StorageMigrationResponse(BaseModel):
+    """存储源迁移响应"""
+    id: UUID
+    source_id: UUID
+    target_id: UUID
+    status: str
+    prefixes: List[str] = Field(..., validation_alias="prefix_list")
+    dual_read: bool
+    prefix_index: int
+    last_key: Optional[str] = None
+    copied: int
+    copied_bytes: int
+    skipped: int
+    failed: int
+    last_error: Optional[str] = None
+    task_id: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class CatalogSyncResponse(BaseModel):
+    """对象目录同步响应"""
+    scanned: int = Field(..., description="扫描的对象数")
+    removed: int = Field(..., description="移除的失效记录数")
+
+
 # ============================================
 # Dependencies
 # ============================================
@@ -506,13 +557,15 @@ async def activate_storage_source(
     await db.commit()
     await db.refresh(source)
 
-    # 重新加载存储客户端配置
+    # 重新加载存储客户端配置；该存储源是迁移目标时开启过渡期读取回退
+    from src.services.storage_migration import apply_dual_read
     from src.utils.storage import storage_client, StorageConfig
     storage_client.reload_config(StorageConfig(
         provider=source.provider, endpoint=source.endpoint,
         access_key=source.access_key, secret_key=source.secret_key,
         bucket=source.bucket, region=source.region, secure=source.secure
     ))
+    await apply_dual_read(db, storage_client, source.id)
 
     return source
 
@@ -537,6 +590,7 @@ async def deactivate_storage_source(
     # 恢复使用环境变量配置
     from src.utils.storage import storage_client, StorageConfig
     storage_client.reload_config(StorageConfig.from_env())
+    storage_client.set_fallback(None)
 
     return MessageResponse(message="存储源已禁用，已恢复使用默认配置")
 
@@ -564,12 +618,14 @@ async def test_storage_connection(
 @router.get("/storage/sources/{source_id}/files", response_model=List[StorageFileInfo], summary="浏览存储文件")
 async def list_storage_files(
     source_id: UUID,
+    response: Response,
     prefix: str = Query("", description="路径前缀"),
     limit: int = Query(100, le=500),
+    continuation_token: Optional[str] = Query(None, description="续页令牌（上一页响应头 X-Next-Token）"),
     admin_user: User = Depends(get_admin_user),
     db: AsyncSession = Depends(get_db)
 ):
-    """浏览存储源中的文件"""
+    """浏览存储源中的文件（还有下一页时通过响应头 X-Next-Token 返回续页令牌）"""
     result = await db.execute(select(StorageSource).where(StorageSource.id == source_id))
     source = result.scalar_one_or_none()
     if not source:
@@ -582,7 +638,10 @@ async def list_storage_files(
         bucket=source.bucket, region=source.region, secure=source.secure
     ))
 
-    files = await client.list_files(prefix, limit)
+    page = await client.list_files_page(prefix, limit, continuation_token)
+    files = page["files"]
+    if page["next_token"]:
+        response.headers["X-Next-Token"] = page["next_token"]
     return [StorageFileInfo(
         key=f["object_key"], size=f["size"],
         last_modified=f.get("last_modified"), url=f["url"]
@@ -615,4 +674,112 @@ async def delete_storage_file(
     raise HTTPException(status_code=500, detail="删除文件失败")
 
 
+@router.post("/storage/gc", response_model=StorageGCResponse, summary="存储垃圾回收")
+async def trigger_storage_gc(
+    data: StorageGCRequest,
+    admin_user: User = Depends(get_admin_user),
+):
+    """提交一次标记-清除垃圾回收任务，回收报告作为任务结果返回"""
+    from src.tasks.task import storage_gc
+
+    task = storage_gc.delay(
+        dry_run=data.dry_run,
+        prefixes=data.prefixes,
+        grace_hours=data.grace_hours,
+        max_deletes_per_second=data.max_deletes_per_second,
+    )
+    return StorageGCResponse(task_id=task.id, dry_run=data.dry_run)
+
+
+@router.get("/storage/migrations", response_model=List[StorageMigrationResponse], summary="获取存储迁移列表")
+async def list_storage_migrations(
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取全部存储源迁移（含进度与断点）"""
+    from src.services.storage_migration import StorageMigrationService
+    return await StorageMigrationService(db).list_migrations()
+
+
+@router.post("/storage/migrations", response_model=StorageMigrationResponse, summary="创建存储迁移")
+async def create_storage_migration(
+    data: StorageMigrationCreateRequest,
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    创建存储源迁移并投递后台任务
+
+    对象键保持不变地复制到目标存储源。建议流程：源存储源保持启用完成首轮复制 →
+    启用目标存储源（过渡期读取回退到源）→ resume 执行增量同步 → finalize 关闭回退。
+    """
+    from src.services.storage_migration import StorageMigrationService
+
+    service = StorageMigrationService(db)
+    migration = await service.create_migration(data.source_id, data.target_id, data.prefixes, data.dual_read)
+    return await service.enqueue(migration)
+
+
+@router.get("/storage/migrations/{migration_id}", response_model=StorageMigrationResponse, summary="获取存储迁移")
+async def get_storage_migration(
+    migration_id: UUID,
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """获取存储源迁移进度"""
+    from src.services.storage_migration import StorageMigrationService
+    return await StorageMigrationService(db).get_migration(migration_id)
+
+
+@router.post("/storage/migrations/{migration_id}/resume", response_model=StorageMigrationResponse, summary="继续存储迁移")
+async def resume_storage_migration(
+    migration_id: UUID,
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """失败或已取消的迁移从断点继续；已完成的迁移重新执行一轮增量同步"""
+    from src.services.storage_migration import StorageMigrationService
+
+    service = StorageMigrationService(db)
+    return await service.enqueue(await service.get_migration(migration_id))
+
+
+@router.post("/storage/migrations/{migration_id}/cancel", response_model=StorageMigrationResponse, summary="取消存储迁移")
+async def cancel_storage_migration(
+    migration_id: UUID,
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """取消迁移（当前批次结束后停止，断点保留，可通过 resume 继续）"""
+    from src.services.storage_migration import StorageMigrationService
+    return await StorageMigrationService(db).cancel(migration_id)
+
+
+@router.post("/storage/migrations/{migration_id}/finalize", response_model=StorageMigrationResponse, summary="结束迁移过渡期")
+async def finalize_storage_migration(
+    migration_id: UUID,
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """关闭读取回退（确认目标存储源数据完整后调用）"""
+    from src.services.storage_migration import StorageMigrationService
+    from src.utils.storage import storage_client
+    return await StorageMigrationService(db).finalize(migration_id, storage_client)
+
+
+@router.post("/storage/catalog/sync", response_model=CatalogSyncResponse, summary="重建对象目录")
+async def sync_object_catalog(
+    prefix: str = Query("", description="只同步该前缀下的对象"),
+    admin_user: User = Depends(get_admin_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """逐页扫描当前存储桶，重建 object_catalog（首次启用目录或发现不一致时使用）"""
+    from src.services.object_catalog import ObjectCatalogService
+    from src.utils.storage import get_storage_client
+
+    storage = await get_storage_client()
+    result = await ObjectCatalogService(db).sync_from_storage(storage, prefix)
+    return CatalogSyncResponse(**result)
+
+
 __all__ = ["router"]
@@ -2,14 +2,18 @@
 音频生成 API
 """
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import get_current_user_required
+from src.api.dependencies import get_current_user_required, get_idempotency_key
 from src.api.schemas.audio import AudioGenerateRequest, AudioGenerateResponse
+from src.core.admission import submit_task
 from src.core.database import get_db
 from src.core.exceptions import NotFoundError, BusinessLogicError
 from src.core.logging import get_logger
+from src.core.task_lock import batch_resource_id, task_submission
 from src.models.chapter import Chapter
 from src.models.user import User
 from src.tasks.task import generate_audio
@@ -24,6 +28,7 @@ async def generate_audio_api(
         *,
         current_user: User = Depends(get_current_user_required),
         db: AsyncSession = Depends(get_db),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
         request: AudioGenerateRequest
 ):
     """
@@ -53,17 +58,30 @@ async def generate_audio_api(
             resource_type="sentence"
         )
 
-    # 3. 投递任务到celery
+    # 3. 投递任务到celery（同一批句子同时只有一个音频生成任务）
     sentence_ids_hex = [sentence_id.hex for sentence_id in request.sentences_ids]
-    result = generate_audio.delay(
-        request.api_key_id.hex, 
-        sentence_ids_hex,
-        voice=request.voice,
-        model=request.model
-    )
+    async with task_submission(
+        "generate_audio", batch_resource_id(sentence_ids_hex), current_user.id, idempotency_key
+    ) as submission:
+        if submission.duplicate:
+            return AudioGenerateResponse(success=True, message="音频生成任务已在进行中", task_id=submission.task_id)
+        # 过载时进入用户的等待列表，按用户轮转放行
+        admission = await submit_task(
+            generate_audio,
+            args=(request.api_key_id.hex, sentence_ids_hex),
+            kwargs={"voice": request.voice, "model": request.model},
+            task_id=submission.task_id,
+            user_id=current_user.id,
+            allow_waiting=True,
+        )
 
-    logger.info(f"成功为句子列表 {request.sentences_ids} 投递音频生成任务，任务ID: {result.id}")
-    return AudioGenerateResponse(success=True, message="音频生成任务已提交", task_id=result.id)
+    if admission.waiting:
+        logger.info(f"音频生成任务进入等待列表，任务ID: {submission.task_id}，位置 {admission.position}")
+        return AudioGenerateResponse(
+            success=True, message=f"音频生成任务排队中（第 {admission.position} 位）", task_id=submission.task_id
+        )
+    logger.info(f"成功为句子列表 {request.sentences_ids} 投递音频生成任务，任务ID: {submission.task_id}")
+    return AudioGenerateResponse(success=True, message="音频生成任务已提交", task_id=submission.task_id)
 
 
 __all__ = ["router"]
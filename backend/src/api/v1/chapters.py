@@ -23,6 +23,7 @@ from src.models.chapter import ChapterStatus as ModelChapterStatus
 from src.models.user import User
 from src.services.chapter import ChapterService
 from src.services.project import ProjectService
+from src.utils.storage import storage_client
 
 logger = get_logger(__name__)
 
@@ -280,7 +281,10 @@ async def get_chapter_sentences(
         has_audio=has_audio,
     )
 
-    # 转换为响应模型
+    # 转换为响应模型（先批量确认媒体对象所在存储，签名时不再逐个检查）
+    await storage_client.resolve_signing_sources(
+        key for s in sentences for key in (s.image_url, s.audio_url)
+    )
     sentence_responses = [SentenceResponse.from_dict(s.to_dict()) for s in sentences]
 
     return {"sentences": sentence_responses, "total": len(sentence_responses)}
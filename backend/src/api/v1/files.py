@@ -11,6 +11,8 @@ from src.api.dependencies import get_current_user_required
 from src.core.database import get_db
 from src.core.logging import get_logger
 from src.models.user import User
+from src.models.object_catalog import ObjectKind
+from src.services.object_catalog import ObjectCatalogService
 from src.services.project import ProjectService
 from src.utils.file_handlers import FileHandler, FileProcessingError
 from src.utils.storage import get_storage_client
@@ -64,7 +66,8 @@ async def upload_file(
         metadata={
             "file_id": file_id,
             "file_type": file_type,
-        }
+        },
+        kind=ObjectKind.UPLOAD,
     )
 
     logger.info(f"文件上传到存储成功: {storage_result}")
@@ -107,62 +110,33 @@ async def cleanup_orphaned_files(
     from datetime import datetime, timedelta, timezone
 
     storage_client = await get_storage_client()
-    project_service = ProjectService(db)
+    catalog_service = ObjectCatalogService(db)
 
-    # 获取用户的所有项目
-    projects, _ = await project_service.get_owner_projects(
+    # 孤立文件直接由对象目录查询：未被项目/句子引用的上传文件
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    orphaned_entries = await catalog_service.find_orphaned_uploads(
         owner_id=current_user.id,
-        page=1,
-        size=1000  # 获取大量项目以检查关联
+        bucket=storage_client.bucket_name,
+        older_than=cutoff_date,
     )
-
-    # 收集所有项目关联的文件对象键
-    project_object_keys = set()
-    for project in projects:
-        if project.file_path:
-            project_object_keys.add(project.file_path)
-
-    # 获取用户上传目录下的所有文件
-    user_prefix = f"uploads/{current_user.id}/"
-    all_files = await storage_client.list_files(prefix=user_prefix, limit=1000)
-
-    # 找出孤立文件
-    cutoff_date = datetime.now(timezone.utc) - timedelta(days=older_than_days)
-    orphaned_files = []
-
-    for file_info in all_files:
-        object_key = file_info['object_key']
-
-        # 跳过项目关联的文件
-        if object_key in project_object_keys:
-            continue
-
-        # 检查文件时间
-        if file_info.get('last_modified'):
-            try:
-                file_date = datetime.fromisoformat(file_info['last_modified'].replace('Z', '+00:00'))
-                if file_date >= cutoff_date:
-                    continue
-            except ValueError:
-                logger.warning(f"无法解析文件时间: {file_info['last_modified']}")
-
-        orphaned_files.append(file_info)
+    orphaned_files = [
+        {
+            "object_key": entry.object_key,
+            "size": entry.size,
+            "last_modified": entry.updated_at.isoformat() if entry.updated_at else None,
+        }
+        for entry in orphaned_entries
+    ]
 
     # 如果不是试运行，执行删除
     deleted_files = []
-    deleted_keys = []
-    if not dry_run:
-        for file_info in orphaned_files:
-            try:
-                success = await storage_client.delete_file(file_info['object_key'])
-                if success:
-                    deleted_files.append(file_info['object_key'])
-                    deleted_keys.append(file_info['object_key'])
-            except Exception as e:
-                logger.error(f"删除文件失败 {file_info['object_key']}: {e}")
+    if not dry_run and orphaned_files:
+        result = await storage_client.delete_files([f['object_key'] for f in orphaned_files])
+        deleted_files = result["deleted"]
 
     total_size = sum(f.get('size', 0) for f in orphaned_files)
-    deleted_size = sum(f.get('size', 0) for f in orphaned_files if f['object_key'] in deleted_files)
+    deleted_set = set(deleted_files)
+    deleted_size = sum(f.get('size', 0) for f in orphaned_files if f['object_key'] in deleted_set)
 
     # 格式化文件详情
     files_details = [
@@ -204,37 +178,22 @@ async def get_storage_usage(
     """
     storage_client = await get_storage_client()
     project_service = ProjectService(db)
+    catalog_service = ObjectCatalogService(db)
 
     # 获取项目统计信息
     stats = await project_service.get_project_statistics(current_user.id)
 
-    # 获取存储文件列表
-    user_prefix = f"uploads/{current_user.id}/"
-    files = await storage_client.list_files(prefix=user_prefix, limit=1000)
-
-    # 按文件类型统计
-    file_type_stats = {}
-    total_size = 0
-
-    for file_info in files:
-        file_size = file_info.get('size', 0)
-        total_size += file_size
-
-        # 从对象键推断文件类型
-        object_key = file_info['object_key']
-        if '.' in object_key.split('/')[-1]:
-            ext = object_key.split('.')[-1].lower()
-            if ext in file_type_stats:
-                file_type_stats[ext] += 1
-            else:
-                file_type_stats[ext] = 1
+    # 存储用量由对象目录聚合得出，无需扫描存储桶
+    usage = await catalog_service.get_usage(current_user.id, storage_client.bucket_name)
+    total_size = usage["total_size"]
+    file_type_stats = usage["by_extension"]
 
     quota_limit_gb = 10.0  # 示例：10GB限制
     quota_usage_percent = round((total_size / (quota_limit_gb * 1024 * 1024 * 1024)) * 100, 2)
 
     return FileStorageUsageResponse(
         success=True,
-        total_files=len(files),
+        total_files=usage["total_files"],
         total_size_mb=round(total_size / (1024 * 1024), 2),
         total_size_gb=round(total_size / (1024 * 1024 * 1024), 2),
         file_type_distribution=file_type_stats,
@@ -250,8 +209,9 @@ async def list_user_files(
         current_user: User = Depends(get_current_user_required),
         db: AsyncSession = Depends(get_db),
         prefix: Optional[str] = Query(None, description="文件前缀过滤"),
-        page: int = Query(1, ge=1, description="页码"),
-        size: int = Query(50, ge=1, le=200, description="每页大小")
+        page: int = Query(1, ge=1, description="页码（未提供 continuation_token 时按页码逐页跳转）"),
+        size: int = Query(50, ge=1, le=200, description="每页大小"),
+        continuation_token: Optional[str] = Query(None, description="上一页返回的 next_token")
 ):
     """
     列出用户的文件
@@ -262,30 +222,39 @@ async def list_user_files(
         prefix: 文件前缀过滤
         page: 页码
         size: 每页大小
+        continuation_token: 续页令牌
 
     Returns:
-        文件列表
+        文件列表（next_token 非空时表示还有下一页）
     """
     storage_client = await get_storage_client()
+    catalog_service = ObjectCatalogService(db)
 
     # 构建搜索前缀
     user_prefix = f"uploads/{current_user.id}/"
     search_prefix = user_prefix + (prefix or "")
 
-    # 获取文件列表
-    files = await storage_client.list_files(prefix=search_prefix, limit=size * page)
+    # 获取文件列表：优先使用续页令牌，否则从第一页开始跳到指定页
+    token = continuation_token
+    result = await storage_client.list_files_page(search_prefix, size, token)
+    if not continuation_token:
+        for _ in range(page - 1):
+            if not result["next_token"]:
+                result = {"files": [], "next_token": None}
+                break
+            result = await storage_client.list_files_page(search_prefix, size, result["next_token"])
 
-    # 计算总数（简化处理）
-    total_files = len(files)
+    # 总数来自对象目录
+    total_files = await catalog_service.count_objects(
+        current_user.id, storage_client.bucket_name, prefix=search_prefix
+    )
 
-    # 分页处理
-    start_index = (page - 1) * size
-    end_index = start_index + size
-    paginated_files = files[start_index:end_index]
+    # 只查询本页对象键是否被项目引用
+    page_keys = [f["object_key"] for f in result["files"]]
+    project_object_keys = await catalog_service.get_project_referenced_keys(current_user.id, page_keys)
 
-    # 清理文件信息
     cleaned_files = []
-    for file_info in paginated_files:
+    for file_info in result["files"]:
         cleaned_files.append({
             "object_key": file_info['object_key'],
             "filename": file_info['object_key'].split('/')[-1],
@@ -293,26 +262,9 @@ async def list_user_files(
             "size_mb": round(file_info.get('size', 0) / (1024 * 1024), 2),
             "last_modified": file_info.get('last_modified'),
             "url": file_info.get('url'),
-            "is_orphaned": True  # 需要进一步检查是否关联到项目
+            "is_orphaned": file_info['object_key'] not in project_object_keys,
         })
 
-    # 检查哪些文件是孤立的
-    project_service = ProjectService(db)
-    projects, _ = await project_service.get_owner_projects(
-        owner_id=current_user.id,
-        page=1,
-        size=1000
-    )
-
-    project_object_keys = set()
-    for project in projects:
-        if project.file_path:
-            project_object_keys.add(project.file_path)
-
-    # 更新孤立状态
-    for file_info in cleaned_files:
-        file_info['is_orphaned'] = file_info['object_key'] not in project_object_keys
-
     total_pages = (total_files + size - 1) // size
     orphaned_count = sum(1 for f in cleaned_files if f['is_orphaned'])
 
@@ -323,6 +275,7 @@ async def list_user_files(
         size=size,
         total_pages=total_pages,
         orphaned_count=orphaned_count,
+        next_token=result["next_token"],
     )
 
 
@@ -357,50 +310,27 @@ async def batch_delete_files(
         )
 
     storage_client = await get_storage_client()
-    project_service = ProjectService(db)
+    catalog_service = ObjectCatalogService(db)
 
     # 检查权限并过滤
     user_prefix = f"uploads/{current_user.id}/"
-    valid_keys = []
-    protected_keys = []
-
+    owned_keys = []
     for object_key in object_keys:
         # 检查文件是否属于当前用户
         if not object_key.startswith(user_prefix):
             logger.warning(f"用户 {current_user.id} 尝试删除不属于自己的文件: {object_key}")
             continue
+        owned_keys.append(object_key)
 
-        # 检查文件是否关联到项目
-        projects, _ = await project_service.get_owner_projects(
-            owner_id=current_user.id,
-            page=1,
-            size=1000
-        )
+    # 一次查询找出关联到项目的文件
+    referenced_keys = await catalog_service.get_project_referenced_keys(current_user.id, owned_keys)
+    protected_keys = [key for key in owned_keys if key in referenced_keys]
+    valid_keys = [key for key in owned_keys if key not in referenced_keys]
 
-        is_protected = False
-        for project in projects:
-            if project.file_path == object_key:
-                is_protected = True
-                protected_keys.append(object_key)
-                break
-
-        if not is_protected:
-            valid_keys.append(object_key)
-
-    # 执行删除
-    deleted_keys = []
-    failed_keys = []
-
-    for object_key in valid_keys:
-        try:
-            success = await storage_client.delete_file(object_key)
-            if success:
-                deleted_keys.append(object_key)
-            else:
-                failed_keys.append(object_key)
-        except Exception as e:
-            logger.error(f"删除文件失败 {object_key}: {e}")
-            failed_keys.append(object_key)
+    # 执行批量删除
+    result = await storage_client.delete_files(valid_keys)
+    deleted_keys = result["deleted"]
+    failed_keys = result["failed"]
 
     return FileBatchDeleteResponse(
         success=True,
@@ -436,28 +366,22 @@ async def check_file_integrity(
     from src.api.schemas.file import FileIntegrityCheckResult
 
     storage_client = await get_storage_client()
-    project_service = ProjectService(db)
+    catalog_service = ObjectCatalogService(db)
 
-    if project_id:
-        # 检查单个项目
-        project = await project_service.get_project_by_id(project_id, current_user.id)
-        if not project:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="项目不存在"
-            )
-
-        projects = [project]
-    else:
-        # 检查用户所有项目
-        projects, _ = await project_service.get_owner_projects(
-            owner_id=current_user.id,
-            page=1,
-            size=1000
+    # 一次LEFT JOIN取出项目及其文件的目录记录，不再逐个 head_object
+    project_files = await catalog_service.get_project_files(
+        owner_id=current_user.id,
+        bucket=storage_client.bucket_name,
+        project_id=project_id,
+    )
+    if project_id and not project_files:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="项目不存在"
         )
 
     results = []
-    for project in projects:
+    for project, entry in project_files:
         if not project.file_path:
             results.append(FileIntegrityCheckResult(
                 project_id=project.id,
@@ -469,55 +393,38 @@ async def check_file_integrity(
             ))
             continue
 
-        try:
-            # 检查文件是否存在
-            file_info = await storage_client.get_file_info(project.file_path)
-            file_exists = file_info is not None
-
-            if file_exists:
-                # 检查文件大小是否匹配
-                storage_size = file_info.get('size', 0)
-                project_size = project.file_size or 0
-                size_match = storage_size == project_size
-
-                # 检查文件哈希是否匹配
-                hash_match = file_info.get('metadata', {}).get('file_hash') == project.file_hash
-
-                results.append(FileIntegrityCheckResult(
-                    project_id=project.id,
-                    project_title=project.title,
-                    file_exists=file_exists,
-                    file_size_match=size_match,
-                    file_hash_match=hash_match,
-                    storage_size=storage_size,
-                    project_size=project_size,
-                    error=None
-                ))
-            else:
-                results.append(FileIntegrityCheckResult(
-                    project_id=project.id,
-                    project_title=project.title,
-                    file_exists=False,
-                    file_size_match=None,
-                    file_hash_match=None,
-                    error="文件在存储中不存在"
-                ))
-
-        except Exception as e:
+        if entry is None:
             results.append(FileIntegrityCheckResult(
                 project_id=project.id,
                 project_title=project.title,
                 file_exists=False,
                 file_size_match=None,
                 file_hash_match=None,
-                error=f"检查失败: {str(e)}"
+                error="文件在存储中不存在"
             ))
+            continue
+
+        project_size = project.file_size or 0
+        hash_match = None
+        if entry.sha256 and project.file_hash:
+            hash_match = entry.sha256 == project.file_hash
+
+        results.append(FileIntegrityCheckResult(
+            project_id=project.id,
+            project_title=project.title,
+            file_exists=True,
+            file_size_match=entry.size == project_size,
+            file_hash_match=hash_match,
+            storage_size=entry.size,
+            project_size=project_size,
+            error=None
+        ))
 
     # 统计结果
     total_checked = len(results)
     files_exist = sum(1 for r in results if r.file_exists)
     size_mismatch = sum(1 for r in results if r.file_exists and not r.file_size_match)
-    hash_mismatch = sum(1 for r in results if r.file_exists and not r.file_hash_match)
+    hash_mismatch = sum(1 for r in results if r.file_exists and r.file_hash_match is False)
 
     integrity_score = round(((files_exist - size_mismatch - hash_mismatch) / total_checked * 100) if total_checked > 0 else 0, 2)
 
@@ -0,0 +1,111 @@
+"""
+批量生成批次 API
+
+批量图片/音频生成任务的批次ID即任务ID（见 /image/generate-images、/audio/generate-audio），
+可查询每个句子的生成结果，只重试失败的句子，或取消执行中的批次。
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import get_current_user_required
+from src.api.schemas.generation_batch import (
+    GenerationBatchResponse,
+    GenerationBatchRetryResponse,
+    GenerationItemListResponse,
+    GenerationItemResponse,
+)
+from src.core.cancellation import request_cancel
+from src.core.database import get_db
+from src.core.exceptions import BusinessLogicError, ConflictError
+from src.core.logging import get_logger
+from src.core.task_lock import task_submission
+from src.models.generation_batch import GenerationBatchStatus, GenerationItemStatus
+from src.models.user import User
+from src.services.generation_batch import GenerationBatchService
+from src.tasks.task import dispatch_generation_batch
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/{batch_id}", response_model=GenerationBatchResponse)
+async def get_generation_batch(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        batch_id: str
+):
+    """获取生成批次统计"""
+    batch = await GenerationBatchService(db).get_batch(batch_id, current_user.id)
+    return GenerationBatchResponse.model_validate(batch)
+
+
+@router.get("/{batch_id}/items", response_model=GenerationItemListResponse)
+async def list_generation_items(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        batch_id: str,
+        item_status: Optional[GenerationItemStatus] = Query(None, alias="status", description="按生成状态筛选")
+):
+    """获取批次内每个句子的生成状态、尝试次数和错误信息"""
+    service = GenerationBatchService(db)
+    batch = await service.get_batch(batch_id, current_user.id)
+    items = await service.list_items(batch.id, item_status.value if item_status else None)
+    return GenerationItemListResponse(
+        batch_id=str(batch.id),
+        items=[GenerationItemResponse.model_validate(item) for item in items],
+    )
+
+
+@router.post("/{batch_id}/retry-failed", response_model=GenerationBatchRetryResponse)
+async def retry_failed_items(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        batch_id: str
+):
+    """只重试批次中失败的句子（已成功的句子不会重新生成）"""
+    service = GenerationBatchService(db)
+    batch = await service.get_batch(batch_id, current_user.id)
+    if batch.status not in (GenerationBatchStatus.PARTIAL.value, GenerationBatchStatus.FAILED.value):
+        raise BusinessLogicError("只有已结束且存在失败句子的批次才能重试")
+
+    async with task_submission(batch.operation, batch.lock_resource, current_user.id, task_id=str(batch.id)) as submission:
+        if submission.duplicate:
+            raise ConflictError("这批句子已有生成任务在进行中")
+        chunks = await service.reset_failed(batch)
+        dispatch_generation_batch(str(batch.id), chunks).apply_async()
+
+    logger.info(f"生成批次 {batch_id} 重试失败句子，重新派发分片 {chunks}")
+    return GenerationBatchRetryResponse(
+        success=True,
+        message="失败句子已重新提交",
+        task_id=str(batch.id),
+        chunks=chunks,
+    )
+
+
+@router.post("/{batch_id}/cancel", response_model=GenerationBatchResponse)
+async def cancel_generation_batch(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        batch_id: str
+):
+    """
+    取消生成批次：排队中的分片跳过，执行中的分片中断未完成的句子，已成功的句子保留；
+    所有分片结束后批次状态变为 cancelled
+    """
+    service = GenerationBatchService(db)
+    batch = await service.get_batch(batch_id, current_user.id)
+    batch = await service.request_cancel(batch)
+    await request_cancel(batch_id)
+    return GenerationBatchResponse.model_validate(batch)
+
+
+__all__ = ["router"]
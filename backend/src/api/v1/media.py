@@ -0,0 +1,300 @@
+"""
+媒体分发API
+
+通过后端直接从对象存储流式输出章节视频、句子图片/音频/视频和BGM，
+用于对象存储不对外暴露（内网/私有化部署）时的播放与下载。
+
+支持：
+- Range / 206 Partial Content（单区间；多区间请求退化为完整响应）
+- If-Range / ETag / Last-Modified 条件请求（304 Not Modified）
+- HEAD 请求
+- 按项目归属校验用户权限
+- 有界缓冲：每次仅从存储读取一个块并等待客户端消费后再读取下一块
+"""
+
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import APIRouter, Depends, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import get_current_user_for_media
+from src.core.database import get_db
+from src.core.exceptions import NotFoundError
+from src.core.logging import get_logger
+from src.models.bgm import BGM, BGMStatus
+from src.models.chapter import Chapter
+from src.models.paragraph import Paragraph
+from src.models.project import Project
+from src.models.sentence import Sentence
+from src.models.user import User
+from src.models.video_task import VideoTask
+from src.utils.storage import storage_client
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+# 句子可分发的资源类型 -> (字段名, 默认Content-Type)
+SENTENCE_MEDIA_FIELDS = {
+    "image": ("image_url", "image/png"),
+    "audio": ("audio_url", "audio/mpeg"),
+    "video": ("sentence_video_key", "video/mp4"),
+}
+
+
+class RangeNotSatisfiable(Exception):
+    """请求的Range无法满足"""
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    解析HTTP Range请求头（仅支持单个字节区间）
+
+    Args:
+        header: Range 头的值，例如 "bytes=0-1023"、"bytes=1024-"、"bytes=-500"
+        size: 对象总大小
+
+    Returns:
+        (start, end) 闭区间；头部缺失、格式无法识别或包含多个区间时返回None（按完整响应处理）
+
+    Raises:
+        RangeNotSatisfiable: 区间超出对象范围
+    """
+    if not header:
+        return None
+
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or not spec or "," in spec:
+        return None
+
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        return None
+    start_str, end_str = start_str.strip(), end_str.strip()
+
+    try:
+        if not start_str:
+            # 后缀区间：最后N个字节
+            suffix = int(end_str)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(size - suffix, 0), size - 1
+
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _http_date(value: Optional[datetime]) -> Optional[str]:
+    """格式化为HTTP日期"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _parse_http_date(value: Optional[str]) -> Optional[datetime]:
+    """解析HTTP日期，失败时返回None"""
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match 比较（弱比较）"""
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return f'"{etag}"' in candidates
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """判断条件请求是否可以返回304"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return bool(etag) and _etag_matches(if_none_match, etag)
+
+    since = _parse_http_date(request.headers.get("if-modified-since"))
+    if since and last_modified:
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def _if_range_allows(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """If-Range 校验：不匹配时应忽略Range返回完整内容"""
+    if_range = request.headers.get("if-range")
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # If-Range 要求强比较，弱ETag永不匹配
+        return bool(etag) and if_range == f'"{etag}"'
+    since = _parse_http_date(if_range)
+    return bool(since and last_modified) and last_modified.replace(microsecond=0) == since
+
+
+async def serve_object(
+    request: Request,
+    object_key: str,
+    default_content_type: str = "application/octet-stream",
+) -> Response:
+    """
+    以流式方式分发存储对象，处理Range与条件请求
+
+    Args:
+        request: 当前请求
+        object_key: 对象键
+        default_content_type: 对象未记录Content-Type时使用的类型
+
+    Returns:
+        200 / 206 / 304 / 416 响应
+    """
+    stat = await storage_client.stat_object(object_key)
+    if stat is None:
+        raise NotFoundError("媒体文件不存在", resource_type="media", resource_id=object_key)
+
+    size = stat["size"]
+    etag = stat["etag"]
+    last_modified = stat["last_modified"]
+
+    headers: Dict[str, Any] = {
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=0, must-revalidate",
+    }
+    if etag:
+        headers["ETag"] = f'"{etag}"'
+    if last_modified:
+        headers["Last-Modified"] = _http_date(last_modified)
+
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    byte_range = None
+    if _if_range_allows(request, etag, last_modified):
+        try:
+            byte_range = parse_range_header(request.headers.get("range"), size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE, headers=headers)
+
+    if byte_range is None:
+        start, end = 0, size - 1
+        status_code = status.HTTP_200_OK
+    else:
+        start, end = byte_range
+        status_code = status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    length = max(end - start + 1, 0)
+    headers["Content-Length"] = str(length)
+    media_type = stat["content_type"] or default_content_type
+
+    if request.method == "HEAD" or length == 0:
+        return Response(status_code=status_code, headers=headers, media_type=media_type)
+
+    return StreamingResponse(
+        storage_client.download_stream(object_key, offset=start, length=length),
+        status_code=status_code,
+        headers=headers,
+        media_type=media_type,
+    )
+
+
+@router.api_route("/video-tasks/{task_id}", methods=["GET", "HEAD"])
+async def get_video_task_media(
+    task_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user_for_media),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    章节视频分发（支持Range拖动播放）
+    """
+    result = await db.execute(
+        select(VideoTask.video_key).where(
+            VideoTask.id == task_id,
+            VideoTask.user_id == current_user.id,
+        )
+    )
+    video_key = result.scalar_one_or_none()
+    if not video_key:
+        raise NotFoundError("视频不存在或无权访问", resource_type="video_task", resource_id=task_id)
+
+    return await serve_object(request, video_key, "video/mp4")
+
+
+@router.api_route("/sentences/{sentence_id}/{kind}", methods=["GET", "HEAD"])
+async def get_sentence_media(
+    sentence_id: str,
+    kind: str,
+    request: Request,
+    current_user: User = Depends(get_current_user_for_media),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    句子资源分发（kind: image / audio / video）
+    """
+    if kind not in SENTENCE_MEDIA_FIELDS:
+        raise NotFoundError("不支持的媒体类型", resource_type="media", resource_id=kind)
+    field, default_content_type = SENTENCE_MEDIA_FIELDS[kind]
+
+    result = await db.execute(
+        select(getattr(Sentence, field))
+        .join(Paragraph, Sentence.paragraph_id == Paragraph.id)
+        .join(Chapter, Paragraph.chapter_id == Chapter.id)
+        .join(Project, Chapter.project_id == Project.id)
+        .where(
+            Sentence.id == sentence_id,
+            Project.owner_id == current_user.id,
+        )
+    )
+    object_key = result.scalar_one_or_none()
+    if not object_key:
+        raise NotFoundError("媒体文件不存在或无权访问", resource_type="sentence", resource_id=sentence_id)
+
+    return await serve_object(request, object_key, default_content_type)
+
+
+@router.api_route("/bgms/{bgm_id}", methods=["GET", "HEAD"])
+async def get_bgm_media(
+    bgm_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user_for_media),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    BGM音频分发
+    """
+    result = await db.execute(
+        select(BGM.file_key).where(
+            BGM.id == bgm_id,
+            BGM.user_id == current_user.id,
+            BGM.status == BGMStatus.ACTIVE,
+        )
+    )
+    file_key = result.scalar_one_or_none()
+    if not file_key:
+        raise NotFoundError("BGM不存在或无权访问", resource_type="bgm", resource_id=bgm_id)
+
+    return await serve_object(request, file_key, "audio/mpeg")
+
+
+__all__ = ["router", "parse_range_header", "serve_object", "RangeNotSatisfiable"]
@@ -0,0 +1,125 @@
+"""
+章节流水线 API
+
+一次提交完成 提示词 → 图片/音频 → 视频，见 src.services.chapter_pipeline。
+"""
+
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import get_current_user_required, get_idempotency_key
+from src.api.schemas.pipeline import PipelineCreate, PipelineResponse, PipelineSubmitResponse
+from src.core.database import get_db
+from src.core.exceptions import BusinessLogicError, ConflictError
+from src.core.logging import get_logger
+from src.core.task_lock import task_submission
+from src.models.chapter import Chapter
+from src.models.chapter_pipeline import ChapterPipeline
+from src.models.user import User
+from src.services.chapter import ChapterService
+from src.services.chapter_pipeline import PIPELINE_OPERATION, ChapterPipelineService
+from src.services.project import ProjectService
+from src.tasks.task import build_pipeline_canvas
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+def _dispatch(pipeline: ChapterPipeline, plan) -> None:
+    build_pipeline_canvas(
+        str(pipeline.id), str(pipeline.image_batch_id), str(pipeline.audio_batch_id), plan
+    ).apply_async()
+
+
+async def _target_chapters(db: AsyncSession, request: PipelineCreate, user_id: str) -> List[Chapter]:
+    """待执行的章节（校验项目归属）"""
+    project_service = ProjectService(db)
+    if request.chapter_id:
+        chapter = await ChapterService(db).get_chapter_by_id(str(request.chapter_id))
+        await project_service.get_project_by_id(str(chapter.project_id), user_id)
+        return [chapter]
+
+    await project_service.get_project_by_id(str(request.project_id), user_id)
+    result = await db.execute(
+        select(Chapter).where(Chapter.project_id == request.project_id).order_by(Chapter.chapter_number)
+    )
+    chapters = list(result.scalars().all())
+    if not chapters:
+        raise BusinessLogicError("项目没有章节")
+    return chapters
+
+
+@router.post("/", response_model=PipelineSubmitResponse)
+async def create_pipelines(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
+        request: PipelineCreate
+):
+    """
+    提交章节（或项目下所有章节）的生成流水线
+
+    同一章节同时只有一条流水线：重复提交返回已有流水线ID。
+    """
+    service = ChapterPipelineService(db)
+    params = request.model_dump(
+        mode="json", exclude={"chapter_id", "project_id", "api_key_id"}
+    )
+
+    pipeline_ids = []
+    for chapter in await _target_chapters(db, request, str(current_user.id)):
+        # 按项目提交时同一个 Idempotency-Key 覆盖多个章节
+        chapter_key = f"{idempotency_key}:{chapter.id.hex}" if idempotency_key else None
+        async with task_submission(PIPELINE_OPERATION, str(chapter.id), current_user.id, chapter_key) as submission:
+            if not submission.duplicate:
+                pipeline = await service.create_pipeline(
+                    submission.task_id, str(current_user.id), chapter, str(request.api_key_id), params
+                )
+                _dispatch(pipeline, await service.start(pipeline))
+        pipeline_ids.append(submission.task_id)
+
+    logger.info(f"提交章节流水线: {pipeline_ids}")
+    return PipelineSubmitResponse(success=True, message="流水线已提交", pipeline_ids=pipeline_ids)
+
+
+@router.get("/{pipeline_id}", response_model=PipelineResponse)
+async def get_pipeline(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        pipeline_id: str
+):
+    """获取流水线及各节点状态"""
+    service = ChapterPipelineService(db)
+    pipeline = await service.get_pipeline(pipeline_id, current_user.id)
+    return PipelineResponse(**await service.describe(pipeline))
+
+
+@router.post("/{pipeline_id}/resume", response_model=PipelineResponse)
+async def resume_pipeline(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        pipeline_id: str
+):
+    """从失败的节点继续执行（只重新执行失败的句子和节点）"""
+    service = ChapterPipelineService(db)
+    pipeline = await service.get_pipeline(pipeline_id, current_user.id)
+
+    async with task_submission(
+        PIPELINE_OPERATION, str(pipeline.chapter_id), current_user.id, task_id=str(pipeline.id)
+    ) as submission:
+        if submission.duplicate:
+            raise ConflictError("该章节已有流水线在进行中")
+        _dispatch(pipeline, await service.prepare_resume(pipeline))
+
+    logger.info(f"流水线 {pipeline_id} 从失败节点继续执行")
+    return PipelineResponse(**await service.describe(pipeline))
+
+
+__all__ = ["router"]
@@ -5,15 +5,19 @@ AI导演引擎 API
 - 批量生成图像提示词
 """
 
+from typing import Optional
+
 from fastapi import APIRouter, Depends
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import get_current_user_required
+from src.api.dependencies import get_current_user_required, get_idempotency_key
 from src.api.schemas.prompt import PromptGenerateRequest, PromptGenerateResponse, PromptGenerateByIdsRequest
+from src.core.admission import submit_task
 from src.core.database import get_db
 from src.core.exceptions import NotFoundError, BusinessLogicError
 from src.core.logging import get_logger
+from src.core.task_lock import batch_resource_id, task_submission
 from src.models.chapter import Chapter, ChapterStatus
 from src.models.user import User
 from src.services.project import ProjectService
@@ -29,6 +33,7 @@ async def generate_prompts(
         *,
         current_user: User = Depends(get_current_user_required),
         db: AsyncSession = Depends(get_db),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
         request: PromptGenerateRequest
 ):
     """
@@ -52,16 +57,31 @@ async def generate_prompts(
     project_service = ProjectService(db)
     await project_service.get_project_by_id(chapter.project_id, current_user.id)
 
-    # 2. 投递任务到celery
-    result = generate_prompts_task.delay(chapter.id.hex, request.api_key_id.hex, request.style, request.model, request.custom_prompt)
+    # 2. 投递任务到celery（同一章节同时只有一个提示词生成任务）
+    async with task_submission("generate_prompts", chapter.id.hex, current_user.id, idempotency_key) as submission:
+        if submission.duplicate:
+            return PromptGenerateResponse(success=True, message="提示词生成任务已在进行中", task_id=submission.task_id)
+        # 过载时进入用户的等待列表，按用户轮转放行
+        admission = await submit_task(
+            generate_prompts_task,
+            args=(chapter.id.hex, request.api_key_id.hex, request.style, request.model, request.custom_prompt),
+            task_id=submission.task_id,
+            user_id=current_user.id,
+            allow_waiting=True,
+        )
 
     # 3.更新章节状态为提示词生成中
     chapter.status = "generating_prompts"
     await db.flush()
     await db.commit()
 
-    logger.info(f"成功为章节 {request.chapter_id} 投递提示词生成任务，任务ID: {result.id}")
-    return PromptGenerateResponse(success=True, message="提示词生成任务已提交", task_id=result.id)
+    if admission.waiting:
+        logger.info(f"章节 {request.chapter_id} 提示词生成任务进入等待列表，任务ID: {submission.task_id}")
+        return PromptGenerateResponse(
+            success=True, message=f"提示词生成任务排队中（第 {admission.position} 位）", task_id=submission.task_id
+        )
+    logger.info(f"成功为章节 {request.chapter_id} 投递提示词生成任务，任务ID: {submission.task_id}")
+    return PromptGenerateResponse(success=True, message="提示词生成任务已提交", task_id=submission.task_id)
 
 
 @router.post("/generate-prompts-ids", response_model=PromptGenerateResponse)
@@ -69,6 +89,7 @@ async def generate_prompts(
         *,
         current_user: User = Depends(get_current_user_required),
         db: AsyncSession = Depends(get_db),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
         request: PromptGenerateByIdsRequest
 ):
     """
@@ -77,11 +98,25 @@ async def generate_prompts(
     根据句子ID列表，调用LLM为每个句子生成专业的图像提示词。
     """
 
-    # 1. 投递任务到celery
-    result = generate_prompts_by_ids.delay(request.sentence_ids, request.api_key_id.hex, request.style, request.model, request.custom_prompt)
+    # 1. 投递任务到celery（同一批句子同时只有一个提示词生成任务）
+    resource_id = batch_resource_id(request.sentence_ids)
+    async with task_submission("generate_prompts_by_ids", resource_id, current_user.id, idempotency_key) as submission:
+        if submission.duplicate:
+            return PromptGenerateResponse(success=True, message="提示词生成任务已在进行中", task_id=submission.task_id)
+        admission = await submit_task(
+            generate_prompts_by_ids,
+            args=(request.sentence_ids, request.api_key_id.hex, request.style, request.model, request.custom_prompt),
+            task_id=submission.task_id,
+            user_id=current_user.id,
+            allow_waiting=True,
+        )
 
-    logger.info(f"成功为章节 {request.sentence_ids} 投递提示词生成任务，任务ID: {result.id}")
-    return PromptGenerateResponse(success=True, message="提示词生成任务已提交，请稍后查看结果。", task_id=result.id)
+    if admission.waiting:
+        return PromptGenerateResponse(
+            success=True, message=f"提示词生成任务排队中（第 {admission.position} 位）", task_id=submission.task_id
+        )
+    logger.info(f"成功为章节 {request.sentence_ids} 投递提示词生成任务，任务ID: {submission.task_id}")
+    return PromptGenerateResponse(success=True, message="提示词生成任务已提交，请稍后查看结果。", task_id=submission.task_id)
 
 
 __all__ = ["router"]
@@ -7,6 +7,7 @@ from src.api.dependencies import get_current_user_required, get_db
 from src.api.schemas.sentence import SentenceCreate, SentenceResponse, SentenceUpdate, SentenceListResponse
 from src.models.user import User
 from src.services.sentence import SentenceService
+from src.utils.storage import storage_client
 
 router = APIRouter()
 
@@ -29,6 +30,9 @@ async def list_sentences(
     """
     sentence_service = SentenceService(db)
     sentences = await sentence_service.get_sentences_by_paragraph(paragraph_id)
+    await storage_client.resolve_signing_sources(
+        key for s in sentences for key in (s.image_url, s.audio_url)
+    )
     
     # 使用 from_dict 转换
     sentence_responses = [SentenceResponse.from_dict(s.to_dict()) for s in sentences]
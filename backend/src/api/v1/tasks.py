@@ -4,11 +4,14 @@
 
 from celery.result import AsyncResult
 from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.dependencies import get_current_user_required
-from src.api.schemas.task import TaskStatusResponse
+from src.api.schemas.task import TaskBulkStatusRequest, TaskBulkStatusResponse, TaskRunStatus, TaskStatusResponse
+from src.core.database import get_db
 from src.core.logging import get_logger
 from src.models.user import User
+from src.services.task_run import TaskRunService
 from src.tasks.task import celery_app
 
 logger = get_logger(__name__)
@@ -44,6 +47,29 @@ def safe_result(task_result: AsyncResult):
     return None
 
 
+@router.post("/bulk-status", response_model=TaskBulkStatusResponse)
+async def get_bulk_task_status(
+    request: TaskBulkStatusRequest,
+    current_user: User = Depends(get_current_user_required),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    批量获取任务状态
+
+    按任务ID列表、项目或章节一次查询 task_runs 表（由 Worker 任务信号写入），
+    适合前端一次轮询整个项目的任务；进行中的任务叠加最新进度。
+    """
+    statuses = await TaskRunService(db).bulk_status(
+        str(current_user.id),
+        task_ids=[str(task_id) for task_id in request.task_ids or []],
+        project_id=str(request.project_id) if request.project_id else None,
+        chapter_id=str(request.chapter_id) if request.chapter_id else None,
+        states=request.states,
+        limit=request.limit,
+    )
+    return TaskBulkStatusResponse(tasks=[TaskRunStatus(**status) for status in statuses])
+
+
 @router.get("/{task_id}", response_model=TaskStatusResponse)
 async def get_task_status(
     task_id: str,
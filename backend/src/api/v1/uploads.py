@@ -0,0 +1,180 @@
+"""
+断点续传API
+
+大文件（项目文件、BGM）分片上传，连接中断后可从已接收的偏移继续：
+
+    POST   /uploads                     创建会话，返回 upload_id 和 chunk_size
+    HEAD   /uploads/{upload_id}         查询偏移（响应头 Upload-Offset / Upload-Length）
+    GET    /uploads/{upload_id}         查询会话
+    PATCH  /uploads/{upload_id}         追加分片（请求头 Upload-Offset，可选 Upload-Checksum）
+    POST   /uploads/{upload_id}/complete 完成上传
+    DELETE /uploads/{upload_id}         取消上传
+
+直传（数据不经过API进程）：
+
+    POST   /uploads/direct                       创建直传会话，返回预签名PUT或分片URL
+    POST   /uploads/direct/{upload_id}/complete  上传完成，投递校验任务
+    GET    /uploads/{upload_id}                  轮询校验结果
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.dependencies import get_current_user_required
+from src.api.schemas.base import MessageResponse
+from src.api.schemas.upload import (DirectUploadComplete, DirectUploadCreate, DirectUploadResponse,
+                                    UploadCompleteResponse, UploadSessionCreate, UploadSessionResponse)
+from src.core.database import get_db
+from src.core.logging import get_logger
+from src.models.user import User
+from src.services.resumable_upload import ResumableUploadService, UploadPurpose
+
+logger = get_logger(__name__)
+
+router = APIRouter()
+
+
+def _offset_headers(response: Response, session: dict) -> None:
+    response.headers["Upload-Offset"] = str(session["offset"])
+    response.headers["Upload-Length"] = str(session["size"])
+    response.headers["Cache-Control"] = "no-store"
+
+
+@router.post("/", response_model=UploadSessionResponse)
+async def create_upload(
+    *,
+    current_user: User = Depends(get_current_user_required),
+    data: UploadSessionCreate,
+    response: Response,
+):
+    """创建上传会话（此时完成文件名、类型和大小校验）"""
+    session = await ResumableUploadService().create_session(
+        user_id=str(current_user.id),
+        filename=data.filename,
+        size=data.size,
+        purpose=UploadPurpose(data.purpose),
+        content_type=data.content_type,
+        sha256=data.sha256,
+        name=data.name,
+    )
+    _offset_headers(response, session)
+    return session
+
+
+@router.post("/direct", response_model=DirectUploadResponse)
+async def create_direct_upload(
+    *,
+    current_user: User = Depends(get_current_user_required),
+    data: DirectUploadCreate,
+):
+    """
+    创建直传会话
+
+    客户端按返回的地址直接上传到对象存储：
+    - method=PUT：PUT 整个文件到 url，并携带 headers
+    - method=multipart：按 part_size 切分，依次 PUT 到各分片 url，记录响应头中的 ETag
+    """
+    return await ResumableUploadService().create_direct_session(
+        user_id=str(current_user.id),
+        filename=data.filename,
+        size=data.size,
+        purpose=UploadPurpose(data.purpose),
+        content_type=data.content_type,
+        sha256=data.sha256,
+        name=data.name,
+        title=data.title,
+        description=data.description,
+    )
+
+
+@router.post("/direct/{upload_id}/complete", response_model=UploadSessionResponse)
+async def complete_direct_upload(
+    upload_id: str,
+    data: DirectUploadComplete,
+    current_user: User = Depends(get_current_user_required),
+):
+    """
+    直传完成，投递后台校验（大小、文件头、编码/格式、SHA-256）
+
+    通过 GET /uploads/{upload_id} 轮询：completed 时 result 中包含对象键
+    （声明了项目标题时还包含 project_id 和解析任务ID），failed 时 error 为原因。
+    """
+    parts = [(p.part_number, p.etag) for p in data.parts] if data.parts else None
+    return await ResumableUploadService().complete_direct(upload_id, str(current_user.id), parts)
+
+
+@router.head("/{upload_id}")
+async def head_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user_required),
+):
+    """查询续传偏移"""
+    session = await ResumableUploadService().get_session(upload_id, str(current_user.id))
+    response = Response(status_code=200)
+    _offset_headers(response, session)
+    return response
+
+
+@router.get("/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload(
+    upload_id: str,
+    response: Response,
+    current_user: User = Depends(get_current_user_required),
+):
+    """查询上传会话"""
+    session = await ResumableUploadService().get_session(upload_id, str(current_user.id))
+    _offset_headers(response, session)
+    return session
+
+
+@router.patch("/{upload_id}", response_model=UploadSessionResponse)
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0, description="本分片的起始偏移"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum", description="sha256 <base64>"),
+    current_user: User = Depends(get_current_user_required),
+):
+    """
+    追加一个分片
+
+    请求体为原始字节（Content-Type: application/offset+octet-stream），
+    长度必须等于 chunk_size（最后一片为剩余长度）。
+    """
+    session = await ResumableUploadService().append_chunk(
+        upload_id,
+        str(current_user.id),
+        upload_offset,
+        request.stream(),
+        upload_checksum,
+    )
+    _offset_headers(response, session)
+    return session
+
+
+@router.post("/{upload_id}/complete", response_model=UploadCompleteResponse)
+async def complete_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user_required),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    完成上传
+
+    项目文件返回 object_key / sha256，用于创建项目（file_path / file_hash）；
+    BGM直接创建记录并返回 bgm_id。
+    """
+    return await ResumableUploadService().complete(upload_id, str(current_user.id), db)
+
+
+@router.delete("/{upload_id}", response_model=MessageResponse)
+async def abort_upload(
+    upload_id: str,
+    current_user: User = Depends(get_current_user_required),
+):
+    """取消上传"""
+    await ResumableUploadService().abort(upload_id, str(current_user.id))
+    return MessageResponse(message="上传已取消")
@@ -2,13 +2,15 @@
 视频任务管理API
 """
 
+import asyncio
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import get_current_user_required
+from src.api.dependencies import get_current_user_required, get_idempotency_key
 from src.api.schemas.video_task import (
+    VideoTaskCancelResponse,
     VideoTaskCreate,
     VideoTaskDeleteResponse,
     VideoTaskListResponse,
@@ -16,28 +18,49 @@ from src.api.schemas.video_task import (
     VideoTaskRetryResponse,
     VideoTaskStatsResponse,
 )
+from src.core.cancellation import request_cancel
 from src.core.database import get_db
+from src.core.exceptions import ConflictError, NotFoundError, TooManyRequestsError
 from src.core.logging import get_logger
+from src.core.progress import publish_progress
+from src.core.render_scheduler import cancel_render, enqueue_render, queue_positions
+from src.core.task_lock import TaskLock, task_submission
 from src.models.user import User
 from src.models.video_task import VideoTaskStatus
 from src.services.video_task import VideoTaskService
 from src.services.chapter import ChapterService
 from src.services.project import ProjectService
-from src.tasks.task import synthesize_video
+from src.tasks.task import celery_app, synthesize_video
+from src.utils.storage import storage_client
 
 logger = get_logger(__name__)
 
 router = APIRouter()
 
 
+async def _get_submitted_task(video_task_service: VideoTaskService, task_id: str, attempts: int = 20):
+    """获取并发请求刚刚抢占锁的任务（对方可能尚未提交任务记录，短暂等待）"""
+    for _ in range(attempts - 1):
+        try:
+            return await video_task_service.get_video_task_by_id(task_id)
+        except NotFoundError:
+            await asyncio.sleep(0.1)
+    return await video_task_service.get_video_task_by_id(task_id)
+
+
 @router.post("/", response_model=VideoTaskResponse)
 async def create_video_task(
         *,
         current_user: User = Depends(get_current_user_required),
         db: AsyncSession = Depends(get_db),
+        idempotency_key: Optional[str] = Depends(get_idempotency_key),
         task_data: VideoTaskCreate
 ):
-    """创建视频生成任务"""
+    """
+    创建视频生成任务
+
+    同一章节同时只有一个视频任务：重复提交（或相同 Idempotency-Key）返回已有任务。
+    """
     video_task_service = VideoTaskService(db)
     chapter_service = ChapterService(db)
     project_service = ProjectService(db)
@@ -46,21 +69,46 @@ async def create_video_task(
     chapter = await chapter_service.get_chapter_by_id(str(task_data.chapter_id))
     await project_service.get_project_by_id(str(chapter.project_id), str(current_user.id))
 
-    # 创建任务
-    task = await video_task_service.create_video_task(
-        user_id=str(current_user.id),
-        project_id=str(chapter.project_id),
-        chapter_id=str(task_data.chapter_id),
-        api_key_id=str(task_data.api_key_id) if task_data.api_key_id else None,
-        bgm_id=str(task_data.bgm_id) if task_data.bgm_id else None,
-        gen_setting=task_data.gen_setting
-    )
-
-    # 触发Celery任务
-    synthesize_video.delay(str(task.id))
+    queue_info = {}
+    async with task_submission(
+        "synthesize_video", str(task_data.chapter_id), current_user.id, idempotency_key
+    ) as submission:
+        if submission.duplicate:
+            task = await _get_submitted_task(video_task_service, submission.task_id)
+            queue_info = (await queue_positions([str(task.id)])).get(str(task.id), {})
+        else:
+            # 创建任务（任务ID即锁的持有者）
+            task = await video_task_service.create_video_task(
+                user_id=str(current_user.id),
+                project_id=str(chapter.project_id),
+                chapter_id=str(task_data.chapter_id),
+                api_key_id=str(task_data.api_key_id) if task_data.api_key_id else None,
+                bgm_id=str(task_data.bgm_id) if task_data.bgm_id else None,
+                gen_setting=task_data.gen_setting,
+                task_id=submission.task_id
+            )
+
+            # 进入渲染公平调度，有空闲槽位时立即投递（排队任务过多时任务标记为失败，可稍后重试）
+            try:
+                queue_info = await enqueue_render(
+                    synthesize_video,
+                    args=(str(task.id),),
+                    kwargs={"chapter_id": str(task_data.chapter_id)},
+                    task_id=str(task.id),
+                    user_id=current_user.id,
+                    sentence_count=chapter.sentence_count,
+                    priority=task_data.priority,
+                    send=celery_app.send_task,
+                )
+            except TooManyRequestsError as e:
+                await video_task_service.mark_task_failed(str(task.id), e.message)
+                raise
+            if queue_info.get("queue_position"):
+                logger.info(f"视频任务 {task.id} 排队中，位置 {queue_info['queue_position']}")
 
     # 获取章节和项目标题
     response_data = task.to_dict()
+    response_data.update(queue_info)
     response_data['chapter_title'] = chapter.title
     response_data['project_title'] = (await project_service.get_project_by_id(str(chapter.project_id), str(current_user.id))).title
 
@@ -102,10 +150,15 @@ async def get_video_tasks(
         sort_order=sort_order
     )
 
-    # 转换为响应模型
+    # 转换为响应模型（排队中的任务附带排队位置和预计等待时间）
+    positions = await queue_positions(
+        str(task.id) for task in tasks if task.status == VideoTaskStatus.PENDING.value
+    )
+    await storage_client.resolve_signing_sources(task.video_key for task in tasks)
     task_responses = []
     for task in tasks:
         task_dict = task.to_dict()
+        task_dict.update(positions.get(str(task.id), {}))
         if task.chapter:
             task_dict['chapter_title'] = task.chapter.title
         if task.project:
@@ -154,6 +207,8 @@ async def get_video_task(
 
     # 获取关联信息
     response_data = task.to_dict()
+    if task.status == VideoTaskStatus.PENDING.value:
+        response_data.update((await queue_positions([str(task.id)])).get(str(task.id), {}))
     
     # 获取章节和项目信息
     try:
@@ -188,7 +243,8 @@ async def delete_video_task(
             detail="无权删除此任务"
         )
 
-    # 删除任务
+    # 删除任务（排队中的任务同时移出渲染调度队列）
+    await cancel_render(task_id)
     await video_task_service.delete_video_task(task_id)
 
     return VideoTaskDeleteResponse(
@@ -223,13 +279,30 @@ async def retry_video_task(
             detail="只有失败的任务才能重试"
         )
 
-    # 重置任务状态
-    retried_task = await video_task_service.retry_task(task_id)
+    async with task_submission("synthesize_video", str(task.chapter_id), current_user.id, task_id=task_id) as submission:
+        if submission.duplicate:
+            raise ConflictError("该章节已有视频任务在进行中")
 
-    # 重新触发Celery任务
-    synthesize_video.delay(task_id)
+        # 重置任务状态
+        retried_task = await video_task_service.retry_task(task_id)
+
+        # 重新进入渲染调度（排队任务过多时恢复为失败状态并返回429）
+        try:
+            queue_info = await enqueue_render(
+                synthesize_video,
+                args=(task_id,),
+                kwargs={"chapter_id": str(task.chapter_id)},
+                task_id=task_id,
+                user_id=current_user.id,
+                sentence_count=retried_task.total_sentences,
+                send=celery_app.send_task,
+            )
+        except TooManyRequestsError as e:
+            await video_task_service.mark_task_failed(task_id, e.message)
+            raise
 
     response_data = retried_task.to_dict()
+    response_data.update(queue_info)
     return VideoTaskRetryResponse(
         success=True,
         message="任务已重新提交",
@@ -237,4 +310,48 @@ async def retry_video_task(
     )
 
 
+@router.post("/{task_id}/cancel", response_model=VideoTaskCancelResponse)
+async def cancel_video_task(
+        *,
+        current_user: User = Depends(get_current_user_required),
+        db: AsyncSession = Depends(get_db),
+        task_id: str
+):
+    """
+    取消视频任务
+
+    排队中（尚未投递给Worker）的任务直接取消；执行中的任务终止正在运行的FFmpeg进程并在当前步骤停止，
+    已生成的单句视频缓存保留，重新创建任务时复用。
+    """
+    video_task_service = VideoTaskService(db)
+    task = await video_task_service.get_video_task_by_id(task_id)
+
+    # 验证权限
+    if str(task.user_id) != str(current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="无权取消此任务"
+        )
+
+    # 先记录到数据库（Worker 开始执行时检查），再通知执行中的任务
+    task = await video_task_service.request_cancel(task_id)
+    await request_cancel(task_id)
+
+    if await cancel_render(task_id):
+        # 仍在渲染调度队列中：直接取消，并释放章节的视频合成锁
+        task = await video_task_service.mark_task_cancelled(task_id)
+        await TaskLock("synthesize_video", str(task.chapter_id), task_id).release()
+        await publish_progress(task_id, "cancelled", status="cancelled", user_id=str(current_user.id))
+        message = "任务已取消"
+    else:
+        message = "已请求取消，任务将在当前步骤停止"
+
+    logger.info(f"取消视频任务: task_id={task_id}, status={task.status}")
+    return VideoTaskCancelResponse(
+        success=True,
+        message=message,
+        task=VideoTaskResponse.from_dict(task.to_dict())
+    )
+
+
 __all__ = ["router"]
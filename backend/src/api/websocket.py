@@ -1,32 +1,44 @@
 """
 WebSocket API - 实时通信
+
+任务进度由 Worker 经 Redis 发布（见 src.core.progress），本进程的订阅者转发给订阅了该任务的连接；
+订阅时回放任务的最新状态。任务进度只发送给任务所属用户（按视频任务、流水线、生成批次或任务执行记录确定），
+刚提交、尚未确定归属的任务先保留订阅，确定归属之前不发送任何进度。
 """
 
 import json
-from typing import Dict, Any, Optional
+from typing import Awaitable, Callable, Dict, Any, Optional
 from datetime import datetime
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 import asyncio
 
 from src.core.logging import logger
+from src.core.progress import get_last_progress, listen_progress
 from src.core.security import verify_websocket_token
-# TODO: 在完成Celery配置后启用
-# from src.workers.base import app as celery_app
 
 router = APIRouter()
 
 
+async def _resolve_task_owner(task_id: str) -> Optional[str]:
+    from src.services.task_run import resolve_task_owner
+
+    return await resolve_task_owner(task_id)
+
+
 class ConnectionManager:
     """WebSocket连接管理器"""
 
-    def __init__(self):
+    def __init__(self, owner_resolver: Optional[Callable[[str], Awaitable[Optional[str]]]] = None):
         # 活跃连接 {user_id: {connection_id: websocket}}
         self.active_connections: Dict[str, Dict[str, WebSocket]] = {}
         # 连接元数据 {user_id: {connection_id: metadata}}
         self.connection_metadata: Dict[str, Dict[str, Any]] = {}
         # 任务订阅 {task_id: {user_id: set of connection_ids}}
         self.task_subscriptions: Dict[str, Dict[str, set]] = {}
+        # 已订阅任务的所属用户 {task_id: user_id}（任务没有订阅者时移除）
+        self.task_owners: Dict[str, str] = {}
+        self._resolve_owner = owner_resolver or _resolve_task_owner
 
     async def connect(self, websocket: WebSocket, user_id: str, connection_id: str):
         """接受连接"""
@@ -72,8 +84,9 @@ class ConnectionManager:
                 subscribers[user_id].discard(connection_id)
                 if not subscribers[user_id]:
                     del subscribers[user_id]
-            if not self.task_subscriptions[task_id]:
-                del self.task_subscriptions[task_id]
+        for task_id in [t for t, subscribers in self.task_subscriptions.items() if not subscribers]:
+            del self.task_subscriptions[task_id]
+            self.task_owners.pop(task_id, None)
 
         logger.info(f"WebSocket连接断开: user_id={user_id}, connection_id={connection_id}")
 
@@ -96,14 +109,36 @@ class ConnectionManager:
                     continue
                 await self.send_to_connection(user_id, connection_id, message)
 
+    async def task_owner(self, task_id: str) -> Optional[str]:
+        """任务所属用户（确定后缓存）"""
+        owner = self.task_owners.get(task_id)
+        if owner is None:
+            owner = await self._resolve_owner(task_id)
+            if owner is not None and task_id in self.task_subscriptions:
+                self.task_owners[task_id] = owner
+        return owner
+
     async def subscribe_to_task(self, user_id: str, connection_id: str, task_id: str):
-        """订阅任务进度"""
+        """订阅任务进度（只能订阅自己的任务）"""
+        owner = await self.task_owner(task_id)
+        if owner is not None and owner != user_id:
+            logger.warning(f"拒绝订阅他人任务: user_id={user_id}, task_id={task_id}")
+            await self.send_to_connection(user_id, connection_id, {
+                "type": "error",
+                "message": "Task not found",
+                "task_id": task_id,
+                "timestamp": datetime.utcnow().isoformat(),
+            })
+            return
+
         if task_id not in self.task_subscriptions:
             self.task_subscriptions[task_id] = {}
         if user_id not in self.task_subscriptions[task_id]:
             self.task_subscriptions[task_id][user_id] = set()
 
         self.task_subscriptions[task_id][user_id].add(connection_id)
+        if owner is not None:
+            self.task_owners[task_id] = owner
 
         await self.send_to_connection(user_id, connection_id, {
             "type": "task_subscribed",
@@ -111,13 +146,27 @@ class ConnectionManager:
             "timestamp": datetime.utcnow().isoformat(),
         })
 
+        # 回放最新状态：订阅之前已发布的进度（归属未确定时不回放）
+        last = await get_last_progress(task_id) if owner is not None else None
+        if last:
+            await self.send_to_connection(user_id, connection_id, {
+                "type": "task_update",
+                "replay": True,
+                **last,
+            })
+
     def get_task_subscribers(self, task_id: str) -> Dict[str, set]:
         """获取任务订阅者"""
         return self.task_subscriptions.get(task_id, {})
 
     async def broadcast_task_update(self, task_id: str, update_data: dict):
-        """广播任务更新"""
+        """广播任务更新（只发送给任务所属用户的订阅，归属未确定时不发送）"""
         subscribers = self.get_task_subscribers(task_id)
+        if not subscribers:
+            return
+        owner_id = await self.task_owner(task_id)
+        if owner_id is None:
+            return
         message = {
             "type": "task_update",
             "task_id": task_id,
@@ -125,9 +174,8 @@ class ConnectionManager:
             **update_data
         }
 
-        for user_id, connection_ids in subscribers.items():
-            for connection_id in connection_ids:
-                await self.send_to_connection(user_id, connection_id, message)
+        for connection_id in list(subscribers.get(owner_id, ())):
+            await self.send_to_connection(owner_id, connection_id, message)
 
     async def ping_all(self):
         """向所有连接发送ping"""
@@ -249,6 +297,9 @@ async def handle_websocket_message(user_id: str, connection_id: str, message: di
                 manager.task_subscriptions[task_id][user_id].discard(connection_id)
                 if not manager.task_subscriptions[task_id][user_id]:
                     del manager.task_subscriptions[task_id][user_id]
+            if not manager.task_subscriptions[task_id]:
+                del manager.task_subscriptions[task_id]
+                manager.task_owners.pop(task_id, None)
 
             await manager.send_to_connection(user_id, connection_id, {
                 "type": "task_unsubscribed",
@@ -265,37 +316,35 @@ async def handle_websocket_message(user_id: str, connection_id: str, message: di
         })
 
 
-# Celery事件处理 - 任务进度更新
-async def setup_celery_events():
-    """设置Celery事件监听"""
-    from celery.events.state import State
-    from celery.events import EventReceiver
+# 任务进度桥接：Worker 经 Redis 发布的进度事件 -> 本进程的 WebSocket 订阅者
+async def forward_progress_event(event: dict):
+    """把一条进度事件转发给订阅该任务的连接"""
+    task_id = event.get("task_id")
+    if task_id and manager.get_task_subscribers(task_id):
+        await manager.broadcast_task_update(task_id, event)
 
-    async def handle_event(event):
-        event_type = event.get("type")
-        task_id = event.get("uuid")
 
-        if not task_id:
-            return
+_progress_listener: Optional[asyncio.Task] = None
 
-        # 处理任务相关事件
-        if event_type in ["task-succeeded", "task-failed", "task-retried", "task-revoked"]:
-            update_data = {
-                "event_type": event_type,
-                "status": event_type.split("-")[1],  # succeeded, failed, etc.
-                "timestamp": datetime.utcnow().isoformat(),
-            }
 
-            if event_type == "task-succeeded":
-                update_data["result"] = event.get("result")
-            elif event_type == "task-failed":
-                update_data["error"] = event.get("exception")
+def start_progress_bridge():
+    """启动进度订阅（API进程启动时调用）"""
+    global _progress_listener
+    if _progress_listener is None or _progress_listener.done():
+        _progress_listener = asyncio.create_task(listen_progress(forward_progress_event))
+        logger.info("任务进度桥接已启动")
 
-            await manager.broadcast_task_update(task_id, update_data)
 
-    # 这里需要设置实际的事件监听
-    # 由于复杂性和当前范围，暂时使用简化版本
-    logger.info("Celery事件监听器已设置")
+async def stop_progress_bridge():
+    """停止进度订阅"""
+    global _progress_listener
+    if _progress_listener is not None:
+        _progress_listener.cancel()
+        try:
+            await _progress_listener
+        except asyncio.CancelledError:
+            pass
+        _progress_listener = None
 
 
 # 定期ping任务
@@ -342,6 +391,9 @@ async def send_task_status(task_id: str, status: str, details: dict = None):
 # 导出管理器实例供其他模块使用
 __all__ = [
     "manager",
+    "forward_progress_event",
+    "start_progress_bridge",
+    "stop_progress_bridge",
     "send_task_progress",
     "send_task_status",
 ]
\ No newline at end of file
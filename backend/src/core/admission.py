@@ -0,0 +1,315 @@
+"""
+任务准入控制与背压
+
+接口投递生成类任务前先检查目标队列的积压和用户的在途任务数，过载时不再无限制地堆积消息：
+- 队列积压（代理中队列的 LLEN）超过 ADMISSION_MAX_QUEUE_DEPTH[queue]，
+  或用户在该队列的在途任务（已投递未结束）达到 ADMISSION_MAX_INFLIGHT_PER_USER[queue] 时拒绝准入
+- 拒绝时返回 429 和 Retry-After（按超出量 × 典型耗时 / 队列并发估算），
+  或（allow_waiting=True，批量生成类接口）放入用户在该队列的等待列表，按用户轮转逐个放行，
+  单个用户的大批量提交不会挤占其他用户；等待超过 ADMISSION_WAITING_TTL_SECONDS 的任务丢弃不再投递
+- 在途任务记录在 admission:inflight:<queue>:<user>（ZSET，分值为过期时间），任务结束时由 Worker
+  的 task_postrun 信号（批量生成由汇总任务）调用 release_admission 释放，并随即放行该队列的等待列表；
+  周期任务 maintenance.release_waiting_tasks 兜底放行。Worker 崩溃未释放的记录按
+  ADMISSION_SLOT_TTL_SECONDS 过期
+
+Redis 不可用时放行（只记录日志），准入控制不影响任务投递本身。
+"""
+
+import json
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from src.core.config import settings
+from src.core.exceptions import TooManyRequestsError
+from src.core.logging import get_logger
+from src.core.progress import publish_progress
+from src.core.redis import get_broker_redis_client, get_redis_client
+from src.core.task_lock import TaskLock
+
+logger = get_logger(__name__)
+
+INFLIGHT_KEY_PREFIX = "admission:inflight:"
+SLOT_KEY_PREFIX = "admission:slot:"
+WAITING_KEY_PREFIX = "admission:waiting:"
+WAITING_USERS_KEY_PREFIX = "admission:waiting-users:"
+
+# 清理过期记录后，在途数未达上限时占用一个名额（同一任务重复准入不重复占用）
+# KEYS: 在途ZSET, 名额键；ARGV: 当前时间, 过期时间, 上限, 任务ID, 名额值, TTL
+ADMIT_SCRIPT = """
+redis.call('zremrangebyscore', KEYS[1], '-inf', ARGV[1])
+if redis.call('zscore', KEYS[1], ARGV[4]) then
+    return 1
+end
+if redis.call('zcard', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('zadd', KEYS[1], ARGV[2], ARGV[4])
+redis.call('expire', KEYS[1], ARGV[6])
+redis.call('set', KEYS[2], ARGV[5], 'EX', ARGV[6])
+return 1
+"""
+
+# 释放任务占用的名额
+# KEYS: 名额键；ARGV: 在途ZSET前缀
+RELEASE_SCRIPT = """
+local slot = redis.call('get', KEYS[1])
+if not slot then
+    return 0
+end
+local sep = string.find(slot, '|', 1, true)
+redis.call('zrem', ARGV[1] .. string.sub(slot, 1, sep - 1), string.sub(slot, sep + 1))
+redis.call('del', KEYS[1])
+return 1
+"""
+
+
+def inflight_key(queue: str, user_id: Any) -> str:
+    return f"{INFLIGHT_KEY_PREFIX}{queue}:{user_id}"
+
+
+def waiting_key(queue: str, user_id: Any) -> str:
+    return f"{WAITING_KEY_PREFIX}{queue}:{user_id}"
+
+
+@dataclass
+class Admission:
+    """准入结果：已投递（waiting=False），或进入等待列表（waiting=True，position 为排在第几位）"""
+    task_id: str
+    queue: str
+    waiting: bool = False
+    position: Optional[int] = None
+
+
+class AdmissionRejected(Exception):
+    """准入被拒绝（reason 为 queue_depth / user_inflight）"""
+
+    def __init__(self, queue: str, reason: str, retry_after: int):
+        super().__init__(f"{queue}: {reason}")
+        self.queue = queue
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def estimate_retry_after(queue: str, excess: int) -> int:
+    """按超出量 × 典型耗时 / 队列并发估算多久后重试（秒）"""
+    from src.tasks.queues import QUEUES
+
+    typical = settings.ADMISSION_TYPICAL_TASK_SECONDS.get(queue, 60)
+    spec = QUEUES.get(queue)
+    concurrency = spec.concurrency if spec else 1
+    return max(1, math.ceil(typical * max(excess, 1) / max(concurrency, 1)))
+
+
+async def queue_depth(queue: str) -> int:
+    """代理中队列的积压消息数"""
+    return int(await get_broker_redis_client().llen(queue))
+
+
+async def try_admit(queue: str, user_id: Any, task_id: str) -> None:
+    """
+    为任务占用一个在途名额
+
+    Raises:
+        AdmissionRejected: 队列积压或用户在途任务数超过上限
+    """
+    max_depth = settings.ADMISSION_MAX_QUEUE_DEPTH.get(queue)
+    if max_depth is not None:
+        depth = await queue_depth(queue)
+        if depth >= max_depth:
+            raise AdmissionRejected(queue, "queue_depth", estimate_retry_after(queue, depth - max_depth + 1))
+
+    limit = settings.ADMISSION_MAX_INFLIGHT_PER_USER.get(queue)
+    if limit is None:
+        return
+    now = time.time()
+    ttl = settings.ADMISSION_SLOT_TTL_SECONDS
+    admitted = await get_redis_client().eval(
+        ADMIT_SCRIPT, 2, inflight_key(queue, user_id), f"{SLOT_KEY_PREFIX}{task_id}",
+        now, now + ttl, limit, str(task_id), f"{queue}:{user_id}|{task_id}", ttl,
+    )
+    if not admitted:
+        raise AdmissionRejected(queue, "user_inflight", estimate_retry_after(queue, 1))
+
+
+async def release_admission(task_id: str) -> bool:
+    """释放任务占用的在途名额（任务结束时调用，重复调用无影响）"""
+    try:
+        return bool(await get_redis_client().eval(
+            RELEASE_SCRIPT, 1, f"{SLOT_KEY_PREFIX}{task_id}", INFLIGHT_KEY_PREFIX,
+        ))
+    except Exception as e:
+        logger.warning(f"释放任务准入名额失败 (task_id={task_id}): {e}")
+        return False
+
+
+async def _enqueue_waiting(queue: str, user_id: Any, entry: Dict[str, Any]) -> Optional[int]:
+    """放入用户的等待列表，返回排队位置；等待列表已满时返回None"""
+    client = get_redis_client()
+    key = waiting_key(queue, user_id)
+    if await client.llen(key) >= settings.ADMISSION_MAX_WAITING_PER_USER:
+        return None
+    pipe = client.pipeline(transaction=True)
+    pipe.rpush(key, json.dumps(entry, ensure_ascii=False))
+    pipe.expire(key, settings.ADMISSION_WAITING_TTL_SECONDS)
+    pipe.sadd(f"{WAITING_USERS_KEY_PREFIX}{queue}", str(user_id))
+    position, _, _ = await pipe.execute()
+    return int(position)
+
+
+async def submit_task(
+    task,
+    args: Sequence[Any] = (),
+    kwargs: Optional[Dict[str, Any]] = None,
+    *,
+    task_id: str,
+    user_id: Any,
+    allow_waiting: bool = False,
+) -> Admission:
+    """
+    经准入控制投递 Celery 任务（apply_async(task_id=task_id)）
+
+    Args:
+        task: Celery 任务
+        args: 位置参数
+        kwargs: 关键字参数
+        task_id: 任务ID
+        user_id: 提交任务的用户ID
+        allow_waiting: 过载时放入等待列表（否则返回429）
+
+    Raises:
+        TooManyRequestsError: 过载且不允许等待（或等待列表已满）
+    """
+    from src.tasks.queues import queue_for
+
+    queue = queue_for(task.name)
+    kwargs = kwargs or {}
+    if settings.ADMISSION_ENABLED:
+        try:
+            await try_admit(queue, user_id, task_id)
+        except AdmissionRejected as rejected:
+            logger.info(f"任务准入被拒绝: {task.name} (user={user_id}, queue={queue}, reason={rejected.reason})")
+            position = None
+            if allow_waiting:
+                position = await _enqueue_waiting(queue, user_id, {
+                    "task_name": task.name,
+                    "args": list(args),
+                    "kwargs": kwargs,
+                    "task_id": str(task_id),
+                    "enqueued_at": time.time(),
+                })
+            if position is None:
+                message = "任务队列繁忙，请稍后重试" if rejected.reason == "queue_depth" else "进行中的任务过多，请稍后重试"
+                raise TooManyRequestsError(message, retry_after=rejected.retry_after,
+                                           details={"queue": queue, "reason": rejected.reason})
+            return Admission(str(task_id), queue, waiting=True, position=position)
+        except Exception as e:
+            logger.warning(f"任务准入检查失败，直接投递 ({task.name}, task_id={task_id}): {e}")
+
+    task.apply_async(args=tuple(args), kwargs=kwargs, task_id=str(task_id))
+    return Admission(str(task_id), queue)
+
+
+async def release_waiting(
+    send: Callable[..., Any],
+    max_per_queue: int = 1000,
+    queues: Optional[Iterable[str]] = None,
+) -> Dict[str, int]:
+    """
+    放行等待列表中的任务（任务结束时和周期任务调用）
+
+    每个队列按用户轮转，每轮每个用户放行队首的一个任务，直到队列或所有用户都没有余量。
+    同一时刻只有一个放行者（抢不到锁时直接返回，由持有者或下一次触发放行），同一个等待任务不会被重复投递。
+
+    Args:
+        send: 投递函数 send(task_name, args=..., kwargs=..., task_id=...)（celery_app.send_task）
+        max_per_queue: 每个队列单次最多放行的任务数
+        queues: 只放行这些队列（默认所有受准入控制的队列）
+
+    Returns:
+        {队列名: 放行数量}
+    """
+    client = get_redis_client()
+    queues = [q for q in (queues or settings.ADMISSION_MAX_INFLIGHT_PER_USER) if q in settings.ADMISSION_MAX_INFLIGHT_PER_USER]
+    released: Dict[str, int] = {queue: 0 for queue in queues}
+    waiting_users = {}
+    for queue in queues:
+        users = await client.smembers(f"{WAITING_USERS_KEY_PREFIX}{queue}")
+        if users:
+            waiting_users[queue] = sorted(users)
+    if not waiting_users:
+        return released
+
+    lock = TaskLock("release_waiting_tasks", "all", str(uuid.uuid4()))
+    if not await lock.acquire(settings.TASK_LOCK_TTL_SECONDS):
+        return released
+    try:
+        for queue, users in waiting_users.items():
+            released[queue] = await _release_queue(client, queue, users, send, max_per_queue)
+    finally:
+        await lock.release()
+    return released
+
+
+async def _release_queue(client, queue: str, users, send: Callable[..., Any], max_per_queue: int) -> int:
+    """按用户轮转放行一个队列的等待任务，返回放行数量"""
+    users_key = f"{WAITING_USERS_KEY_PREFIX}{queue}"
+    count = 0
+    while users and count < max_per_queue:
+        blocked = []
+        for user_id in users:
+            key = waiting_key(queue, user_id)
+            payload = await client.lindex(key, 0)
+            if payload is None:
+                await client.srem(users_key, user_id)
+                if await client.llen(key):
+                    # 移除期间恰好有新的等待任务
+                    await client.sadd(users_key, user_id)
+                blocked.append(user_id)
+                continue
+            entry = json.loads(payload)
+            if time.time() - entry["enqueued_at"] > settings.ADMISSION_WAITING_TTL_SECONDS:
+                await client.lpop(key)
+                await _expire_waiting(entry, user_id)
+                continue
+            try:
+                await try_admit(queue, user_id, entry["task_id"])
+            except AdmissionRejected as rejected:
+                blocked.append(user_id)
+                if rejected.reason == "queue_depth":
+                    # 队列已满，本轮不再放行该队列
+                    blocked = users
+                    break
+                continue
+            send(entry["task_name"], args=entry["args"], kwargs=entry["kwargs"], task_id=entry["task_id"])
+            await client.lpop(key)
+            count += 1
+            if count >= max_per_queue:
+                break
+        users = [user_id for user_id in users if user_id not in blocked]
+    if count:
+        logger.info(f"等待列表放行 {count} 个任务 (queue={queue})")
+    return count
+
+
+async def _expire_waiting(entry: Dict[str, Any], user_id: Any) -> None:
+    """丢弃等待超时的任务，发布终态事件（前端按任务ID得知任务未执行）"""
+    logger.warning(f"等待任务超时丢弃: {entry['task_name']} (task_id={entry['task_id']}, user={user_id})")
+    await publish_progress(
+        entry["task_id"], "finished", status="expired", message="等待超时，任务未执行，请重新提交",
+        user_id=user_id,
+    )
+
+
+__all__ = [
+    "Admission",
+    "AdmissionRejected",
+    "estimate_retry_after",
+    "queue_depth",
+    "release_admission",
+    "release_waiting",
+    "submit_task",
+    "try_admit",
+]
@@ -0,0 +1,180 @@
+"""
+协作式任务取消
+
+取消接口把取消标记写入 Redis（task-cancel:<task_id>，带过期时间）和数据库（cancel_requested_at），
+执行中的任务通过 CancellationScope 响应取消：
+- 在阶段边界和句子之间调用 checkpoint()，已请求取消时抛出 TaskCancelled
+- 后台每 TASK_CANCEL_POLL_SECONDS 检查一次标记；发现取消时终止作用域内登记的子进程组（FFmpeg），
+  并取消任务协程，挂起中的 Provider 调用随之取消，不必等到下一个检查点
+
+TaskCancelled 与 asyncio.CancelledError 一样继承 BaseException，不会被业务代码中的 except Exception 吞掉；
+任务在最外层捕获后保留已完成的部分结果，并把任务标记为已取消。
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import threading
+from contextvars import ContextVar
+from typing import Optional, Set
+
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.redis import get_redis_client
+
+logger = get_logger(__name__)
+
+CANCEL_KEY_PREFIX = "task-cancel:"
+
+_current_scope: ContextVar[Optional["CancellationScope"]] = ContextVar("cancellation_scope", default=None)
+
+
+class TaskCancelled(BaseException):
+    """任务已被取消"""
+
+    def __init__(self, task_id: str):
+        super().__init__(f"任务已取消: {task_id}")
+        self.task_id = task_id
+
+
+def cancel_key(task_id: str) -> str:
+    return f"{CANCEL_KEY_PREFIX}{task_id}"
+
+
+async def request_cancel(task_id: str) -> None:
+    """写入取消标记"""
+    await get_redis_client().set(cancel_key(str(task_id)), "1", ex=settings.TASK_CANCEL_TTL_SECONDS)
+
+
+async def is_cancel_requested(task_id: str) -> bool:
+    """是否已请求取消（Redis 不可用时视为未取消）"""
+    try:
+        return bool(await get_redis_client().exists(cancel_key(str(task_id))))
+    except Exception as e:
+        logger.warning(f"读取取消标记失败 (task_id={task_id}): {e}")
+        return False
+
+
+class CancellationScope:
+    """
+    任务内的取消作用域
+
+    用法：
+        async with CancellationScope(task_id) as cancellation:
+            ...
+            await cancellation.check()
+
+    作用域内（包括 asyncio.to_thread 执行的同步代码）通过 register_process 登记的子进程，
+    取消时按进程组终止。
+    """
+
+    def __init__(self, task_id: str, poll_interval: Optional[float] = None):
+        self.task_id = str(task_id)
+        self.poll_interval = settings.TASK_CANCEL_POLL_SECONDS if poll_interval is None else poll_interval
+        self.requested = False
+        self._processes: Set[subprocess.Popen] = set()
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._token = None
+
+    async def __aenter__(self) -> "CancellationScope":
+        self._task = asyncio.current_task()
+        self._token = _current_scope.set(self)
+        self._watcher = asyncio.create_task(self._watch())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        self._watcher.cancel()
+        _current_scope.reset(self._token)
+        if self.requested:
+            # 撤销本作用域发出的、可能尚未送达的取消，避免作用域之后的 await 被意外中断
+            self.acknowledge()
+            if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+                # 由本作用域触发的取消：转换为 TaskCancelled，交给任务处理
+                raise TaskCancelled(self.task_id) from None
+        return False
+
+    async def check(self) -> None:
+        """检查点：已请求取消时抛出 TaskCancelled"""
+        if not self.requested and await is_cancel_requested(self.task_id):
+            self._trip()
+        if self.requested:
+            raise TaskCancelled(self.task_id)
+
+    def acknowledge(self) -> None:
+        """任务已处理取消：撤销对任务协程的取消请求，之后的清理和状态更新可以正常 await"""
+        if self._task is not None and self._task.cancelling():
+            self._task.uncancel()
+
+    def register_process(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.add(process)
+        if self.requested:
+            self.kill_processes()
+
+    def unregister_process(self, process: subprocess.Popen) -> None:
+        with self._lock:
+            self._processes.discard(process)
+
+    def kill_processes(self) -> None:
+        """终止登记的子进程组（子进程以 start_new_session 启动，进程组ID即其PID）"""
+        with self._lock:
+            processes = list(self._processes)
+        for process in processes:
+            if process.poll() is not None:
+                continue
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+                logger.info(f"任务 {self.task_id} 已取消，终止子进程组 {process.pid}")
+            except ProcessLookupError:
+                pass
+            except Exception as e:
+                logger.warning(f"终止子进程组失败 (pid={process.pid}): {e}")
+
+    def _trip(self) -> None:
+        self.requested = True
+        self.kill_processes()
+        # 在子任务（gather 的并发项、后台检查）中发现取消时，取消作用域所属的任务，其余并发项随之取消
+        if self._task is not None and not self._task.done() and asyncio.current_task() is not self._task:
+            self._task.cancel()
+
+    def disarm(self) -> None:
+        """停止后台检查：之后只在显式检查点响应取消（用于上传结果等不宜中途打断的收尾阶段）"""
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            cancelled = await is_cancel_requested(self.task_id)
+            if self.requested:
+                # 检查点已先一步响应取消，不再中断任务
+                return
+            if cancelled:
+                logger.info(f"任务 {self.task_id} 收到取消请求")
+                self._trip()
+                return
+
+
+def current_scope() -> Optional[CancellationScope]:
+    """当前上下文的取消作用域（不在作用域内时为None）"""
+    return _current_scope.get()
+
+
+async def checkpoint() -> None:
+    """检查点（不在取消作用域内时无操作）"""
+    scope = _current_scope.get()
+    if scope is not None:
+        await scope.check()
+
+
+__all__ = [
+    "CancellationScope",
+    "TaskCancelled",
+    "checkpoint",
+    "current_scope",
+    "is_cancel_requested",
+    "request_cancel",
+]
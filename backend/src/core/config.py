@@ -3,7 +3,7 @@
 """
 
 from functools import lru_cache
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import Field, field_validator
 from pydantic_settings import BaseSettings
@@ -60,6 +60,47 @@ class Settings(BaseSettings):
     MINIO_SECURE: bool = False
     MINIO_BUCKET_NAME: str = "aicg-files"
     MINIO_REGION: str = "us-east-1"
+    # 存储I/O线程池大小（boto3同步调用在线程池中执行）
+    STORAGE_IO_MAX_WORKERS: int = 32
+    # 存储客户端连接池大小（实际取值不小于 STORAGE_IO_MAX_WORKERS）
+    STORAGE_MAX_POOL_CONNECTIONS: int = 50
+    STORAGE_TCP_KEEPALIVE: bool = True
+    # 预签名URL缓存：最大条目数，以及在有效期的前多少比例内复用同一URL
+    STORAGE_PRESIGN_CACHE_SIZE: int = 10000
+    STORAGE_PRESIGN_REUSE_RATIO: float = 0.5
+    # 公共读/CDN模式：设置后直接返回 "{STORAGE_PUBLIC_BASE_URL}/{object_key}"，不再签名
+    STORAGE_PUBLIC_BASE_URL: Optional[str] = Field(default=None, env="STORAGE_PUBLIC_BASE_URL")
+    # 分片上传：分片大小（S3要求不小于5MB）和并发分片数
+    STORAGE_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024  # 8MB
+    STORAGE_MULTIPART_CONCURRENCY: int = 4
+    # 流式下载每次读取的块大小
+    STORAGE_DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB
+    # 上传/删除时同步写入 object_catalog 表
+    STORAGE_CATALOG_ENABLED: bool = True
+    # list_objects_v2 单页最大对象数（S3上限1000）
+    STORAGE_LIST_PAGE_SIZE: int = 1000
+    # 存储垃圾回收：只清理这些前缀下、早于宽限期且未被引用的对象
+    STORAGE_GC_PREFIXES: List[str] = ["uploads/", "sentence_videos/", "videos/", "bgm/", "blobs/", "resumable/"]
+    STORAGE_GC_GRACE_HOURS: int = 24
+    STORAGE_GC_MAX_DELETES_PER_SECOND: int = 1000
+    # 不可变内容按SHA-256去重存放在 blobs/ 下（引用计数见 storage_blobs 表）
+    STORAGE_DEDUP_ENABLED: bool = True
+    # 断点续传：分片大小（除最后一片外不小于S3最小分片5MB）与会话有效期
+    UPLOAD_CHUNK_SIZE: int = 8 * 1024 * 1024  # 8MB
+    UPLOAD_SESSION_TTL_HOURS: int = 24
+    # 直传预签名URL有效期（分钟）
+    UPLOAD_DIRECT_URL_EXPIRES_MINUTES: int = 60
+    # 存储源迁移：并发复制的对象数与每批（断点）对象数
+    STORAGE_MIGRATION_CONCURRENCY: int = 8
+    STORAGE_MIGRATION_BATCH_SIZE: int = 200
+
+    # 资源下载（提供商生成的图片等）：共享连接池、超时、大小上限与重试
+    ASSET_FETCH_POOL_SIZE: int = 50
+    ASSET_FETCH_POOL_SIZE_PER_HOST: int = 20
+    ASSET_FETCH_TIMEOUT_SECONDS: int = 60
+    ASSET_FETCH_MAX_BYTES: int = 20 * 1024 * 1024  # 20MB
+    ASSET_FETCH_CHUNK_SIZE: int = 64 * 1024  # 64KB
+    ASSET_FETCH_MAX_RETRIES: int = 3
 
     # 文件上传配置
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
@@ -78,6 +119,8 @@ class Settings(BaseSettings):
     DEFAULT_VOICE_TYPE: str = "female_gentle"
     DEFAULT_BACKGROUND_MUSIC: bool = True
     VIDEO_MAX_SIZE: int = 2 * 1024 * 1024 * 1024  # 2GB
+    # 字幕本地对齐纠错的最低置信度，低于该值才调用LLM纠错
+    SUBTITLE_LOCAL_CORRECTION_THRESHOLD: float = 0.8
 
     # Celery配置
     CELERY_BROKER_URL: str = Field(
@@ -91,6 +134,51 @@ class Settings(BaseSettings):
     CELERY_WORKER_CONCURRENCY: int = 4
     CELERY_TASK_SOFT_TIME_LIMIT: int = 300  # 5分钟
     CELERY_TASK_TIME_LIMIT: int = 600  # 10分钟
+    # Worker 进程内缓存的存储配置刷新间隔（秒），管理员切换存储源后最迟在该时间内生效
+    CELERY_STORAGE_CONFIG_TTL_SECONDS: int = 60
+    # 任务进度事件：最新状态在Redis中的保留时间（用于订阅时回放），以及同一任务两次进度推送的最小间隔
+    PROGRESS_STATE_TTL_SECONDS: int = 24 * 3600
+    PROGRESS_MIN_INTERVAL_SECONDS: float = 0.5
+    # 任务锁：投递后等待执行期间的锁有效期；执行中锁的租期（心跳每 1/3 租期续期一次）
+    TASK_LOCK_QUEUED_TTL_SECONDS: int = 3600
+    TASK_LOCK_TTL_SECONDS: int = 60
+    # Idempotency-Key 与任务ID的映射保留时间
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 24 * 3600
+    # 批量图片/音频生成：每个子任务处理的句子数；单个句子的最大尝试次数与重试退避基数（秒）
+    GENERATION_CHUNK_SIZE: int = 50
+    GENERATION_ITEM_MAX_ATTEMPTS: int = 3
+    GENERATION_ITEM_RETRY_BASE_SECONDS: float = 2.0
+    # 任务准入控制（见 src.core.admission），按队列配置：
+    # 队列积压上限、每个用户同时在途（排队+执行中）的任务数上限、单个任务的典型耗时（秒，用于估算 Retry-After）
+    ADMISSION_ENABLED: bool = True
+    # （render 队列的视频合成由 src.core.render_scheduler 按用户公平调度，不在此配置）
+    ADMISSION_MAX_QUEUE_DEPTH: Dict[str, int] = {"ingest": 500, "llm-io": 1000, "transcribe": 50}
+    ADMISSION_MAX_INFLIGHT_PER_USER: Dict[str, int] = {"ingest": 20, "llm-io": 20, "transcribe": 2}
+    ADMISSION_TYPICAL_TASK_SECONDS: Dict[str, int] = {"ingest": 30, "llm-io": 120, "render": 600, "transcribe": 300}
+    # 在途记录的过期时间（Worker 崩溃未释放时兜底）；每个用户等待队列的长度上限；等待队列的放行间隔（秒）
+    ADMISSION_SLOT_TTL_SECONDS: int = 2 * 3600
+    ADMISSION_MAX_WAITING_PER_USER: int = 200
+    ADMISSION_RELEASE_INTERVAL_SECONDS: float = 15.0
+    # 等待任务的最长等待时间（秒），超过后丢弃不再投递；须大于 TASK_LOCK_QUEUED_TTL_SECONDS，
+    # 提交锁仍挡住重复提交（返回等待中的任务ID）期间等待任务不会被丢弃
+    ADMISSION_WAITING_TTL_SECONDS: int = 2 * 3600
+    # 视频合成公平调度（见 src.core.render_scheduler）：
+    # 渲染执行槽位总数（所有 render Worker 的并发之和）；每个句子的预估渲染耗时（秒，作为任务成本）；
+    # 每级优先级抵扣的虚拟时间（秒）；每等待1秒抵扣的虚拟时间（老化，防止饿死）
+    RENDER_SCHEDULER_ENABLED: bool = True
+    RENDER_SCHEDULER_SLOTS: int = 2
+    RENDER_SECONDS_PER_SENTENCE: float = 6.0
+    RENDER_PRIORITY_BOOST_SECONDS: float = 600.0
+    RENDER_AGING_FACTOR: float = 1.0
+    # 每个用户排队中的视频任务上限；执行槽位的过期时间（Worker 崩溃未释放时兜底）；周期调度间隔（秒）
+    RENDER_MAX_PENDING_PER_USER: int = 50
+    RENDER_SLOT_TTL_SECONDS: int = 3600 + 600
+    RENDER_SCHEDULER_INTERVAL_SECONDS: float = 10.0
+    # 任务取消（见 src.core.cancellation）：取消标记在Redis中的保留时间；执行中任务检查取消标记的间隔（秒）
+    TASK_CANCEL_TTL_SECONDS: int = 24 * 3600
+    TASK_CANCEL_POLL_SECONDS: float = 2.0
+    # 任务执行记录（task_runs）的保留天数，超过的记录由周期任务分批删除
+    TASK_RUN_RETENTION_DAYS: int = 30
 
     # 日志配置
     LOG_LEVEL: str = "INFO"
@@ -127,6 +215,10 @@ class Settings(BaseSettings):
     DATABASE_MAX_OVERFLOW: int = 30
     DATABASE_POOL_PRE_PING: bool = True
     DATABASE_POOL_RECYCLE: int = 3600
+    # 会话并发使用检查：同一会话被多个协程同时使用时立即报错（DEBUG 模式下始终开启）
+    DATABASE_SESSION_GUARD: bool = False
+    # 连接在事务中空闲（idle in transaction）超过该秒数时记录警告：长时间持有会话执行外部调用会占用连接、阻塞 vacuum
+    DATABASE_IDLE_IN_TRANSACTION_WARN_SECONDS: float = 5.0
 
     # AI服务配置
     DEFAULT_AI_TIMEOUT: int = 60  # 60秒
@@ -2,8 +2,10 @@
 数据库连接和会话管理模块
 """
 
+import asyncio
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from sqlalchemy import Engine, event
 from sqlalchemy.ext.asyncio import (AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine)
@@ -22,6 +24,120 @@ AsyncSessionLocal: async_sessionmaker = None
 SessionLocal: sessionmaker = None
 
 
+class ConcurrentSessionUseError(RuntimeError):
+    """同一个数据库会话被多个协程并发使用"""
+
+
+def _guarded(name: str):
+    async def method(self, *args, **kwargs):
+        async with self._exclusive(name):
+            return await getattr(super(GuardedAsyncSession, self), name)(*args, **kwargs)
+
+    method.__name__ = name
+    method.__doc__ = getattr(AsyncSession, name).__doc__
+    return method
+
+
+class GuardedAsyncSession(AsyncSession):
+    """
+    检查并发使用的会话（DEBUG 或 DATABASE_SESSION_GUARD 时使用）
+
+    AsyncSession 不支持并发使用：在 asyncio.gather 的多个协程中共用同一会话时，
+    另一个协程的操作尚未结束就开始新的操作会立即抛出 ConcurrentSessionUseError，
+    而不是产生 "Session is already flushing" 之类难以定位的错误。同一协程内的嵌套调用不受影响。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._guard_owner: Optional[asyncio.Task] = None
+        self._guard_operation: Optional[str] = None
+
+    @asynccontextmanager
+    async def _exclusive(self, operation: str):
+        task = asyncio.current_task()
+        if self._guard_owner is not None and self._guard_owner is not task:
+            raise ConcurrentSessionUseError(
+                f"数据库会话被并发使用: {operation} 开始时 {self._guard_operation} 尚未结束"
+                f"（并发的协程应各自使用独立的会话）"
+            )
+        outermost = self._guard_owner is None
+        if outermost:
+            self._guard_owner, self._guard_operation = task, operation
+        try:
+            yield
+        finally:
+            if outermost:
+                self._guard_owner, self._guard_operation = None, None
+
+    execute = _guarded("execute")
+    scalar = _guarded("scalar")
+    scalars = _guarded("scalars")
+    stream = _guarded("stream")
+    get = _guarded("get")
+    merge = _guarded("merge")
+    delete = _guarded("delete")
+    refresh = _guarded("refresh")
+    flush = _guarded("flush")
+    commit = _guarded("commit")
+    rollback = _guarded("rollback")
+    close = _guarded("close")
+
+
+_TRANSACTION_ACTIVITY = "idle_monitor_last_activity"
+
+
+class TransactionIdleMonitor:
+    """
+    统计连接在事务中空闲（idle in transaction）的时长
+
+    空闲时长为事务内相邻两条语句之间、最后一条语句到提交/回滚之间的间隔。
+    超过 warn_seconds 时记录警告——通常是持有会话期间执行了外部调用（LLM、存储、FFmpeg），
+    这类代码应在外部调用前结束事务（见 BaseService.end_transaction）或按阶段使用短会话。
+    """
+
+    def __init__(self, warn_seconds: Optional[float] = None):
+        self.warn_seconds = (
+            settings.DATABASE_IDLE_IN_TRANSACTION_WARN_SECONDS if warn_seconds is None else warn_seconds
+        )
+        self.max_idle_seconds = 0.0
+
+    def install(self, sync_engine: Engine) -> None:
+        event.listen(sync_engine, "begin", self._on_begin)
+        event.listen(sync_engine, "before_cursor_execute", self._before_execute)
+        event.listen(sync_engine, "after_cursor_execute", self._after_execute)
+        event.listen(sync_engine, "commit", self._on_end)
+        event.listen(sync_engine, "rollback", self._on_end)
+
+    def reset(self) -> None:
+        self.max_idle_seconds = 0.0
+
+    def _on_begin(self, conn) -> None:
+        conn.info[_TRANSACTION_ACTIVITY] = time.monotonic()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self._observe(conn, statement)
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if _TRANSACTION_ACTIVITY in conn.info:
+            conn.info[_TRANSACTION_ACTIVITY] = time.monotonic()
+
+    def _on_end(self, conn) -> None:
+        self._observe(conn, "COMMIT / ROLLBACK")
+        conn.info.pop(_TRANSACTION_ACTIVITY, None)
+
+    def _observe(self, conn, statement: str) -> None:
+        last_activity = conn.info.get(_TRANSACTION_ACTIVITY)
+        if last_activity is None:
+            return
+        idle = time.monotonic() - last_activity
+        self.max_idle_seconds = max(self.max_idle_seconds, idle)
+        if idle > self.warn_seconds:
+            logger.warning(f"数据库连接在事务中空闲 {idle:.1f} 秒后执行: {statement[:200]}")
+
+
+transaction_monitor = TransactionIdleMonitor()
+
+
 async def create_database_engine() -> AsyncEngine:
     """创建数据库引擎"""
     global engine, AsyncSessionLocal, SessionLocal
@@ -46,10 +162,12 @@ async def create_database_engine() -> AsyncEngine:
         },
     )
 
-    # 创建异步会话工厂
+    transaction_monitor.install(engine.sync_engine)
+
+    # 创建异步会话工厂（调试时检查会话的并发使用）
     AsyncSessionLocal = async_sessionmaker(
         engine,
-        class_=AsyncSession,
+        class_=GuardedAsyncSession if settings.DEBUG or settings.DATABASE_SESSION_GUARD else AsyncSession,
         expire_on_commit=False,
         autoflush=True,
         autocommit=False,
@@ -251,6 +369,9 @@ async def initialize_database():
 # 导出
 __all__ = [
     "Base",
+    "ConcurrentSessionUseError",
+    "GuardedAsyncSession",
+    "TransactionIdleMonitor",
     "engine",
     "AsyncSessionLocal",
     "SessionLocal",
@@ -263,4 +384,5 @@ __all__ = [
     "drop_database_tables",
     "get_database_stats",
     "initialize_database",
+    "transaction_monitor",
 ]
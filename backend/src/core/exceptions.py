@@ -69,3 +69,24 @@ class FileUploadError(AICGException):
             status_code=400,
             error_code="FILE_UPLOAD_ERROR"
         )
+
+class TooManyRequestsError(AICGException):
+    """请求过多异常（响应带 Retry-After 头）"""
+    def __init__(self, message: str, retry_after: int, code: str = "TOO_MANY_REQUESTS", details: Optional[Any] = None):
+        super().__init__(
+            message=message,
+            status_code=429,
+            error_code=code,
+            details={"retry_after": retry_after, **(details or {})}
+        )
+        self.retry_after = retry_after
+
+class ConflictError(AICGException):
+    """资源状态冲突异常"""
+    def __init__(self, message: str, code: str = "CONFLICT", details: Optional[Any] = None):
+        super().__init__(
+            message=message,
+            status_code=409,
+            error_code=code,
+            details=details
+        )
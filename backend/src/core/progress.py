@@ -0,0 +1,288 @@
+"""
+任务进度事件总线
+
+Celery Worker 与 API 进程之间通过 Redis 传递任务进度：
+- Worker 调用 publish_progress / ProgressTracker 把结构化事件（阶段、百分比、句子序号、预计剩余时间）
+  发布到频道 task-progress:<task_id>，同时把最新状态写入 task-progress:last:<task_id>（带过期时间）
+- 每个 API 进程运行一个 listen_progress 订阅所有进度频道，转发给本进程的 WebSocket 订阅者（见 src.api.websocket）
+- 客户端订阅任务时用 get_last_progress 回放最新状态，订阅之前发生的进度不会丢失
+
+进度推送失败只记录日志，不影响任务本身。
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, TypeVar
+
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.redis import get_redis_client
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+CHANNEL_PREFIX = "task-progress:"
+STATE_KEY_PREFIX = "task-progress:last:"
+
+
+def progress_channel(task_id: str) -> str:
+    return f"{CHANNEL_PREFIX}{task_id}"
+
+
+def progress_state_key(task_id: str) -> str:
+    return f"{STATE_KEY_PREFIX}{task_id}"
+
+
+def build_progress_event(
+    task_id: str,
+    stage: str,
+    status: Optional[str] = None,
+    percent: Optional[float] = None,
+    current: Optional[int] = None,
+    total: Optional[int] = None,
+    sentence_index: Optional[int] = None,
+    eta_seconds: Optional[float] = None,
+    message: Optional[str] = None,
+    user_id: Optional[str] = None,
+    nodes: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """构造进度事件（省略未设置的字段）"""
+    event = {
+        "task_id": str(task_id),
+        "stage": stage,
+        "status": status,
+        "percent": None if percent is None else round(max(0.0, min(100.0, percent)), 1),
+        "current": current,
+        "total": total,
+        "sentence_index": sentence_index,
+        "eta_seconds": None if eta_seconds is None else round(eta_seconds, 1),
+        "message": message,
+        "user_id": None if user_id is None else str(user_id),
+        "nodes": nodes,
+    }
+    event = {k: v for k, v in event.items() if v is not None}
+    event["timestamp"] = datetime.now(timezone.utc).isoformat()
+    return event
+
+
+async def publish_progress(task_id: str, stage: str, **fields) -> Optional[Dict[str, Any]]:
+    """
+    发布一条进度事件并保存为任务的最新状态
+
+    Args:
+        task_id: 任务ID（Celery任务ID或业务任务ID，与前端轮询使用的ID一致）
+        stage: 阶段名称
+        **fields: build_progress_event 的其余字段
+
+    Returns:
+        发布的事件；Redis不可用时返回None
+    """
+    event = build_progress_event(task_id, stage, **fields)
+    payload = json.dumps(event, ensure_ascii=False)
+    try:
+        pipe = get_redis_client().pipeline(transaction=False)
+        pipe.set(progress_state_key(event["task_id"]), payload, ex=settings.PROGRESS_STATE_TTL_SECONDS)
+        pipe.publish(progress_channel(event["task_id"]), payload)
+        await pipe.execute()
+    except Exception as e:
+        logger.warning(f"发布任务进度失败 (task_id={task_id}): {e}")
+        return None
+    return event
+
+
+async def get_last_progress(task_id: str) -> Optional[Dict[str, Any]]:
+    """读取任务的最新进度状态（已过期或从未发布时返回None）"""
+    try:
+        payload = await get_redis_client().get(progress_state_key(task_id))
+    except Exception as e:
+        logger.warning(f"读取任务进度失败 (task_id={task_id}): {e}")
+        return None
+    return json.loads(payload) if payload else None
+
+
+async def get_last_progress_many(task_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """批量读取任务的最新进度状态（一次 MGET），只返回有状态的任务"""
+    task_ids = [str(task_id) for task_id in task_ids]
+    if not task_ids:
+        return {}
+    try:
+        payloads = await get_redis_client().mget([progress_state_key(task_id) for task_id in task_ids])
+    except Exception as e:
+        logger.warning(f"批量读取任务进度失败: {e}")
+        return {}
+    return {task_id: json.loads(payload) for task_id, payload in zip(task_ids, payloads) if payload}
+
+
+class ProgressTracker:
+    """
+    任务内的进度上报器
+
+    按阶段上报：stage() 切换阶段并立即推送；advance() 在阶段内按已完成数量推算百分比和预计剩余时间，
+    并按 PROGRESS_MIN_INTERVAL_SECONDS 节流（阶段完成时总会推送）。
+    阶段的百分比区间 [start, end] 映射到任务整体进度。
+    """
+
+    def __init__(self, task_id: str, user_id: Optional[str] = None, min_interval: Optional[float] = None):
+        self.task_id = str(task_id)
+        self.user_id = None if user_id is None else str(user_id)
+        self.min_interval = settings.PROGRESS_MIN_INTERVAL_SECONDS if min_interval is None else min_interval
+        self.stage_name = "pending"
+        self.total = 0
+        self.done = 0
+        self._start = 0.0
+        self._end = 100.0
+        self._stage_started = time.monotonic()
+        self._last_published = 0.0
+
+    @property
+    def percent(self) -> float:
+        if not self.total:
+            return self._start
+        return self._start + (self._end - self._start) * min(self.done, self.total) / self.total
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        """按本阶段已完成项的平均耗时估算剩余时间"""
+        if not self.done or not self.total:
+            return None
+        elapsed = time.monotonic() - self._stage_started
+        return elapsed / self.done * max(self.total - self.done, 0)
+
+    async def stage(
+        self,
+        stage: str,
+        total: int = 0,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        status: Optional[str] = None,
+        message: Optional[str] = None,
+    ) -> None:
+        """进入新阶段（start 默认接上一阶段的结束位置）"""
+        self.stage_name = stage
+        self.total = total
+        self.done = 0
+        self._start = self._end if start is None else start
+        self._end = self._start if end is None else max(end, self._start)
+        self._stage_started = time.monotonic()
+        await self._publish(status=status, message=message)
+
+    async def advance(self, count: int = 1, sentence_index: Optional[int] = None, message: Optional[str] = None) -> None:
+        """本阶段完成 count 项"""
+        self.done += count
+        finished = self.total and self.done >= self.total
+        if not finished and time.monotonic() - self._last_published < self.min_interval:
+            return
+        await self._publish(sentence_index=sentence_index, message=message)
+
+    async def track(self, awaitable: Awaitable[T], sentence_index: Optional[int] = None) -> T:
+        """等待单项完成（成功或失败）后推进进度，用于包装 asyncio.gather 中的各项"""
+        try:
+            return await awaitable
+        finally:
+            await self.advance(sentence_index=sentence_index)
+
+    async def finish(self, status: str, message: Optional[str] = None) -> None:
+        """终态（completed / failed / cancelled）"""
+        self.stage_name = status
+        percent = 100.0 if status == "completed" else self.percent
+        self._last_published = time.monotonic()
+        await publish_progress(
+            self.task_id, status, status=status, percent=percent, message=message, user_id=self.user_id,
+        )
+
+    async def _publish(self, status: Optional[str] = None, sentence_index: Optional[int] = None,
+                       message: Optional[str] = None) -> None:
+        self._last_published = time.monotonic()
+        await publish_progress(
+            self.task_id,
+            self.stage_name,
+            status=status or "running",
+            percent=self.percent,
+            current=self.done if self.total else None,
+            total=self.total or None,
+            sentence_index=sentence_index,
+            eta_seconds=self.eta_seconds,
+            message=message,
+            user_id=self.user_id,
+        )
+
+
+async def gather_with_progress(
+    awaitables: Iterable[Awaitable[T]],
+    progress: Optional[ProgressTracker] = None,
+    stage: str = "running",
+    sentence_indexes: Optional[Sequence[Optional[int]]] = None,
+    start: float = 0,
+    end: float = 100,
+) -> List[Any]:
+    """
+    asyncio.gather(..., return_exceptions=True)，每完成一项推进一次进度
+
+    progress 为 None 时等价于普通 gather。
+    """
+    awaitables = list(awaitables)
+    if progress is None:
+        return await asyncio.gather(*awaitables, return_exceptions=True)
+
+    indexes = list(sentence_indexes) if sentence_indexes is not None else [None] * len(awaitables)
+    await progress.stage(stage, total=len(awaitables), start=start, end=end)
+    return await asyncio.gather(
+        *(progress.track(item, sentence_index=index) for item, index in zip(awaitables, indexes)),
+        return_exceptions=True,
+    )
+
+
+async def listen_progress(
+    handler: Callable[[Dict[str, Any]], Awaitable[None]],
+    reconnect_delay: float = 1.0,
+    max_reconnect_delay: float = 30.0,
+) -> None:
+    """
+    订阅所有任务的进度频道并逐条交给 handler 处理（API进程后台运行，直到被取消）
+
+    Redis 连接断开时按指数退避重连；单条事件处理失败不影响后续事件。
+    """
+    delay = reconnect_delay
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_redis_client().pubsub(ignore_subscribe_messages=True)
+            await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+            logger.info("任务进度订阅已建立")
+            delay = reconnect_delay
+            async for message in pubsub.listen():
+                if message.get("type") != "pmessage":
+                    continue
+                try:
+                    await handler(json.loads(message["data"]))
+                except Exception as e:
+                    logger.warning(f"处理任务进度事件失败: {e}")
+            raise ConnectionError("订阅已关闭")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"任务进度订阅中断，{delay:.0f}秒后重连: {e}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_reconnect_delay)
+        finally:
+            if pubsub is not None:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+
+__all__ = [
+    "ProgressTracker",
+    "build_progress_event",
+    "gather_with_progress",
+    "get_last_progress",
+    "get_last_progress_many",
+    "listen_progress",
+    "progress_channel",
+    "progress_state_key",
+    "publish_progress",
+]
@@ -0,0 +1,39 @@
+"""
+Redis客户端
+
+按事件循环缓存 redis.asyncio 客户端：API进程和 Celery Worker 进程（见 src.tasks.runtime）
+各自只有一个长期事件循环；脚本等通过 asyncio.run 新建的循环不能复用绑定到其他循环的连接。
+"""
+
+import asyncio
+import weakref
+
+import redis.asyncio as redis
+
+from src.core.config import settings
+
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, redis.Redis]" = weakref.WeakKeyDictionary()
+_broker_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, redis.Redis]" = weakref.WeakKeyDictionary()
+
+
+def get_redis_client() -> redis.Redis:
+    """获取当前事件循环的Redis客户端（decode_responses=True）"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        _clients[loop] = client
+    return client
+
+
+def get_broker_redis_client() -> redis.Redis:
+    """获取当前事件循环的 Celery 代理（Redis）客户端，用于读取队列积压"""
+    loop = asyncio.get_running_loop()
+    client = _broker_clients.get(loop)
+    if client is None:
+        client = redis.from_url(settings.CELERY_BROKER_URL, decode_responses=True)
+        _broker_clients[loop] = client
+    return client
+
+
+__all__ = ["get_broker_redis_client", "get_redis_client"]
@@ -0,0 +1,325 @@
+"""
+视频合成公平调度
+
+render 队列的 FIFO 会让一个用户的上百个章节挡住其他用户的单个预览。视频合成任务先进入本调度层，
+只在渲染槽位空闲时才投递到 Celery：
+- 每个用户一个待调度队列 render-sched:jobs:<user>（ZSET，按提交时间排序，优先级高的提前）
+- 用户之间按起始时间公平排队（start-time fair queuing）：每个用户有虚拟时间（render-sched:users 的分值），
+  调度一个任务后前进该任务的成本（句子数 × RENDER_SECONDS_PER_SENTENCE），小任务自然先完成；
+  新加入（或重新活跃）的用户从全局虚拟时钟开始，不会积累额度
+- 选择时各用户队首任务的得分 = 虚拟起始时间 + 成本 − 优先级 × RENDER_PRIORITY_BOOST_SECONDS
+  − 等待秒数 × RENDER_AGING_FACTOR，得分最小者先调度；老化保证大批量用户的任务最终也会被调度
+- 执行中的任务记录在 render-sched:running（ZSET，分值为预计结束时间），合成任务结束时（task_postrun）
+  释放槽位并立即调度下一个；周期任务 maintenance.dispatch_render_jobs 兜底。
+  Worker 崩溃未释放的槽位在预计结束 RENDER_SLOT_TTL_SECONDS 后失效
+
+排队位置和预计开始时间按同一调度规则模拟得到（见 schedule_order）。
+"""
+
+import heapq
+import json
+import math
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.exceptions import TooManyRequestsError
+from src.core.logging import get_logger
+from src.core.redis import get_redis_client
+from src.core.task_lock import TaskLock
+
+logger = get_logger(__name__)
+
+KEY_PREFIX = "render-sched:"
+USERS_KEY = f"{KEY_PREFIX}users"
+RUNNING_KEY = f"{KEY_PREFIX}running"
+VCLOCK_KEY = f"{KEY_PREFIX}vclock"
+
+
+def jobs_key(user_id: Any) -> str:
+    return f"{KEY_PREFIX}jobs:{user_id}"
+
+
+def job_key(task_id: str) -> str:
+    return f"{KEY_PREFIX}job:{task_id}"
+
+
+@dataclass
+class RenderJob:
+    """待调度的视频合成任务"""
+    task_id: str
+    user_id: str
+    task_name: str
+    args: List[Any]
+    kwargs: Dict[str, Any]
+    cost: float
+    priority: int = 0
+    enqueued_at: float = 0.0
+
+    @property
+    def rank(self) -> float:
+        """用户队列内的排序分值（优先级高的提前）"""
+        return self.enqueued_at - self.priority * settings.RENDER_PRIORITY_BOOST_SECONDS
+
+
+@dataclass
+class ScheduledJob:
+    """模拟调度结果：任务、虚拟起始/结束时间、预计开始等待秒数"""
+    job: RenderJob
+    start: float
+    finish: float
+    eta_seconds: float
+
+
+def job_cost(sentence_count: Optional[int]) -> float:
+    """任务成本（预估渲染秒数）"""
+    return max(int(sentence_count or 0), 1) * settings.RENDER_SECONDS_PER_SENTENCE
+
+
+def schedule_order(
+    jobs_by_user: Dict[str, List[RenderJob]],
+    vtimes: Dict[str, float],
+    vclock: float,
+    now: float,
+    slot_free_at: Optional[List[float]] = None,
+) -> List[ScheduledJob]:
+    """
+    按公平调度规则模拟全部待调度任务的顺序
+
+    Args:
+        jobs_by_user: 用户 → 按队列顺序排列的任务
+        vtimes: 用户当前的虚拟时间
+        vclock: 全局虚拟时钟
+        now: 当前时间
+        slot_free_at: 各渲染槽位预计空闲的时间（用于估算预计开始时间，默认一个空闲槽位）
+
+    Returns:
+        按调度顺序排列的任务
+    """
+    queues = {user: list(jobs) for user, jobs in jobs_by_user.items() if jobs}
+    vtimes = dict(vtimes)
+    slots = [max(t, now) for t in (slot_free_at or [now])]
+    heapq.heapify(slots)
+    order: List[ScheduledJob] = []
+
+    while queues:
+        best: Optional[Tuple[float, float, str, float]] = None
+        for user, jobs in queues.items():
+            head = jobs[0]
+            start = max(vtimes.get(user, vclock), vclock)
+            score = (start + head.cost - head.priority * settings.RENDER_PRIORITY_BOOST_SECONDS
+                     - (now - head.enqueued_at) * settings.RENDER_AGING_FACTOR)
+            candidate = (score, head.enqueued_at, user, start)
+            if best is None or candidate[:2] < best[:2]:
+                best = candidate
+        _, _, user, start = best
+        job = queues[user].pop(0)
+        if not queues[user]:
+            del queues[user]
+        vtimes[user] = start + job.cost
+        vclock = start
+
+        free_at = heapq.heappop(slots)
+        heapq.heappush(slots, free_at + job.cost)
+        order.append(ScheduledJob(job, start, start + job.cost, free_at - now))
+    return order
+
+
+@dataclass
+class _State:
+    jobs_by_user: Dict[str, List[RenderJob]]
+    vtimes: Dict[str, float]
+    vclock: float
+    running: List[float]
+
+    def order(self, now: float) -> List[ScheduledJob]:
+        slots = max(settings.RENDER_SCHEDULER_SLOTS, 1)
+        free_at = sorted(self.running)[:slots] + [now] * max(slots - len(self.running), 0)
+        return schedule_order(self.jobs_by_user, self.vtimes, self.vclock, now, free_at)
+
+
+async def _load_state(now: float) -> _State:
+    """读取调度状态：各用户待调度任务、虚拟时间、全局虚拟时钟、执行中任务的预计结束时间"""
+    client = get_redis_client()
+    await client.zremrangebyscore(RUNNING_KEY, "-inf", now - settings.RENDER_SLOT_TTL_SECONDS)
+    running = [float(score) for _, score in await client.zrange(RUNNING_KEY, 0, -1, withscores=True)]
+    vclock = float(await client.get(VCLOCK_KEY) or 0)
+    vtimes = {user: float(score) for user, score in await client.zrange(USERS_KEY, 0, -1, withscores=True)}
+
+    jobs_by_user: Dict[str, List[RenderJob]] = {}
+    for user in vtimes:
+        task_ids = await client.zrange(jobs_key(user), 0, -1)
+        payloads = await client.mget([job_key(task_id) for task_id in task_ids]) if task_ids else []
+        jobs_by_user[user] = [RenderJob(**json.loads(payload)) for payload in payloads if payload]
+    return _State(jobs_by_user, vtimes, vclock, running)
+
+
+async def enqueue_render(
+    task,
+    args: Iterable[Any] = (),
+    kwargs: Optional[Dict[str, Any]] = None,
+    *,
+    task_id: str,
+    user_id: Any,
+    sentence_count: Optional[int] = None,
+    priority: int = 0,
+    send: Optional[Callable[..., Any]] = None,
+) -> Dict[str, Any]:
+    """
+    视频合成任务进入公平调度（调度关闭时直接投递）
+
+    Args:
+        task: Celery 任务（generate.synthesize_video）
+        args: 位置参数
+        kwargs: 关键字参数
+        task_id: 任务ID（即视频任务ID）
+        user_id: 用户ID
+        sentence_count: 章节句子数（估算成本）
+        priority: 优先级（0 普通，越大越优先，如预览）
+        send: 投递函数（celery_app.send_task），有空闲槽位时立即调度
+
+    Returns:
+        {"queue_position", "eta_seconds"}（已投递时位置为 None）
+
+    Raises:
+        TooManyRequestsError: 用户排队中的任务超过 RENDER_MAX_PENDING_PER_USER
+    """
+    kwargs = kwargs or {}
+    if not settings.RENDER_SCHEDULER_ENABLED:
+        task.apply_async(args=tuple(args), kwargs=kwargs, task_id=str(task_id))
+        return {"queue_position": None, "eta_seconds": None}
+
+    client = get_redis_client()
+    user_id = str(user_id)
+    if await client.zcard(jobs_key(user_id)) >= settings.RENDER_MAX_PENDING_PER_USER:
+        # 该用户下一个任务开始执行（排队数减少）的预计等待时间
+        now = time.time()
+        first = next((s for s in (await _load_state(now)).order(now) if s.job.user_id == user_id), None)
+        retry_after = max(1, math.ceil(first.eta_seconds if first else settings.RENDER_SECONDS_PER_SENTENCE))
+        raise TooManyRequestsError("排队中的视频任务过多，请稍后重试", retry_after=retry_after,
+                                   details={"queue": "render", "reason": "user_pending"})
+
+    job = RenderJob(
+        task_id=str(task_id),
+        user_id=user_id,
+        task_name=task.name,
+        args=list(args),
+        kwargs=kwargs,
+        cost=job_cost(sentence_count),
+        priority=priority,
+        enqueued_at=time.time(),
+    )
+    vclock = float(await client.get(VCLOCK_KEY) or 0)
+    pipe = client.pipeline(transaction=True)
+    pipe.set(job_key(job.task_id), json.dumps(asdict(job), ensure_ascii=False))
+    pipe.zadd(jobs_key(user_id), {job.task_id: job.rank})
+    pipe.zadd(USERS_KEY, {user_id: vclock}, nx=True)
+    await pipe.execute()
+
+    if send is not None:
+        await dispatch_ready(send)
+    positions = await queue_positions([job.task_id])
+    return positions.get(job.task_id, {"queue_position": None, "eta_seconds": None})
+
+
+async def cancel_render(task_id: str) -> bool:
+    """从待调度队列中移除任务（已投递的任务不受影响），返回是否移除"""
+    client = get_redis_client()
+    payload = await client.get(job_key(task_id))
+    if not payload:
+        return False
+    user_id = json.loads(payload)["user_id"]
+    pipe = client.pipeline(transaction=True)
+    pipe.zrem(jobs_key(user_id), str(task_id))
+    pipe.delete(job_key(task_id))
+    await pipe.execute()
+    if not await client.zcard(jobs_key(user_id)):
+        await client.zrem(USERS_KEY, user_id)
+    return True
+
+
+async def release_render_slot(task_id: str) -> bool:
+    """合成任务结束：释放执行槽位"""
+    return bool(await get_redis_client().zrem(RUNNING_KEY, str(task_id)))
+
+
+async def dispatch_ready(send: Callable[..., Any]) -> int:
+    """
+    按公平调度顺序投递任务，直到没有空闲槽位
+
+    同一时刻只有一个调度者（抢不到调度锁时直接返回，由持有者或下一次触发调度）。
+
+    Args:
+        send: 投递函数 send(task_name, args=..., kwargs=..., task_id=...)（celery_app.send_task）
+
+    Returns:
+        投递的任务数
+    """
+    lock = TaskLock("render_scheduler", "dispatch", str(uuid.uuid4()))
+    if not await lock.acquire(settings.TASK_LOCK_TTL_SECONDS):
+        return 0
+    try:
+        client = get_redis_client()
+        now = time.time()
+        state = await _load_state(now)
+        free = settings.RENDER_SCHEDULER_SLOTS - len(state.running)
+        if free <= 0 or not state.jobs_by_user:
+            return 0
+
+        scheduled_jobs = state.order(now)[:free]
+        for scheduled in scheduled_jobs:
+            job = scheduled.job
+            send(job.task_name, args=job.args, kwargs=job.kwargs, task_id=job.task_id)
+            pipe = client.pipeline(transaction=True)
+            pipe.zadd(RUNNING_KEY, {job.task_id: now + job.cost})
+            pipe.zrem(jobs_key(job.user_id), job.task_id)
+            pipe.delete(job_key(job.task_id))
+            pipe.zadd(USERS_KEY, {job.user_id: scheduled.finish})
+            pipe.set(VCLOCK_KEY, scheduled.start)
+            await pipe.execute()
+
+        # 队列已空的用户不再参与调度（重新活跃时从全局虚拟时钟开始）
+        for user in {scheduled.job.user_id for scheduled in scheduled_jobs}:
+            if not await client.zcard(jobs_key(user)):
+                await client.zrem(USERS_KEY, user)
+        logger.info(f"视频合成调度: 投递 {len(scheduled_jobs)} 个任务（执行中 {len(state.running) + len(scheduled_jobs)}）")
+        return len(scheduled_jobs)
+    finally:
+        await lock.release()
+
+
+async def queue_positions(task_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    待调度任务的排队位置（从1开始）和预计开始等待秒数（按当前队列和执行中任务的预计结束时间模拟，估算值）
+
+    不在待调度队列中的任务（已投递或不存在）不返回。
+    """
+    wanted = {str(task_id) for task_id in task_ids}
+    if not wanted or not settings.RENDER_SCHEDULER_ENABLED:
+        return {}
+    now = time.time()
+    try:
+        order = (await _load_state(now)).order(now)
+    except Exception as e:
+        logger.warning(f"读取视频合成排队位置失败: {e}")
+        return {}
+    return {
+        scheduled.job.task_id: {"queue_position": index + 1, "eta_seconds": round(scheduled.eta_seconds, 1)}
+        for index, scheduled in enumerate(order)
+        if scheduled.job.task_id in wanted
+    }
+
+
+__all__ = [
+    "RenderJob",
+    "ScheduledJob",
+    "cancel_render",
+    "dispatch_ready",
+    "enqueue_render",
+    "job_cost",
+    "queue_positions",
+    "release_render_slot",
+    "schedule_order",
+]
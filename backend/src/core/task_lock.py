@@ -0,0 +1,193 @@
+"""
+任务去重与分布式锁
+
+同一资源上的同一操作（例如同一章节的视频合成、同一批句子的图片生成）同一时刻只允许一个任务：
+- 投递时 task_submission 以 SET NX 抢占 task-lock:<operation>:<resource>，值为新任务ID；
+  锁已被占用时直接返回占用者的任务ID，不重复投递（双击、客户端重试、并发请求）
+- 请求携带 Idempotency-Key 时把 key -> 任务ID 记录 IDEMPOTENCY_KEY_TTL_SECONDS，
+  同一个 key 的重复请求（包括任务已结束之后）返回同一个任务ID
+- Worker 执行时 run_exclusive 接管锁（值等于自身任务ID，或锁已过期时重新抢占），
+  执行期间按 TASK_LOCK_TTL_SECONDS 租期心跳续期，结束后释放；Worker 崩溃时锁在一个租期内过期
+- 锁被其他任务持有时跳过执行，避免两次运行竞争写同一批句子字段
+
+释放和续期都先比对锁的值，不会误删其他任务的锁。
+"""
+
+import asyncio
+import hashlib
+import uuid
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterable, Optional, TypeVar, Union
+
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.redis import get_redis_client
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+LOCK_KEY_PREFIX = "task-lock:"
+IDEMPOTENCY_KEY_PREFIX = "idempotency:"
+
+# 值匹配时删除
+RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# 值匹配时续期（毫秒）
+EXTEND_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def batch_resource_id(ids: Iterable[Any]) -> str:
+    """一批对象ID（顺序、格式无关）对应的资源标识"""
+    normalized = sorted(uuid.UUID(str(item)).hex for item in ids)
+    return hashlib.sha1(",".join(normalized).encode()).hexdigest()
+
+
+class TaskLock:
+    """(operation, resource) 上的 Redis 锁，值为持有者的任务ID"""
+
+    def __init__(self, operation: str, resource_id: Any, holder_id: str):
+        self.operation = operation
+        self.resource_id = str(resource_id)
+        self.holder_id = str(holder_id)
+        self.key = f"{LOCK_KEY_PREFIX}{operation}:{self.resource_id}"
+
+    async def acquire(self, ttl: int) -> bool:
+        """锁空闲时抢占"""
+        return bool(await get_redis_client().set(self.key, self.holder_id, nx=True, ex=ttl))
+
+    async def owner(self) -> Optional[str]:
+        return await get_redis_client().get(self.key)
+
+    async def extend(self, ttl: int) -> bool:
+        """仍持有锁时续期"""
+        return bool(await get_redis_client().eval(EXTEND_SCRIPT, 1, self.key, self.holder_id, ttl * 1000))
+
+    async def release(self) -> bool:
+        """仍持有锁时释放"""
+        return bool(await get_redis_client().eval(RELEASE_SCRIPT, 1, self.key, self.holder_id))
+
+    async def adopt(self, ttl: int) -> bool:
+        """接管投递时抢占的锁；锁已过期则重新抢占"""
+        return await self.extend(ttl) or await self.acquire(ttl)
+
+    async def keep_alive(self, ttl: int) -> None:
+        """心跳续期，直到被取消"""
+        while True:
+            await asyncio.sleep(ttl / 3)
+            try:
+                if not await self.extend(ttl):
+                    logger.error(f"任务锁已丢失: {self.key} (holder={self.holder_id}, owner={await self.owner()})")
+                    return
+            except Exception as e:
+                logger.warning(f"任务锁续期失败: {self.key}: {e}")
+
+
+@dataclass
+class Submission:
+    """一次任务投递：task_id 为新任务ID（duplicate=False，需要投递）或已有任务ID（duplicate=True）"""
+    task_id: str
+    duplicate: bool
+
+
+@asynccontextmanager
+async def task_submission(
+    operation: str,
+    resource_id: Any,
+    user_id: Any,
+    idempotency_key: Optional[str] = None,
+    task_id: Optional[str] = None,
+) -> AsyncIterator[Submission]:
+    """
+    去重投递
+
+    duplicate=False 时调用方必须以 submission.task_id 作为任务ID投递（apply_async(task_id=...)），
+    投递失败（with 块抛出异常）时释放锁。
+
+    Args:
+        operation: 操作名称
+        resource_id: 资源标识
+        user_id: 用户ID（Idempotency-Key 按用户隔离）
+        idempotency_key: 请求头 Idempotency-Key
+        task_id: 指定新任务ID（默认生成UUID）
+    """
+    client = get_redis_client()
+    idem_key = f"{IDEMPOTENCY_KEY_PREFIX}{user_id}:{operation}:{idempotency_key}" if idempotency_key else None
+
+    if idem_key:
+        existing = await client.get(idem_key)
+        if existing:
+            logger.info(f"重复请求（Idempotency-Key={idempotency_key}），返回已有任务: {existing}")
+            yield Submission(existing, duplicate=True)
+            return
+
+    lock = TaskLock(operation, resource_id, task_id or str(uuid.uuid4()))
+    if not await lock.acquire(settings.TASK_LOCK_QUEUED_TTL_SECONDS):
+        existing = await lock.owner()
+        if existing:
+            logger.info(f"{operation} 已有任务进行中 (resource={lock.resource_id})，返回已有任务: {existing}")
+            yield Submission(existing, duplicate=True)
+            return
+        # 锁恰好在两次调用之间过期
+        if not await lock.acquire(settings.TASK_LOCK_QUEUED_TTL_SECONDS):
+            yield Submission(await lock.owner() or lock.holder_id, duplicate=True)
+            return
+
+    try:
+        yield Submission(lock.holder_id, duplicate=False)
+    except BaseException:
+        await lock.release()
+        raise
+
+    if idem_key:
+        await client.set(idem_key, lock.holder_id, ex=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+
+
+async def run_exclusive(
+    operation: str,
+    resource_id: Any,
+    holder_id: str,
+    coro: Awaitable[T],
+) -> Union[T, Dict[str, Any]]:
+    """
+    持有任务锁执行协程（Worker 端）
+
+    锁被其他任务持有时不执行，返回 {"skipped": True, "reason": "duplicate", "running_task_id": ...}。
+    """
+    ttl = settings.TASK_LOCK_TTL_SECONDS
+    lock = TaskLock(operation, resource_id, holder_id)
+    if not await lock.adopt(ttl):
+        coro.close()
+        owner = await lock.owner()
+        logger.warning(f"{operation} 已由任务 {owner} 执行 (resource={lock.resource_id})，跳过 {holder_id}")
+        return {"skipped": True, "reason": "duplicate", "running_task_id": owner}
+
+    heartbeat = asyncio.create_task(lock.keep_alive(ttl))
+    try:
+        return await coro
+    finally:
+        heartbeat.cancel()
+        try:
+            await lock.release()
+        except Exception as e:
+            logger.warning(f"释放任务锁失败: {lock.key}: {e}")
+
+
+__all__ = [
+    "Submission",
+    "TaskLock",
+    "batch_resource_id",
+    "run_exclusive",
+    "task_submission",
+]
@@ -52,6 +52,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Token", "Content-Range", "Accept-Ranges", "Upload-Offset", "Upload-Length"],
 )
 
 # 添加受信任主机中间件
@@ -111,6 +112,10 @@ async def startup_event():
     except Exception as e:
         app_logger.warning(f"加载存储配置失败，使用默认配置: {e}")
 
+    # Worker 进度事件 -> WebSocket
+    from src.api.websocket import start_progress_bridge
+    start_progress_bridge()
+
 
 @app.on_event("shutdown")
 async def shutdown_event():
@@ -118,7 +123,10 @@ async def shutdown_event():
     import logging
     app_logger = logging.getLogger(__name__)
     app_logger.info("🛑 AICG平台正在关闭...")
-    # 这里可以添加清理逻辑
+    from src.api.websocket import stop_progress_bridge
+    await stop_progress_bridge()
+    from src.utils.http_client import close_http_session
+    await close_http_session()
 
 
 @app.exception_handler(AICGException)
@@ -133,6 +141,7 @@ async def aicg_exception_handler(request: Request, exc: AICGException):
             "details": exc.details,
             "timestamp": time.time(),
         },
+        headers={"Retry-After": str(exc.retry_after)} if getattr(exc, "retry_after", None) else None,
     )
 
 
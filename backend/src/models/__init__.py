@@ -12,6 +12,18 @@ from src.models.sentence import Sentence, SentenceStatus
 from src.models.user import User
 from src.models.video_task import VideoTask, VideoTaskStatus
 from src.models.storage_source import StorageSource
+from src.models.object_catalog import ObjectCatalog, ObjectKind
+from src.models.storage_blob import StorageBlob
+from src.models.storage_migration import StorageMigration, StorageMigrationStatus
+from src.models.generation_batch import (
+    GenerationBatch,
+    GenerationBatchStatus,
+    GenerationItem,
+    GenerationItemStatus,
+    GenerationKind,
+)
+from src.models.chapter_pipeline import ChapterPipeline, PipelineNode, PipelineNodeStatus, PipelineStatus
+from src.models.task_run import TaskRun
 
 __all__ = [
     "Base",
@@ -33,4 +45,19 @@ __all__ = [
     "BGM",
     "BGMStatus",
     "StorageSource",
+    "ObjectCatalog",
+    "ObjectKind",
+    "StorageBlob",
+    "StorageMigration",
+    "StorageMigrationStatus",
+    "GenerationBatch",
+    "GenerationBatchStatus",
+    "GenerationItem",
+    "GenerationItemStatus",
+    "GenerationKind",
+    "ChapterPipeline",
+    "PipelineNode",
+    "PipelineNodeStatus",
+    "PipelineStatus",
+    "TaskRun",
 ]
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+章节流水线数据模型
+
+一条流水线把章节的 提示词 → 图片/音频 → 视频 串成一个 Celery canvas：
+- 音频不依赖提示词，与提示词/图片并行执行
+- 提示词与图片按分片串联：某个分片的提示词生成完成后立即生成该分片的图片，不等待整章提示词
+- 图片、音频全部完成后合成视频
+
+每个节点的状态持久化在本表，失败后可以只从失败的节点（失败的分片）继续执行。
+"""
+
+import json
+from enum import Enum
+from typing import Any, Dict
+
+from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
+
+from src.models.base import BaseModel
+
+
+class PipelineStatus(str, Enum):
+    """流水线状态"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class PipelineNode(str, Enum):
+    """流水线节点"""
+    PROMPTS = "prompts"
+    IMAGES = "images"
+    AUDIO = "audio"
+    VIDEO = "video"
+
+
+class PipelineNodeStatus(str, Enum):
+    """节点状态"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class ChapterPipeline(BaseModel):
+    """章节流水线模型（ID即提交时返回的流水线ID）"""
+    __tablename__ = 'chapter_pipelines'
+
+    user_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey('users.id'), nullable=False, index=True, comment="用户ID")
+    project_id = Column(PostgreSQLUUID(as_uuid=True), nullable=False, comment="项目ID")
+    chapter_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey('chapters.id', ondelete='CASCADE'),
+                        nullable=False, index=True, comment="章节ID")
+    api_key_id = Column(PostgreSQLUUID(as_uuid=True), nullable=False, comment="API密钥ID")
+    params = Column(Text, nullable=False, default="{}", comment="各节点参数（JSON）")
+    status = Column(String(20), nullable=False, default=PipelineStatus.PENDING, index=True, comment="流水线状态")
+
+    prompts_status = Column(String(20), nullable=False, default=PipelineNodeStatus.PENDING, comment="提示词节点状态")
+    images_status = Column(String(20), nullable=False, default=PipelineNodeStatus.PENDING, comment="图片节点状态")
+    audio_status = Column(String(20), nullable=False, default=PipelineNodeStatus.PENDING, comment="音频节点状态")
+    video_status = Column(String(20), nullable=False, default=PipelineNodeStatus.PENDING, comment="视频节点状态")
+
+    image_batch_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, comment="图片生成批次ID")
+    audio_batch_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, comment="音频生成批次ID")
+    video_task_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, comment="视频任务ID")
+
+    error_message = Column(Text, nullable=True, comment="错误信息")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="结束时间")
+
+    @property
+    def param_dict(self) -> Dict[str, Any]:
+        return json.loads(self.params or "{}")
+
+    def node_status(self, node: PipelineNode) -> str:
+        return getattr(self, f"{node.value}_status")
+
+    def set_node_status(self, node: PipelineNode, status: PipelineNodeStatus) -> None:
+        setattr(self, f"{node.value}_status", status.value)
+
+
+__all__ = [
+    "ChapterPipeline",
+    "PipelineNode",
+    "PipelineNodeStatus",
+    "PipelineStatus",
+]
@@ -0,0 +1,98 @@
+"""
+生成批次数据模型
+
+一次批量图片/音频生成拆分为若干分片（每片 GENERATION_CHUNK_SIZE 个句子）由独立子任务执行，
+每个句子一条 GenerationItem 记录状态、尝试次数和最后一次错误：
+- 子任务只处理未成功的句子，Worker 崩溃或子任务重试不会重复生成（和计费）已成功的句子
+- 单个句子失败按退避重试，超过 GENERATION_ITEM_MAX_ATTEMPTS 后标记失败，不影响同批其他句子
+- 所有分片完成后由汇总任务统计结果；可以只重试失败的句子
+"""
+
+import json
+from enum import Enum
+from typing import Any, Dict
+
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
+
+from src.models.base import BaseModel
+
+
+class GenerationKind(str, Enum):
+    """生成类型"""
+    IMAGE = "image"
+    AUDIO = "audio"
+
+
+class GenerationBatchStatus(str, Enum):
+    """批次状态"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"  # 全部成功
+    PARTIAL = "partial"      # 部分失败
+    FAILED = "failed"        # 全部失败
+    CANCELLED = "cancelled"  # 已取消（保留取消前已完成的句子）
+
+
+class GenerationItemStatus(str, Enum):
+    """句子生成状态"""
+    PENDING = "pending"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class GenerationBatch(BaseModel):
+    """生成批次模型（ID即提交时返回的任务ID）"""
+    __tablename__ = 'generation_batches'
+
+    user_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey('users.id'), nullable=False, index=True, comment="用户ID")
+    kind = Column(String(20), nullable=False, comment="生成类型")
+    api_key_id = Column(PostgreSQLUUID(as_uuid=True), nullable=False, comment="API密钥ID")
+    params = Column(Text, nullable=False, default="{}", comment="生成参数（JSON：model/voice）")
+    lock_resource = Column(String(64), nullable=False, comment="任务锁资源标识（句子集合摘要）")
+    status = Column(String(20), nullable=False, default=GenerationBatchStatus.PENDING, index=True, comment="批次状态")
+    chunk_size = Column(Integer, nullable=False, comment="每个分片的句子数")
+    total = Column(Integer, nullable=False, default=0, comment="句子总数")
+    succeeded = Column(Integer, nullable=False, default=0, comment="成功数")
+    failed = Column(Integer, nullable=False, default=0, comment="失败数")
+    cancel_requested_at = Column(DateTime(timezone=True), nullable=True, comment="请求取消的时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="结束时间")
+
+    @property
+    def param_dict(self) -> Dict[str, Any]:
+        return json.loads(self.params or "{}")
+
+    @property
+    def operation(self) -> str:
+        """任务锁的操作名（与投递时一致）"""
+        return "generate_images" if self.kind == GenerationKind.IMAGE else "generate_audio"
+
+
+class GenerationItem(BaseModel):
+    """批次内单个句子的生成记录"""
+    __tablename__ = 'generation_items'
+
+    batch_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey('generation_batches.id', ondelete='CASCADE'),
+                      nullable=False, comment="批次ID")
+    sentence_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey('sentences.id', ondelete='CASCADE'),
+                         nullable=False, comment="句子ID")
+    chunk_index = Column(Integer, nullable=False, comment="分片序号")
+    status = Column(String(20), nullable=False, default=GenerationItemStatus.PENDING, comment="生成状态")
+    attempts = Column(Integer, nullable=False, default=0, comment="已尝试次数")
+    last_error = Column(Text, nullable=True, comment="最后一次错误")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="完成时间")
+
+    __table_args__ = (
+        UniqueConstraint('batch_id', 'sentence_id', name='uq_generation_items_batch_sentence'),
+        Index('idx_generation_items_batch_chunk', 'batch_id', 'chunk_index'),
+        Index('idx_generation_items_batch_status', 'batch_id', 'status'),
+    )
+
+
+__all__ = [
+    "GenerationBatch",
+    "GenerationBatchStatus",
+    "GenerationItem",
+    "GenerationItemStatus",
+    "GenerationKind",
+]
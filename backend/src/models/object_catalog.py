@@ -0,0 +1,117 @@
+"""
+对象目录数据模型
+
+记录存储桶中每个对象的元数据（键、大小、ETag、所有者、项目、类型），
+上传/删除时同步写入，使用量统计、完整性检查和孤立文件查询直接走SQL，
+不再扫描存储桶。
+"""
+
+import mimetypes
+from enum import Enum
+from typing import Iterable, Optional
+
+from sqlalchemy import BigInteger, Column, Index, String, UniqueConstraint, delete
+from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.base import BaseModel
+
+
+class ObjectKind(str, Enum):
+    """对象类型"""
+    UPLOAD = "upload"                  # 用户上传的项目文件
+    IMAGE = "image"                    # 生成的句子图片
+    AUDIO = "audio"                    # 生成的句子音频
+    SENTENCE_VIDEO = "sentence_video"  # 单句视频缓存
+    VIDEO = "video"                    # 章节成品视频
+    BGM = "bgm"                        # 背景音乐
+    AVATAR = "avatar"                  # 用户头像
+    OTHER = "other"
+
+    @classmethod
+    def infer(cls, object_key: str, content_type: Optional[str] = None) -> "ObjectKind":
+        """根据对象键前缀和Content-Type推断对象类型"""
+        prefix = object_key.split("/", 1)[0]
+        by_prefix = {
+            "bgm": cls.BGM,
+            "videos": cls.VIDEO,
+            "sentence_videos": cls.SENTENCE_VIDEO,
+            "avatars": cls.AVATAR,
+        }
+        if prefix in by_prefix:
+            return by_prefix[prefix]
+        if prefix in ("uploads", "blobs"):
+            if not content_type or content_type == "application/octet-stream":
+                content_type = mimetypes.guess_type(object_key)[0]
+            if content_type and content_type.startswith("image/"):
+                return cls.IMAGE
+            if content_type and content_type.startswith("audio/"):
+                return cls.AUDIO
+            return cls.UPLOAD
+        return cls.OTHER
+
+
+class ObjectCatalog(BaseModel):
+    """对象目录模型"""
+    __tablename__ = 'object_catalog'
+
+    object_key = Column(String(500), nullable=False, comment="对象键")
+    bucket = Column(String(100), nullable=False, comment="存储桶")
+    size = Column(BigInteger, nullable=False, default=0, comment="对象大小（字节）")
+    etag = Column(String(100), nullable=True, comment="ETag")
+    sha256 = Column(String(64), nullable=True, index=True, comment="内容SHA-256（上传时计算）")
+    content_type = Column(String(100), nullable=True, comment="Content-Type")
+    kind = Column(String(20), nullable=False, default=ObjectKind.OTHER, index=True, comment="对象类型")
+    owner_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, index=True, comment="所有者ID（外键索引，无约束）")
+    project_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, index=True, comment="项目ID（外键索引，无约束）")
+
+    __table_args__ = (
+        UniqueConstraint('bucket', 'object_key', name='uq_object_catalog_bucket_key'),
+        Index('idx_object_catalog_owner_kind', 'owner_id', 'kind'),
+    )
+
+    @classmethod
+    async def upsert(
+        cls,
+        db_session,
+        object_key: str,
+        bucket: str,
+        size: int,
+        etag: Optional[str] = None,
+        sha256: Optional[str] = None,
+        content_type: Optional[str] = None,
+        kind: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+    ) -> None:
+        """写入或覆盖对象记录（同一键重复上传时更新）"""
+        values = {
+            "object_key": object_key,
+            "bucket": bucket,
+            "size": size,
+            "etag": etag,
+            "sha256": sha256,
+            "content_type": content_type,
+            "kind": kind or ObjectKind.infer(object_key, content_type),
+            "owner_id": owner_id,
+            "project_id": project_id,
+        }
+        stmt = insert(cls).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.bucket, cls.object_key],
+            set_={k: stmt.excluded[k] for k in values if k not in ("bucket", "object_key")}
+            | {"updated_at": stmt.excluded.updated_at},
+        )
+        await db_session.execute(stmt)
+
+    @classmethod
+    async def remove(cls, db_session, bucket: str, object_keys: Iterable[str]) -> None:
+        """删除对象记录"""
+        keys = list(object_keys)
+        if keys:
+            await db_session.execute(
+                delete(cls).where(cls.bucket == bucket, cls.object_key.in_(keys))
+            )
+
+
+__all__ = ["ObjectCatalog", "ObjectKind"]
@@ -0,0 +1,178 @@
+"""
+内容寻址对象数据模型
+
+不可变内容（上传的项目文件、BGM、生成的图片/音频）按 SHA-256 存放在 blobs/<sha256><ext>，
+同一内容只保存一份，由 ref_count 记录引用数：上传命中已有内容时只增加计数，
+删除引用方时递减计数，归零后才删除对象。
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import BigInteger, Column, Integer, String, UniqueConstraint, delete, func, select, union_all, update
+from sqlalchemy.dialects.postgresql import insert
+
+from src.models.base import BaseModel
+
+# 内容寻址对象的键前缀
+BLOB_PREFIX = "blobs/"
+
+
+class StorageBlob(BaseModel):
+    """内容寻址对象模型"""
+    __tablename__ = 'storage_blobs'
+
+    bucket = Column(String(100), nullable=False, comment="存储桶")
+    sha256 = Column(String(64), nullable=False, comment="内容SHA-256")
+    object_key = Column(String(500), nullable=False, comment="对象键")
+    size = Column(BigInteger, nullable=False, default=0, comment="对象大小（字节）")
+    content_type = Column(String(100), nullable=True, comment="Content-Type")
+    ref_count = Column(Integer, nullable=False, default=0, comment="引用计数")
+
+    __table_args__ = (
+        UniqueConstraint('bucket', 'sha256', name='uq_storage_blobs_bucket_sha256'),
+        UniqueConstraint('bucket', 'object_key', name='uq_storage_blobs_bucket_key'),
+    )
+
+    @staticmethod
+    def build_key(sha256: str, extension: str = "") -> str:
+        """生成内容寻址对象键（保留扩展名，供按后缀识别文件类型的代码使用）"""
+        return f"{BLOB_PREFIX}{sha256}{extension.lower()}"
+
+    @staticmethod
+    def is_blob_key(object_key: Optional[str]) -> bool:
+        """是否为内容寻址对象键"""
+        return bool(object_key) and object_key.startswith(BLOB_PREFIX)
+
+    @classmethod
+    async def acquire(cls, db_session, bucket: str, sha256: str) -> Optional[str]:
+        """
+        内容已存在时增加引用计数
+
+        Returns:
+            已有对象键；内容不存在时返回None
+        """
+        result = await db_session.execute(
+            update(cls)
+            .where(cls.bucket == bucket, cls.sha256 == sha256)
+            .values(ref_count=cls.ref_count + 1)
+            .returning(cls.object_key)
+        )
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def register(
+        cls,
+        db_session,
+        bucket: str,
+        sha256: str,
+        object_key: str,
+        size: int,
+        content_type: Optional[str] = None,
+    ) -> str:
+        """
+        登记新上传的内容（引用计数为1）；并发上传同一内容时在已有记录上加1
+
+        Returns:
+            该内容的规范对象键（并发冲突时可能与传入的键不同）
+        """
+        stmt = insert(cls).values(
+            bucket=bucket,
+            sha256=sha256,
+            object_key=object_key,
+            size=size,
+            content_type=content_type,
+            ref_count=1,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[cls.bucket, cls.sha256],
+            set_={"ref_count": cls.ref_count + 1, "updated_at": stmt.excluded.updated_at},
+        ).returning(cls.object_key)
+        result = await db_session.execute(stmt)
+        return result.scalar_one()
+
+    @classmethod
+    async def release(cls, db_session, bucket: str, object_keys: Iterable[str]) -> List[str]:
+        """
+        递减引用计数（同一键出现多次时按次数递减）
+
+        计数归零的行保持行锁直到事务结束，调用方应在提交前删除对象并调用 forget，
+        避免并发上传在删除过程中命中即将删除的内容。
+
+        Returns:
+            引用计数归零的对象键
+        """
+        released: List[str] = []
+        by_times: Dict[int, List[str]] = {}
+        for key, times in Counter(object_keys).items():
+            by_times.setdefault(times, []).append(key)
+
+        for times, keys in by_times.items():
+            result = await db_session.execute(
+                update(cls)
+                .where(cls.bucket == bucket, cls.object_key.in_(keys))
+                .values(ref_count=func.greatest(cls.ref_count - times, 0))
+                .returning(cls.object_key, cls.ref_count)
+            )
+            released.extend(key for key, ref_count in result if ref_count == 0)
+        return released
+
+    @classmethod
+    async def lock_in_use(
+        cls, db_session, bucket: str, object_keys: Iterable[str], cutoff: datetime
+    ) -> Set[str]:
+        """
+        锁定内容记录并返回仍在使用的键（引用计数大于0，或更新时间晚于 cutoff）
+
+        行锁与 acquire 的 UPDATE 互斥并保持到事务结束：调用方应在提交前删除其余对象并调用 forget，
+        并发上传会等待提交后因记录已删除而重新上传。
+        """
+        keys = list(object_keys)
+        if not keys:
+            return set()
+        result = await db_session.execute(
+            select(cls.object_key, cls.ref_count, cls.updated_at)
+            .where(cls.bucket == bucket, cls.object_key.in_(keys))
+            .with_for_update()
+        )
+        return {
+            object_key
+            for object_key, ref_count, updated_at in result
+            if ref_count > 0 or updated_at >= cutoff
+        }
+
+    @classmethod
+    async def recount(cls, db_session, bucket: str, reference_columns: Sequence) -> None:
+        """
+        按引用方的列重新计算存储桶内所有内容的引用计数（每个引用该键的非空值计一次）
+
+        用于复制记录后校正计数：复制来的计数可能早于源存储桶之后的变化，也不包含切换后目标存储桶上的新引用。
+        """
+        refs = union_all(*(
+            select(column.label("object_key")).where(column.like(f"{BLOB_PREFIX}%"))
+            for column in reference_columns
+        )).subquery()
+        counts = select(refs.c.object_key, func.count().label("refs")).group_by(refs.c.object_key).subquery()
+        await db_session.execute(
+            update(cls)
+            .where(cls.bucket == bucket, cls.object_key == counts.c.object_key)
+            .values(ref_count=counts.c.refs)
+        )
+        await db_session.execute(
+            update(cls)
+            .where(cls.bucket == bucket, cls.object_key.not_in(select(refs.c.object_key)))
+            .values(ref_count=0)
+        )
+
+    @classmethod
+    async def forget(cls, db_session, bucket: str, object_keys: Iterable[str]) -> None:
+        """删除内容记录"""
+        keys = list(object_keys)
+        if keys:
+            await db_session.execute(
+                delete(cls).where(cls.bucket == bucket, cls.object_key.in_(keys))
+            )
+
+
+__all__ = ["StorageBlob", "BLOB_PREFIX"]
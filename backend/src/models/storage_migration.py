@@ -0,0 +1,69 @@
+"""
+存储源迁移数据模型
+
+记录一次存储源之间的对象迁移：迁移范围（前缀）、断点（当前前缀与最后完成的对象键）、
+进度统计和状态。任务中断后从断点继续；迁移期间及切换后的过渡期内，
+dual_read 为真时读取目标源未命中的对象会回退到源存储源。
+"""
+
+import json
+from enum import Enum
+from typing import List
+
+from sqlalchemy import BigInteger, Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
+
+from src.models.base import BaseModel
+
+
+class StorageMigrationStatus(str, Enum):
+    """迁移状态"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class StorageMigration(BaseModel):
+    """存储源迁移模型"""
+    __tablename__ = 'storage_migrations'
+
+    source_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey('storage_sources.id'), nullable=False, index=True,
+                       comment="源存储源ID")
+    target_id = Column(PostgreSQLUUID(as_uuid=True), ForeignKey('storage_sources.id'), nullable=False, index=True,
+                       comment="目标存储源ID")
+    status = Column(String(20), nullable=False, default=StorageMigrationStatus.PENDING, index=True, comment="迁移状态")
+    prefixes = Column(Text, nullable=False, default="[]", comment="迁移的前缀（JSON数组，空前缀表示整个存储桶）")
+    dual_read = Column(Boolean, nullable=False, default=True, comment="过渡期内读取未命中时回退到源存储源")
+
+    # 断点：prefixes[prefix_index] 中对象键 <= last_key 的对象已处理完毕
+    prefix_index = Column(Integer, nullable=False, default=0, comment="当前前缀序号")
+    last_key = Column(String(500), nullable=True, comment="当前前缀下最后处理完毕的对象键")
+
+    copied = Column(Integer, nullable=False, default=0, comment="已复制对象数")
+    copied_bytes = Column(BigInteger, nullable=False, default=0, comment="已复制字节数")
+    skipped = Column(Integer, nullable=False, default=0, comment="目标已存在且一致而跳过的对象数")
+    failed = Column(Integer, nullable=False, default=0, comment="复制或校验失败的对象数")
+    last_error = Column(Text, nullable=True, comment="最近一次错误")
+
+    task_id = Column(String(255), nullable=True, comment="Celery任务ID")
+    started_at = Column(DateTime(timezone=True), nullable=True, comment="开始时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="结束时间")
+
+    @property
+    def prefix_list(self) -> List[str]:
+        """迁移的前缀列表"""
+        return json.loads(self.prefixes or "[]") or [""]
+
+    @property
+    def is_finished(self) -> bool:
+        """迁移是否已结束"""
+        return self.status in (
+            StorageMigrationStatus.COMPLETED,
+            StorageMigrationStatus.FAILED,
+            StorageMigrationStatus.CANCELLED,
+        )
+
+
+__all__ = ["StorageMigration", "StorageMigrationStatus"]
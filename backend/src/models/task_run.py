@@ -0,0 +1,42 @@
+"""
+任务执行记录数据模型
+
+每个 Celery 任务一行（ID即任务ID），由 Worker 的任务信号写入
+（开始 / 结束 / 失败 / 重试），并按任务参数关联到用户、项目和章节。
+前端按项目或章节批量查询任务状态时只需一次SQL查询，不再逐个查询 Celery 结果后端。
+"""
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
+
+from src.models.base import BaseModel
+
+# 终态（与 Celery 状态名一致）
+TASK_RUN_TERMINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+
+class TaskRun(BaseModel):
+    """任务执行记录模型"""
+    __tablename__ = 'task_runs'
+
+    task_name = Column(String(200), nullable=False, comment="任务名称")
+    state = Column(String(20), nullable=False, default="PENDING", comment="任务状态（Celery状态名）")
+    user_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, comment="用户ID（外键索引，无约束）")
+    project_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, comment="项目ID（外键索引，无约束）")
+    chapter_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, comment="章节ID（外键索引，无约束）")
+    stage = Column(String(50), nullable=True, comment="当前阶段")
+    progress = Column(Integer, nullable=False, default=0, comment="进度（0-100）")
+    retries = Column(Integer, nullable=False, default=0, comment="重试次数")
+    result = Column(Text, nullable=True, comment="任务结果（JSON，仅统计类小结果）")
+    error = Column(Text, nullable=True, comment="错误信息")
+    started_at = Column(DateTime(timezone=True), nullable=True, comment="开始时间")
+    finished_at = Column(DateTime(timezone=True), nullable=True, comment="结束时间")
+
+    __table_args__ = (
+        Index('idx_task_runs_user_created', 'user_id', 'created_at'),
+        Index('idx_task_runs_project_created', 'project_id', 'created_at'),
+        Index('idx_task_runs_chapter_created', 'chapter_id', 'created_at'),
+    )
+
+
+__all__ = ["TASK_RUN_TERMINAL_STATES", "TaskRun"]
@@ -9,7 +9,7 @@ from datetime import timedelta
 from enum import Enum
 from typing import Dict, Optional
 
-from sqlalchemy import Column, ForeignKey, Index, Integer, String, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
 from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
 
 from src.core.logging import get_logger
@@ -29,6 +29,7 @@ class VideoTaskStatus(str, Enum):
     UPLOADING = "uploading"  # 上传到MinIO
     COMPLETED = "completed"  # 完成
     FAILED = "failed"  # 失败
+    CANCELLED = "cancelled"  # 已取消
 
 
 class VideoTask(BaseModel):
@@ -60,6 +61,9 @@ class VideoTask(BaseModel):
     error_message = Column(Text, nullable=True, comment="错误信息")
     error_sentence_id = Column(PostgreSQLUUID(as_uuid=True), nullable=True, comment="出错的句子ID（用于调试）")
 
+    # 取消
+    cancel_requested_at = Column(DateTime(timezone=True), nullable=True, comment="请求取消的时间")
+
     # 关系定义
     from sqlalchemy.orm import relationship
     project = relationship("Project", foreign_keys=[project_id], lazy="noload")
@@ -208,6 +212,12 @@ class VideoTask(BaseModel):
             self.error_sentence_id = sentence_id
         logger.error(f"视频任务 {self.id} 失败: {error}")
 
+    def mark_as_cancelled(self) -> None:
+        """标记为已取消（已生成的单句视频缓存保留，重新提交时复用）"""
+        self.status = VideoTaskStatus.CANCELLED.value
+        self.error_message = "任务已取消"
+        logger.info(f"视频任务 {self.id} 已取消")
+
     def get_video_url(self, expires_hours: int = 6) -> Optional[str]:
         """
         生成视频预签名URL
@@ -251,6 +261,7 @@ class VideoTask(BaseModel):
         self.progress = 0
         self.error_message = None
         self.error_sentence_id = None
+        self.cancel_requested_at = None
         # 保留 current_sentence_index 用于断点续传
         logger.info(f"视频任务 {self.id} 重置为待处理状态，保留断点: {self.current_sentence_index}")
 
@@ -3,14 +3,15 @@ import asyncio
 import random
 import io
 import aiohttp
-from typing import List
+from typing import List, Optional
 
 from fastapi import UploadFile
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from src.core.exceptions import NotFoundError
 from src.core.logging import get_logger
-from src.models import Sentence, SentenceStatus, Paragraph, Chapter
+from src.core.progress import ProgressTracker, gather_with_progress
+from src.models import Sentence, SentenceStatus, Paragraph, Chapter, ObjectKind
 from src.services.api_key import APIKeyService
 from src.services.base import SessionManagedService
 from src.services.provider.base import BaseLLMProvider
@@ -56,6 +57,65 @@ async def retry_with_backoff(task_fn, max_retries=5):
 # 处理单句 – 音频版
 # ============================================================
 
+async def generate_sentence_audio(
+        sentence: Sentence,
+        llm_provider: BaseLLMProvider,
+        storage_client,
+        user_id: str,
+        voice: str = "alloy",
+        model: str = "tts-1"
+) -> str:
+    """
+    为单个句子生成音频并上传，写入句子字段（失败时抛出异常）
+
+    Returns:
+        音频对象键
+    """
+    logger.info(f"[LLM] 处理句子音频 {sentence.id}")
+
+    # 加入重试机制
+    # 注意：OpenAI audio API 返回的是二进制内容，不是 URL
+    # 对于 SiliconFlow，voice 格式为 "model:voice_name"，例如 "FunAudioLLM/CosyVoice2-0.5B:alex"
+    response = await retry_with_backoff(
+        lambda: llm_provider.generate_audio(
+            input_text=sentence.content,
+            voice=voice,
+            model=model,
+        )
+    )
+
+    # OpenAI SDK audio.speech.create 返回的是 HttpxBinaryResponseContent
+    # 需要读取 content
+    content = response.content
+
+    # --- 上传 MinIO ---
+    file_id = str(uuid.uuid4())
+    upload_file = UploadFile(
+        filename=f"{file_id}.mp3",
+        file=io.BytesIO(content),
+    )
+
+    storage_result = await storage_client.upload_file(
+        user_id=str(user_id),
+        file=upload_file,
+        metadata={
+            "file_id": file_id,
+            "file_type": "audio/mpeg",
+        },
+        kind=ObjectKind.AUDIO,
+        dedup=True,
+    )
+    object_key = storage_result["object_key"]
+
+    # --- 更新数据库 ---
+    sentence.audio_url = object_key
+    sentence.status = SentenceStatus.GENERATED_AUDIO
+    sentence.mark_material_updated()  # 标记需要重新生成视频
+    # 注意：不在这里 flush/commit，避免并发冲突
+    # 统一在主函数中处理
+    return object_key
+
+
 async def process_sentence(
         sentence: Sentence,
         llm_provider: BaseLLMProvider,
@@ -80,46 +140,7 @@ async def process_sentence(
     """
     async with semaphore:
         try:
-            logger.info(f"[LLM] 处理句子音频 {sentence.id}")
-
-            # 加入重试机制
-            # 注意：OpenAI audio API 返回的是二进制内容，不是 URL
-            # 对于 SiliconFlow，voice 格式为 "model:voice_name"，例如 "FunAudioLLM/CosyVoice2-0.5B:alex"
-            response = await retry_with_backoff(
-                lambda: llm_provider.generate_audio(
-                    input_text=sentence.content,
-                    voice=voice,
-                    model=model,
-                )
-            )
-
-            # OpenAI SDK audio.speech.create 返回的是 HttpxBinaryResponseContent
-            # 需要读取 content
-            content = response.content
-
-            # --- 上传 MinIO ---
-            file_id = str(uuid.uuid4())
-            upload_file = UploadFile(
-                filename=f"{file_id}.mp3",
-                file=io.BytesIO(content),
-            )
-
-            storage_result = await storage_client.upload_file(
-                user_id=str(user_id),
-                file=upload_file,
-                metadata={
-                    "file_id": file_id,
-                    "file_type": "audio/mpeg",
-                }
-            )
-            object_key = storage_result["object_key"]
-
-            # --- 更新数据库 ---
-            sentence.audio_url = object_key
-            sentence.status = SentenceStatus.GENERATED_AUDIO
-            sentence.mark_material_updated()  # 标记需要重新生成视频
-            # 注意：不在这里 flush/commit，避免并发冲突
-            # 统一在主函数中处理
+            await generate_sentence_audio(sentence, llm_provider, storage_client, user_id, voice, model)
             return True
 
         except Exception as e:
@@ -134,7 +155,7 @@ async def process_sentence(
 class AudioService(SessionManagedService):
 
     async def generate_audio(self, api_key_id: str, sentence_ids: List[str], voice: str = "alloy",
-                             model: str = "tts-1") -> dict:
+                             model: str = "tts-1", progress: Optional[ProgressTracker] = None) -> dict:
         async with self:
             # --- 1. 查询 Sentence ----
             stmt = (
@@ -178,9 +199,18 @@ class AudioService(SessionManagedService):
                 for sentence in sentences
             ]
 
+            # 重新生成会覆盖旧音频，提交后释放旧对象
+            previous_keys = [sentence.audio_url for sentence in sentences]
+
             logger.info(f"[LLM] 开始并发处理音频，共 {len(tasks)} 项")
+            # 生成期间不占用数据库连接，结果在全部完成后统一写入
+            await self.end_transaction()
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if progress:
+                progress.user_id = str(user_id)
+            results = await gather_with_progress(
+                tasks, progress, "generate_audio", [sentence.order_index for sentence in sentences]
+            )
 
             # 统计成功和失败数量
             success_count = 0
@@ -196,6 +226,9 @@ class AudioService(SessionManagedService):
             # --- 7. 提交数据库 ---
             await self.db_session.flush()
             await self.db_session.commit()
+            await storage_client.release_replaced_files(
+                key for key, res in zip(previous_keys, results) if res is True
+            )
 
             logger.info("[FINISH] 所有音频任务完成")
 
@@ -23,6 +23,7 @@ from PIL import Image
 
 from src.core.config import settings
 from src.core.exceptions import ValidationError
+from src.utils.storage import run_in_storage_executor
 
 
 class AvatarService:
@@ -46,9 +47,10 @@ class AvatarService:
     async def _ensure_bucket_exists(self):
         """确保头像存储桶存在"""
         try:
-            self.client.head_bucket(Bucket=self.bucket_name)
+            await run_in_storage_executor(self.client.head_bucket, Bucket=self.bucket_name)
         except ClientError:
-            self.client.create_bucket(
+            await run_in_storage_executor(
+                self.client.create_bucket,
                 Bucket=self.bucket_name,
                 CreateBucketConfiguration={"LocationConstraint": settings.MINIO_REGION}
                 if settings.MINIO_REGION != "us-east-1" else {}
@@ -123,7 +125,8 @@ class AvatarService:
         processed_data = await self._resize_image(file_data, format_type)
         object_name = self._generate_object_name(user_id, filename, format_type)
 
-        self.client.put_object(
+        await run_in_storage_executor(
+            self.client.put_object,
             Bucket=self.bucket_name,
             Key=object_name,
             Body=processed_data,
@@ -141,8 +144,8 @@ class AvatarService:
         object_name = avatar_url.split(f"/{self.bucket_name}/", 1)[1]
 
         try:
-            self.client.head_object(Bucket=self.bucket_name, Key=object_name)
-            self.client.delete_object(Bucket=self.bucket_name, Key=object_name)
+            await run_in_storage_executor(self.client.head_object, Bucket=self.bucket_name, Key=object_name)
+            await run_in_storage_executor(self.client.delete_object, Bucket=self.bucket_name, Key=object_name)
             return True
         except ClientError:
             return False
@@ -155,7 +158,7 @@ class AvatarService:
         object_name = avatar_url.split(f"/{self.bucket_name}/", 1)[1]
 
         try:
-            stat = self.client.head_object(Bucket=self.bucket_name, Key=object_name)
+            stat = await run_in_storage_executor(self.client.head_object, Bucket=self.bucket_name, Key=object_name)
             return {
                 "object_name": object_name,
                 "size": stat["ContentLength"],
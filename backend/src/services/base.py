@@ -101,6 +101,15 @@ class BaseService:
             await self.rollback()
             raise
 
+    async def end_transaction(self):
+        """
+        结束当前事务，把连接归还连接池
+
+        在长时间的外部调用（LLM、存储、FFmpeg）之前调用，避免连接处于 idle in transaction；
+        已加载的对象仍可读取和修改（会话 expire_on_commit=False），之后的操作自动开启新的事务。
+        """
+        await self.commit()
+
     async def rollback(self):
         """
         回滚当前事务
@@ -14,19 +14,86 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from src.core.exceptions import BusinessLogicError, NotFoundError
 from src.core.logging import get_logger
 from src.models.bgm import BGM, BGMStatus
+from src.models.object_catalog import ObjectKind
 from src.services.base import BaseService
 from src.utils.storage import storage_client
 
 logger = get_logger(__name__)
 
+# 各音频格式的容器文件头特征
+_AUDIO_SIGNATURES = {
+    # ID3 标签或 MPEG 音频帧同步字
+    ".mp3": lambda head: head[:3] == b"ID3" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0),
+    ".wav": lambda head: head[:4] == b"RIFF" and head[8:12] == b"WAVE",
+    ".m4a": lambda head: head[4:8] == b"ftyp",
+    # ADIF 头或 ADTS 帧同步字
+    ".aac": lambda head: head[:4] == b"ADIF" or (len(head) >= 2 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0),
+    ".ogg": lambda head: head[:4] == b"OggS",
+}
+
 
 class BGMService(BaseService):
     """BGM管理服务"""
 
+    # 支持的音频格式
+    ALLOWED_EXTENSIONS = {".mp3", ".wav", ".m4a", ".aac", ".ogg"}
+    # 文件大小上限 (50MB)
+    MAX_FILE_SIZE = 50 * 1024 * 1024
+
     def __init__(self, db_session: Optional[AsyncSession] = None):
         super().__init__(db_session)
         logger.debug("BGMService 初始化完成")
 
+    @classmethod
+    def validate_bgm_file(cls, filename: str, file_size: int) -> str:
+        """
+        验证BGM文件名和大小
+
+        Returns:
+            小写的文件扩展名
+
+        Raises:
+            BusinessLogicError: 文件格式不支持或文件过大
+        """
+        file_ext = os.path.splitext(filename or "")[1].lower()
+        if file_ext not in cls.ALLOWED_EXTENSIONS:
+            raise BusinessLogicError(
+                f"不支持的音频格式: {file_ext}。支持的格式: {', '.join(cls.ALLOWED_EXTENSIONS)}"
+            )
+        if file_size > cls.MAX_FILE_SIZE:
+            raise BusinessLogicError(f"文件大小超过限制 (最大 50MB)")
+        return file_ext
+
+    @staticmethod
+    def validate_audio_head(file_ext: str, head: bytes) -> None:
+        """
+        按扩展名检查音频容器的文件头
+
+        Raises:
+            BusinessLogicError: 文件内容与音频格式不符
+        """
+        if not _AUDIO_SIGNATURES[file_ext](head):
+            raise BusinessLogicError(f"文件内容不是有效的{file_ext[1:].upper()}音频")
+
+    @classmethod
+    def probe_audio_file(cls, path: str, file_ext: str) -> int:
+        """
+        校验本地音频文件（文件头 + ffprobe）并返回时长（秒）
+
+        Raises:
+            BusinessLogicError: 文件头不符或ffprobe无法解析
+        """
+        with open(path, "rb") as f:
+            cls.validate_audio_head(file_ext, f.read(1024))
+        try:
+            duration = cls._probe_duration(path)
+        except Exception as e:
+            logger.warning(f"ffprobe执行失败: {e}")
+            duration = None
+        if duration is None:
+            raise BusinessLogicError("无法解析音频文件，请确认文件未损坏")
+        return duration
+
     async def upload_bgm(self, user_id: str, file: UploadFile, name: str) -> BGM:
         """
         上传BGM文件
@@ -42,23 +109,11 @@ class BGMService(BaseService):
         Raises:
             BusinessLogicError: 文件格式不支持或文件过大
         """
-        # 验证文件类型
-        allowed_extensions = {".mp3", ".wav", ".m4a", ".aac", ".ogg"}
-        file_ext = os.path.splitext(file.filename)[1].lower()
-
-        if file_ext not in allowed_extensions:
-            raise BusinessLogicError(
-                f"不支持的音频格式: {file_ext}。支持的格式: {', '.join(allowed_extensions)}"
-            )
-
-        # 验证文件大小 (50MB)
-        max_size = 50 * 1024 * 1024
         file.file.seek(0, 2)  # Seek to end
         file_size = file.file.tell()
         file.file.seek(0)  # Reset to beginning
 
-        if file_size > max_size:
-            raise BusinessLogicError(f"文件大小超过限制 (最大 50MB)")
+        file_ext = self.validate_bgm_file(file.filename, file_size)
 
         try:
             # 生成存储路径
@@ -70,7 +125,7 @@ class BGMService(BaseService):
 
             # 上传到存储
             upload_result = await storage_client.upload_file(
-                user_id=str(user_id), file=file, object_key=file_key
+                user_id=str(user_id), file=file, object_key=file_key, kind=ObjectKind.BGM, dedup=True
             )
 
             # 使用返回的key
@@ -102,12 +157,74 @@ class BGMService(BaseService):
             logger.error(f"BGM上传失败: {e}")
             # 尝试清理已上传的文件
             try:
-                if "file_key" in locals():
-                    storage_client.delete_file(file_key)
+                if "upload_result" in locals():
+                    await storage_client.release_files([upload_result["object_key"]])
             except:
                 pass
             raise
 
+    async def create_bgm_from_object(
+        self,
+        user_id: str,
+        name: str,
+        file_name: str,
+        file_size: int,
+        file_key: str,
+        duration: Optional[int] = None
+    ) -> BGM:
+        """
+        为已在存储中的音频对象创建BGM记录（断点续传或直传完成后调用）
+
+        未提供时长时下载到临时文件，校验文件头并用ffprobe提取时长，不把整个文件读入内存。
+
+        Raises:
+            BusinessLogicError: 不是可解析的音频文件
+        """
+        import asyncio
+        import tempfile
+
+        file_ext = self.validate_bgm_file(file_name, file_size)
+        if duration is None:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                tmp_path = os.path.join(tmp_dir, f"bgm{file_ext}")
+                await storage_client.download_to_path(file_key, tmp_path)
+                duration = await asyncio.to_thread(self.probe_audio_file, tmp_path, file_ext)
+
+        bgm = BGM(
+            user_id=user_id,
+            name=name,
+            file_name=file_name,
+            file_size=file_size,
+            file_key=file_key,
+            duration=duration,
+            status=BGMStatus.ACTIVE,
+        )
+        await self.add(bgm)
+        await self.commit()
+        await self.refresh(bgm)
+
+        logger.info(f"BGM创建成功: ID={bgm.id}, 名称={name}, 时长={duration}s")
+        return bgm
+
+    @staticmethod
+    def _probe_duration(path: str) -> Optional[int]:
+        """使用ffprobe获取本地音频文件时长（秒），失败返回None"""
+        cmd = [
+            "ffprobe",
+            "-v",
+            "error",
+            "-show_entries",
+            "format=duration",
+            "-of",
+            "default=noprint_wrappers=1:nokey=1",
+            path,
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        if result.returncode == 0 and result.stdout.strip():
+            return int(float(result.stdout.strip()))
+        logger.warning(f"无法提取音频时长: {result.stderr}")
+        return None
+
     async def _extract_audio_duration(
         self, content: bytes, file_ext: str
     ) -> Optional[int]:
@@ -130,25 +247,7 @@ class BGMService(BaseService):
                 tmp_path = tmp_file.name
 
             # 使用ffprobe获取时长
-            cmd = [
-                "ffprobe",
-                "-v",
-                "error",
-                "-show_entries",
-                "format=duration",
-                "-of",
-                "default=noprint_wrappers=1:nokey=1",
-                tmp_path,
-            ]
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-
-            if result.returncode == 0 and result.stdout.strip():
-                duration = float(result.stdout.strip())
-                return int(duration)
-
-            logger.warning(f"无法提取音频时长: {result.stderr}")
-            return None
+            return self._probe_duration(tmp_path)
 
         except Exception as e:
             logger.warning(f"提取音频时长失败: {e}")
@@ -260,9 +359,9 @@ class BGMService(BaseService):
         bgm = await self.get_bgm_by_id(bgm_id, user_id)
 
         try:
-            # 从MinIO删除文件
+            # 释放文件引用（共享内容引用归零时才删除）
             if bgm.file_key:
-                await storage_client.delete_file(bgm.file_key)
+                await storage_client.release_files([bgm.file_key])
 
             # 从数据库删除
             await self.delete(bgm)
@@ -0,0 +1,500 @@
+"""
+章节流水线服务（提示词 → 图片/音频 → 视频）
+
+创建流水线时为章节句子预先创建图片、音频两个生成批次（见 src.services.generation_batch），
+按批次的分片构造 Celery canvas（见 src.tasks.task.build_pipeline_canvas）：
+
+    chord(
+        [音频分片 0..n] + [提示词分片 i → 图片分片 i, ...],
+        素材汇总
+    )
+
+素材节点成功后视频合成进入渲染公平调度（见 src.core.render_scheduler），与单独提交的视频任务
+共享 render 槽位和按用户的公平排队。
+节点状态持久化在 chapter_pipelines 表；继续执行时只重置失败的句子，
+只派发仍有未成功句子的分片，视频失败时只重新合成视频。
+"""
+
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.exceptions import BusinessLogicError, NotFoundError, TooManyRequestsError
+from src.core.logging import get_logger
+from src.core.progress import publish_progress
+from src.core.render_scheduler import enqueue_render
+from src.core.task_lock import TaskLock, batch_resource_id, run_exclusive
+from src.models import Chapter, Sentence, VideoTask
+from src.models.chapter_pipeline import ChapterPipeline, PipelineNode, PipelineNodeStatus, PipelineStatus
+from src.models.generation_batch import (
+    GenerationBatchStatus,
+    GenerationItem,
+    GenerationItemStatus,
+    GenerationKind,
+)
+from src.services.base import BaseService
+from src.services.chapter import ChapterService
+from src.services.generation_batch import GenerationBatchService
+from src.services.video_task import VideoTaskService
+
+logger = get_logger(__name__)
+
+# 流水线任务锁：同一章节同时只有一条流水线
+PIPELINE_OPERATION = "chapter_pipeline"
+
+# 批次状态 → 节点状态
+_BATCH_NODE_STATUS = {
+    GenerationBatchStatus.COMPLETED.value: PipelineNodeStatus.COMPLETED,
+    GenerationBatchStatus.PARTIAL.value: PipelineNodeStatus.FAILED,
+    GenerationBatchStatus.FAILED.value: PipelineNodeStatus.FAILED,
+}
+
+
+class ChapterPipelineService(BaseService):
+    """章节流水线服务"""
+
+    def __init__(self, db_session: Optional[AsyncSession] = None):
+        super().__init__(db_session)
+
+    async def get_pipeline(self, pipeline_id: str, user_id: Optional[str] = None) -> ChapterPipeline:
+        """获取流水线（指定 user_id 时校验归属）"""
+        pipeline = await self.get(ChapterPipeline, pipeline_id)
+        if pipeline is None or (user_id is not None and str(pipeline.user_id) != str(user_id)):
+            raise NotFoundError("流水线不存在", resource_type="chapter_pipeline", resource_id=str(pipeline_id))
+        return pipeline
+
+    async def create_pipeline(
+        self,
+        pipeline_id: str,
+        user_id: str,
+        chapter: Chapter,
+        api_key_id: str,
+        params: Dict[str, Any],
+    ) -> ChapterPipeline:
+        """
+        创建流水线及其图片、音频生成批次
+
+        Args:
+            pipeline_id: 流水线ID（即任务锁的持有者）
+            user_id: 用户ID
+            chapter: 章节
+            api_key_id: API密钥ID（提示词、图片、音频共用）
+            params: 各节点参数（style/prompt_model/custom_prompt/image_model/voice/audio_model/bgm_id/gen_setting）
+
+        Raises:
+            BusinessLogicError: 章节没有句子
+        """
+        sentences = await ChapterService(self.db_session).get_sentences(str(chapter.id))
+        if not sentences:
+            raise BusinessLogicError("章节没有句子，请先拆分章节")
+        sentence_ids = [sentence.id.hex for sentence in sentences]
+        lock_resource = batch_resource_id(sentence_ids)
+
+        pipeline = ChapterPipeline(
+            id=pipeline_id,
+            user_id=user_id,
+            project_id=chapter.project_id,
+            chapter_id=chapter.id,
+            api_key_id=api_key_id,
+            params=json.dumps(params),
+            status=PipelineStatus.PENDING.value,
+            image_batch_id=uuid.uuid4(),
+            audio_batch_id=uuid.uuid4(),
+        )
+        await self.add(pipeline)
+
+        batches = GenerationBatchService(self.db_session)
+        await batches.create_batch(
+            str(pipeline.image_batch_id), GenerationKind.IMAGE, api_key_id, sentence_ids,
+            {"model": params.get("image_model")}, lock_resource,
+        )
+        await batches.create_batch(
+            str(pipeline.audio_batch_id), GenerationKind.AUDIO, api_key_id, sentence_ids,
+            {"voice": params.get("voice"), "model": params.get("audio_model")}, lock_resource,
+        )
+        await self.refresh(pipeline)
+        logger.info(f"创建章节流水线: {pipeline_id} (chapter={chapter.id}), {len(sentence_ids)} 个句子")
+        return pipeline
+
+    async def plan(self, pipeline: ChapterPipeline) -> Dict[str, List[int]]:
+        """
+        待执行的分片
+
+        Returns:
+            {audio_chunks, image_chunks}（提示词分片与图片分片一一对应）
+        """
+        batches = GenerationBatchService(self.db_session)
+        return {
+            "audio_chunks": await batches.pending_chunks(pipeline.audio_batch_id),
+            "image_chunks": await batches.pending_chunks(pipeline.image_batch_id),
+        }
+
+    async def start(self, pipeline: ChapterPipeline) -> Dict[str, List[int]]:
+        """标记流水线和待执行节点为运行中，返回待执行的分片"""
+        plan = await self.plan(pipeline)
+        pipeline.status = PipelineStatus.RUNNING.value
+        pipeline.error_message = None
+        pipeline.finished_at = None
+        if plan["image_chunks"]:
+            pipeline.set_node_status(PipelineNode.PROMPTS, PipelineNodeStatus.RUNNING)
+            pipeline.set_node_status(PipelineNode.IMAGES, PipelineNodeStatus.RUNNING)
+        if plan["audio_chunks"]:
+            pipeline.set_node_status(PipelineNode.AUDIO, PipelineNodeStatus.RUNNING)
+        await self.commit()
+        return plan
+
+    async def prepare_resume(self, pipeline: ChapterPipeline) -> Dict[str, List[int]]:
+        """
+        从失败的节点继续：只重置失败的句子（已成功的句子和已完成的节点不会重新执行）
+
+        Raises:
+            BusinessLogicError: 流水线未失败
+        """
+        if pipeline.status != PipelineStatus.FAILED.value:
+            raise BusinessLogicError(f"只有失败的流水线才能继续执行，当前状态: {pipeline.status}")
+
+        batches = GenerationBatchService(self.db_session)
+        for batch_id in (pipeline.image_batch_id, pipeline.audio_batch_id):
+            batch = await batches.get_batch(batch_id)
+            if batch.status in (GenerationBatchStatus.PARTIAL.value, GenerationBatchStatus.FAILED.value):
+                await batches.reset_failed(batch)
+        if pipeline.video_status == PipelineNodeStatus.FAILED.value:
+            pipeline.set_node_status(PipelineNode.VIDEO, PipelineNodeStatus.PENDING)
+        return await self.start(pipeline)
+
+    async def run_prompts_chunk(self, pipeline_id: str, chunk_index: int) -> Dict[str, Any]:
+        """
+        生成图片分片对应句子的提示词（已有提示词的句子跳过），
+        仍没有提示词的句子在图片批次中直接标记为失败，不再调用图片接口
+
+        Returns:
+            {chunk, generated, missing}
+        """
+        from src.services.prompt import prompt_service
+
+        pipeline = await self.get_pipeline(pipeline_id)
+        await TaskLock(PIPELINE_OPERATION, pipeline.chapter_id, str(pipeline.id)).extend(
+            settings.TASK_LOCK_QUEUED_TTL_SECONDS
+        )
+        batches = GenerationBatchService(self.db_session)
+        sentence_ids = await batches.chunk_sentence_ids(pipeline.image_batch_id, chunk_index)
+
+        todo = await self._without_prompt(sentence_ids)
+        report = {"chunk": chunk_index, "generated": 0, "missing": 0}
+        if todo:
+            params = pipeline.param_dict
+            stats = await prompt_service.generate_prompts_by_ids(
+                todo,
+                str(pipeline.api_key_id),
+                params.get("style") or "cinematic",
+                params.get("prompt_model"),
+                params.get("custom_prompt"),
+            )
+            report["generated"] = stats["success"]
+
+        missing = await self._without_prompt(sentence_ids)
+        report["missing"] = len(missing)
+        await batches.fail_items(pipeline.image_batch_id, missing, "提示词生成失败")
+        return report
+
+    async def fail_prompts_chunk(self, pipeline_id: str, chunk_index: int, error: str) -> None:
+        """提示词分片重试耗尽：把对应的图片分片标记为失败，保证汇总回调照常执行"""
+        pipeline = await self.get_pipeline(pipeline_id)
+        await GenerationBatchService(self.db_session).fail_chunk(
+            str(pipeline.image_batch_id), chunk_index, f"提示词生成失败: {error}"
+        )
+
+    async def complete_media(self, pipeline_id: str) -> Dict[str, Any]:
+        """
+        素材节点汇总（chord 回调）：汇总图片、音频批次并更新提示词/图片/音频节点状态
+
+        Returns:
+            {pipeline_id, status, prompts, images, audio}
+        """
+        pipeline = await self.get_pipeline(pipeline_id)
+        batches = GenerationBatchService(self.db_session)
+        images = await batches.finalize(str(pipeline.image_batch_id))
+        audio = await batches.finalize(str(pipeline.audio_batch_id))
+
+        missing_prompts = await self.execute(
+            select(GenerationItem.sentence_id)
+            .join(Sentence, Sentence.id == GenerationItem.sentence_id)
+            .where(
+                GenerationItem.batch_id == pipeline.image_batch_id,
+                (Sentence.image_prompt.is_(None)) | (Sentence.image_prompt == ""),
+            )
+            .limit(1)
+        )
+        prompts_ok = missing_prompts.first() is None
+        pipeline.set_node_status(
+            PipelineNode.PROMPTS, PipelineNodeStatus.COMPLETED if prompts_ok else PipelineNodeStatus.FAILED
+        )
+        pipeline.set_node_status(PipelineNode.IMAGES, _BATCH_NODE_STATUS[images["status"]])
+        pipeline.set_node_status(PipelineNode.AUDIO, _BATCH_NODE_STATUS[audio["status"]])
+
+        failed = [
+            node.value for node in (PipelineNode.PROMPTS, PipelineNode.IMAGES, PipelineNode.AUDIO)
+            if pipeline.node_status(node) == PipelineNodeStatus.FAILED.value
+        ]
+        if failed:
+            await self._fail(pipeline, f"节点失败: {', '.join(failed)}（图片失败 {images['failed']}，音频失败 {audio['failed']}）")
+        else:
+            pipeline.set_node_status(PipelineNode.VIDEO, PipelineNodeStatus.RUNNING)
+            await self.commit()
+            await self._publish(pipeline, "video")
+
+        return {
+            "pipeline_id": str(pipeline.id),
+            "status": pipeline.status,
+            "prompts": pipeline.prompts_status,
+            "images": images,
+            "audio": audio,
+        }
+
+    async def queue_video(self, pipeline_id: str, task, send: Callable[..., Any]) -> Dict[str, Any]:
+        """
+        视频节点进入渲染公平调度（有空闲槽位时立即投递）；流水线已结束时跳过
+
+        Args:
+            pipeline_id: 流水线ID
+            task: 视频节点的 Celery 任务（generate.pipeline_synthesize_video）
+            send: 投递函数（celery_app.send_task）
+
+        Returns:
+            {pipeline_id, status, render_task_id, queue_position, eta_seconds}
+        """
+        pipeline = await self.get_pipeline(pipeline_id)
+        if pipeline.status != PipelineStatus.RUNNING.value:
+            return {"pipeline_id": str(pipeline.id), "status": pipeline.status, "skipped": True}
+
+        await TaskLock(PIPELINE_OPERATION, pipeline.chapter_id, str(pipeline.id)).extend(
+            settings.TASK_LOCK_QUEUED_TTL_SECONDS
+        )
+        chapter = await self.get(Chapter, pipeline.chapter_id)
+        render_task_id = str(uuid.uuid4())
+        try:
+            queue_info = await enqueue_render(
+                task,
+                args=(str(pipeline.id),),
+                task_id=render_task_id,
+                user_id=pipeline.user_id,
+                sentence_count=chapter.sentence_count if chapter is not None else None,
+                send=send,
+            )
+        except TooManyRequestsError as e:
+            pipeline.set_node_status(PipelineNode.VIDEO, PipelineNodeStatus.FAILED)
+            await self._fail(pipeline, f"视频合成排队失败: {e.message}")
+            return {"pipeline_id": str(pipeline.id), "status": pipeline.status}
+
+        logger.info(f"流水线 {pipeline_id} 视频合成进入调度: {render_task_id} {queue_info}")
+        return {"pipeline_id": str(pipeline.id), "status": pipeline.status, "render_task_id": render_task_id,
+                **queue_info}
+
+    async def run_video(self, pipeline_id: str) -> Dict[str, Any]:
+        """
+        视频节点（由渲染调度投递）：创建（或复用失败的）视频任务并合成视频；流水线已结束时跳过
+
+        Returns:
+            {pipeline_id, status, video_task_id}
+        """
+        from src.services.video_synthesis import video_synthesis_service
+
+        pipeline = await self.get_pipeline(pipeline_id)
+        if pipeline.status != PipelineStatus.RUNNING.value:
+            logger.info(f"流水线 {pipeline_id} 状态为 {pipeline.status}，跳过视频合成")
+            return {"pipeline_id": str(pipeline.id), "status": pipeline.status, "skipped": True}
+
+        await TaskLock(PIPELINE_OPERATION, pipeline.chapter_id, str(pipeline.id)).extend(
+            settings.TASK_LOCK_QUEUED_TTL_SECONDS
+        )
+        if pipeline.video_task_id is None:
+            params = pipeline.param_dict
+            video_task = await VideoTaskService(self.db_session).create_video_task(
+                user_id=str(pipeline.user_id),
+                project_id=str(pipeline.project_id),
+                chapter_id=str(pipeline.chapter_id),
+                api_key_id=str(pipeline.api_key_id),
+                bgm_id=params.get("bgm_id"),
+                gen_setting=params.get("gen_setting"),
+            )
+            pipeline.video_task_id = video_task.id
+            await self.commit()
+
+        video_task_id = str(pipeline.video_task_id)
+        try:
+            result = await run_exclusive(
+                "synthesize_video",
+                str(pipeline.chapter_id),
+                video_task_id,
+                video_synthesis_service.synthesize_video(video_task_id),
+            )
+            if isinstance(result, dict) and result.get("skipped"):
+                raise BusinessLogicError("该章节已有视频任务在进行中")
+            if isinstance(result, dict) and result.get("cancelled"):
+                raise BusinessLogicError("视频任务已取消")
+        except Exception as e:
+            logger.error(f"流水线 {pipeline_id} 视频合成失败: {e}", exc_info=True)
+            pipeline.set_node_status(PipelineNode.VIDEO, PipelineNodeStatus.FAILED)
+            await self._fail(pipeline, f"视频合成失败: {e}")
+            return {"pipeline_id": str(pipeline.id), "status": pipeline.status, "video_task_id": video_task_id}
+
+        pipeline.set_node_status(PipelineNode.VIDEO, PipelineNodeStatus.COMPLETED)
+        pipeline.status = PipelineStatus.COMPLETED.value
+        pipeline.finished_at = datetime.now(timezone.utc)
+        await self.commit()
+        await self._release(pipeline)
+        await self._publish(pipeline, "finished")
+        logger.info(f"流水线 {pipeline_id} 完成，视频任务 {video_task_id}")
+        return {"pipeline_id": str(pipeline.id), "status": pipeline.status, "video_task_id": video_task_id}
+
+    async def describe(self, pipeline: ChapterPipeline) -> Dict[str, Any]:
+        """
+        流水线状态（单个接口返回所有节点的进度）
+
+        Returns:
+            流水线字段 + nodes: [{name, status, total, succeeded, failed, ref_id, progress}]
+        """
+        batches = GenerationBatchService(self.db_session)
+        image_counts = await batches.count_items(pipeline.image_batch_id)
+        audio_counts = await batches.count_items(pipeline.audio_batch_id)
+        total = sum(image_counts.values())
+
+        prompted = await self.execute(
+            select(func.count(GenerationItem.id))
+            .join(Sentence, Sentence.id == GenerationItem.sentence_id)
+            .where(
+                GenerationItem.batch_id == pipeline.image_batch_id,
+                Sentence.image_prompt.isnot(None),
+                Sentence.image_prompt != "",
+            )
+        )
+        prompted = prompted.scalar() or 0
+
+        def _batch_node(node: PipelineNode, counts: Dict[str, int], ref_id) -> Dict[str, Any]:
+            return {
+                "name": node.value,
+                "status": pipeline.node_status(node),
+                "total": sum(counts.values()),
+                "succeeded": counts.get(GenerationItemStatus.SUCCEEDED.value, 0),
+                "failed": counts.get(GenerationItemStatus.FAILED.value, 0),
+                "ref_id": str(ref_id),
+            }
+
+        video_node = {"name": PipelineNode.VIDEO.value, "status": pipeline.video_status, "total": 1,
+                      "succeeded": 0, "failed": 0, "ref_id": None, "progress": None}
+        if pipeline.video_task_id:
+            video_task = await self.get(VideoTask, pipeline.video_task_id)
+            if video_task is not None:
+                video_node["ref_id"] = str(video_task.id)
+                video_node["progress"] = video_task.progress
+                video_node["succeeded"] = int(pipeline.video_status == PipelineNodeStatus.COMPLETED.value)
+                video_node["failed"] = int(pipeline.video_status == PipelineNodeStatus.FAILED.value)
+
+        return {
+            "id": str(pipeline.id),
+            "project_id": str(pipeline.project_id),
+            "chapter_id": str(pipeline.chapter_id),
+            "status": pipeline.status,
+            "error_message": pipeline.error_message,
+            "created_at": pipeline.created_at,
+            "finished_at": pipeline.finished_at,
+            "nodes": [
+                {"name": PipelineNode.PROMPTS.value, "status": pipeline.prompts_status, "total": total,
+                 "succeeded": prompted, "failed": 0 if pipeline.prompts_status != PipelineNodeStatus.FAILED.value
+                 else total - prompted, "ref_id": None},
+                _batch_node(PipelineNode.IMAGES, image_counts, pipeline.image_batch_id),
+                _batch_node(PipelineNode.AUDIO, audio_counts, pipeline.audio_batch_id),
+                video_node,
+            ],
+        }
+
+    async def _without_prompt(self, sentence_ids: List[str]) -> List[str]:
+        """没有提示词的句子（只查列，读取其他会话刚提交的结果）"""
+        if not sentence_ids:
+            return []
+        result = await self.execute(
+            select(Sentence.id).where(
+                Sentence.id.in_(sentence_ids),
+                (Sentence.image_prompt.is_(None)) | (Sentence.image_prompt == ""),
+            )
+        )
+        return [str(sentence_id) for sentence_id in result.scalars().all()]
+
+    async def _fail(self, pipeline: ChapterPipeline, message: str) -> None:
+        pipeline.status = PipelineStatus.FAILED.value
+        pipeline.error_message = message
+        pipeline.finished_at = datetime.now(timezone.utc)
+        await self.commit()
+        await self._release(pipeline)
+        await self._publish(pipeline, "finished")
+
+    async def _release(self, pipeline: ChapterPipeline) -> None:
+        try:
+            await TaskLock(PIPELINE_OPERATION, pipeline.chapter_id, str(pipeline.id)).release()
+        except Exception as e:
+            logger.warning(f"释放流水线锁失败: {pipeline.id}: {e}")
+
+    async def _publish(self, pipeline: ChapterPipeline, stage: str) -> None:
+        await publish_progress(
+            str(pipeline.id),
+            stage,
+            status=pipeline.status,
+            nodes={node.value: pipeline.node_status(node) for node in PipelineNode},
+            message=pipeline.error_message,
+            user_id=str(pipeline.user_id),
+        )
+
+
+async def run_pipeline_prompts_chunk(pipeline_id: str, chunk_index: int) -> Dict[str, Any]:
+    """使用独立数据库会话生成一个分片的提示词（供 Celery 任务调用）"""
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        return await ChapterPipelineService(db).run_prompts_chunk(pipeline_id, chunk_index)
+
+
+async def fail_pipeline_prompts_chunk(pipeline_id: str, chunk_index: int, error: str) -> None:
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        await ChapterPipelineService(db).fail_prompts_chunk(pipeline_id, chunk_index, error)
+
+
+async def complete_pipeline_media(pipeline_id: str) -> Dict[str, Any]:
+    """使用独立数据库会话汇总素材节点（供 chord 回调调用）"""
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        return await ChapterPipelineService(db).complete_media(pipeline_id)
+
+
+async def queue_pipeline_video(pipeline_id: str, task, send: Callable[..., Any]) -> Dict[str, Any]:
+    """使用独立数据库会话把视频节点加入渲染调度（供素材汇总回调调用）"""
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        return await ChapterPipelineService(db).queue_video(pipeline_id, task, send)
+
+
+async def run_pipeline_video(pipeline_id: str) -> Dict[str, Any]:
+    """使用独立数据库会话执行视频节点（供 Celery 任务调用）"""
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        return await ChapterPipelineService(db).run_video(pipeline_id)
+
+
+__all__ = [
+    "ChapterPipelineService",
+    "PIPELINE_OPERATION",
+    "complete_pipeline_media",
+    "fail_pipeline_prompts_chunk",
+    "queue_pipeline_video",
+    "run_pipeline_prompts_chunk",
+    "run_pipeline_video",
+]
@@ -1,5 +1,6 @@
 import os
 import json
+import threading
 from src.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -19,16 +20,20 @@ class WhisperTranscriptionService:
         self._model_size = model_size
         self._device = device
         self._compute_type = compute_type
+        self._load_lock = threading.Lock()
 
     def _ensure_model_loaded(self):
-        """确保模型已加载"""
-        if self._model is None:
-            from faster_whisper import WhisperModel
-            from opencc import OpenCC
-            logger.info(f"正在加载 Whisper 模型: {self._model_size} ...")
-            self._model = WhisperModel(self._model_size, device=self._device, compute_type=self._compute_type)
-            self._cc = OpenCC("t2s")
-            logger.info("模型加载完成")
+        """确保模型已加载（视频合成在多个线程中并发识别，只加载一次）"""
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is None:
+                from faster_whisper import WhisperModel
+                from opencc import OpenCC
+                logger.info(f"正在加载 Whisper 模型: {self._model_size} ...")
+                self._cc = OpenCC("t2s")
+                self._model = WhisperModel(self._model_size, device=self._device, compute_type=self._compute_type)
+                logger.info("模型加载完成")
 
     @property
     def model(self):
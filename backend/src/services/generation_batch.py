@@ -0,0 +1,495 @@
+"""
+批量生成服务（分片子任务 + 单句重试）
+
+一次批量图片/音频生成（见 src.models.generation_batch）：
+1. 创建批次：按提交顺序每 GENERATION_CHUNK_SIZE 个句子一个分片，每个句子一条记录
+2. 每个分片由一个 Celery 子任务执行：只处理未成功的句子，单个句子失败按指数退避重试，
+   最多 GENERATION_ITEM_MAX_ATTEMPTS 次；分片结束时一次提交，Worker 崩溃最多损失一个分片的进度
+3. 所有分片完成后（chord 回调）汇总成功/失败数、更新API密钥使用统计并释放任务锁
+4. 重试失败：把失败的句子重置为待处理，只为包含失败句子的分片重新派发子任务
+5. 取消：排队中的分片直接跳过，执行中的分片中断未完成的句子（见 src.core.cancellation），
+   已成功的句子照常保存，汇总时批次标记为已取消
+"""
+
+import asyncio
+import json
+import random
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from src.core.admission import release_admission
+from src.core.cancellation import CancellationScope, TaskCancelled, checkpoint
+from src.core.config import settings
+from src.core.exceptions import BusinessLogicError, NotFoundError
+from src.core.logging import get_logger
+from src.core.progress import publish_progress
+from src.core.task_lock import TaskLock
+from src.models import Chapter, Paragraph, Sentence
+from src.models.generation_batch import (
+    GenerationBatch,
+    GenerationBatchStatus,
+    GenerationItem,
+    GenerationItemStatus,
+    GenerationKind,
+)
+from src.services.api_key import APIKeyService
+from src.services.base import BaseService
+from src.services.provider.factory import ProviderFactory
+from src.utils.storage import get_storage_client
+
+logger = get_logger(__name__)
+
+# 每种生成类型的并发数与 Provider 并发上限（与原单任务实现一致）
+_CONCURRENCY = {
+    GenerationKind.IMAGE: 20,
+    GenerationKind.AUDIO: 5,
+}
+
+# 记录的错误信息最大长度
+_MAX_ERROR_LENGTH = 2000
+
+
+def plan_chunks(count: int, chunk_size: int) -> List[int]:
+    """按提交顺序为每个句子分配分片序号"""
+    chunk_size = max(chunk_size, 1)
+    return [index // chunk_size for index in range(count)]
+
+
+async def attempt_item(
+    item: GenerationItem,
+    generate: Callable[[], Awaitable[Any]],
+    max_attempts: Optional[int] = None,
+    base_delay: Optional[float] = None,
+) -> bool:
+    """
+    生成单个句子：失败按指数退避重试，记录尝试次数和最后一次错误
+
+    尝试次数跨子任务累计，子任务重试或重新派发时不会超过上限。
+
+    Returns:
+        是否成功
+    """
+    max_attempts = max_attempts or settings.GENERATION_ITEM_MAX_ATTEMPTS
+    base_delay = settings.GENERATION_ITEM_RETRY_BASE_SECONDS if base_delay is None else base_delay
+
+    while (item.attempts or 0) < max_attempts:
+        item.attempts = (item.attempts or 0) + 1
+        try:
+            await generate()
+        except Exception as e:
+            item.last_error = f"{type(e).__name__}: {e}"[:_MAX_ERROR_LENGTH]
+            logger.warning(f"句子 {item.sentence_id} 第 {item.attempts}/{max_attempts} 次生成失败: {e}")
+            if item.attempts < max_attempts:
+                await asyncio.sleep(base_delay * 2 ** (item.attempts - 1) + random.random() * base_delay)
+            continue
+        item.status = GenerationItemStatus.SUCCEEDED
+        item.last_error = None
+        item.finished_at = datetime.now(timezone.utc)
+        return True
+
+    item.status = GenerationItemStatus.FAILED
+    item.finished_at = datetime.now(timezone.utc)
+    return False
+
+
+def _summary(batch: GenerationBatch) -> Dict[str, Any]:
+    """批次统计（与原单任务返回的统计结构一致）"""
+    return {
+        "batch_id": str(batch.id),
+        "status": batch.status,
+        "total": batch.total,
+        "success": batch.succeeded,
+        "failed": batch.failed,
+    }
+
+
+class GenerationBatchService(BaseService):
+    """批量生成服务"""
+
+    def __init__(self, db_session: Optional[AsyncSession] = None):
+        super().__init__(db_session)
+
+    async def get_batch(self, batch_id: str, user_id: Optional[str] = None) -> GenerationBatch:
+        """获取批次（指定 user_id 时校验归属）"""
+        batch = await self.get(GenerationBatch, batch_id)
+        if batch is None or (user_id is not None and str(batch.user_id) != str(user_id)):
+            raise NotFoundError("生成批次不存在", resource_type="generation_batch", resource_id=str(batch_id))
+        return batch
+
+    async def list_items(self, batch_id: str, status: Optional[str] = None) -> List[GenerationItem]:
+        """批次内的句子记录（按分片顺序）"""
+        query = select(GenerationItem).where(GenerationItem.batch_id == batch_id)
+        if status:
+            query = query.where(GenerationItem.status == status)
+        result = await self.execute(query.order_by(GenerationItem.chunk_index, GenerationItem.created_at))
+        return list(result.scalars().all())
+
+    async def count_items(self, batch_id: str) -> Dict[str, int]:
+        """按状态统计句子数"""
+        result = await self.execute(
+            select(GenerationItem.status, func.count(GenerationItem.id))
+            .where(GenerationItem.batch_id == batch_id)
+            .group_by(GenerationItem.status)
+        )
+        return {status: count for status, count in result.all()}
+
+    async def pending_chunks(self, batch_id: str) -> List[int]:
+        """仍有未成功句子的分片"""
+        result = await self.execute(
+            select(GenerationItem.chunk_index)
+            .where(GenerationItem.batch_id == batch_id, GenerationItem.status != GenerationItemStatus.SUCCEEDED)
+            .distinct()
+            .order_by(GenerationItem.chunk_index)
+        )
+        return list(result.scalars().all())
+
+    async def chunk_sentence_ids(self, batch_id: str, chunk_index: int) -> List[str]:
+        """分片内未成功句子的ID"""
+        result = await self.execute(
+            select(GenerationItem.sentence_id).where(
+                GenerationItem.batch_id == batch_id,
+                GenerationItem.chunk_index == chunk_index,
+                GenerationItem.status != GenerationItemStatus.SUCCEEDED,
+            )
+        )
+        return [str(sentence_id) for sentence_id in result.scalars().all()]
+
+    async def fail_items(self, batch_id: str, sentence_ids: Sequence[str], error: str) -> None:
+        """把指定句子标记为失败且不再重试（前置条件不满足，如没有提示词）"""
+        if not sentence_ids:
+            return
+        await self.execute(
+            update(GenerationItem)
+            .where(GenerationItem.batch_id == batch_id, GenerationItem.sentence_id.in_(sentence_ids))
+            .values(
+                status=GenerationItemStatus.FAILED.value,
+                attempts=settings.GENERATION_ITEM_MAX_ATTEMPTS,
+                last_error=error[:_MAX_ERROR_LENGTH],
+                finished_at=datetime.now(timezone.utc),
+            )
+        )
+        await self.commit()
+
+    async def create_batch(
+        self,
+        batch_id: str,
+        kind: GenerationKind,
+        api_key_id: str,
+        sentence_ids: Sequence[str],
+        params: Dict[str, Any],
+        lock_resource: str,
+    ) -> GenerationBatch:
+        """
+        创建批次和句子记录（同一 batch_id 重复调用返回已有批次，任务重投时不会重复创建）
+
+        Raises:
+            NotFoundError: 句子不存在
+        """
+        existing = await self.get(GenerationBatch, batch_id)
+        if existing is not None:
+            return existing
+
+        result = await self.execute(
+            select(Sentence)
+            .where(Sentence.id.in_(sentence_ids))
+            .options(selectinload(Sentence.paragraph).selectinload(Paragraph.chapter).selectinload(Chapter.project))
+        )
+        sentences = {sentence.id.hex: sentence for sentence in result.scalars().all()}
+        ordered = [sentences[key] for key in dict.fromkeys(_hex(sid) for sid in sentence_ids) if key in sentences]
+        if not ordered:
+            raise NotFoundError("未找到待处理句子")
+
+        chunk_size = settings.GENERATION_CHUNK_SIZE
+        batch = GenerationBatch(
+            id=batch_id,
+            user_id=ordered[0].paragraph.chapter.project.owner_id,
+            kind=kind.value,
+            api_key_id=api_key_id,
+            params=json.dumps(params),
+            lock_resource=lock_resource,
+            status=GenerationBatchStatus.PENDING.value,
+            chunk_size=chunk_size,
+            total=len(ordered),
+        )
+        await self.add(batch)
+        for sentence, chunk_index in zip(ordered, plan_chunks(len(ordered), chunk_size)):
+            await self.add(GenerationItem(
+                batch_id=batch.id,
+                sentence_id=sentence.id,
+                chunk_index=chunk_index,
+                status=GenerationItemStatus.PENDING.value,
+                attempts=0,
+            ))
+        await self.commit()
+        logger.info(f"创建生成批次: {batch_id} ({kind.value}), {len(ordered)} 个句子, 每片 {chunk_size} 个")
+        return batch
+
+    async def reset_failed(self, batch: GenerationBatch) -> List[int]:
+        """
+        把失败的句子重置为待处理（尝试次数清零）
+
+        Returns:
+            需要重新派发的分片序号
+        """
+        result = await self.execute(
+            update(GenerationItem)
+            .where(GenerationItem.batch_id == batch.id, GenerationItem.status == GenerationItemStatus.FAILED)
+            .values(status=GenerationItemStatus.PENDING.value, attempts=0, last_error=None, finished_at=None)
+            .returning(GenerationItem.chunk_index)
+        )
+        if batch.status == GenerationBatchStatus.CANCELLED.value:
+            raise BusinessLogicError("已取消的批次不能重试")
+        chunks = sorted(set(result.scalars().all()))
+        if not chunks:
+            raise BusinessLogicError("该批次没有失败的句子")
+        batch.status = GenerationBatchStatus.RUNNING.value
+        batch.finished_at = None
+        await self.commit()
+        return chunks
+
+    async def request_cancel(self, batch: GenerationBatch) -> GenerationBatch:
+        """
+        记录取消请求
+
+        Raises:
+            BusinessLogicError: 批次已结束
+        """
+        if batch.finished_at is not None:
+            raise BusinessLogicError(f"批次已结束，无法取消，当前状态: {batch.status}")
+        if batch.cancel_requested_at is None:
+            batch.cancel_requested_at = datetime.now(timezone.utc)
+        await self.commit()
+        logger.info(f"请求取消生成批次: {batch.id}")
+        return batch
+
+    async def run_chunk(self, batch_id: str, chunk_index: int) -> Dict[str, Any]:
+        """
+        执行一个分片：并发生成分片内未成功的句子，结束时一次提交
+
+        批次已请求取消时跳过；执行中收到取消时中断未完成的句子，保存已成功的句子。
+
+        Returns:
+            {chunk, succeeded, failed}，被取消时附带 cancelled=True
+        """
+        from src.services.audio import generate_sentence_audio
+        from src.services.image import generate_sentence_image
+
+        batch = await self.get_batch(batch_id)
+        result = await self.execute(
+            select(GenerationItem, Sentence)
+            .join(Sentence, Sentence.id == GenerationItem.sentence_id)
+            .where(
+                GenerationItem.batch_id == batch.id,
+                GenerationItem.chunk_index == chunk_index,
+                GenerationItem.status != GenerationItemStatus.SUCCEEDED,
+            )
+        )
+        rows = result.all()
+        report = {"chunk": chunk_index, "succeeded": 0, "failed": 0}
+        if batch.cancel_requested_at is not None:
+            logger.info(f"生成批次 {batch_id} 已取消，跳过分片 {chunk_index}")
+            return {**report, "cancelled": True}
+        if not rows:
+            return report
+
+        # 分片开始时续期任务锁，覆盖排队等待的剩余分片
+        await TaskLock(batch.operation, batch.lock_resource, str(batch.id)).extend(settings.TASK_LOCK_QUEUED_TTL_SECONDS)
+        if batch.status == GenerationBatchStatus.PENDING.value:
+            batch.status = GenerationBatchStatus.RUNNING.value
+
+        kind = GenerationKind(batch.kind)
+        params = batch.param_dict
+        api_key = await APIKeyService(self.db_session).get_api_key_by_id(str(batch.api_key_id), str(batch.user_id))
+        llm_provider = ProviderFactory.create(
+            provider=api_key.provider,
+            api_key=api_key.get_api_key(),
+            max_concurrency=_CONCURRENCY[kind],
+            base_url=api_key.base_url if api_key.base_url else None,
+        )
+        storage_client = await get_storage_client()
+        semaphore = asyncio.Semaphore(_CONCURRENCY[kind])
+        # 生成期间不占用数据库连接（并发的句子只修改已加载的对象，不使用会话），分片结束时一次写入
+        await self.end_transaction()
+        user_id = str(batch.user_id)
+
+        def _generator(sentence: Sentence) -> Callable[[], Awaitable[Any]]:
+            if kind == GenerationKind.IMAGE:
+                return lambda: generate_sentence_image(
+                    sentence, llm_provider, storage_client, user_id, params.get("model")
+                )
+            return lambda: generate_sentence_audio(
+                sentence, llm_provider, storage_client, user_id,
+                params.get("voice") or "alloy", params.get("model") or "tts-1",
+            )
+
+        async def _run(item: GenerationItem, sentence: Sentence) -> bool:
+            async with semaphore:
+                await checkpoint()
+                return await attempt_item(item, _generator(sentence))
+
+        # 重新生成会覆盖旧图片/音频，提交后释放旧对象
+        column = "image_url" if kind == GenerationKind.IMAGE else "audio_url"
+        previous_keys = [getattr(sentence, column) for _, sentence in rows]
+
+        cancellation = CancellationScope(batch_id)
+        try:
+            async with cancellation:
+                await asyncio.gather(*(_run(item, sentence) for item, sentence in rows), return_exceptions=True)
+        except TaskCancelled:
+            pass
+        if cancellation.requested:
+            # 被中断的句子保持待处理状态，已成功的句子照常提交
+            report["cancelled"] = True
+            logger.info(f"生成批次 {batch_id} 分片 {chunk_index} 已取消")
+        statuses = [item.status for item, _ in rows]
+        report["succeeded"] = statuses.count(GenerationItemStatus.SUCCEEDED)
+        report["failed"] = statuses.count(GenerationItemStatus.FAILED)
+        await self.commit()
+        await storage_client.release_replaced_files(
+            key for key, status in zip(previous_keys, statuses) if status == GenerationItemStatus.SUCCEEDED
+        )
+
+        await self._publish(batch)
+        logger.info(f"生成批次 {batch_id} 分片 {chunk_index} 完成: {report}")
+        return report
+
+    async def fail_chunk(self, batch_id: str, chunk_index: int, error: str) -> None:
+        """子任务重试耗尽：把分片内未成功的句子标记为失败，保证汇总回调照常执行"""
+        await self.execute(
+            update(GenerationItem)
+            .where(
+                GenerationItem.batch_id == batch_id,
+                GenerationItem.chunk_index == chunk_index,
+                GenerationItem.status != GenerationItemStatus.SUCCEEDED,
+            )
+            .values(
+                status=GenerationItemStatus.FAILED.value,
+                last_error=error[:_MAX_ERROR_LENGTH],
+                finished_at=datetime.now(timezone.utc),
+            )
+        )
+        await self.commit()
+
+    async def finalize(self, batch_id: str) -> Dict[str, Any]:
+        """
+        汇总批次结果、更新API密钥使用统计并释放任务锁
+
+        Returns:
+            {batch_id, status, total, success, failed}
+        """
+        batch = await self.get_batch(batch_id)
+        counts = await self.count_items(batch.id)
+        batch.succeeded = counts.get(GenerationItemStatus.SUCCEEDED.value, 0)
+        batch.failed = counts.get(GenerationItemStatus.FAILED.value, 0)
+        if batch.cancel_requested_at is not None:
+            batch.status = GenerationBatchStatus.CANCELLED.value
+        elif batch.succeeded == batch.total:
+            batch.status = GenerationBatchStatus.COMPLETED.value
+        elif batch.succeeded == 0:
+            batch.status = GenerationBatchStatus.FAILED.value
+        else:
+            batch.status = GenerationBatchStatus.PARTIAL.value
+        batch.finished_at = datetime.now(timezone.utc)
+
+        try:
+            await APIKeyService(self.db_session).update_usage(str(batch.api_key_id), str(batch.user_id))
+        except Exception as e:
+            logger.warning(f"更新API密钥使用统计失败: {e}")
+        await self.commit()
+
+        await TaskLock(batch.operation, batch.lock_resource, str(batch.id)).release()
+        # 编排任务已被 chord 替换，由汇总任务释放其准入名额
+        await release_admission(str(batch.id))
+        summary = _summary(batch)
+        await publish_progress(
+            str(batch.id), "finished", status=batch.status, percent=100,
+            current=batch.succeeded + batch.failed, total=batch.total, user_id=str(batch.user_id),
+        )
+        logger.info(f"[STATS] 生成批次统计: {summary}")
+        return summary
+
+    async def _publish(self, batch: GenerationBatch) -> None:
+        """按已完成句子数发布批次进度"""
+        counts = await self.count_items(batch.id)
+        done = counts.get(GenerationItemStatus.SUCCEEDED.value, 0) + counts.get(GenerationItemStatus.FAILED.value, 0)
+        await publish_progress(
+            str(batch.id),
+            batch.operation,
+            status="running",
+            percent=100 * done / batch.total if batch.total else 100,
+            current=done,
+            total=batch.total,
+            user_id=str(batch.user_id),
+        )
+
+
+def _hex(sentence_id: Any) -> str:
+    from uuid import UUID
+
+    return UUID(str(sentence_id)).hex
+
+
+async def prepare_generation_batch(
+    operation: str,
+    batch_id: str,
+    kind: GenerationKind,
+    api_key_id: str,
+    sentence_ids: Sequence[str],
+    params: Dict[str, Any],
+    lock_resource: str,
+) -> Optional[List[int]]:
+    """
+    创建批次并接管任务锁（供编排任务调用）
+
+    Returns:
+        需要执行的分片序号；锁被其他任务持有时返回None
+    """
+    from src.core.database import get_async_db
+
+    lock = TaskLock(operation, lock_resource, batch_id)
+    if not await lock.adopt(settings.TASK_LOCK_QUEUED_TTL_SECONDS):
+        logger.warning(f"{operation} 已由任务 {await lock.owner()} 执行，跳过批次 {batch_id}")
+        return None
+
+    async with get_async_db() as db:
+        service = GenerationBatchService(db)
+        batch = await service.create_batch(batch_id, kind, api_key_id, sentence_ids, params, lock_resource)
+        return await service.pending_chunks(batch.id)
+
+
+async def run_generation_chunk(batch_id: str, chunk_index: int) -> Dict[str, Any]:
+    """使用独立数据库会话执行一个分片（供 Celery 子任务调用）"""
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        return await GenerationBatchService(db).run_chunk(batch_id, chunk_index)
+
+
+async def fail_generation_chunk(batch_id: str, chunk_index: int, error: str) -> None:
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        await GenerationBatchService(db).fail_chunk(batch_id, chunk_index, error)
+
+
+async def complete_generation_batch(batch_id: str) -> Dict[str, Any]:
+    """使用独立数据库会话汇总批次（供 chord 回调调用）"""
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        return await GenerationBatchService(db).finalize(batch_id)
+
+
+__all__ = [
+    "GenerationBatchService",
+    "attempt_item",
+    "complete_generation_batch",
+    "fail_generation_chunk",
+    "plan_chunks",
+    "prepare_generation_batch",
+    "run_generation_chunk",
+]
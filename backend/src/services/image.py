@@ -2,19 +2,20 @@ import uuid
 import asyncio
 import random
 import io
-import aiohttp
-from typing import List
+from typing import List, Optional
 
 from fastapi import UploadFile
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from src.core.exceptions import NotFoundError
 from src.core.logging import get_logger
-from src.models import Sentence, SentenceStatus, Paragraph, Chapter
+from src.core.progress import ProgressTracker, gather_with_progress
+from src.models import Sentence, SentenceStatus, Paragraph, Chapter, ObjectKind
 from src.services.api_key import APIKeyService
 from src.services.base import SessionManagedService
 from src.services.provider.base import BaseLLMProvider
 from src.services.provider.factory import ProviderFactory
+from src.utils.http_client import download_to_storage
 from src.utils.storage import get_storage_client
 from openai import RateLimitError
 
@@ -44,6 +45,95 @@ async def retry_with_backoff(task_fn, max_retries=5):
 # 处理单句 – 优化版（返回异常信息）
 # ============================================================
 
+async def generate_sentence_image(
+        sentence: Sentence,
+        llm_provider: BaseLLMProvider,
+        storage_client,
+        user_id: str,
+        model: str = None,
+) -> str:
+    """
+    为单个句子生成图片并上传，写入句子字段（失败时抛出异常）
+
+    Returns:
+        图片对象键
+    """
+    logger.info(f"[LLM] 处理句子 {sentence.id}")
+
+    # 加入重试机制
+    result = await retry_with_backoff(
+        lambda: llm_provider.generate_image(
+            prompt=sentence.image_prompt,
+            model=model,
+        )
+    )
+
+    # 检查是否是 base64 响应（Gemini）还是 URL 响应（其他）
+    image_data = result.data[0]
+
+    # gemini 格式要特殊处理
+    if hasattr(image_data, 'b64_json') and image_data.b64_json:
+        # Gemini 返回 base64 数据
+        import base64
+        logger.info(f"[LLM] 使用 base64 数据（Gemini 模型）")
+
+        b64_string = image_data.b64_json
+        content_type = image_data.mime
+        file_ext = content_type.split('/')[-1]
+        logger.info(f"[LLM] Base64 字符串长度: {len(b64_string)},ContentType:{content_type}")
+
+        try:
+            content = base64.b64decode(b64_string)
+        except Exception as e:
+            logger.error(f"[LLM] Base64 解码失败: {e}")
+            raise
+
+        # --- 上传 MinIO ---
+        file_id = str(uuid.uuid4())
+        upload_file = UploadFile(
+            filename=f"{file_id}.{file_ext}",
+            file=io.BytesIO(content),
+        )
+
+        storage_result = await storage_client.upload_file(
+            user_id=str(user_id),
+            file=upload_file,
+            metadata={
+                "file_id": file_id,
+                "file_type": content_type,
+            },
+            kind=ObjectKind.IMAGE,
+            dedup=True,
+        )
+
+    else:
+        # 其他提供商返回 URL：共享连接池下载，边下载边上传（按文件头识别格式）
+        image_url = image_data.url
+        logger.info(f"[LLM] 从 URL 下载图片: {image_url}")
+
+        try:
+            storage_result = await download_to_storage(
+                image_url,
+                storage_client,
+                user_id=str(user_id),
+                kind=ObjectKind.IMAGE,
+                dedup=True,
+            )
+        except Exception as e:
+            logger.error(f"[Download] 图片下载错误: {e}")
+            raise
+
+    object_key = storage_result["object_key"]
+
+    # --- 更新数据库 ---
+    sentence.image_url = object_key
+    sentence.status = SentenceStatus.GENERATED_IMAGE
+    sentence.mark_material_updated()  # 标记需要重新生成视频
+    # 注意：不在这里 flush/commit，避免并发冲突
+    # 统一在主函数中处理
+    return object_key
+
+
 async def process_sentence(
         sentence: Sentence,
         llm_provider: BaseLLMProvider,
@@ -66,82 +156,7 @@ async def process_sentence(
     """
     async with semaphore:
         try:
-            logger.info(f"[LLM] 处理句子 {sentence.id}")
-
-            # 加入重试机制
-            result = await retry_with_backoff(
-                lambda: llm_provider.generate_image(
-                    prompt=sentence.image_prompt,
-                    model=model,
-                )
-            )
-
-            # 检查是否是 base64 响应（Gemini）还是 URL 响应（其他）
-            image_data = result.data[0]
-
-            # gemini 格式要特殊处理
-            if hasattr(image_data, 'b64_json') and image_data.b64_json:
-                # Gemini 返回 base64 数据
-                import base64
-                logger.info(f"[LLM] 使用 base64 数据（Gemini 模型）")
-
-                b64_string = image_data.b64_json
-                content_type = image_data.mime
-                file_ext = content_type.split('/')[-1]
-                logger.info(f"[LLM] Base64 字符串长度: {len(b64_string)},ContentType:{content_type}")
-
-                try:
-                    content = base64.b64decode(b64_string)
-                except Exception as e:
-                    logger.error(f"[LLM] Base64 解码失败: {e}")
-                    raise
-
-            else:
-                # 其他提供商返回 URL
-                image_url = image_data.url
-                logger.info(f"[LLM] 从 URL 下载图片: {image_url}")
-
-                # --- 6. 统一的下载 Session ---
-                async with aiohttp.ClientSession() as http_session:
-                    # --- 下载图片 ---
-                    try:
-                        async with http_session.get(image_url) as resp:
-                            if resp.status != 200:
-                                logger.error(f"[Download] 失败 {resp.status} url={image_url}")
-                            content = await resp.read()
-                            # 要保存为临时文件上传到minio上
-
-                    except Exception as e:
-                        logger.error(f"[Download] 图片下载错误: {e}")
-                        raise
-
-                # 默认格式
-                file_ext = 'jpg'
-                content_type = 'image/jpeg'
-
-            # --- 上传 MinIO ---
-            file_id = str(uuid.uuid4())
-            upload_file = UploadFile(
-                filename=f"{file_id}.{file_ext}",
-                file=io.BytesIO(content),
-            )
-
-            storage_result = await storage_client.upload_file(
-                user_id=str(user_id),
-                file=upload_file,
-                metadata={
-                    "file_id": file_id,
-                    "file_type": content_type,
-                }
-            )
-            object_key = storage_result["object_key"]
-
-            # --- 更新数据库 ---
-            sentence.image_url = object_key
-            sentence.status = SentenceStatus.GENERATED_IMAGE
-            sentence.mark_material_updated()  # 标记需要重新生成视频
-            # 注意：不在这里 flush/commit，避免并发冲突
-            # 统一在主函数中处理
+            await generate_sentence_image(sentence, llm_provider, storage_client, user_id, model)
             return True
 
         except Exception as e:
@@ -155,7 +170,8 @@ async def process_sentence(
 
 class ImageService(SessionManagedService):
 
-    async def generate_images(self, api_key_id: str, sentence_ids: List[str], model: str = None) -> dict:
+    async def generate_images(self, api_key_id: str, sentence_ids: List[str], model: str = None,
+                              progress: Optional[ProgressTracker] = None) -> dict:
         async with self:
             # --- 1. 查询 Sentence ----
             stmt = (
@@ -199,9 +215,18 @@ class ImageService(SessionManagedService):
                 for sentence in sentences
             ]
 
+            # 重新生成会覆盖旧图片，提交后释放旧对象
+            previous_keys = [sentence.image_url for sentence in sentences]
+
             logger.info(f"[LLM] 开始并发处理，共 {len(tasks)} 项")
+            # 生成期间不占用数据库连接，结果在全部完成后统一写入
+            await self.end_transaction()
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            if progress:
+                progress.user_id = str(user_id)
+            results = await gather_with_progress(
+                tasks, progress, "generate_images", [sentence.order_index for sentence in sentences]
+            )
 
             # 统计成功和失败数量
             success_count = 0
@@ -217,6 +242,9 @@ class ImageService(SessionManagedService):
             # --- 7. 提交数据库 ---
             await self.db_session.flush()
             await self.db_session.commit()
+            await storage_client.release_replaced_files(
+                key for key, res in zip(previous_keys, results) if res is True
+            )
 
             logger.info("[FINISH] 所有任务完成")
 
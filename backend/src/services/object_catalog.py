@@ -0,0 +1,226 @@
+"""
+对象目录服务
+
+基于 object_catalog 表提供存储使用量、孤立文件和完整性查询，
+以及从存储桶重建目录（首次启用或目录与存储桶不一致时）。
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.logging import get_logger
+from src.models.object_catalog import ObjectCatalog, ObjectKind
+from src.models.project import Project
+from src.models.sentence import Sentence
+from src.services.base import BaseService
+
+logger = get_logger(__name__)
+
+# 目录重建时每批写入的行数
+_SYNC_BATCH_SIZE = 500
+
+
+def _owner_from_key(object_key: str) -> Optional[UUID]:
+    """从 <prefix>/<user_id>/... 形式的对象键中解析所有者"""
+    parts = object_key.split("/")
+    if len(parts) < 3:
+        return None
+    try:
+        return UUID(parts[1])
+    except ValueError:
+        return None
+
+
+class ObjectCatalogService(BaseService):
+    """对象目录服务"""
+
+    def __init__(self, db_session: Optional[AsyncSession] = None):
+        super().__init__(db_session)
+
+    async def count_objects(self, owner_id: str, bucket: str, prefix: Optional[str] = None) -> int:
+        """统计用户在指定前缀下的对象数"""
+        query = select(func.count(ObjectCatalog.id)).where(
+            ObjectCatalog.owner_id == owner_id,
+            ObjectCatalog.bucket == bucket,
+        )
+        if prefix:
+            query = query.where(ObjectCatalog.object_key.startswith(prefix, autoescape=True))
+        result = await self.execute(query)
+        return result.scalar() or 0
+
+    async def get_usage(self, owner_id: str, bucket: str) -> Dict[str, Any]:
+        """
+        获取用户存储使用量
+
+        Returns:
+            {total_files, total_size, by_kind: {kind: {count, size}}, by_extension: {ext: count}}
+        """
+        owner_filter = and_(ObjectCatalog.owner_id == owner_id, ObjectCatalog.bucket == bucket)
+
+        kind_result = await self.execute(
+            select(
+                ObjectCatalog.kind,
+                func.count(ObjectCatalog.id),
+                func.coalesce(func.sum(ObjectCatalog.size), 0),
+            ).where(owner_filter).group_by(ObjectCatalog.kind)
+        )
+        by_kind = {kind: {"count": count, "size": int(size)} for kind, count, size in kind_result}
+
+        # PostgreSQL substring(text, pattern) 返回正则第一个捕获组
+        ext = func.lower(func.substring(ObjectCatalog.object_key, r"\.([^./]+)$"))
+        ext_result = await self.execute(
+            select(ext, func.count(ObjectCatalog.id)).where(owner_filter, ext.isnot(None)).group_by(ext)
+        )
+        by_extension = {row[0]: row[1] for row in ext_result}
+
+        return {
+            "total_files": sum(v["count"] for v in by_kind.values()),
+            "total_size": sum(v["size"] for v in by_kind.values()),
+            "by_kind": by_kind,
+            "by_extension": by_extension,
+        }
+
+    async def find_orphaned_uploads(
+        self,
+        owner_id: str,
+        bucket: str,
+        older_than: datetime,
+        limit: Optional[int] = None
+    ) -> List[ObjectCatalog]:
+        """
+        查找未被任何项目引用、且早于 older_than 的上传文件
+
+        生成的图片/音频与上传文件同在 uploads/ 前缀下，额外排除被句子引用的键，
+        避免类型推断偏差导致误删。
+        """
+        referenced = select(Project.file_path).where(
+            Project.owner_id == owner_id,
+            Project.file_path.isnot(None),
+        )
+        query = (
+            select(ObjectCatalog)
+            .where(
+                ObjectCatalog.owner_id == owner_id,
+                ObjectCatalog.bucket == bucket,
+                ObjectCatalog.kind == ObjectKind.UPLOAD,
+                ObjectCatalog.created_at < older_than,
+                ObjectCatalog.object_key.notin_(referenced),
+                ~select(Sentence.id).where(
+                    (Sentence.image_url == ObjectCatalog.object_key)
+                    | (Sentence.audio_url == ObjectCatalog.object_key)
+                ).exists(),
+            )
+            .order_by(ObjectCatalog.created_at)
+        )
+        if limit:
+            query = query.limit(limit)
+        result = await self.execute(query)
+        return list(result.scalars().all())
+
+    async def get_project_referenced_keys(self, owner_id: str, object_keys: Iterable[str]) -> Set[str]:
+        """返回给定对象键中被用户项目引用的部分"""
+        keys = list(object_keys)
+        if not keys:
+            return set()
+        result = await self.execute(
+            select(Project.file_path).where(
+                Project.owner_id == owner_id,
+                Project.file_path.in_(keys),
+            )
+        )
+        return {row[0] for row in result}
+
+    async def get_project_files(
+        self,
+        owner_id: str,
+        bucket: str,
+        project_id: Optional[str] = None
+    ) -> List[Tuple[Project, Optional[ObjectCatalog]]]:
+        """
+        获取项目及其文件的目录记录（一次LEFT JOIN，用于完整性检查）
+        """
+        query = (
+            select(Project, ObjectCatalog)
+            .outerjoin(
+                ObjectCatalog,
+                and_(ObjectCatalog.object_key == Project.file_path, ObjectCatalog.bucket == bucket),
+            )
+            .where(Project.owner_id == owner_id)
+            .order_by(Project.created_at.desc())
+        )
+        if project_id:
+            query = query.where(Project.id == project_id)
+        result = await self.execute(query)
+        return [(project, entry) for project, entry in result.all()]
+
+    async def sync_from_storage(self, storage, prefix: str = "") -> Dict[str, int]:
+        """
+        从存储桶重建对象目录
+
+        逐页遍历存储桶：新对象插入（类型、所有者按对象键推断），已有记录只刷新大小和ETag，
+        最后删除本次未出现在存储桶中的记录。
+
+        Args:
+            storage: S3Storage 实例
+            prefix: 只同步该前缀下的对象
+
+        Returns:
+            {scanned, removed}
+        """
+        started_at = datetime.now(timezone.utc)
+        bucket = storage.bucket_name
+        scanned = 0
+        batch: List[Dict[str, Any]] = []
+
+        async def _flush():
+            if not batch:
+                return
+            stmt = insert(ObjectCatalog).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[ObjectCatalog.bucket, ObjectCatalog.object_key],
+                set_={
+                    "size": stmt.excluded.size,
+                    "etag": stmt.excluded.etag,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            await self.execute(stmt)
+            await self.commit()
+            batch.clear()
+
+        async for file_info in storage.iter_files(prefix):
+            object_key = file_info["object_key"]
+            batch.append({
+                "object_key": object_key,
+                "bucket": bucket,
+                "size": file_info["size"],
+                "etag": file_info.get("etag"),
+                "kind": ObjectKind.infer(object_key),
+                "owner_id": _owner_from_key(object_key),
+                "updated_at": datetime.now(timezone.utc),
+            })
+            scanned += 1
+            if len(batch) >= _SYNC_BATCH_SIZE:
+                await _flush()
+        await _flush()
+
+        stale = delete(ObjectCatalog).where(
+            ObjectCatalog.bucket == bucket,
+            ObjectCatalog.updated_at < started_at,
+        )
+        if prefix:
+            stale = stale.where(ObjectCatalog.object_key.startswith(prefix, autoescape=True))
+        result = await self.execute(stale)
+        await self.commit()
+
+        removed = result.rowcount or 0
+        logger.info(f"对象目录同步完成: bucket={bucket}, prefix={prefix!r}, 扫描 {scanned}, 移除 {removed}")
+        return {"scanned": scanned, "removed": removed}
+
+
+__all__ = ["ObjectCatalogService"]
@@ -364,9 +364,12 @@ class ProjectService(BaseService):
         if files_to_delete:
             try:
                 storage_client = await get_storage_client()
-                for file_key in files_to_delete:
-                    await storage_client.delete_file(file_key)
-                logger.info(f"删除项目文件: {len(files_to_delete)} 个文件")
+                # 共享内容（blobs/）只递减引用计数，其他文件直接删除
+                result = await storage_client.release_files(files_to_delete)
+                logger.info(
+                    f"删除项目文件: {len(result['deleted'])} 个已删除, "
+                    f"{len(result['released'])} 个共享文件仍被引用"
+                )
             except Exception as e:
                 logger.warning(f"删除存储文件时出错: {e}")
 
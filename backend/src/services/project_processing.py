@@ -373,34 +373,34 @@ class ProjectProcessingService(SessionManagedService):
             if not project or not project.file_path:
                 raise ValueError(f"项目或文件路径无效: {project_id}")
 
-            # 从存储下载文件
-            storage = await self._get_storage_client()
-            data = await storage.download_file(project.file_path)
-
             file_type = project.file_type
             handler = get_file_handler(file_type)
 
-            # 创建临时文件处理
+            # 从存储直接下载到临时文件，不在内存中保留整个文件
             suffix = Path(project.file_path).suffix
             with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as fp:
-                fp.write(data)
                 temp_path = fp.name
 
             try:
-                # 尝试使用文件处理器读取
-                content = await handler.read_file(temp_path)
-                logger.info(f"成功读取文件 {project.file_path}，内容长度: {len(content)}")
-                return content
-            except Exception as e:
-                # 如果文件处理器失败，尝试直接解码
-                logger.warning(f"文件处理器读取失败，尝试直接解码: {e}")
+                storage = await self._get_storage_client()
+                await storage.download_to_path(project.file_path, temp_path)
+
                 try:
-                    content = decode_file_content(data, project.file_path)
-                    logger.info(f"成功解码文件 {project.file_path}，内容长度: {len(content)}")
+                    # 尝试使用文件处理器读取
+                    content = await handler.read_file(temp_path)
+                    logger.info(f"成功读取文件 {project.file_path}，内容长度: {len(content)}")
                     return content
-                except Exception as decode_error:
-                    logger.error(f"无法解码文件 {project.file_path}: {decode_error}")
-                    raise ValueError(f"无法解码文件: {project.file_path}")
+                except Exception as e:
+                    # 如果文件处理器失败，尝试直接解码
+                    logger.warning(f"文件处理器读取失败，尝试直接解码: {e}")
+                    try:
+                        data = Path(temp_path).read_bytes()
+                        content = decode_file_content(data, project.file_path)
+                        logger.info(f"成功解码文件 {project.file_path}，内容长度: {len(content)}")
+                        return content
+                    except Exception as decode_error:
+                        logger.error(f"无法解码文件 {project.file_path}: {decode_error}")
+                        raise ValueError(f"无法解码文件: {project.file_path}")
             finally:
                 # 清理临时文件
                 try:
@@ -9,13 +9,14 @@ AI导演引擎 - 提示词生成服务（优化版，含完整注释）
 """
 
 import asyncio
-from typing import List
+from typing import List, Optional
 
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from src.core.exceptions import NotFoundError
 from src.core.logging import get_logger
+from src.core.progress import ProgressTracker, gather_with_progress
 from src.models import Sentence, APIKey, ChapterStatus, SentenceStatus, Paragraph, Chapter
 from src.services import ChapterService
 from src.services.api_key import APIKeyService
@@ -175,7 +176,8 @@ class PromptService(SessionManagedService):
     # ------------------------------------------------------------
 
     async def _generate_prompts(self, sentences: List[Sentence], api_key: APIKey, style: str,
-                                update: bool = True, model: str = None, custom_prompt: str = None) -> dict:
+                                update: bool = True, model: str = None, custom_prompt: str = None,
+                                progress: Optional[ProgressTracker] = None) -> dict:
         """
         核心执行方法：批量生成提示词 + 写数据库 + 更新章节状态。
 
@@ -186,6 +188,7 @@ class PromptService(SessionManagedService):
             update (bool): 是否更新章节，默认为 True
             model (str): 模型名称
             custom_prompt (str): 自定义系统提示词
+            progress (ProgressTracker): 进度上报器（可选）
             
         Returns:
             dict: 统计信息 {"total": int, "success": int, "failed": int}
@@ -209,7 +212,13 @@ class PromptService(SessionManagedService):
         ]
 
         logger.info(f"[LLM] 开始批量生成提示词，总数={len(sentences)}")
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # 生成期间不占用数据库连接，结果在全部完成后统一写入
+        await self.end_transaction()
+        if progress:
+            progress.user_id = str(sentences[0].paragraph.chapter.project.owner_id)
+        results = await gather_with_progress(
+            tasks, progress, "generate_prompts", [sentence.order_index for sentence in sentences]
+        )
         logger.info("[LLM] 所有句子处理完成")
 
         # 统计成功和失败数量
@@ -259,7 +268,7 @@ class PromptService(SessionManagedService):
     # 对外方法：按章节处理
     # ============================================================
 
-    async def generate_prompts_batch(self, chapter_id: str, api_key_id: str, style: str = "cinematic", model: str = None, custom_prompt: str = None) -> dict:
+    async def generate_prompts_batch(self, chapter_id: str, api_key_id: str, style: str = "cinematic", model: str = None, custom_prompt: str = None, progress: Optional[ProgressTracker] = None) -> dict:
         """
         批量生成提示词（按章节 ID 获取所有待处理句子）
 
@@ -269,6 +278,7 @@ class PromptService(SessionManagedService):
             style (str): 生成风格
             model (str): 模型名称
             custom_prompt (str): 自定义系统提示词
+            progress (ProgressTracker): 进度上报器（可选）
             
         Returns:
             dict: 统计信息 {"total": int, "success": int, "failed": int}
@@ -286,13 +296,13 @@ class PromptService(SessionManagedService):
             api_key = await self._load_api_key(api_key_id, user_id)
 
             # 统一执行批量处理
-            return await self._generate_prompts(sentences, api_key, style, True, model, custom_prompt)
+            return await self._generate_prompts(sentences, api_key, style, True, model, custom_prompt, progress)
 
     # ============================================================
     # 对外方法：按句子 ID 数组处理
     # ============================================================
 
-    async def generate_prompts_by_ids(self, sentence_ids: List[str], api_key_id: str, style: str = "cinematic", model: str = None, custom_prompt: str = None) -> dict:
+    async def generate_prompts_by_ids(self, sentence_ids: List[str], api_key_id: str, style: str = "cinematic", model: str = None, custom_prompt: str = None, progress: Optional[ProgressTracker] = None) -> dict:
         """
         批量生成提示词（按句子 ID 列表处理）
 
@@ -302,6 +312,7 @@ class PromptService(SessionManagedService):
             style (str): 生成风格
             model (str): 模型名称
             custom_prompt (str): 自定义系统提示词
+            progress (ProgressTracker): 进度上报器（可选）
             
         Returns:
             dict: 统计信息 {"total": int, "success": int, "failed": int}
@@ -327,7 +338,7 @@ class PromptService(SessionManagedService):
             api_key = await self._load_api_key(api_key_id, user_id)
 
             # 执行批量生成
-            return await self._generate_prompts(sentences, api_key, style, False, model, custom_prompt)
+            return await self._generate_prompts(sentences, api_key, style, False, model, custom_prompt, progress)
 
 
 prompt_service = PromptService()
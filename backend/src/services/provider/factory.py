@@ -1,5 +1,10 @@
 # src/services/providers/factory.py
 
+import asyncio
+import weakref
+from collections import OrderedDict
+from typing import Optional, Tuple
+
 from .openai_provider import OpenAIProvider
 from .deepseek_provider import DeepSeekProvider
 from .volcengine_provider import VolcengineProvider
@@ -8,10 +13,49 @@ from .custom_provider import CustomProvider
 from .base import BaseLLMProvider
 
 
+# 每个事件循环缓存的 Provider 数量上限
+_CACHE_SIZE = 32
+
+_providers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OrderedDict[Tuple, BaseLLMProvider]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _running_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
 class ProviderFactory:
 
     @staticmethod
     def create(provider: str, api_key: str, **kwargs) -> BaseLLMProvider:
+        """
+        创建 Provider（按事件循环缓存）
+
+        Provider 内的 SDK 客户端持有绑定事件循环的连接池，Worker 进程的长期事件循环中
+        同一密钥的多个任务复用同一个 Provider，免去重复建立连接；缓存按LRU淘汰。
+        """
+        loop = _running_loop()
+        if loop is None:
+            return ProviderFactory._build(provider, api_key, **kwargs)
+
+        cache = _providers.setdefault(loop, OrderedDict())
+        key = (provider.lower(), api_key, kwargs.get("max_concurrency", 5), kwargs.get("base_url"))
+        instance = cache.get(key)
+        if instance is None:
+            instance = ProviderFactory._build(provider, api_key, **kwargs)
+            cache[key] = instance
+            while len(cache) > _CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return instance
+
+    @staticmethod
+    def _build(provider: str, api_key: str, **kwargs) -> BaseLLMProvider:
         provider = provider.lower()
 
         match provider:
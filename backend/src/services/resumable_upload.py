@@ -0,0 +1,788 @@
+"""
+断点续传服务
+
+协议（create / patch / complete）：
+1. POST 创建会话：声明文件名、大小、用途（项目文件/BGM）和可选的SHA-256，
+   在接收任何数据之前完成文件名、类型和大小校验，并在存储中发起分片上传。
+2. PATCH 追加分片：请求头 Upload-Offset 必须等于服务端已接收的字节数，
+   每次请求体恰好是一个分片（最后一片除外），流式读入后直接作为一个S3分片上传；
+   可选 Upload-Checksum: sha256 <base64> 校验分片内容。中断后通过 HEAD 查询偏移继续上传。
+3. POST complete 合并分片，校验整体大小与SHA-256，转为正式对象（按内容去重）并完成业务登记。
+
+直传模式（数据不经过API进程）：
+1. POST 创建直传会话：返回预签名PUT URL，或超过一个分片时返回各分片的预签名URL。
+2. 客户端直接上传到对象存储，然后调用直传 complete（分片直传需提交各分片ETag）。
+3. Celery 任务校验大小、文件头（魔数/MIME）、编码/格式与SHA-256，通过后转为正式对象，
+   项目文件在声明了标题时直接创建项目并投递解析任务，BGM创建记录；客户端轮询会话获取结果。
+
+会话状态保存在Redis（随每次写入续期，过期即视为放弃），
+过期会话在存储中遗留的未完成分片上传由定时任务中止。
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+import mimetypes
+import re
+import secrets
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.exceptions import BusinessLogicError, ConflictError, FileUploadError, NotFoundError
+from src.core.logging import get_logger
+from src.core.redis import get_redis_client
+from src.models.object_catalog import ObjectKind
+from src.utils.file_handlers import FileHandler, FileProcessingError
+from src.utils.storage import S3Storage, get_storage_client, run_in_storage_executor
+
+logger = get_logger(__name__)
+
+# 未完成上传的暂存前缀（完成后转为正式对象）
+STAGING_PREFIX = "resumable/"
+
+_SESSION_KEY = "upload_session:{}"
+_LOCK_KEY = "upload_session:{}:lock"
+# 单个分片请求的最长处理时间（秒），超时后锁自动释放
+_LOCK_TTL = 300
+# 等待会话锁时的轮询间隔（秒）
+_LOCK_POLL_SECONDS = 0.1
+# 完成后的会话保留时间（秒），用于重复调用 complete 时返回相同结果
+_COMPLETED_TTL = 3600
+# 进程内保留的增量哈希状态数
+_MAX_HASHERS = 256
+
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadPurpose(str, Enum):
+    """上传用途"""
+    PROJECT_FILE = "project_file"
+    BGM = "bgm"
+
+
+class UploadMode(str, Enum):
+    """上传方式"""
+    RESUMABLE = "resumable"  # 经API分片续传
+    DIRECT = "direct"        # 预签名URL直传对象存储
+
+
+class UploadStatus(str, Enum):
+    """上传会话状态"""
+    UPLOADING = "uploading"
+    VALIDATING = "validating"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+# 整体SHA-256的增量计算状态 upload_id -> (已计算到的偏移, hasher)。
+# hashlib 的中间状态无法序列化，只能保存在进程内：同一进程顺序接收的分片直接续算，
+# 分片落在其他进程或服务重启后，完成时从存储重新读取一遍计算。
+# 分片哈希在存储线程池中计算，对字典的读写都在 _hashers_lock 下进行（计算本身不持锁）。
+_hashers: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+_hashers_lock = threading.Lock()
+
+
+def _update_hasher(upload_id: str, offset: int, chunk: bytes) -> None:
+    """在已计算到 offset 的哈希状态上追加分片（同一会话的分片由会话锁串行化）"""
+    with _hashers_lock:
+        state = _hashers.pop(upload_id, None)
+    if offset == 0:
+        state = (0, hashlib.sha256())
+    if state is None or state[0] != offset:
+        return
+    hasher = state[1]
+    hasher.update(chunk)
+    with _hashers_lock:
+        _hashers[upload_id] = (offset + len(chunk), hasher)
+        while len(_hashers) > _MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def _hasher_state(upload_id: str) -> Optional[Tuple[int, Any]]:
+    """会话的增量哈希状态 (已计算到的偏移, hasher)"""
+    with _hashers_lock:
+        return _hashers.get(upload_id)
+
+
+def _forget_hasher(upload_id: str) -> None:
+    """移除会话的增量哈希状态"""
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+
+
+def _parse_checksum(header: str) -> bytes:
+    """解析 Upload-Checksum: sha256 <base64>"""
+    algorithm, _, value = header.strip().partition(" ")
+    if algorithm.lower() != "sha256" or not value:
+        raise BusinessLogicError("Upload-Checksum 仅支持 sha256", code="UPLOAD_CHECKSUM_UNSUPPORTED")
+    try:
+        return base64.b64decode(value.strip(), validate=True)
+    except (binascii.Error, ValueError):
+        raise BusinessLogicError("Upload-Checksum 格式错误", code="UPLOAD_CHECKSUM_INVALID")
+
+
+class ResumableUploadService:
+    """断点续传服务"""
+
+    def __init__(self, storage: Optional[S3Storage] = None, redis_client=None):
+        self._storage = storage
+        self._redis = redis_client
+
+    @property
+    def redis(self):
+        return self._redis or get_redis_client()
+
+    async def _get_storage(self) -> S3Storage:
+        return self._storage or await get_storage_client()
+
+    # ------------------------------------------------------------------
+    # 会话状态
+    # ------------------------------------------------------------------
+
+    async def _save(self, session: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """保存会话并续期"""
+        ttl = ttl or settings.UPLOAD_SESSION_TTL_HOURS * 3600
+        session["expires_at"] = (datetime.now(timezone.utc) + timedelta(seconds=ttl)).isoformat()
+        await self.redis.set(_SESSION_KEY.format(session["upload_id"]), json.dumps(session, ensure_ascii=False), ex=ttl)
+
+    async def _load(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        """读取会话，不存在、已过期或不属于当前用户时抛出 NotFoundError"""
+        raw = await self.redis.get(_SESSION_KEY.format(upload_id))
+        session = json.loads(raw) if raw else None
+        if not session or session["user_id"] != str(user_id):
+            raise NotFoundError("上传会话不存在或已过期", resource_type="upload", resource_id=upload_id)
+        return session
+
+    async def _acquire_lock(self, upload_id: str, wait: bool = False) -> str:
+        """同一会话同时只处理一个写请求（wait=True 时等待其他请求释放，最长一个锁有效期）"""
+        token = secrets.token_hex(8)
+        deadline = time.monotonic() + _LOCK_TTL
+        while not await self.redis.set(_LOCK_KEY.format(upload_id), token, nx=True, ex=_LOCK_TTL):
+            if not wait or time.monotonic() >= deadline:
+                raise ConflictError("该上传正在处理其他请求，请稍后重试", code="UPLOAD_LOCKED")
+            await asyncio.sleep(_LOCK_POLL_SECONDS)
+        return token
+
+    async def _release_lock(self, upload_id: str, token: str) -> None:
+        key = _LOCK_KEY.format(upload_id)
+        if await self.redis.get(key) == token:
+            await self.redis.delete(key)
+
+    @staticmethod
+    def _public(session: Dict[str, Any]) -> Dict[str, Any]:
+        """会话对外字段"""
+        return {
+            "upload_id": session["upload_id"],
+            "mode": session["mode"],
+            "purpose": session["purpose"],
+            "filename": session["filename"],
+            "size": session["size"],
+            "offset": session["offset"],
+            "chunk_size": session["chunk_size"],
+            "status": session["status"],
+            "expires_at": session["expires_at"],
+            "result": session.get("result"),
+            "error": session.get("error"),
+            "task_id": session.get("task_id"),
+        }
+
+    # ------------------------------------------------------------------
+    # 协议
+    # ------------------------------------------------------------------
+
+    async def create_session(
+        self,
+        user_id: str,
+        filename: str,
+        size: int,
+        purpose: UploadPurpose,
+        content_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+        name: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        创建上传会话（接收数据前完成文件名、类型和大小校验）
+
+        Args:
+            user_id: 用户ID
+            filename: 原始文件名
+            size: 文件总大小（字节）
+            purpose: 上传用途
+            content_type: Content-Type，缺省时按文件名推断
+            sha256: 客户端声明的整体SHA-256（十六进制），完成时校验
+            name: BGM名称（仅BGM）
+
+        Returns:
+            会话信息
+        """
+        purpose = UploadPurpose(purpose)
+        session = self._new_session(
+            user_id, filename, size, purpose, UploadMode.RESUMABLE, content_type, sha256, name
+        )
+        storage = await self._get_storage()
+        session["s3_upload_id"] = await storage.create_multipart_upload(
+            session["staging_key"], session["content_type"], user_id, filename
+        )
+        await self._save(session)
+        logger.info(f"创建上传会话: {session['upload_id']}, 用户={user_id}, 文件={filename}, 大小={size}")
+        return self._public(session)
+
+    def _new_session(
+        self,
+        user_id: str,
+        filename: str,
+        size: int,
+        purpose: UploadPurpose,
+        mode: UploadMode,
+        content_type: Optional[str],
+        sha256: Optional[str],
+        name: Optional[str],
+    ) -> Dict[str, Any]:
+        """校验声明的文件信息并构建会话"""
+        file_type = None
+        if purpose == UploadPurpose.PROJECT_FILE:
+            try:
+                file_type, _ = FileHandler.validate_declared_file(filename, size)
+            except FileProcessingError as e:
+                raise FileUploadError(str(e))
+        else:
+            from src.services.bgm_service import BGMService
+            if size <= 0:
+                raise FileUploadError("文件不能为空")
+            BGMService.validate_bgm_file(filename, size)
+
+        chunk_size = settings.UPLOAD_CHUNK_SIZE
+        if size > chunk_size * 10000:
+            raise FileUploadError("文件过大，超过分片上传上限")
+
+        if sha256:
+            sha256 = sha256.lower()
+            if not _SHA256_RE.match(sha256):
+                raise BusinessLogicError("sha256 必须是64位十六进制字符串", code="UPLOAD_HASH_INVALID")
+
+        upload_id = uuid.uuid4().hex
+        extension = Path(filename).suffix.lower()
+        return {
+            "upload_id": upload_id,
+            "mode": mode.value,
+            "user_id": str(user_id),
+            "purpose": purpose.value,
+            "filename": filename,
+            "name": name or Path(filename).stem,
+            "size": size,
+            "content_type": content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            "file_type": file_type,
+            "declared_sha256": sha256,
+            "staging_key": f"{STAGING_PREFIX}{user_id}/{upload_id}{extension}",
+            "s3_upload_id": None,
+            "chunk_size": chunk_size,
+            "offset": 0,
+            "parts": [],
+            "assembled": False,
+            "status": UploadStatus.UPLOADING.value,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+    async def get_session(self, upload_id: str, user_id: str) -> Dict[str, Any]:
+        """查询会话（客户端中断后据此获取续传偏移）"""
+        return self._public(await self._load(upload_id, user_id))
+
+    async def append_chunk(
+        self,
+        upload_id: str,
+        user_id: str,
+        offset: int,
+        body: AsyncIterator[bytes],
+        checksum: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        追加一个分片
+
+        请求体流式读入，超过本分片应有长度时立即拒绝；内存占用不超过一个分片。
+
+        Args:
+            upload_id: 会话ID
+            user_id: 用户ID
+            offset: 客户端认为的当前偏移（Upload-Offset）
+            body: 请求体字节流
+            checksum: 可选的分片校验（Upload-Checksum）
+
+        Returns:
+            更新后的会话信息
+        """
+        token = await self._acquire_lock(upload_id)
+        try:
+            session = await self._load(upload_id, user_id)
+            if session["mode"] != UploadMode.RESUMABLE.value:
+                raise ConflictError("直传会话请直接上传到对象存储", code="UPLOAD_MODE_MISMATCH")
+            if session["status"] != UploadStatus.UPLOADING.value:
+                raise ConflictError("上传已完成", code="UPLOAD_COMPLETED")
+            if offset != session["offset"]:
+                raise ConflictError(
+                    "上传偏移不一致", code="UPLOAD_OFFSET_MISMATCH", details={"offset": session["offset"]}
+                )
+
+            expected = min(session["chunk_size"], session["size"] - offset)
+            if expected <= 0:
+                raise ConflictError("数据已全部接收，请调用完成接口", code="UPLOAD_ALREADY_FULL")
+
+            buffer = bytearray()
+            async for piece in body:
+                buffer.extend(piece)
+                if len(buffer) > expected:
+                    raise BusinessLogicError(
+                        f"分片长度超出，本次应为 {expected} 字节", code="UPLOAD_CHUNK_TOO_LARGE"
+                    )
+            if len(buffer) != expected:
+                raise BusinessLogicError(
+                    f"分片长度不符，本次应为 {expected} 字节，实际 {len(buffer)} 字节",
+                    code="UPLOAD_CHUNK_SIZE_MISMATCH",
+                )
+            chunk = bytes(buffer)
+            del buffer
+
+            if checksum:
+                digest = await run_in_storage_executor(lambda: hashlib.sha256(chunk).digest())
+                if digest != _parse_checksum(checksum):
+                    raise BusinessLogicError("分片校验失败", code="UPLOAD_CHECKSUM_MISMATCH")
+
+            if offset == 0 and session["purpose"] == UploadPurpose.PROJECT_FILE.value:
+                try:
+                    session["file_type"], _ = FileHandler.validate_file_head(
+                        session["filename"], session["file_type"], chunk[:1024]
+                    )
+                except FileProcessingError as e:
+                    await self._discard(session)
+                    raise FileUploadError(str(e))
+            elif offset == 0 and session["purpose"] == UploadPurpose.BGM.value:
+                from src.services.bgm_service import BGMService
+                try:
+                    BGMService.validate_audio_head(Path(session["filename"]).suffix.lower(), chunk[:1024])
+                except BusinessLogicError as e:
+                    await self._discard(session)
+                    raise FileUploadError(e.message)
+
+            storage = await self._get_storage()
+            part_number = offset // session["chunk_size"] + 1
+            etag = await storage.upload_part(
+                session["staging_key"], session["s3_upload_id"], part_number, chunk
+            )
+            await run_in_storage_executor(_update_hasher, upload_id, offset, chunk)
+
+            session["parts"] = [p for p in session["parts"] if p[0] != part_number] + [[part_number, etag]]
+            session["offset"] = offset + len(chunk)
+            await self._save(session)
+            return self._public(session)
+        finally:
+            await self._release_lock(upload_id, token)
+
+    async def complete(self, upload_id: str, user_id: str, db_session: AsyncSession) -> Dict[str, Any]:
+        """
+        完成上传：合并分片、校验SHA-256、转为正式对象并登记（BGM创建记录）
+
+        重复调用返回相同结果。
+
+        Returns:
+            {upload_id, purpose, object_key, size, sha256, deduplicated, file_name, file_type, bgm_id}
+        """
+        token = await self._acquire_lock(upload_id)
+        try:
+            session = await self._load(upload_id, user_id)
+            if session["mode"] != UploadMode.RESUMABLE.value:
+                raise ConflictError("直传会话请调用直传完成接口", code="UPLOAD_MODE_MISMATCH")
+            if session["status"] == UploadStatus.COMPLETED.value:
+                return session["result"]
+            if session["offset"] != session["size"]:
+                raise ConflictError(
+                    "上传尚未完成", code="UPLOAD_INCOMPLETE", details={"offset": session["offset"]}
+                )
+
+            storage = await self._get_storage()
+            staging_key = session["staging_key"]
+            if not session["assembled"]:
+                await storage.complete_multipart_upload(
+                    staging_key, session["s3_upload_id"], [tuple(p) for p in session["parts"]]
+                )
+                session["assembled"] = True
+                await self._save(session)
+
+            sha256 = await self._final_sha256(storage, session)
+            if session["declared_sha256"] and sha256 != session["declared_sha256"]:
+                await self._discard(session)
+                raise BusinessLogicError("文件SHA-256校验失败，请重新上传", code="UPLOAD_HASH_MISMATCH")
+
+            try:
+                result = await self._commit(storage, session, sha256, db_session)
+            except Exception:
+                # 暂存对象可能已被转移，会话无法继续，需重新上传（残留的暂存对象由GC回收）
+                await self.redis.delete(_SESSION_KEY.format(upload_id))
+                _forget_hasher(upload_id)
+                raise
+            session["status"] = UploadStatus.COMPLETED.value
+            session["result"] = result
+            await self._save(session, ttl=_COMPLETED_TTL)
+            _forget_hasher(upload_id)
+
+            logger.info(f"断点续传完成: {upload_id}, 对象={result['object_key']}, 去重={result['deduplicated']}")
+            return result
+        finally:
+            await self._release_lock(upload_id, token)
+
+    async def abort(self, upload_id: str, user_id: str) -> None:
+        """取消上传并释放已上传的分片"""
+        token = await self._acquire_lock(upload_id)
+        try:
+            session = await self._load(upload_id, user_id)
+            if session["status"] in (UploadStatus.VALIDATING.value, UploadStatus.COMPLETED.value):
+                raise ConflictError("上传已提交，无法取消", code="UPLOAD_COMPLETED")
+            await self._discard(session)
+        finally:
+            await self._release_lock(upload_id, token)
+
+    async def create_direct_session(
+        self,
+        user_id: str,
+        filename: str,
+        size: int,
+        purpose: UploadPurpose,
+        content_type: Optional[str] = None,
+        sha256: Optional[str] = None,
+        name: Optional[str] = None,
+        title: Optional[str] = None,
+        description: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        创建直传会话，返回预签名上传地址
+
+        不超过一个分片的文件使用单个预签名PUT，否则发起分片上传并为每个分片签名。
+
+        Args:
+            title / description: 项目文件校验通过后用于直接创建项目（缺省时只返回对象键）
+            其余参数同 create_session
+
+        Returns:
+            会话信息，附带 upload: {method, url, headers} 或 {method, part_size, parts: [{part_number, url}]}
+        """
+        purpose = UploadPurpose(purpose)
+        session = self._new_session(user_id, filename, size, purpose, UploadMode.DIRECT, content_type, sha256, name)
+        if purpose == UploadPurpose.PROJECT_FILE and title:
+            session["project"] = {"title": title, "description": description}
+
+        storage = await self._get_storage()
+        expires = timedelta(minutes=settings.UPLOAD_DIRECT_URL_EXPIRES_MINUTES)
+        chunk_size = session["chunk_size"]
+        if size <= chunk_size:
+            upload = {
+                "method": "PUT",
+                "url": storage.get_presigned_put_url(session["staging_key"], session["content_type"], expires),
+                "headers": {"Content-Type": session["content_type"]},
+            }
+        else:
+            session["s3_upload_id"] = await storage.create_multipart_upload(
+                session["staging_key"], session["content_type"], user_id, filename
+            )
+            part_count = (size + chunk_size - 1) // chunk_size
+            urls = storage.get_presigned_part_urls(
+                session["staging_key"], session["s3_upload_id"], part_count, expires
+            )
+            upload = {
+                "method": "multipart",
+                "part_size": chunk_size,
+                "parts": [{"part_number": n, "url": url} for n, url in enumerate(urls, start=1)],
+            }
+
+        await self._save(session)
+        logger.info(f"创建直传会话: {session['upload_id']}, 用户={user_id}, 文件={filename}, 大小={size}")
+        return {**self._public(session), "upload": upload}
+
+    async def complete_direct(
+        self,
+        upload_id: str,
+        user_id: str,
+        parts: Optional[List[Tuple[int, str]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        客户端直传完成：合并分片（分片直传时）并投递校验任务
+
+        Args:
+            parts: 分片直传时各分片的 (分片号, ETag)
+
+        Returns:
+            会话信息（状态为 validating，task_id 为校验任务ID）
+        """
+        token = await self._acquire_lock(upload_id)
+        try:
+            session = await self._load(upload_id, user_id)
+            if session["mode"] != UploadMode.DIRECT.value:
+                raise ConflictError("续传会话请调用续传完成接口", code="UPLOAD_MODE_MISMATCH")
+            if session["status"] != UploadStatus.UPLOADING.value:
+                return self._public(session)
+
+            storage = await self._get_storage()
+            if session["s3_upload_id"]:
+                expected = (session["size"] + session["chunk_size"] - 1) // session["chunk_size"]
+                if not parts or sorted(n for n, _ in parts) != list(range(1, expected + 1)):
+                    raise BusinessLogicError(f"需要提交全部 {expected} 个分片的ETag", code="UPLOAD_PARTS_MISSING")
+                await storage.complete_multipart_upload(session["staging_key"], session["s3_upload_id"], parts)
+            session["assembled"] = True
+            session["offset"] = session["size"]
+            session["status"] = UploadStatus.VALIDATING.value
+
+            # 先保存校验中状态再投递（任务ID预先生成），校验任务读到的一定是 validating
+            from src.tasks.task import validate_direct_upload
+            session["task_id"] = str(uuid.uuid4())
+            await self._save(session)
+            try:
+                validate_direct_upload.apply_async(args=(upload_id,), task_id=session["task_id"])
+            except Exception:
+                session["status"] = UploadStatus.UPLOADING.value
+                session.pop("task_id")
+                await self._save(session)
+                raise
+            logger.info(f"直传完成，已投递校验任务: {upload_id}, task={session['task_id']}")
+            return self._public(session)
+        finally:
+            await self._release_lock(upload_id, token)
+
+    async def validate_direct_upload(self, upload_id: str) -> Dict[str, Any]:
+        """
+        校验直传对象并完成登记（Celery 任务调用）
+
+        依次校验：对象大小、文件头（魔数/MIME与安全检查）、编码/容器格式（BGM用ffprobe解析）、SHA-256。
+        校验失败时删除暂存对象，会话标记为 failed 并记录原因。
+
+        Returns:
+            会话信息
+        """
+        raw = await self.redis.get(_SESSION_KEY.format(upload_id))
+        if not raw:
+            raise NotFoundError("上传会话不存在或已过期", resource_type="upload", resource_id=upload_id)
+        session = json.loads(raw)
+        if session["status"] != UploadStatus.VALIDATING.value:
+            return self._public(session)
+
+        storage = await self._get_storage()
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                local_path = str(Path(tmp_dir) / f"upload{Path(session['filename']).suffix.lower()}")
+                sha256 = await self._inspect_direct_object(storage, session, local_path)
+        except (FileUploadError, BusinessLogicError) as e:
+            logger.warning(f"直传文件校验失败: {upload_id}, {e.message}")
+            await storage.delete_file(session["staging_key"])
+            return await self._finish_validation(session, error=e.message)
+
+        from src.core.database import get_async_db
+        result = None
+        try:
+            async with get_async_db() as db:
+                result = await self._commit(storage, session, sha256, db)
+                if session.get("project"):
+                    result.update(await self._create_project(session, result, db))
+        except Exception as e:
+            logger.error(f"直传文件登记失败: {upload_id}, {e}")
+            if result:
+                await storage.release_files([result["object_key"]])
+            await self._finish_validation(session, error="文件登记失败，请重新上传")
+            raise
+
+        logger.info(f"直传文件校验通过: {upload_id}, 对象={result['object_key']}")
+        return await self._finish_validation(session, result=result)
+
+    async def _finish_validation(
+        self,
+        session: Dict[str, Any],
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        在会话锁内写入校验结果
+
+        只有会话仍处于本任务的校验中状态时才写入，不覆盖其他请求已写入的状态。
+        """
+        upload_id = session["upload_id"]
+        token = await self._acquire_lock(upload_id, wait=True)
+        try:
+            raw = await self.redis.get(_SESSION_KEY.format(upload_id))
+            current = json.loads(raw) if raw else None
+            if (
+                current is None
+                or current["status"] != UploadStatus.VALIDATING.value
+                or current.get("task_id") != session.get("task_id")
+            ):
+                logger.warning(f"直传会话状态已变化，丢弃校验结果: {upload_id}")
+                return self._public(current or session)
+            if error is not None:
+                return await self._fail(session, error)
+            session["status"] = UploadStatus.COMPLETED.value
+            session["result"] = result
+            await self._save(session, ttl=_COMPLETED_TTL)
+            return self._public(session)
+        finally:
+            await self._release_lock(upload_id, token)
+
+    async def _fail(self, session: Dict[str, Any], error: str) -> Dict[str, Any]:
+        """标记会话失败"""
+        session["status"] = UploadStatus.FAILED.value
+        session["error"] = error
+        await self._save(session, ttl=_COMPLETED_TTL)
+        return self._public(session)
+
+    async def _inspect_direct_object(self, storage: S3Storage, session: Dict[str, Any], local_path: str) -> str:
+        """下载直传对象到本地并校验，返回SHA-256"""
+        stat = await storage.stat_object(session["staging_key"])
+        if stat is None:
+            raise FileUploadError("未找到已上传的文件，请重新上传")
+        if stat["size"] != session["size"]:
+            raise FileUploadError(f"文件大小不符：声明 {session['size']} 字节，实际 {stat['size']} 字节")
+
+        await storage.download_to_path(session["staging_key"], local_path)
+
+        def _inspect() -> str:
+            hasher = hashlib.sha256()
+            with open(local_path, "rb") as f:
+                head = f.read(1024)
+                hasher.update(head)
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    hasher.update(block)
+            if session["purpose"] == UploadPurpose.PROJECT_FILE.value:
+                session["file_type"], _ = FileHandler.validate_file_head(
+                    session["filename"], session["file_type"], head
+                )
+                FileHandler.verify_file_format(local_path, session["file_type"])
+            elif session["purpose"] == UploadPurpose.BGM.value:
+                from src.services.bgm_service import BGMService
+                session["duration"] = BGMService.probe_audio_file(local_path, Path(local_path).suffix)
+            return hasher.hexdigest()
+
+        try:
+            sha256 = await run_in_storage_executor(_inspect)
+        except FileProcessingError as e:
+            raise FileUploadError(str(e))
+
+        if session["declared_sha256"] and sha256 != session["declared_sha256"]:
+            raise BusinessLogicError("文件SHA-256校验失败，请重新上传", code="UPLOAD_HASH_MISMATCH")
+        return sha256
+
+    async def _create_project(self, session: Dict[str, Any], result: Dict[str, Any], db_session) -> Dict[str, Any]:
+        """项目文件校验通过后创建项目并投递解析任务"""
+        from src.services.project import ProjectService
+        from src.tasks.task import process_uploaded_file
+
+        project = await ProjectService(db_session).create_project(
+            owner_id=session["user_id"],
+            title=session["project"]["title"],
+            description=session["project"].get("description"),
+            file_name=session["filename"],
+            file_size=session["size"],
+            file_type=session["file_type"],
+            file_path=result["object_key"],
+            file_hash=result["sha256"],
+        )
+        task = process_uploaded_file.delay(str(project.id), session["user_id"])
+        logger.info(f"直传项目 {project.id} 创建成功，已投递解析任务: {task.id}")
+        return {"project_id": str(project.id), "process_task_id": task.id}
+
+    async def expire_stale_uploads(self) -> int:
+        """中止会话已过期的未完成分片上传（会话状态本身由Redis过期删除）"""
+        storage = await self._get_storage()
+        older_than = datetime.now(timezone.utc) - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+        return await storage.abort_stale_multipart_uploads(STAGING_PREFIX, older_than)
+
+    # ------------------------------------------------------------------
+    # 内部
+    # ------------------------------------------------------------------
+
+    async def _discard(self, session: Dict[str, Any]) -> None:
+        """删除会话及其在存储中的数据"""
+        storage = await self._get_storage()
+        if session["s3_upload_id"] and not session["assembled"]:
+            await storage.abort_multipart_upload(session["staging_key"], session["s3_upload_id"])
+        else:
+            await storage.delete_file(session["staging_key"])
+        await self.redis.delete(_SESSION_KEY.format(session["upload_id"]))
+        _forget_hasher(session["upload_id"])
+        logger.info(f"上传会话已丢弃: {session['upload_id']}")
+
+    async def _final_sha256(self, storage: S3Storage, session: Dict[str, Any]) -> str:
+        """整体SHA-256：优先使用进程内增量结果，否则从存储重新读取计算"""
+        state = _hasher_state(session["upload_id"])
+        if state and state[0] == session["size"]:
+            return state[1].hexdigest()
+
+        hasher = hashlib.sha256()
+        async for chunk in storage.download_stream(session["staging_key"]):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+    async def _commit(
+        self,
+        storage: S3Storage,
+        session: Dict[str, Any],
+        sha256: str,
+        db_session: AsyncSession,
+    ) -> Dict[str, Any]:
+        """按用途转为正式对象并完成业务登记"""
+        user_id = session["user_id"]
+        extension = Path(session["filename"]).suffix.lower()
+        is_bgm = session["purpose"] == UploadPurpose.BGM.value
+        object_key = (
+            f"bgm/{user_id}/{uuid.uuid4()}{extension}"
+            if is_bgm else storage.generate_object_key(user_id, session["filename"])
+        )
+        committed = await storage.commit_staged_object(
+            session["staging_key"],
+            user_id=user_id,
+            size=session["size"],
+            sha256=sha256,
+            content_type=session["content_type"],
+            object_key=object_key,
+            kind=ObjectKind.BGM if is_bgm else ObjectKind.UPLOAD,
+            dedup=True,
+        )
+
+        result = {
+            "upload_id": session["upload_id"],
+            "purpose": session["purpose"],
+            "object_key": committed["object_key"],
+            "size": session["size"],
+            "sha256": sha256,
+            "deduplicated": committed["deduplicated"],
+            "file_name": session["filename"],
+            "file_type": session["file_type"],
+            "bgm_id": None,
+            "project_id": None,
+            "process_task_id": None,
+        }
+
+        if is_bgm:
+            from src.services.bgm_service import BGMService
+            try:
+                bgm = await BGMService(db_session).create_bgm_from_object(
+                    user_id=user_id,
+                    name=session["name"],
+                    file_name=session["filename"],
+                    file_size=session["size"],
+                    file_key=committed["object_key"],
+                    duration=session.get("duration"),
+                )
+            except Exception:
+                await storage.release_files([committed["object_key"]])
+                raise
+            result["bgm_id"] = str(bgm.id)
+
+        return result
+
+
+__all__ = ["ResumableUploadService", "UploadMode", "UploadPurpose", "UploadStatus", "STAGING_PREFIX"]
@@ -0,0 +1,255 @@
+"""
+存储垃圾回收服务（标记-清除）
+
+标记阶段：流式读取数据库中所有被引用的对象键
+（句子图片/音频/单句视频、章节视频、BGM、头像、项目文件）。
+清除阶段：逐页遍历存储桶，找出未被引用且早于宽限期的对象，
+删除前按批次再次核对数据库引用，然后用 DeleteObjects 批量删除（每次最多1000个）。
+blobs/ 下的共享内容另按 storage_blobs 的引用计数和更新时间在行锁下复核（见 S3Storage.reclaim_blobs）。
+
+一次回收可能持续数小时（含限速等待），不持有长期数据库会话：
+标记阶段每个查询、清除阶段每批复核各自使用短会话（get_async_db）。
+
+覆盖旧接口遗漏的场景：重新生成后被覆盖引用的旧图片/音频、已删除句子的单句视频缓存等。
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import select
+
+from src.core.config import settings
+from src.core.database import get_async_db
+from src.core.logging import get_logger
+from src.models.bgm import BGM
+from src.models.project import Project
+from src.models.sentence import Sentence
+from src.models.storage_blob import StorageBlob
+from src.models.user import User
+from src.models.video_task import VideoTask
+from src.utils.storage import S3Storage
+
+logger = get_logger(__name__)
+
+# 流式读取引用键时每次拉取的行数
+_MARK_YIELD_PER = 5000
+# 报告中保留的样例对象键数量
+_REPORT_SAMPLE_SIZE = 100
+
+
+def referenced_columns():
+    """所有保存对象键的列"""
+    return [
+        Sentence.image_url,
+        Sentence.audio_url,
+        Sentence.sentence_video_key,
+        VideoTask.video_key,
+        BGM.file_key,
+        Project.file_path,
+    ]
+
+
+class StorageGarbageCollector:
+    """存储垃圾回收器"""
+
+    def __init__(self, storage: S3Storage):
+        self.storage = storage
+
+    async def mark(self) -> Set[str]:
+        """
+        标记阶段：收集所有被引用的对象键
+
+        Returns:
+            被引用的对象键集合
+        """
+        referenced: Set[str] = set()
+        for column in referenced_columns():
+            query = select(column).where(column.isnot(None)).execution_options(yield_per=_MARK_YIELD_PER)
+            async with get_async_db() as db:
+                async for key in await db.stream_scalars(query):
+                    referenced.add(key)
+
+        # 头像保存的是完整URL，只有与当前存储桶相同时才需要保护
+        bucket_marker = f"/{self.storage.bucket_name}/"
+        query = select(User.avatar_url).where(User.avatar_url.isnot(None)).execution_options(
+            yield_per=_MARK_YIELD_PER
+        )
+        async with get_async_db() as db:
+            async for avatar_url in await db.stream_scalars(query):
+                if bucket_marker in avatar_url:
+                    referenced.add(avatar_url.split(bucket_marker, 1)[1])
+
+        logger.info(f"GC标记完成: {len(referenced)} 个被引用对象")
+        return referenced
+
+    async def _still_referenced(self, object_keys: List[str]) -> Set[str]:
+        """删除前再次核对：返回当前仍被数据库引用的键（覆盖标记之后新写入的引用）"""
+        still: Set[str] = set()
+        async with get_async_db() as db:
+            for column in referenced_columns():
+                result = await db.execute(select(column).where(column.in_(object_keys)))
+                still.update(row[0] for row in result)
+        return still
+
+    async def sweep(
+        self,
+        referenced: Set[str],
+        prefixes: Optional[Iterable[str]] = None,
+        grace_hours: Optional[int] = None,
+        dry_run: bool = True,
+        max_deletes_per_second: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        清除阶段：分页遍历存储桶并批量删除未被引用的对象
+
+        Args:
+            referenced: 标记阶段得到的被引用键
+            prefixes: 参与回收的前缀（默认 STORAGE_GC_PREFIXES）
+            grace_hours: 宽限期（小时），更新时间晚于 now - 宽限期 的对象不会被删除
+            dry_run: 试运行，只统计不删除
+            max_deletes_per_second: 删除速率上限
+
+        Returns:
+            回收报告
+        """
+        prefixes = list(prefixes or settings.STORAGE_GC_PREFIXES)
+        grace_hours = settings.STORAGE_GC_GRACE_HOURS if grace_hours is None else grace_hours
+        rate = max_deletes_per_second or settings.STORAGE_GC_MAX_DELETES_PER_SECOND
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=grace_hours)
+
+        report: Dict[str, Any] = {
+            "dry_run": dry_run,
+            "grace_hours": grace_hours,
+            "referenced": len(referenced),
+            "scanned": 0,
+            "candidates": 0,
+            "candidate_bytes": 0,
+            "deleted": 0,
+            "deleted_bytes": 0,
+            "failed": 0,
+            "skipped_recent": 0,
+            "rescued": 0,
+            "by_prefix": {},
+            "sample": [],
+        }
+
+        batch: List[Dict[str, Any]] = []
+
+        async def _flush(prefix_stats: Dict[str, int]) -> None:
+            if not batch:
+                return
+            keys = [item["object_key"] for item in batch]
+            rescued = await self._still_referenced(keys)
+            doomed = [item for item in batch if item["object_key"] not in rescued]
+            report["rescued"] += len(batch) - len(doomed)
+            batch.clear()
+            if not doomed:
+                return
+
+            started = time.monotonic()
+            blob_keys = [item["object_key"] for item in doomed if StorageBlob.is_blob_key(item["object_key"])]
+            plain_keys = [item["object_key"] for item in doomed if not StorageBlob.is_blob_key(item["object_key"])]
+            result = await self.storage.delete_files(plain_keys) if plain_keys else {"deleted": [], "failed": []}
+            if blob_keys:
+                # 共享内容的引用由 storage_blobs 计数，需在与 acquire 相同的行锁下复核后再删除
+                reclaimed = await self.storage.reclaim_blobs(blob_keys, cutoff)
+                result["deleted"] = result["deleted"] + reclaimed["deleted"]
+                result["failed"] = result["failed"] + reclaimed["failed"]
+                report["rescued"] += len(reclaimed["kept"])
+            deleted = set(result["deleted"])
+            deleted_bytes = sum(item["size"] for item in doomed if item["object_key"] in deleted)
+            report["deleted"] += len(deleted)
+            report["deleted_bytes"] += deleted_bytes
+            report["failed"] += len(result["failed"])
+            prefix_stats["deleted"] += len(deleted)
+
+            # 限速：本批次至少占用 len/rate 秒
+            min_duration = len(doomed) / rate
+            elapsed = time.monotonic() - started
+            if elapsed < min_duration:
+                await asyncio.sleep(min_duration - elapsed)
+
+        for prefix in prefixes:
+            prefix_stats = {"scanned": 0, "candidates": 0, "deleted": 0}
+            report["by_prefix"][prefix] = prefix_stats
+
+            async for file_info in self.storage.iter_files(prefix):
+                report["scanned"] += 1
+                prefix_stats["scanned"] += 1
+                object_key = file_info["object_key"]
+                if object_key in referenced:
+                    continue
+
+                last_modified = file_info.get("last_modified")
+                if last_modified and datetime.fromisoformat(last_modified) >= cutoff:
+                    report["skipped_recent"] += 1
+                    continue
+
+                report["candidates"] += 1
+                report["candidate_bytes"] += file_info.get("size", 0)
+                prefix_stats["candidates"] += 1
+                if len(report["sample"]) < _REPORT_SAMPLE_SIZE:
+                    report["sample"].append(object_key)
+
+                if not dry_run:
+                    batch.append({"object_key": object_key, "size": file_info.get("size", 0)})
+                    if len(batch) >= 1000:
+                        await _flush(prefix_stats)
+
+            await _flush(prefix_stats)
+
+        return report
+
+    async def run(
+        self,
+        dry_run: bool = True,
+        prefixes: Optional[Iterable[str]] = None,
+        grace_hours: Optional[int] = None,
+        max_deletes_per_second: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        执行一次完整的标记-清除
+
+        Returns:
+            回收报告（含耗时）
+        """
+        started = time.monotonic()
+        referenced = await self.mark()
+        report = await self.sweep(
+            referenced,
+            prefixes=prefixes,
+            grace_hours=grace_hours,
+            dry_run=dry_run,
+            max_deletes_per_second=max_deletes_per_second,
+        )
+        report["bucket"] = self.storage.bucket_name
+        report["duration_seconds"] = round(time.monotonic() - started, 2)
+        logger.info(
+            f"存储GC完成: dry_run={dry_run}, 扫描 {report['scanned']}, 候选 {report['candidates']}, "
+            f"删除 {report['deleted']} ({report['deleted_bytes']} bytes), 失败 {report['failed']}, "
+            f"耗时 {report['duration_seconds']}s"
+        )
+        return report
+
+
+async def run_storage_gc(
+    dry_run: bool = True,
+    prefixes: Optional[List[str]] = None,
+    grace_hours: Optional[int] = None,
+    max_deletes_per_second: Optional[int] = None,
+) -> Dict[str, Any]:
+    """使用全局存储客户端执行一次GC（供 Celery 任务调用；数据库查询各自使用短会话）"""
+    from src.utils.storage import get_storage_client
+
+    storage = await get_storage_client()
+    return await StorageGarbageCollector(storage).run(
+        dry_run=dry_run,
+        prefixes=prefixes,
+        grace_hours=grace_hours,
+        max_deletes_per_second=max_deletes_per_second,
+    )
+
+
+__all__ = ["StorageGarbageCollector", "referenced_columns", "run_storage_gc"]
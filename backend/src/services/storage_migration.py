@@ -0,0 +1,394 @@
+"""
+存储源迁移服务
+
+在两个存储源之间复制对象（对象键保持不变，数据库中保存的 image_url / audio_url /
+video_key / file_path 等键在切换后依然有效）：
+
+- 同一服务和账号下使用服务端复制，否则流式复制
+- 复制后校验目标对象的大小和ETag（分片上传产生的ETag不可比较时只校验大小）
+- 目标已存在且一致的对象直接跳过，重复执行即为增量同步
+- 每批处理完毕后把断点（前缀序号 + 最后处理的对象键）写入 storage_migrations，中断后从断点继续
+
+零停机切换流程：
+1. 源存储源保持启用，创建迁移并完成首轮复制
+2. 启用目标存储源：迁移的 dual_read 为真时，读取目标未命中的对象会回退到源存储源
+3. 重新执行迁移（增量同步），复制首轮之后写入源存储源的对象
+4. 调用 finalize 关闭回退，过渡结束
+"""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.exceptions import BusinessLogicError, ConflictError, NotFoundError
+from src.core.logging import get_logger
+from src.models.storage_blob import StorageBlob
+from src.models.storage_migration import StorageMigration, StorageMigrationStatus
+from src.models.storage_source import StorageSource
+from src.services.base import BaseService
+from src.services.storage_gc import referenced_columns
+from src.utils.storage import S3Storage, StorageConfig
+
+logger = get_logger(__name__)
+
+# 复制 storage_blobs 记录时每批行数
+_BLOB_COPY_BATCH_SIZE = 1000
+
+
+def objects_match(source_info: Dict[str, Any], target_info: Optional[Dict[str, Any]]) -> bool:
+    """
+    目标对象是否与源对象一致
+
+    大小必须相同；两边ETag都是单次上传的MD5时还必须相同
+    （分片上传的ETag形如 "<md5>-<分片数>"，与分片大小有关，跨存储不可比较）。
+    """
+    if target_info is None or target_info["size"] != source_info["size"]:
+        return False
+    source_etag, target_etag = source_info.get("etag") or "", target_info.get("etag") or ""
+    if not source_etag or not target_etag or "-" in source_etag or "-" in target_etag:
+        return True
+    return source_etag == target_etag
+
+
+def _report(migration: StorageMigration) -> Dict[str, Any]:
+    """迁移记录转为可序列化的任务结果"""
+    return {key: str(value) if isinstance(value, UUID) else value for key, value in migration.to_dict().items()}
+
+
+class StorageMigrationService(BaseService):
+    """存储源迁移服务"""
+
+    def __init__(self, db_session: Optional[AsyncSession] = None):
+        super().__init__(db_session)
+
+    async def _get_source(self, source_id) -> StorageSource:
+        source = await self.get(StorageSource, source_id)
+        if not source:
+            raise NotFoundError("存储源不存在", resource_type="storage_source", resource_id=str(source_id))
+        return source
+
+    async def get_migration(self, migration_id) -> StorageMigration:
+        """获取迁移记录"""
+        migration = await self.get(StorageMigration, migration_id)
+        if not migration:
+            raise NotFoundError("迁移任务不存在", resource_type="storage_migration", resource_id=str(migration_id))
+        return migration
+
+    async def list_migrations(self) -> List[StorageMigration]:
+        """获取全部迁移记录（按创建时间倒序）"""
+        result = await self.execute(select(StorageMigration).order_by(StorageMigration.created_at.desc()))
+        return list(result.scalars().all())
+
+    async def create_migration(
+        self,
+        source_id: UUID,
+        target_id: UUID,
+        prefixes: Optional[List[str]] = None,
+        dual_read: bool = True,
+    ) -> StorageMigration:
+        """
+        创建迁移
+
+        Args:
+            source_id: 源存储源
+            target_id: 目标存储源
+            prefixes: 迁移的前缀（默认整个存储桶）
+            dual_read: 启用目标存储源后，读取未命中时回退到源存储源
+
+        Raises:
+            BusinessLogicError: 源与目标相同
+            ConflictError: 目标存储源已有进行中的迁移
+        """
+        if source_id == target_id:
+            raise BusinessLogicError("源存储源与目标存储源不能相同", code="STORAGE_MIGRATION_SAME_SOURCE")
+        await self._get_source(source_id)
+        await self._get_source(target_id)
+
+        result = await self.execute(
+            select(StorageMigration.id).where(
+                StorageMigration.target_id == target_id,
+                StorageMigration.status.in_([StorageMigrationStatus.PENDING, StorageMigrationStatus.RUNNING]),
+            )
+        )
+        if result.first():
+            raise ConflictError("目标存储源已有进行中的迁移", code="STORAGE_MIGRATION_IN_PROGRESS")
+
+        migration = StorageMigration(
+            source_id=source_id,
+            target_id=target_id,
+            prefixes=json.dumps(list(dict.fromkeys(prefixes or [""]))),
+            dual_read=dual_read,
+            status=StorageMigrationStatus.PENDING,
+        )
+        await self.add(migration)
+        await self.commit()
+        await self.refresh(migration)
+        logger.info(f"创建存储迁移: {migration.id}, {source_id} -> {target_id}, 前缀={migration.prefix_list}")
+        return migration
+
+    async def enqueue(self, migration: StorageMigration) -> StorageMigration:
+        """
+        投递迁移任务
+
+        失败或已取消的迁移从断点继续；已完成的迁移清空断点重新执行一轮（增量同步，一致的对象会被跳过）。
+        """
+        if migration.status == StorageMigrationStatus.RUNNING:
+            raise ConflictError("迁移正在执行", code="STORAGE_MIGRATION_RUNNING")
+        if migration.status == StorageMigrationStatus.COMPLETED:
+            migration.prefix_index = 0
+            migration.last_key = None
+            migration.copied = migration.copied_bytes = migration.skipped = migration.failed = 0
+        migration.status = StorageMigrationStatus.PENDING
+        migration.last_error = None
+        migration.finished_at = None
+        await self.commit()
+
+        from src.tasks.task import migrate_storage
+        task = migrate_storage.delay(str(migration.id))
+        migration.task_id = task.id
+        await self.commit()
+        await self.refresh(migration)
+        logger.info(f"已投递存储迁移任务: {migration.id}, task={task.id}")
+        return migration
+
+    async def cancel(self, migration_id) -> StorageMigration:
+        """取消迁移（执行中的任务在当前批次结束后停止，断点保留）"""
+        migration = await self.get_migration(migration_id)
+        if migration.is_finished:
+            raise BusinessLogicError("迁移已结束", code="STORAGE_MIGRATION_FINISHED")
+        migration.status = StorageMigrationStatus.CANCELLED
+        migration.finished_at = datetime.now(timezone.utc)
+        await self.commit()
+        await self.refresh(migration)
+        return migration
+
+    async def finalize(self, migration_id, storage: S3Storage) -> StorageMigration:
+        """结束过渡期：关闭读取回退"""
+        migration = await self.get_migration(migration_id)
+        migration.dual_read = False
+        await self.commit()
+        await self.refresh(migration)
+
+        target = await self._get_source(migration.target_id)
+        if target.is_active:
+            await apply_dual_read(self.db_session, storage, target.id)
+        return migration
+
+    async def run(self, migration_id) -> Dict[str, Any]:
+        """
+        执行迁移（Celery 任务调用）
+
+        Returns:
+            迁移记录
+        """
+        migration = await self.get_migration(migration_id)
+        if migration.status != StorageMigrationStatus.PENDING:
+            logger.info(f"存储迁移 {migration_id} 状态为 {migration.status}，跳过执行")
+            return _report(migration)
+
+        source_row = await self._get_source(migration.source_id)
+        target_row = await self._get_source(migration.target_id)
+        source = S3Storage(StorageConfig.from_source(source_row))
+        target = S3Storage(StorageConfig.from_source(target_row))
+
+        migration.status = StorageMigrationStatus.RUNNING
+        migration.started_at = migration.started_at or datetime.now(timezone.utc)
+        await self.commit()
+        logger.info(f"存储迁移开始: {migration.id}, {source_row.name} -> {target_row.name}")
+
+        try:
+            await target.ensure_bucket_exists()
+            prefixes = migration.prefix_list
+            for index in range(migration.prefix_index, len(prefixes)):
+                start_after = migration.last_key if index == migration.prefix_index else None
+                if not await self._migrate_prefix(migration, source, target, prefixes[index], start_after):
+                    logger.info(f"存储迁移已取消: {migration.id}")
+                    return _report(migration)
+                migration.prefix_index = index + 1
+                migration.last_key = None
+                await self.commit()
+
+            if source.bucket_name != target.bucket_name:
+                await self._copy_blob_records(source.bucket_name, target.bucket_name)
+        except Exception as e:
+            logger.error(f"存储迁移失败: {migration.id}, {e}")
+            await self.rollback()
+            migration.status = StorageMigrationStatus.FAILED
+            migration.last_error = str(e)
+            migration.finished_at = datetime.now(timezone.utc)
+            await self.commit()
+            raise
+
+        migration.status = StorageMigrationStatus.COMPLETED
+        migration.finished_at = datetime.now(timezone.utc)
+        await self.commit()
+        logger.info(
+            f"存储迁移完成: {migration.id}, 复制 {migration.copied} ({migration.copied_bytes} bytes), "
+            f"跳过 {migration.skipped}, 失败 {migration.failed}"
+        )
+        return _report(migration)
+
+    async def _migrate_prefix(
+        self,
+        migration: StorageMigration,
+        source: S3Storage,
+        target: S3Storage,
+        prefix: str,
+        start_after: Optional[str],
+    ) -> bool:
+        """迁移一个前缀下的对象，被取消时返回False"""
+        batch: List[Dict[str, Any]] = []
+        async for file_info in source.iter_files(prefix, start_after=start_after):
+            batch.append(file_info)
+            if len(batch) >= settings.STORAGE_MIGRATION_BATCH_SIZE:
+                if not await self._process_batch(migration, source, target, batch):
+                    return False
+                batch = []
+        if batch:
+            return await self._process_batch(migration, source, target, batch)
+        return True
+
+    async def _process_batch(
+        self,
+        migration: StorageMigration,
+        source: S3Storage,
+        target: S3Storage,
+        batch: List[Dict[str, Any]],
+    ) -> bool:
+        """并发迁移一批对象并写入断点，被取消时返回False"""
+        semaphore = asyncio.Semaphore(settings.STORAGE_MIGRATION_CONCURRENCY)
+
+        async def _bounded(file_info: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+            async with semaphore:
+                return await self._migrate_object(source, target, file_info)
+
+        outcomes = await asyncio.gather(*(_bounded(file_info) for file_info in batch))
+        for file_info, (outcome, error) in zip(batch, outcomes):
+            if outcome == "copied":
+                migration.copied += 1
+                migration.copied_bytes += file_info["size"]
+            elif outcome == "skipped":
+                migration.skipped += 1
+            else:
+                migration.failed += 1
+                migration.last_error = f"{file_info['object_key']}: {error}"
+
+        # 批内对象全部处理完毕后才推进断点，断点之前的对象不会遗漏
+        migration.last_key = batch[-1]["object_key"]
+        await self.commit()
+
+        await self.db_session.refresh(migration, ["status"])
+        return migration.status != StorageMigrationStatus.CANCELLED
+
+    async def _migrate_object(
+        self,
+        source: S3Storage,
+        target: S3Storage,
+        file_info: Dict[str, Any],
+    ) -> Tuple[str, Optional[str]]:
+        """
+        迁移单个对象
+
+        Returns:
+            (copied / skipped / failed, 错误信息)
+        """
+        object_key = file_info["object_key"]
+        try:
+            if objects_match(file_info, await target.stat_object(object_key)):
+                return "skipped", None
+            await target.copy_from(source, object_key)
+            if not objects_match(file_info, await target.stat_object(object_key)):
+                return "failed", "复制后大小或ETag与源对象不一致"
+            return "copied", None
+        except Exception as e:
+            logger.warning(f"迁移对象失败: {object_key}, {e}")
+            return "failed", str(e)
+
+    async def _copy_blob_records(self, source_bucket: str, target_bucket: str) -> None:
+        """
+        复制内容寻址对象记录到目标存储桶
+
+        storage_blobs 按存储桶区分，存储桶名称不同时需要为目标桶建立同样的记录，
+        否则切换后去重和引用计数无法找到已迁移的对象。
+        复制后按数据库中的实际引用重新计算目标桶的引用计数：重复执行（增量同步）时目标桶已有的记录
+        可能是上一轮复制的旧计数，切换后目标桶上也可能已有新的引用，沿用任一方的计数都可能偏低，
+        导致仍被引用的内容被回收。
+        """
+
+        copied = 0
+        query = (
+            select(StorageBlob)
+            .where(StorageBlob.bucket == source_bucket)
+            .execution_options(yield_per=_BLOB_COPY_BATCH_SIZE)
+        )
+        rows: List[Dict[str, Any]] = []
+        async for blob in await self.db_session.stream_scalars(query):
+            rows.append({
+                "bucket": target_bucket,
+                "sha256": blob.sha256,
+                "object_key": blob.object_key,
+                "size": blob.size,
+                "content_type": blob.content_type,
+                "ref_count": blob.ref_count,
+            })
+            if len(rows) >= _BLOB_COPY_BATCH_SIZE:
+                copied += await self._insert_blob_records(rows)
+                rows = []
+        if rows:
+            copied += await self._insert_blob_records(rows)
+        await StorageBlob.recount(self.db_session, target_bucket, referenced_columns())
+        await self.commit()
+        logger.info(f"已复制内容寻址对象记录: {source_bucket} -> {target_bucket}, {copied} 条")
+
+    async def _insert_blob_records(self, rows: List[Dict[str, Any]]) -> int:
+        stmt = insert(StorageBlob).values(rows).on_conflict_do_nothing()
+        result = await self.execute(stmt)
+        return result.rowcount or 0
+
+
+async def apply_dual_read(db_session: AsyncSession, storage: S3Storage, active_source_id) -> None:
+    """
+    按迁移记录为当前存储配置读取回退
+
+    当前启用的存储源是某个 dual_read 迁移的目标时，回退到该迁移的源存储源；否则关闭回退。
+    回退存储的配置未变化时保留现有的回退客户端。
+    """
+    result = await db_session.execute(
+        select(StorageSource)
+        .join(StorageMigration, StorageMigration.source_id == StorageSource.id)
+        .where(
+            StorageMigration.target_id == active_source_id,
+            StorageMigration.dual_read.is_(True),
+            StorageMigration.status != StorageMigrationStatus.CANCELLED,
+        )
+        .order_by(StorageMigration.created_at.desc())
+        .limit(1)
+    )
+    fallback_source = result.scalar_one_or_none()
+    if fallback_source is None:
+        if storage.fallback is not None:
+            storage.set_fallback(None)
+        return
+
+    fallback_config = StorageConfig.from_source(fallback_source)
+    if storage.fallback is not None and storage.fallback.config == fallback_config:
+        return
+    storage.set_fallback(S3Storage(fallback_config))
+
+
+async def run_storage_migration(migration_id: str) -> Dict[str, Any]:
+    """使用独立数据库会话执行一次迁移（供 Celery 任务调用）"""
+    from src.core.database import get_async_db
+
+    async with get_async_db() as db:
+        return await StorageMigrationService(db).run(migration_id)
+
+
+__all__ = ["StorageMigrationService", "apply_dual_read", "objects_match", "run_storage_migration"]
@@ -3,14 +3,16 @@
 
 负责:
 - 使用Whisper生成字幕时间轴
-- 使用LLM纠正字幕中的错别字
+- 基于原文的本地字符对齐纠错（无需调用LLM）
+- 使用LLM纠正字幕中的错别字（仅在本地对齐置信度不足时）
 - 创建FFmpeg字幕滤镜
 - 文本分割和格式化
 """
 
 import re
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+from src.core.config import settings
 from src.core.logging import get_logger
 from src.models import APIKey
 from src.services.faster_whisper_service import transcription_service
@@ -19,6 +21,64 @@ from src.utils.ffmpeg_utils import get_audio_duration
 
 logger = get_logger(__name__)
 
+# 本地对齐时忽略的字符（空白和标点），只对齐实际发音的字符
+_ALIGN_SKIP_PATTERN = re.compile(r'[\s，。！？；：、,\.!?;:\'"“”‘’()（）\[\]{}<>《》【】…—\-]')
+
+
+def _is_alignable(ch: str) -> bool:
+    """判断字符是否参与对齐"""
+    return not _ALIGN_SKIP_PATTERN.match(ch)
+
+
+def align_characters(recognized: List[str], original: List[str]) -> List[Tuple[str, int, int]]:
+    """
+    基于编辑距离的字符级对齐
+
+    Args:
+        recognized: 识别出的字符序列
+        original: 原文字符序列
+
+    Returns:
+        对齐操作列表 (op, i, j)，op 取值:
+        - "match": recognized[i] == original[j]
+        - "sub": recognized[i] 应替换为 original[j]
+        - "del": recognized[i] 在原文中不存在（j 为 -1）
+        - "ins": original[j] 在识别结果中缺失（i 为 -1）
+    """
+    n, m = len(recognized), len(original)
+    # dp[i][j]: recognized[:i] 与 original[:j] 的编辑距离
+    dp = [[0] * (m + 1) for _ in range(n + 1)]
+    for i in range(1, n + 1):
+        dp[i][0] = i
+    for j in range(1, m + 1):
+        dp[0][j] = j
+    for i in range(1, n + 1):
+        rec_ch = recognized[i - 1]
+        row, prev_row = dp[i], dp[i - 1]
+        for j in range(1, m + 1):
+            cost = 0 if rec_ch == original[j - 1] else 1
+            row[j] = min(prev_row[j - 1] + cost, prev_row[j] + 1, row[j - 1] + 1)
+
+    # 回溯，优先对角线（匹配/替换）以保留时间轴
+    ops = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            cost = 0 if recognized[i - 1] == original[j - 1] else 1
+            if dp[i][j] == dp[i - 1][j - 1] + cost:
+                ops.append(("match" if cost == 0 else "sub", i - 1, j - 1))
+                i, j = i - 1, j - 1
+                continue
+        if i > 0 and dp[i][j] == dp[i - 1][j] + 1:
+            ops.append(("del", i - 1, -1))
+            i -= 1
+        else:
+            ops.append(("ins", -1, j - 1))
+            j -= 1
+
+    ops.reverse()
+    return ops
+
 
 class SubtitleService:
     """字幕服务 - 处理所有字幕相关操作"""
@@ -52,6 +112,94 @@ class SubtitleService:
             logger.error(f"生成字幕时间轴失败: {e}")
             raise
 
+    def correct_subtitle_locally(
+            self,
+            subtitle_data: dict,
+            original_text: str,
+            min_confidence: Optional[float] = None
+    ) -> Tuple[dict, float]:
+        """
+        基于原文的本地字幕纠错（不调用LLM）
+
+        将识别结果的字符流与原文做编辑距离对齐，在原位置替换为原文字符，
+        每个词的时间信息保持不变。原文中缺失的字符并入前一个词，多余的字符被移除。
+
+        Args:
+            subtitle_data: Whisper生成的字幕数据（包含segments）
+            original_text: 原始句子文本
+            min_confidence: 应用纠正所需的最低置信度，低于该值时字幕保持不变
+
+        Returns:
+            (字幕数据, 对齐置信度)，置信度为匹配字符数占较长序列的比例
+        """
+        if min_confidence is None:
+            min_confidence = settings.SUBTITLE_LOCAL_CORRECTION_THRESHOLD
+
+        segments = subtitle_data.get("segments", [])
+
+        # 收集对齐单元：有词级时间轴时按词，否则按整个segment
+        units = []
+        for seg in segments:
+            if seg.get("words"):
+                units.extend((w, "word") for w in seg["words"])
+            else:
+                units.append((seg, "text"))
+
+        unit_chars = [list(unit.get(field, "") or "") for unit, field in units]
+        positions = [
+            (ui, ci)
+            for ui, chars in enumerate(unit_chars)
+            for ci, ch in enumerate(chars)
+            if _is_alignable(ch)
+        ]
+        recognized = [unit_chars[ui][ci] for ui, ci in positions]
+        original = [ch for ch in original_text or "" if _is_alignable(ch)]
+
+        if not recognized or not original:
+            return subtitle_data, 0.0
+
+        ops = align_characters(recognized, original)
+        matches = sum(1 for op, _, _ in ops if op == "match")
+        confidence = matches / max(len(recognized), len(original))
+
+        if confidence < min_confidence:
+            logger.debug(f"[本地纠错] 对齐置信度 {confidence:.2f} 低于阈值 {min_confidence:.2f}，不应用")
+            return subtitle_data, confidence
+
+        # 应用对齐结果
+        leading = ""
+        last_pos = None
+        for op, i, j in ops:
+            if op == "ins":
+                if last_pos is None:
+                    leading += original[j]
+                else:
+                    ui, ci = last_pos
+                    unit_chars[ui][ci] += original[j]
+                continue
+            ui, ci = positions[i]
+            if op == "sub":
+                unit_chars[ui][ci] = original[j]
+            elif op == "del":
+                unit_chars[ui][ci] = ""
+            last_pos = (ui, ci)
+
+        if leading:
+            ui, ci = positions[0]
+            unit_chars[ui][ci] = leading + unit_chars[ui][ci]
+
+        for (unit, field), chars in zip(units, unit_chars):
+            unit[field] = "".join(chars)
+
+        # 有词级时间轴的segment，文本由词重新拼接
+        for seg in segments:
+            if seg.get("words"):
+                seg["text"] = "".join(w.get("word", "") for w in seg["words"]).strip()
+
+        edits = len(ops) - matches
+        logger.info(f"[本地纠错] 对齐置信度 {confidence:.2f}，修正 {edits} 处")
+        return subtitle_data, confidence
+
     async def correct_subtitle_with_llm(
             self,
             subtitle_data: dict,
@@ -62,6 +210,8 @@ class SubtitleService:
         """
         使用LLM纠正字幕中的错别字
 
+        先尝试本地对齐纠错，只有当对齐置信度低于阈值时才调用LLM。
+
         Args:
             subtitle_data: Whisper生成的字幕数据（包含segments）
             original_text: 原始句子文本
@@ -86,6 +236,12 @@ class SubtitleService:
                 logger.warning("识别文本为空，跳过LLM纠错")
                 return subtitle_data
 
+            # 本地对齐纠错，置信度足够时无需调用LLM
+            subtitle_data, confidence = self.correct_subtitle_locally(subtitle_data, original_text)
+            if confidence >= settings.SUBTITLE_LOCAL_CORRECTION_THRESHOLD:
+                logger.info(f"[LLM纠错] 本地对齐置信度 {confidence:.2f}，跳过LLM调用")
+                return subtitle_data
+
             # 创建LLM provider
             llm_provider = ProviderFactory.create(
                 provider=api_key.provider,
@@ -635,5 +791,6 @@ subtitle_service = SubtitleService()
 
 __all__ = [
     "SubtitleService",
+    "align_characters",
     "subtitle_service",
 ]
@@ -0,0 +1,294 @@
+"""
+任务执行记录服务
+
+Worker 的任务信号（开始 / 结束 / 失败 / 重试）调用 record_task_run 写入 task_runs 表；
+首次写入时按任务参数解析所属用户、项目和章节，之后只更新状态字段。
+批量状态接口按任务ID、项目或章节一次查询，进行中的任务再用一次 MGET 叠加 Redis 中的最新进度。
+超过保留期（TASK_RUN_RETENTION_DAYS）未更新的记录由周期任务 purge_task_runs 分批删除。
+"""
+
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.core.logging import get_logger
+from src.core.progress import get_last_progress_many
+from src.models import Chapter, Paragraph, Project, Sentence, VideoTask
+from src.models.chapter_pipeline import ChapterPipeline
+from src.models.generation_batch import GenerationBatch, GenerationItem
+from src.models.task_run import TASK_RUN_TERMINAL_STATES, TaskRun
+from src.services.base import BaseService
+
+logger = get_logger(__name__)
+
+# 保存的任务结果最大长度（超过时不保存，结果仍可通过 /tasks/{task_id} 查询）
+_MAX_RESULT_LENGTH = 4000
+# 错误信息最大长度
+_MAX_ERROR_LENGTH = 2000
+# 过期记录每批删除的行数（每批单独提交，避免长事务）
+_PURGE_BATCH_SIZE = 5000
+
+
+def serialize_result(result: Any) -> Optional[str]:
+    """只保存可序列化的字典类小结果（统计信息）"""
+    if not isinstance(result, dict):
+        return None
+    try:
+        payload = json.dumps(result, ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return None
+    return payload if len(payload) <= _MAX_RESULT_LENGTH else None
+
+
+def format_task_error(error: Any) -> Optional[str]:
+    """错误信息（异常类型 + 消息，截断）"""
+    if error is None:
+        return None
+    text = f"{type(error).__name__}: {error}" if isinstance(error, BaseException) else str(error)
+    return text[:_MAX_ERROR_LENGTH]
+
+
+class TaskRunService(BaseService):
+    """任务执行记录服务"""
+
+    def __init__(self, db_session: Optional[AsyncSession] = None):
+        super().__init__(db_session)
+
+    async def resolve_scope(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        按任务参数解析所属用户、项目和章节
+
+        Args:
+            arguments: 任务参数（参数名 → 值）
+
+        Returns:
+            {user_id, project_id, chapter_id}（无法解析的为None）
+        """
+        scope = {
+            "user_id": arguments.get("owner_id"),
+            "project_id": arguments.get("project_id"),
+            "chapter_id": arguments.get("chapter_id"),
+        }
+        sentence_id = None
+
+        if arguments.get("video_task_id"):
+            owner = await self.get(VideoTask, arguments["video_task_id"])
+            if owner is not None:
+                scope.update(user_id=owner.user_id, project_id=owner.project_id, chapter_id=owner.chapter_id)
+        elif arguments.get("pipeline_id"):
+            owner = await self.get(ChapterPipeline, arguments["pipeline_id"])
+            if owner is not None:
+                scope.update(user_id=owner.user_id, project_id=owner.project_id, chapter_id=owner.chapter_id)
+        elif arguments.get("batch_id"):
+            batch = await self.get(GenerationBatch, arguments["batch_id"])
+            if batch is not None:
+                scope["user_id"] = batch.user_id
+                result = await self.execute(
+                    select(GenerationItem.sentence_id).where(GenerationItem.batch_id == batch.id).limit(1)
+                )
+                sentence_id = result.scalar()
+        else:
+            sentence_ids = arguments.get("sentences_ids") or arguments.get("sentence_ids")
+            if sentence_ids:
+                sentence_id = sentence_ids[0]
+
+        if sentence_id is not None:
+            result = await self.execute(
+                select(Paragraph.chapter_id)
+                .join(Sentence, Sentence.paragraph_id == Paragraph.id)
+                .where(Sentence.id == sentence_id)
+            )
+            scope["chapter_id"] = result.scalar()
+
+        if scope["chapter_id"] and not scope["project_id"]:
+            result = await self.execute(select(Chapter.project_id).where(Chapter.id == scope["chapter_id"]))
+            scope["project_id"] = result.scalar()
+        if scope["project_id"] and not scope["user_id"]:
+            result = await self.execute(select(Project.owner_id).where(Project.id == scope["project_id"]))
+            scope["user_id"] = result.scalar()
+        return scope
+
+    async def task_owner(self, task_id: str) -> Optional[str]:
+        """
+        任务所属用户（WebSocket 订阅鉴权用）
+
+        可订阅的任务ID依次按视频任务、章节流水线、生成批次和任务执行记录查找。
+
+        Returns:
+            用户ID；任务不存在或无法确定归属时返回None
+        """
+        try:
+            ident = uuid.UUID(str(task_id))
+        except ValueError:
+            return None
+        for model in (VideoTask, ChapterPipeline, GenerationBatch, TaskRun):
+            result = await self.execute(select(model.user_id).where(model.id == ident))
+            owner = result.scalar()
+            if owner is not None:
+                return str(owner)
+        return None
+
+    async def record(
+        self,
+        task_id: str,
+        task_name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        **fields: Any,
+    ) -> TaskRun:
+        """写入任务记录：首次写入时解析归属，之后只更新 fields"""
+        run = await self.get(TaskRun, task_id)
+        if run is None:
+            scope = await self.resolve_scope(arguments or {})
+            run = TaskRun(id=task_id, task_name=task_name, **scope)
+            await self.add(run)
+        for key, value in fields.items():
+            setattr(run, key, value)
+        await self.commit()
+        return run
+
+    async def purge(self, older_than: datetime, batch_size: int = _PURGE_BATCH_SIZE) -> int:
+        """
+        分批删除 older_than 之前最后更新的任务记录（含 Worker 崩溃后遗留的未结束记录）
+
+        Returns:
+            删除的记录数
+        """
+        removed = 0
+        while True:
+            expired = select(TaskRun.id).where(TaskRun.updated_at < older_than).limit(batch_size)
+            result = await self.execute(delete(TaskRun).where(TaskRun.id.in_(expired)))
+            await self.commit()
+            count = result.rowcount or 0
+            removed += count
+            if count < batch_size:
+                return removed
+
+    async def list_runs(
+        self,
+        user_id: str,
+        task_ids: Optional[Sequence[str]] = None,
+        project_id: Optional[str] = None,
+        chapter_id: Optional[str] = None,
+        states: Optional[Iterable[str]] = None,
+        limit: int = 200,
+    ) -> List[TaskRun]:
+        """按任务ID / 项目 / 章节批量查询用户的任务（一次查询，最新的在前）"""
+        query = select(TaskRun).where(TaskRun.user_id == user_id)
+        if task_ids:
+            query = query.where(TaskRun.id.in_(task_ids))
+        if project_id:
+            query = query.where(TaskRun.project_id == project_id)
+        if chapter_id:
+            query = query.where(TaskRun.chapter_id == chapter_id)
+        if states:
+            query = query.where(TaskRun.state.in_(list(states)))
+        result = await self.execute(query.order_by(TaskRun.created_at.desc()).limit(limit))
+        return list(result.scalars().all())
+
+    async def bulk_status(
+        self,
+        user_id: str,
+        task_ids: Optional[Sequence[str]] = None,
+        project_id: Optional[str] = None,
+        chapter_id: Optional[str] = None,
+        states: Optional[Iterable[str]] = None,
+        limit: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """
+        批量任务状态
+
+        进行中的任务叠加 Redis 中的最新进度（一次 MGET）；
+        按ID查询时尚未开始执行（没有记录）的任务返回 PENDING。
+        """
+        if task_ids:
+            limit = max(limit, len(task_ids))
+        runs = await self.list_runs(user_id, task_ids, project_id, chapter_id, states, limit)
+        live = await get_last_progress_many(
+            [str(run.id) for run in runs if run.state not in TASK_RUN_TERMINAL_STATES]
+        )
+
+        statuses = []
+        for run in runs:
+            status = {
+                "task_id": str(run.id),
+                "task_name": run.task_name,
+                "state": run.state,
+                "stage": run.stage,
+                "progress": run.progress,
+                "message": None,
+                "retries": run.retries,
+                "project_id": str(run.project_id) if run.project_id else None,
+                "chapter_id": str(run.chapter_id) if run.chapter_id else None,
+                "result": json.loads(run.result) if run.result else None,
+                "error": run.error,
+                "started_at": run.started_at,
+                "finished_at": run.finished_at,
+                "updated_at": run.updated_at,
+            }
+            event = live.get(str(run.id))
+            if event:
+                status["stage"] = event.get("stage", run.stage)
+                status["message"] = event.get("message")
+                if event.get("percent") is not None:
+                    status["progress"] = int(event["percent"])
+            statuses.append(status)
+
+        if task_ids and not (project_id or chapter_id or states):
+            known = {status["task_id"] for status in statuses}
+            statuses.extend(
+                {"task_id": str(task_id), "state": "PENDING", "progress": 0, "retries": 0}
+                for task_id in task_ids if str(task_id) not in known
+            )
+        return statuses
+
+
+async def record_task_run(
+    task_id: str,
+    task_name: str,
+    arguments: Optional[Dict[str, Any]] = None,
+    **fields: Any,
+) -> None:
+    """使用独立数据库会话写入任务记录（供任务信号调用；失败只记录日志，不影响任务本身）"""
+    from src.core.database import get_async_db
+
+    try:
+        async with get_async_db() as db:
+            await TaskRunService(db).record(task_id, task_name, arguments, **fields)
+    except Exception as e:
+        logger.warning(f"写入任务记录失败 (task_id={task_id}, task={task_name}): {e}")
+
+
+async def purge_task_runs(retention_days: Optional[int] = None) -> int:
+    """使用独立数据库会话删除超过保留期的任务记录（供周期任务调用）"""
+    from src.core.database import get_async_db
+
+    days = settings.TASK_RUN_RETENTION_DAYS if retention_days is None else retention_days
+    async with get_async_db() as db:
+        return await TaskRunService(db).purge(datetime.now(timezone.utc) - timedelta(days=days))
+
+
+async def resolve_task_owner(task_id: str) -> Optional[str]:
+    """使用独立数据库会话查询任务所属用户（查询失败时返回None）"""
+    from src.core.database import get_async_db
+
+    try:
+        async with get_async_db() as db:
+            return await TaskRunService(db).task_owner(task_id)
+    except Exception as e:
+        logger.warning(f"查询任务归属失败 (task_id={task_id}): {e}")
+        return None
+
+
+__all__ = [
+    "TaskRunService",
+    "format_task_error",
+    "purge_task_runs",
+    "record_task_run",
+    "resolve_task_owner",
+    "serialize_result",
+]
@@ -7,9 +7,11 @@
 - 视频拼接
 """
 
+import asyncio
 from pathlib import Path
 from typing import Optional
 
+from src.core.cancellation import checkpoint
 from src.core.logging import get_logger
 from src.models import Sentence, APIKey
 from src.services.material_service import material_service
@@ -38,7 +40,7 @@ class VideoCompositionService:
         合成单个句子的视频
 
         Args:
-            sentence: 句子对象
+            sentence: 句子对象或句子快照（只读取 image_url / audio_url / content）
             temp_dir: 临时目录
             index: 句子索引
             gen_setting: 生成设置
@@ -61,18 +63,23 @@ class VideoCompositionService:
             audio_path = sentence_dir / f"audio.mp3"
             await material_service.fetch_material_from_minio(sentence.audio_url, audio_path)
 
-            # 生成字幕时间轴
-            subtitle_data = subtitle_service.generate_subtitle_timeline(str(audio_path))
+            # 生成字幕时间轴（语音识别为CPU密集的同步调用，放到线程中执行，不阻塞事件循环）
+            await checkpoint()
+            subtitle_data = await asyncio.to_thread(subtitle_service.generate_subtitle_timeline, str(audio_path))
 
-            # 如果提供了API密钥，使用LLM纠正字幕
+            # 如果提供了API密钥，纠正字幕（本地对齐置信度不足时才调用LLM）
             if api_key:
-                logger.info(f"[LLM纠错] 句子 {index} 使用LLM纠正字幕")
+                logger.info(f"[LLM纠错] 句子 {index} 纠正字幕")
                 subtitle_data = await subtitle_service.correct_subtitle_with_llm(
                     subtitle_data=subtitle_data,
                     original_text=sentence.content,
                     api_key=api_key,
                     model=model
                 )
+            else:
+                subtitle_data, _ = subtitle_service.correct_subtitle_locally(
+                    subtitle_data, sentence.content
+                )
 
             # 创建字幕滤镜
             subtitle_filter = subtitle_service.create_subtitle_filter(subtitle_data, gen_setting)
@@ -89,8 +96,9 @@ class VideoCompositionService:
                 gen_setting
             )
 
-            # 执行FFmpeg命令
-            success, stdout, stderr = run_ffmpeg_command(command, timeout=300)
+            # 执行FFmpeg命令（任务取消时终止FFmpeg进程组）
+            await checkpoint()
+            success, stdout, stderr = await asyncio.to_thread(run_ffmpeg_command, command, 300)
 
             if not success:
                 raise Exception(f"FFmpeg执行失败: {stderr}")
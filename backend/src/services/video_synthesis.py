@@ -1,18 +1,29 @@
 """
 视频合成服务 - 视频生成的核心服务（重构版）
+
+一次合成可能持续近一个小时，各阶段使用各自的短会话（get_async_db），阶段之间只传递普通数据：
+- 准备阶段：加载并验证任务、章节和素材，读出句子快照（SentenceSnapshot）
+- 渲染、拼接、上传期间不持有数据库连接；每个单句视频完成后用独立的会话写入缓存信息，
+  并发的句子任务互不共享会话
+- 状态更新、API密钥使用统计和最终结果各自在短会话中写入
 """
 
 import asyncio
 import shutil
 import tempfile
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
 
+from src.core.cancellation import CancellationScope, TaskCancelled
+from src.core.database import get_async_db
 from src.core.exceptions import BusinessLogicError
 from src.core.logging import get_logger
-from src.models import Chapter, ChapterStatus, Sentence, VideoTask, VideoTaskStatus
+from src.core.progress import ProgressTracker, gather_with_progress
+from src.models import APIKey, Chapter, ChapterStatus, ObjectKind, Sentence, VideoTaskStatus
 from src.services.api_key import APIKeyService
-from src.services.base import SessionManagedService
 from src.services.chapter import ChapterService
 from src.services.video_composition_service import video_composition_service
 from src.services.video_task import VideoTaskService
@@ -26,7 +37,45 @@ from src.utils.storage import get_storage_client
 logger = get_logger(__name__)
 
 
-class VideoSynthesisService(SessionManagedService):
+@dataclass(frozen=True)
+class SentenceSnapshot:
+    """句子的只读快照（渲染阶段使用，不依赖数据库会话）"""
+    id: str
+    order_index: int
+    content: str
+    image_url: Optional[str]
+    audio_url: Optional[str]
+    sentence_video_key: Optional[str]
+    has_cache: bool
+
+    @classmethod
+    def from_model(cls, sentence: Sentence) -> "SentenceSnapshot":
+        return cls(
+            id=str(sentence.id),
+            order_index=sentence.order_index,
+            content=sentence.content,
+            image_url=sentence.image_url,
+            audio_url=sentence.audio_url,
+            sentence_video_key=sentence.sentence_video_key,
+            has_cache=sentence.has_valid_cache(),
+        )
+
+
+@dataclass
+class RenderPlan:
+    """准备阶段读出的任务数据"""
+    user_id: str
+    project_id: str
+    chapter_id: str
+    background_id: Optional[str]
+    gen_setting: Dict[str, Any]
+    sentences: List[SentenceSnapshot]
+    # 已脱离会话的只读对象（字幕纠错只读取 provider / base_url / 密钥）
+    api_key: Optional[APIKey] = None
+    model: Optional[str] = None
+
+
+class VideoSynthesisService:
     """
     视频合成服务（重构版）
 
@@ -34,11 +83,12 @@ class VideoSynthesisService(SessionManagedService):
     - SubtitleService: 字幕生成和LLM纠错
     - MaterialService: 素材下载
     - VideoCompositionService: 视频合成
+
+    服务实例不持有数据库会话，全局实例可被多个任务并发使用。
     """
 
     def __init__(self):
         """初始化视频合成服务"""
-        super().__init__()
         self.storage_client = None
         logger.debug("VideoSynthesisService 初始化完成")
 
@@ -48,12 +98,13 @@ class VideoSynthesisService(SessionManagedService):
             self.storage_client = await get_storage_client()
         return self.storage_client
 
-    async def _validate_chapter_materials(self, chapter: Chapter) -> None:
+    def _validate_chapter_materials(self, chapter: Chapter, sentences: Sequence[Sentence]) -> None:
         """
         验证章节素材是否准备好
 
         Args:
             chapter: 章节对象
+            sentences: 章节的所有句子
 
         Raises:
             BusinessLogicError: 如果章节状态不正确或素材不完整
@@ -64,10 +115,6 @@ class VideoSynthesisService(SessionManagedService):
                 f"章节状态不正确，当前状态: {chapter.status}，需要: {ChapterStatus.MATERIALS_PREPARED.value}"
             )
 
-        # 获取章节的所有句子
-        chapter_service = ChapterService(self.db_session)
-        sentences = await chapter_service.get_sentences(chapter.id)
-
         if not sentences:
             raise BusinessLogicError("章节没有句子")
 
@@ -180,12 +227,13 @@ class VideoSynthesisService(SessionManagedService):
         storage_client = await self._get_storage_client()
         object_key = f"sentence_videos/{sentence_id}.mp4"
         
-        await storage_client.upload_file_from_path(
+        await storage_client.upload_from_path(
             user_id=user_id,
             file_path=str(video_path),
             original_filename=f"{sentence_id}.mp4",
             object_key=object_key,
-            metadata={"content_type": "video/mp4"}
+            content_type="video/mp4",
+            kind=ObjectKind.SENTENCE_VIDEO
         )
         
         logger.info(f"✅ 句子视频已缓存: {object_key}")
@@ -193,14 +241,14 @@ class VideoSynthesisService(SessionManagedService):
 
     async def _download_cached_video(
             self,
-            sentence: Sentence,
+            sentence: SentenceSnapshot,
             temp_dir: Path
     ) -> Path:
         """
         从 MinIO 下载缓存的句子视频
         
         Args:
-            sentence: 句子对象
+            sentence: 句子快照
             temp_dir: 临时目录
             
         Returns:
@@ -209,11 +257,8 @@ class VideoSynthesisService(SessionManagedService):
         storage_client = await self._get_storage_client()
         video_path = temp_dir / f"cached_{sentence.id}.mp4"
         
-        # 下载视频
-        content = await storage_client.download_file(sentence.sentence_video_key)
-        
-        with open(video_path, 'wb') as f:
-            f.write(content)
+        # 分段下载视频到本地文件
+        await storage_client.download_to_path(sentence.sentence_video_key, str(video_path))
         
         logger.info(f"📥 已下载缓存视频: {sentence.sentence_video_key}")
         return video_path
@@ -238,7 +283,7 @@ class VideoSynthesisService(SessionManagedService):
 
     async def _process_sentence_with_cache(
             self,
-            sentence: Sentence,
+            sentence: SentenceSnapshot,
             temp_dir: Path,
             index: int,
             gen_setting: dict,
@@ -251,7 +296,7 @@ class VideoSynthesisService(SessionManagedService):
         处理单个句子：生成视频并上传缓存
         
         Args:
-            sentence: 句子对象
+            sentence: 句子快照
             temp_dir: 临时目录
             index: 句子索引
             gen_setting: 生成设置
@@ -283,10 +328,8 @@ class VideoSynthesisService(SessionManagedService):
                 # 3. 获取视频时长
                 duration = await self._get_video_duration(video_path)
                 
-                # 4. 保存缓存信息到数据库
-                # 注意：这里只更新对象状态，不要 flush，避免并发 flush 导致 "Session is already flushing" 错误
-                # 统一在主流程中 flush
-                sentence.save_video_cache(video_key, duration)
+                # 4. 保存缓存信息到数据库（独立的短会话，任务中途取消或失败时已完成的句子仍可复用）
+                await self._save_sentence_cache(sentence.id, video_key, duration)
                 
                 logger.info(f"✅ 句子 {index} 视频已生成并缓存")
                 return True, video_path, None
@@ -326,6 +369,133 @@ class VideoSynthesisService(SessionManagedService):
         
         return video_paths
 
+    # ==================== 数据库阶段（各自使用短会话） ====================
+
+    async def _prepare(self, video_task_id: str, progress: ProgressTracker) -> RenderPlan:
+        """
+        准备阶段：加载并验证任务、章节和素材，更新状态，读出后续阶段需要的数据
+
+        Raises:
+            TaskCancelled: 任务已请求取消
+            BusinessLogicError: 任务状态不正确或素材不完整
+        """
+        async with get_async_db() as db:
+            # 1. 加载视频任务
+            task_service = VideoTaskService(db)
+            task = await task_service.get_video_task_by_id(video_task_id)
+            if task.cancel_requested_at is not None:
+                raise TaskCancelled(video_task_id)
+
+            # 2. 验证任务状态
+            if task.status not in [VideoTaskStatus.PENDING.value, VideoTaskStatus.FAILED.value]:
+                raise BusinessLogicError(
+                    f"任务状态不正确: {task.status}"
+                )
+
+            # 3. 更新状态为验证中
+            await task_service.update_task_status(task.id, VideoTaskStatus.VALIDATING)
+            progress.user_id = str(task.user_id)
+            await progress.stage(VideoTaskStatus.VALIDATING.value, start=0, end=5)
+
+            # 4. 加载章节并验证素材
+            chapter_service = ChapterService(db)
+            chapter = await chapter_service.get_chapter_by_id(task.chapter_id)
+            sentences = await chapter_service.get_sentences(task.chapter_id)
+            self._validate_chapter_materials(chapter, sentences)
+
+            # 5. 解析生成设置
+            gen_setting = task.get_gen_setting()
+
+            # 6. 如果任务包含api_key_id，加载API密钥用于LLM纠错
+            api_key = None
+            model = None
+            if task.api_key_id:
+                try:
+                    api_key_service = APIKeyService(db)
+                    api_key = await api_key_service.get_api_key_by_id(
+                        str(task.api_key_id),
+                        str(task.user_id)
+                    )
+                    logger.info(f"[LLM纠错] 已加载API密钥，将使用LLM纠正字幕")
+
+                    # 可以从gen_setting中获取模型配置
+                    model = gen_setting.get("llm_model")
+                except Exception as e:
+                    logger.warning(f"加载API密钥失败，将不使用LLM纠错: {e}")
+                    api_key = None
+
+            # 7. 更新状态为下载素材，记录句子数量
+            task.total_sentences = len(sentences)
+            await task_service.update_task_status(task.id, VideoTaskStatus.DOWNLOADING_MATERIALS)
+            await progress.stage(VideoTaskStatus.DOWNLOADING_MATERIALS.value, start=5, end=10)
+
+            return RenderPlan(
+                user_id=str(task.user_id),
+                project_id=str(task.project_id),
+                chapter_id=str(task.chapter_id),
+                background_id=str(task.background_id) if task.background_id else None,
+                gen_setting=gen_setting,
+                sentences=[SentenceSnapshot.from_model(sentence) for sentence in sentences],
+                api_key=api_key,
+                model=model,
+            )
+
+    async def _update_task(self, video_task_id: str, status: VideoTaskStatus, progress: Optional[int] = None) -> None:
+        """更新任务状态（和进度）"""
+        async with get_async_db() as db:
+            task_service = VideoTaskService(db)
+            await task_service.update_task_status(video_task_id, status)
+            if progress is not None:
+                await task_service.update_task_progress(video_task_id, progress)
+
+    async def _save_sentence_cache(self, sentence_id: str, video_key: str, duration: int) -> None:
+        """保存单句视频缓存信息"""
+        async with get_async_db() as db:
+            sentence = await db.get(Sentence, sentence_id)
+            if sentence is not None:
+                sentence.save_video_cache(video_key, duration)
+                await db.commit()
+
+    async def _mark_materials_updated(self, sentence_ids: Sequence[str]) -> None:
+        """缓存视频不可用的句子标记为需要重新生成"""
+        if not sentence_ids:
+            return
+        async with get_async_db() as db:
+            result = await db.execute(select(Sentence).where(Sentence.id.in_(sentence_ids)))
+            for sentence in result.scalars().all():
+                sentence.mark_material_updated()
+            await db.commit()
+
+    async def _update_api_key_usage(self, plan: RenderPlan) -> None:
+        """更新API密钥使用统计（每个句子调用一次LLM，所以使用次数为句子数量）"""
+        async with get_async_db() as db:
+            api_key_service = APIKeyService(db)
+            for _ in range(len(plan.sentences)):
+                await api_key_service.update_usage(plan.api_key.id, plan.user_id)
+            await db.commit()
+
+    async def _load_bgm(self, plan: RenderPlan) -> Optional[Dict[str, str]]:
+        """读取BGM信息（不存在或无文件时返回None）"""
+        from src.services.bgm_service import BGMService
+
+        async with get_async_db() as db:
+            bgm = await BGMService(db).get_bgm_by_id(plan.background_id, plan.user_id)
+            if not bgm or not bgm.file_key:
+                return None
+            return {"name": bgm.name, "file_key": bgm.file_key, "file_name": bgm.file_name}
+
+    async def _mark_completed(self, video_task_id: str, video_key: str, duration: int) -> None:
+        async with get_async_db() as db:
+            await VideoTaskService(db).mark_task_completed(video_task_id, video_key, duration)
+
+    async def _mark_cancelled(self, video_task_id: str) -> None:
+        async with get_async_db() as db:
+            await VideoTaskService(db).mark_task_cancelled(video_task_id)
+
+    async def _mark_failed(self, video_task_id: str, error: str) -> None:
+        async with get_async_db() as db:
+            await VideoTaskService(db).mark_task_failed(video_task_id, error)
+
     async def synthesize_video(self, video_task_id: str) -> dict:
         """
         合成视频（主流程）
@@ -334,78 +504,36 @@ class VideoSynthesisService(SessionManagedService):
             video_task_id: 视频任务ID
 
         Returns:
-            统计信息字典
+            统计信息字典（任务被取消时为 {"cancelled": True, ...}）
         """
-        async with self:
-            temp_dir = None
+        temp_dir = None
+        # 进度按视频任务ID发布，与前端轮询 /video-tasks/{id} 使用的ID一致
+        progress = ProgressTracker(video_task_id)
+        async with CancellationScope(video_task_id) as cancellation:
             try:
                 # 检查FFmpeg
                 if not check_ffmpeg_installed():
                     raise BusinessLogicError("FFmpeg未安装或不可用")
 
-                # 1. 加载视频任务
-                task_service = VideoTaskService(self.db_session)
-                task = await task_service.get_video_task_by_id(video_task_id)
-
-                # 2. 验证任务状态
-                if task.status not in [VideoTaskStatus.PENDING.value, VideoTaskStatus.FAILED.value]:
-                    raise BusinessLogicError(
-                        f"任务状态不正确: {task.status}"
-                    )
-
-                # 3. 更新状态为验证中
-                await task_service.update_task_status(task.id, VideoTaskStatus.VALIDATING)
-
-                # 4. 加载章节并验证素材
-                chapter_service = ChapterService(self.db_session)
-                chapter = await chapter_service.get_chapter_by_id(task.chapter_id)
-                await self._validate_chapter_materials(chapter)
-
-                # 5. 解析生成设置
-                gen_setting = task.get_gen_setting()
-
-                # 6. 如果任务包含api_key_id，加载API密钥用于LLM纠错
-                api_key = None
-                model = None
-                if task.api_key_id:
-                    try:
-                        api_key_service = APIKeyService(self.db_session)
-                        api_key = await api_key_service.get_api_key_by_id(
-                            str(task.api_key_id),
-                            str(task.user_id)
-                        )
-                        logger.info(f"[LLM纠错] 已加载API密钥，将使用LLM纠正字幕")
-                        
-                        # 可以从gen_setting中获取模型配置
-                        model = gen_setting.get("llm_model")
-                    except Exception as e:
-                        logger.warning(f"加载API密钥失败，将不使用LLM纠错: {e}")
-                        api_key = None
-
-                # 7. 更新状态为下载素材
-                await task_service.update_task_status(task.id, VideoTaskStatus.DOWNLOADING_MATERIALS)
-
-                # 8. 获取所有句子
-                sentences = await chapter_service.get_sentences(task.chapter_id)
-                task.total_sentences = len(sentences)
-                await self.db_session.flush()
+                # 1-8. 加载并验证任务和素材
+                plan = await self._prepare(video_task_id, progress)
+                sentences = plan.sentences
+                gen_setting = plan.gen_setting
+                await cancellation.check()
 
                 # 9. 创建临时目录
                 temp_dir = Path(tempfile.mkdtemp(prefix="video_synthesis_"))
                 logger.info(f"创建临时目录: {temp_dir}")
 
                 # 10. 更新状态为合成视频
-                await task_service.update_task_status(
-                    task.id,
-                    VideoTaskStatus.SYNTHESIZING_VIDEOS
-                )
+                await self._update_task(video_task_id, VideoTaskStatus.SYNTHESIZING_VIDEOS)
 
                 # 11. 分类句子：需要生成 vs 可以复用缓存
                 sentences_to_generate = []
                 cached_sentences = []
                 
                 for sentence in sentences:
-                    if sentence.has_valid_cache():
+                    if sentence.has_cache:
                         cached_sentences.append(sentence)
                         logger.info(f"🔄 句子 {sentence.order_index} 使用缓存: {sentence.sentence_video_key}")
                     else:
@@ -419,38 +547,50 @@ class VideoSynthesisService(SessionManagedService):
                 )
 
                 # 12. 并发生成需要更新的句子视频
+                await cancellation.check()
                 generated_videos = {}
                 if sentences_to_generate:
                     semaphore = asyncio.Semaphore(3)  # 限制并发数为3
                     tasks_list = [
                         self._process_sentence_with_cache(
-                            sentence, temp_dir, idx, gen_setting, semaphore, str(task.user_id), api_key, model
+                            sentence, temp_dir, idx, gen_setting, semaphore, plan.user_id, plan.api_key, plan.model
                         )
                         for idx, sentence in enumerate(sentences_to_generate)
                     ]
                     
-                    results = await asyncio.gather(*tasks_list, return_exceptions=True)
+                    results = await gather_with_progress(
+                        tasks_list,
+                        progress,
+                        VideoTaskStatus.SYNTHESIZING_VIDEOS.value,
+                        [sentence.order_index for sentence in sentences_to_generate],
+                        start=10,
+                        end=80,
+                    )
+                    await cancellation.check()
                     
                     # 收集成功生成的视频
                     for idx, (success, video_path, error) in enumerate(results):
                         if success and video_path:
-                            sentence_id = str(sentences_to_generate[idx].id)
-                            generated_videos[sentence_id] = video_path
+                            generated_videos[sentences_to_generate[idx].id] = video_path
                         elif error:
                             logger.error(f"句子 {idx} 生成失败: {error}")
                 
                 # 13. 下载缓存的句子视频
                 cached_videos = {}
                 if cached_sentences:
+                    await progress.stage("downloading_cache", total=len(cached_sentences), start=80, end=85)
+                    stale_cache_ids = []
                     for sentence in cached_sentences:
+                        await cancellation.check()
                         try:
                             video_path = await self._download_cached_video(sentence, temp_dir)
-                            cached_videos[str(sentence.id)] = video_path
+                            cached_videos[sentence.id] = video_path
+                            await progress.advance(sentence_index=sentence.order_index)
                         except Exception as e:
                             logger.error(f"下载缓存视频失败 {sentence.id}: {e}")
                             # 如果缓存下载失败，标记需要重新生成
-                            sentence.mark_material_updated()
-                            await self.db_session.flush()
+                            stale_cache_ids.append(sentence.id)
+                    await self._mark_materials_updated(stale_cache_ids)
                 
                 # 14. 合并所有视频路径（按句子顺序）
                 video_paths = self._merge_video_paths(
@@ -471,26 +611,25 @@ class VideoSynthesisService(SessionManagedService):
                 logger.info(f"✅ 成功: {success_count}, ❌ 失败: {failed_count}")
                 
                 # 16. 更新API密钥使用统计（如果使用了LLM纠错）
-                if api_key:
+                if plan.api_key:
                     try:
-                        api_key_service = APIKeyService(self.db_session)
-                        # 每个句子调用一次LLM，所以使用次数为句子数量
-                        for _ in range(len(sentences)):
-                            await api_key_service.update_usage(api_key.id, str(task.user_id))
+                        await self._update_api_key_usage(plan)
                         logger.info(f"[LLM纠错] 已更新API密钥使用统计，共 {len(sentences)} 次")
                     except Exception as e:
                         logger.warning(f"更新API密钥使用统计失败: {e}")
 
                 # 17. 更新状态为拼接中
-                await task_service.update_task_status(task.id, VideoTaskStatus.CONCATENATING)
-                task.update_progress(85)
-                await self.db_session.flush()
+                await cancellation.check()
+                await self._update_task(video_task_id, VideoTaskStatus.CONCATENATING, progress=85)
+                await progress.stage(VideoTaskStatus.CONCATENATING.value, start=85, end=90)
 
                 # 15. 拼接视频
                 final_video_path = temp_dir / "final_video.mp4"
                 concat_file_path = temp_dir / "concat.txt"
 
-                success = concatenate_videos(video_paths, final_video_path, concat_file_path)
+                # FFmpeg 在线程中执行，取消时由取消作用域终止进程
+                success = await asyncio.to_thread(concatenate_videos, video_paths, final_video_path, concat_file_path)
+                await cancellation.check()
                 if not success:
                     raise BusinessLogicError("视频拼接失败")
 
@@ -501,7 +640,8 @@ class VideoSynthesisService(SessionManagedService):
                     from src.utils.ffmpeg_utils import apply_video_speed
                     
                     speed_video_path = temp_dir / "final_video_speed.mp4"
-                    speed_success = apply_video_speed(
+                    speed_success = await asyncio.to_thread(
+                        apply_video_speed,
                         str(final_video_path),
                         str(speed_video_path),
                         video_speed
@@ -514,32 +654,23 @@ class VideoSynthesisService(SessionManagedService):
                         logger.warning("视频速度调整失败，使用原视频")
 
                 # 17. 混合BGM（如果有）
-                if task.background_id:
-                    logger.info(f"开始混合BGM: background_id={task.background_id}")
+                if plan.background_id:
+                    logger.info(f"开始混合BGM: background_id={plan.background_id}")
                     try:
                         # 16.1 加载BGM信息
-                        from src.services.bgm_service import BGMService
-                        bgm_service = BGMService(self.db_session)
-                        bgm = await bgm_service.get_bgm_by_id(
-                            str(task.background_id),
-                            str(task.user_id)
-                        )
+                        bgm = await self._load_bgm(plan)
                         
-                        if not bgm or not bgm.file_key:
+                        if not bgm:
                             logger.warning(f"BGM不存在或无file_key，跳过BGM混合")
                         else:
                             # 16.2 下载BGM文件
                             storage = await self._get_storage_client()
-                            bgm_content = await storage.download_file(bgm.file_key)
-                            
-                            # 保存到临时文件
                             import os
-                            bgm_ext = os.path.splitext(bgm.file_name)[1] or ".mp3"
+                            bgm_ext = os.path.splitext(bgm["file_name"])[1] or ".mp3"
                             bgm_temp_path = temp_dir / f"bgm{bgm_ext}"
-                            with open(bgm_temp_path, 'wb') as f:
-                                f.write(bgm_content)
+                            bgm_size = await storage.download_to_path(bgm["file_key"], str(bgm_temp_path))
                             
-                            logger.info(f"BGM下载成功: {bgm.name}, 大小={len(bgm_content)} bytes")
+                            logger.info(f"BGM下载成功: {bgm['name']}, 大小={bgm_size} bytes")
                             
                             # 16.3 获取BGM音量配置（从gen_setting读取，默认0.15）
                             bgm_volume = gen_setting.get("bgm_volume", 0.15)
@@ -549,7 +680,8 @@ class VideoSynthesisService(SessionManagedService):
                             from src.utils.ffmpeg_utils import mix_bgm_with_video
                             final_video_with_bgm_path = temp_dir / "final_video_with_bgm.mp4"
                             
-                            mix_success = mix_bgm_with_video(
+                            mix_success = await asyncio.to_thread(
+                                mix_bgm_with_video,
                                 str(final_video_path),
                                 str(bgm_temp_path),
                                 str(final_video_with_bgm_path),
@@ -568,31 +700,30 @@ class VideoSynthesisService(SessionManagedService):
                         logger.error(f"BGM混合过程出错: {e}", exc_info=True)
                         logger.warning("BGM混合失败，继续使用原视频")
 
-                # 17. 更新状态为上传中
-                await task_service.update_task_status(task.id, VideoTaskStatus.UPLOADING)
-                task.update_progress(90)
-                await self.db_session.flush()
+                # 17. 更新状态为上传中（之后不再响应取消，避免上传中途中断）
+                await cancellation.check()
+                cancellation.disarm()
+                await self._update_task(video_task_id, VideoTaskStatus.UPLOADING, progress=90)
+                await progress.stage(VideoTaskStatus.UPLOADING.value, start=90, end=100)
 
                 # 18. 上传到MinIO
                 storage = await self._get_storage_client()
                 video_key = storage.generate_object_key(
-                    str(task.user_id),
-                    f"chapter_{task.chapter_id}_video.mp4",
+                    plan.user_id,
+                    f"chapter_{plan.chapter_id}_video.mp4",
                     prefix="videos"
                 )
 
-                # 读取文件并上传
-                from fastapi import UploadFile
-                with open(final_video_path, 'rb') as f:
-                    upload_file = UploadFile(
-                        filename=f"chapter_{task.chapter_id}_video.mp4",
-                        file=f
-                    )
-                    result = await storage.upload_file(
-                        str(task.user_id),
-                        upload_file,
-                        object_key=video_key
-                    )
+                # 分片并行上传，不把整个视频读入内存
+                result = await storage.upload_from_path(
+                    plan.user_id,
+                    str(final_video_path),
+                    f"chapter_{plan.chapter_id}_video.mp4",
+                    object_key=video_key,
+                    content_type="video/mp4",
+                    kind=ObjectKind.VIDEO,
+                    project_id=plan.project_id
+                )
 
                 video_key = result["object_key"]
 
@@ -600,11 +731,10 @@ class VideoSynthesisService(SessionManagedService):
                 duration = int(get_audio_duration(str(final_video_path)) or 0)
 
                 # 20. 标记任务完成
-                await task_service.mark_task_completed(task.id, video_key, duration)
-                task.update_progress(100)
-                await self.db_session.flush()
+                await self._mark_completed(video_task_id, video_key, duration)
+                await progress.finish("completed")
 
-                logger.info(f"视频合成完成: task_id={task.id}, video_key={video_key}")
+                logger.info(f"视频合成完成: task_id={video_task_id}, video_key={video_key}")
 
                 return {
                     "total": len(sentences),
@@ -614,18 +744,27 @@ class VideoSynthesisService(SessionManagedService):
                     "duration": duration
                 }
 
+            except (TaskCancelled, asyncio.CancelledError) as e:
+                if isinstance(e, asyncio.CancelledError) and not cancellation.requested:
+                    raise
+                cancellation.acknowledge()
+                logger.info(f"视频合成已取消: task_id={video_task_id}")
+
+                # 已完成的单句视频缓存已逐句写入，重新创建任务时复用
+                await self._mark_cancelled(video_task_id)
+                await progress.finish("cancelled")
+
+                return {"cancelled": True, "video_task_id": video_task_id}
+
             except Exception as e:
                 logger.error(f"视频合成失败: {e}", exc_info=True)
 
                 # 标记任务失败
                 try:
-                    task_service = VideoTaskService(self.db_session)
-                    await task_service.mark_task_failed(
-                        video_task_id,
-                        str(e)
-                    )
+                    await self._mark_failed(video_task_id, str(e))
                 except Exception as mark_error:
                     logger.error(f"标记任务失败时出错: {mark_error}")
+                await progress.finish("failed", message=str(e))
 
                 raise
 
@@ -2,6 +2,7 @@
 视频任务服务 - 视频任务的CRUD操作
 """
 
+from datetime import datetime, timezone
 from typing import List, Optional, Tuple
 
 from sqlalchemy import desc, func, select
@@ -40,7 +41,8 @@ class VideoTaskService(BaseService):
             api_key_id: Optional[str] = None,
             bgm_id: Optional[str] = None,
             background_id: Optional[str] = None,
-            gen_setting: Optional[dict] = None
+            gen_setting: Optional[dict] = None,
+            task_id: Optional[str] = None
     ) -> VideoTask:
         """
         创建新的视频任务
@@ -52,6 +54,7 @@ class VideoTaskService(BaseService):
             api_key_id: API密钥ID（可选）
             background_id: 背景音乐/图片ID（可选）
             gen_setting: 生成设置（可选）
+            task_id: 指定任务ID（可选，去重投递时预先分配）
 
         Returns:
             创建的视频任务对象
@@ -66,6 +69,8 @@ class VideoTaskService(BaseService):
                 background_id=bgm_id or background_id,  # bgm_id优先
                 status=VideoTaskStatus.PENDING
             )
+            if task_id:
+                video_task.id = task_id
 
             # 设置生成设置
             if gen_setting:
@@ -272,6 +277,57 @@ class VideoTaskService(BaseService):
         logger.error(f"任务失败: ID={task_id}, 错误={error_message}")
         return task
 
+    async def request_cancel(self, task_id: str) -> VideoTask:
+        """
+        记录取消请求（执行中的任务在下一个检查点响应，见 src.core.cancellation）
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            更新后的任务
+
+        Raises:
+            BusinessLogicError: 如果任务已结束
+        """
+        task = await self.get_video_task_by_id(task_id)
+
+        if task.status in [
+            VideoTaskStatus.COMPLETED.value,
+            VideoTaskStatus.FAILED.value,
+            VideoTaskStatus.CANCELLED.value
+        ]:
+            raise BusinessLogicError(
+                f"任务已结束，无法取消，当前状态: {task.status}"
+            )
+
+        if task.cancel_requested_at is None:
+            task.cancel_requested_at = datetime.now(timezone.utc)
+
+        await self.commit()
+        await self.refresh(task)
+
+        logger.info(f"请求取消任务: ID={task_id}, 状态={task.status}")
+        return task
+
+    async def mark_task_cancelled(self, task_id: str) -> VideoTask:
+        """
+        标记任务为已取消
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            更新后的任务
+        """
+        task = await self.get_video_task_by_id(task_id)
+        task.mark_as_cancelled()
+
+        await self.commit()
+        await self.refresh(task)
+
+        return task
+
     async def retry_task(self, task_id: str) -> VideoTask:
         """
         重试失败的任务
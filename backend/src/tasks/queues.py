@@ -0,0 +1,133 @@
+"""
+Celery 队列拓扑与路由
+
+任务按资源特征分到不同队列，由各自的 Worker 消费，长时间的渲染任务不会占用交互式生成的执行槽位：
+
+- ingest：上传文件解析、直传校验（短任务，预取多个）
+- llm-io：提示词/图片/音频生成，主要时间花在等待外部API；
+  任务协程都在 Worker 进程的事件循环中执行（见 src.tasks.runtime），Worker 使用 threads 池即可高并发，
+  不要使用 gevent 池（猴子补丁会干扰事件循环线程）
+- render：视频合成（FFmpeg，CPU密集），prefork、每容器单并发，通过容器CPU配额/绑核隔离
+- transcribe：语音识别（faster-whisper，CPU/GPU密集），单并发
+- maintenance：存储GC、迁移、过期会话清理等运维任务，收到即确认（可重新触发，不依赖重投）
+- scheduling：等待列表放行、渲染调度等秒级周期任务，与可能运行数小时的运维任务分开消费，
+  beat 消息设置了过期时间，Worker 停止期间不会积压
+
+每个队列的预取数、acks_late 和默认时限见 QUEUES；任务装饰器显式设置的时限优先，
+队列未设置时限时使用全局 CELERY_TASK_TIME_LIMIT / CELERY_TASK_SOFT_TIME_LIMIT。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from kombu import Queue
+
+from src.core.config import settings
+
+QUEUE_INGEST = "ingest"
+QUEUE_LLM_IO = "llm-io"
+QUEUE_RENDER = "render"
+QUEUE_TRANSCRIBE = "transcribe"
+QUEUE_MAINTENANCE = "maintenance"
+QUEUE_SCHEDULING = "scheduling"
+
+
+@dataclass(frozen=True)
+class QueueSpec:
+    """队列配置（prefetch_multiplier / pool / concurrency 为对应 Worker 的启动参数）"""
+    name: str
+    prefetch_multiplier: int
+    acks_late: bool
+    time_limit: Optional[int] = None
+    soft_time_limit: Optional[int] = None
+    pool: str = "prefork"
+    concurrency: int = 1
+
+
+QUEUES: Dict[str, QueueSpec] = {
+    spec.name: spec for spec in (
+        QueueSpec(QUEUE_INGEST, prefetch_multiplier=4, acks_late=True, concurrency=4),
+        QueueSpec(QUEUE_LLM_IO, prefetch_multiplier=1, acks_late=True, pool="threads", concurrency=16),
+        QueueSpec(QUEUE_RENDER, prefetch_multiplier=1, acks_late=True,
+                  time_limit=3600, soft_time_limit=3300),
+        QueueSpec(QUEUE_TRANSCRIBE, prefetch_multiplier=1, acks_late=True,
+                  time_limit=1800, soft_time_limit=1700),
+        QueueSpec(QUEUE_MAINTENANCE, prefetch_multiplier=1, acks_late=False,
+                  time_limit=6 * 3600, soft_time_limit=6 * 3600 - 300),
+        QueueSpec(QUEUE_SCHEDULING, prefetch_multiplier=1, acks_late=False,
+                  time_limit=120, soft_time_limit=100),
+    )
+}
+
+# 未匹配路由的任务进入的队列
+DEFAULT_QUEUE = QUEUE_INGEST
+
+# 任务路由：精确名称优先于通配符，通配符按顺序匹配
+TASK_ROUTES: Dict[str, Dict[str, str]] = {
+    "generate.synthesize_video": {"queue": QUEUE_RENDER},
+    "generate.pipeline_synthesize_video": {"queue": QUEUE_RENDER},
+    "generate.*": {"queue": QUEUE_LLM_IO},
+    "file_processing.*": {"queue": QUEUE_INGEST},
+    "transcribe.*": {"queue": QUEUE_TRANSCRIBE},
+    "maintenance.release_waiting_tasks": {"queue": QUEUE_SCHEDULING},
+    "maintenance.dispatch_render_jobs": {"queue": QUEUE_SCHEDULING},
+    "maintenance.*": {"queue": QUEUE_MAINTENANCE},
+}
+
+TASK_QUEUES = tuple(Queue(name, routing_key=name) for name in QUEUES)
+
+# Redis 代理的可见性超时必须长于 acks_late 队列中最长的任务，否则执行中的任务会被重复投递
+VISIBILITY_TIMEOUT = max(
+    spec.time_limit or settings.CELERY_TASK_TIME_LIMIT for spec in QUEUES.values() if spec.acks_late
+) + 600
+
+
+def queue_for(task_name: str) -> str:
+    """按路由表解析任务所在队列"""
+    from fnmatch import fnmatchcase
+
+    route = TASK_ROUTES.get(task_name)
+    if route is None:
+        route = next(
+            (r for pattern, r in TASK_ROUTES.items() if "*" in pattern and fnmatchcase(task_name, pattern)),
+            {"queue": DEFAULT_QUEUE},
+        )
+    return route["queue"]
+
+
+class QueueAnnotation:
+    """
+    按任务所在队列设置 acks_late 和默认时限（task_annotations）
+
+    任务装饰器已设置 time_limit / soft_time_limit 时保留任务自身的值。
+    """
+
+    def annotate(self, task) -> Optional[Dict[str, Any]]:
+        spec = QUEUES[queue_for(task.name)]
+        options: Dict[str, Any] = {"acks_late": spec.acks_late}
+        if spec.time_limit is not None and getattr(task, "time_limit", None) is None:
+            options["time_limit"] = spec.time_limit
+        if spec.soft_time_limit is not None and getattr(task, "soft_time_limit", None) is None:
+            options["soft_time_limit"] = spec.soft_time_limit
+        return options
+
+    def annotate_any(self) -> None:
+        return None
+
+
+__all__ = [
+    "QUEUE_INGEST",
+    "QUEUE_LLM_IO",
+    "QUEUE_RENDER",
+    "QUEUE_TRANSCRIBE",
+    "QUEUE_MAINTENANCE",
+    "QUEUE_SCHEDULING",
+    "QueueSpec",
+    "QUEUES",
+    "DEFAULT_QUEUE",
+    "TASK_ROUTES",
+    "TASK_QUEUES",
+    "VISIBILITY_TIMEOUT",
+    "QueueAnnotation",
+    "queue_for",
+]
@@ -0,0 +1,147 @@
+"""
+Celery Worker 的异步运行时
+
+每个 Worker 进程持有一个长期运行的事件循环线程：数据库引擎、Redis客户端、共享HTTP会话、
+LLM Provider 等绑定事件循环的对象在进程内只创建一次，所有任务的协程都提交到该循环执行，
+不再为每个任务新建事件循环、重建连接池和查询存储配置。
+
+生命周期：
+- worker_process_init：启动事件循环线程，创建数据库引擎并加载存储配置
+- 任务执行：run() 把协程提交到事件循环并阻塞等待结果；
+  存储配置超过 CELERY_STORAGE_CONFIG_TTL_SECONDS 后在下一个任务前刷新
+- worker_process_shutdown：关闭HTTP会话和数据库连接，停止事件循环
+
+未收到 worker_process_init 的运行方式（solo 池、测试）在第一次 run() 时惰性启动。
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Coroutine, Optional, TypeVar
+
+from src.core.config import settings
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """Worker 进程内的事件循环线程与共享资源"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._pid: Optional[int] = None
+        self._storage_loaded_at = 0.0
+
+    @property
+    def loop(self) -> Optional[asyncio.AbstractEventLoop]:
+        return self._loop
+
+    @property
+    def running(self) -> bool:
+        """当前进程中的事件循环线程是否在运行（fork 出的子进程不继承父进程的线程）"""
+        return self._loop is not None and self._pid == os.getpid() and self._thread.is_alive()
+
+    def start(self) -> None:
+        """启动事件循环线程并初始化共享资源"""
+        with self._lock:
+            if self.running:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=self._run_loop, args=(loop,), name="worker-event-loop", daemon=True)
+            thread.start()
+            # 初始化完成后再对外可见：threads 池中并发的 run() 不会在引擎创建前提交任务
+            try:
+                asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            except BaseException:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join(timeout=10)
+                loop.close()
+                raise
+            self._loop, self._thread, self._pid = loop, thread, os.getpid()
+
+        logger.info(f"Worker 事件循环已启动 (pid={self._pid})")
+
+    def stop(self) -> None:
+        """关闭共享资源并停止事件循环线程"""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = self._pid = None
+
+        try:
+            asyncio.run_coroutine_threadsafe(self._teardown(), loop).result(timeout=30)
+        except Exception as e:
+            logger.warning(f"Worker 资源关闭失败: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=10)
+        loop.close()
+        logger.info("Worker 事件循环已停止")
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        在 Worker 事件循环中执行协程并等待结果
+
+        调用线程被中断时（如 Celery 软超时 SoftTimeLimitExceeded）取消事件循环中的协程。
+        """
+        if not self.running:
+            self.start()
+        return self._submit(self._with_fresh_storage(coro))
+
+    def _submit(self, coro: Coroutine[Any, Any, T]) -> T:
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _setup(self) -> None:
+        from src.core.database import close_database_connections, create_database_engine
+
+        # prefork 子进程可能继承了父进程的引擎，其连接不能跨进程使用
+        await close_database_connections()
+        await create_database_engine()
+        await self._reload_storage_config()
+
+    async def _teardown(self) -> None:
+        from src.core.database import close_database_connections
+        from src.utils.http_client import close_http_session
+
+        await close_http_session()
+        await close_database_connections()
+
+    async def _reload_storage_config(self) -> None:
+        from src.core.database import get_async_db
+        from src.utils.storage import reload_storage_config_from_db
+
+        async with get_async_db() as db:
+            await reload_storage_config_from_db(db)
+        self._storage_loaded_at = time.monotonic()
+
+    async def _with_fresh_storage(self, coro: Coroutine[Any, Any, T]) -> T:
+        if time.monotonic() - self._storage_loaded_at >= settings.CELERY_STORAGE_CONFIG_TTL_SECONDS:
+            try:
+                await self._reload_storage_config()
+            except Exception as e:
+                # 刷新失败时继续使用已加载的配置
+                logger.warning(f"刷新存储配置失败: {e}")
+        return await coro
+
+
+# Worker 进程内的运行时实例
+worker_runtime = WorkerRuntime()
+
+
+__all__ = ["WorkerRuntime", "worker_runtime"]
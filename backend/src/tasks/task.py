@@ -12,16 +12,53 @@
 - 任务状态管理
 """
 
-import asyncio
-from typing import Any, Dict, List
-
-from celery import Celery
+import inspect
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from celery import Celery, chain, chord
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_process_init,
+    worker_process_shutdown,
+)
 
+from src.core.admission import release_admission, release_waiting
 from src.core.config import settings
 from src.core.logging import get_logger
+from src.core.progress import ProgressTracker, publish_progress
+from src.core.render_scheduler import dispatch_ready, release_render_slot
+from src.core.task_lock import batch_resource_id, run_exclusive
 from src.services.project_processing import project_processing_service
 from src.services.prompt import prompt_service
-from src.services.image import image_service
+from src.models.generation_batch import GenerationKind
+from src.models.chapter_pipeline import PipelineStatus
+from src.services.chapter_pipeline import (
+    complete_pipeline_media,
+    fail_pipeline_prompts_chunk,
+    queue_pipeline_video,
+    run_pipeline_prompts_chunk,
+    run_pipeline_video,
+)
+from src.services.generation_batch import (
+    complete_generation_batch,
+    fail_generation_chunk,
+    prepare_generation_batch,
+    run_generation_chunk,
+)
+from src.services.task_run import format_task_error, record_task_run, serialize_result
+from src.tasks.queues import (
+    DEFAULT_QUEUE,
+    TASK_QUEUES,
+    TASK_ROUTES,
+    VISIBILITY_TIMEOUT,
+    QueueAnnotation,
+    queue_for,
+)
+from src.tasks.runtime import worker_runtime
 
 logger = get_logger(__name__)
 
@@ -48,8 +85,37 @@ celery_app.conf.update(
     task_acks_late=True,
     task_reject_on_worker_lost=True,
     result_expires=3600,
+    # 队列拓扑（见 src.tasks.queues）
+    task_queues=TASK_QUEUES,
+    task_default_queue=DEFAULT_QUEUE,
+    task_routes=TASK_ROUTES,
+    task_annotations=(QueueAnnotation(),),
+    broker_transport_options={"visibility_timeout": VISIBILITY_TIMEOUT},
 )
 
+# 周期任务（需运行 celery beat）
+celery_app.conf.beat_schedule = {
+    "expire-upload-sessions": {
+        "task": "maintenance.expire_upload_sessions",
+        "schedule": 3600.0,
+    },
+    "purge-task-runs": {
+        "task": "maintenance.purge_task_runs",
+        "schedule": 24 * 3600.0,
+    },
+    # 兜底的周期调度：消息在下一次触发前过期，Worker 繁忙或停止时不会积压重复消息
+    "release-waiting-tasks": {
+        "task": "maintenance.release_waiting_tasks",
+        "schedule": settings.ADMISSION_RELEASE_INTERVAL_SECONDS,
+        "options": {"expires": settings.ADMISSION_RELEASE_INTERVAL_SECONDS},
+    },
+    "dispatch-render-jobs": {
+        "task": "maintenance.dispatch_render_jobs",
+        "schedule": settings.RENDER_SCHEDULER_INTERVAL_SECONDS,
+        "options": {"expires": settings.RENDER_SCHEDULER_INTERVAL_SECONDS},
+    },
+}
+
 
 # ---------------------------
 # Celery 任务定义
@@ -91,30 +157,125 @@ def process_uploaded_file(self, project_id: str, owner_id: str) -> Dict[str, Any
 
 def run_async_task(coro):
     """
-    运行异步任务的辅助函数，确保在新的事件循环中重置数据库连接
-    
+    在 Worker 进程的长期事件循环中运行异步任务
+
+    数据库引擎、存储配置和各类客户端在进程内复用，见 src.tasks.runtime。
+
     Args:
         coro: 要运行的协程对象
-        
+
     Returns:
         协程的执行结果
     """
+    return worker_runtime.run(coro)
+
 
-    async def _wrapper():
-        from src.core.database import close_database_connections, create_database_engine, AsyncSessionLocal
-        from src.utils.storage import reload_storage_config_from_db
-        # 在新的事件循环中，必须重置数据库连接，因为旧的连接绑定在已关闭的循环上
-        await close_database_connections()
-        # 确保数据库引擎已初始化
-        await create_database_engine()
-        # 重新导入已初始化的 AsyncSessionLocal
-        from src.core.database import AsyncSessionLocal as SessionLocal
-        # 加载数据库中的存储配置
-        async with SessionLocal() as db:
-            await reload_storage_config_from_db(db)
-        return await coro
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    """Worker 子进程启动：创建事件循环线程和数据库引擎"""
+    worker_runtime.start()
 
-    return asyncio.run(_wrapper())
+
+@worker_process_shutdown.connect
+def _shutdown_worker_process(**kwargs):
+    """Worker 子进程退出：关闭连接并停止事件循环"""
+    worker_runtime.stop()
+
+
+def _task_arguments(task, args, kwargs) -> Dict[str, Any]:
+    """按任务签名把位置参数映射为参数名（用于解析任务所属的用户、项目和章节）"""
+    try:
+        return dict(inspect.signature(task.run).bind_partial(*(args or ()), **(kwargs or {})).arguments)
+    except (TypeError, ValueError):
+        return dict(kwargs or {})
+
+
+# 经渲染公平调度投递的任务（结束时释放 render-sched:running 中的槽位）
+_SCHEDULED_RENDER_TASKS = ("generate.synthesize_video", "generate.pipeline_synthesize_video")
+
+
+def _tracked(task) -> bool:
+    """
+    是否发布进度事件并写任务记录
+
+    Celery 内置任务（chord_unlock 等）和声明了 track=False 的周期运维任务
+    （调度兜底每十几秒执行一次）不发布、不记录。
+    """
+    return task is not None and not task.name.startswith("celery.") and getattr(task, "track", True)
+
+
+@task_prerun.connect
+def _publish_task_started(task_id=None, task=None, args=None, kwargs=None, **extra):
+    """任务开始执行：发布进度事件（按 Celery 任务ID，供前端订阅）并写入任务记录"""
+    if _tracked(task):
+        worker_runtime.run(publish_progress(task_id, "started", status="started", percent=0))
+        worker_runtime.run(record_task_run(
+            task_id,
+            task.name,
+            _task_arguments(task, args, kwargs),
+            state="STARTED",
+            stage="started",
+            progress=0,
+            retries=task.request.retries or 0,
+            started_at=datetime.now(timezone.utc),
+            finished_at=None,
+        ))
+
+
+@task_postrun.connect
+def _publish_task_finished(task_id=None, task=None, state=None, retval=None, **kwargs):
+    """任务结束：发布终态事件（SUCCESS / FAILURE / RETRY / 已取消），释放准入名额（和渲染槽位）并更新任务记录"""
+    if state not in ("SUCCESS", "FAILURE", "RETRY", "REVOKED"):
+        # 被 self.replace 替换的任务（IGNORED）由替换后的任务发布终态
+        return
+    if state == "SUCCESS" and isinstance(retval, dict) and retval.get("cancelled"):
+        # 协作式取消（见 src.core.cancellation）正常返回，按已撤销记录
+        state = "REVOKED"
+    status = "cancelled" if state == "REVOKED" else (state or "unknown").lower()
+    percent = 100 if state == "SUCCESS" else None
+    tracked = _tracked(task)
+    if tracked:
+        worker_runtime.run(publish_progress(task_id, "finished", status=status, percent=percent))
+    if state == "RETRY":
+        return
+    worker_runtime.run(release_admission(task_id))
+    if settings.ADMISSION_ENABLED:
+        # 名额空出后立即放行该队列的等待任务（周期任务兜底）
+        try:
+            queues = [queue_for(task.name)] if task is not None else None
+            worker_runtime.run(release_waiting(celery_app.send_task, queues=queues))
+        except Exception as e:
+            logger.warning(f"放行等待任务失败 (task_id={task_id}): {e}")
+    if task is not None and task.name in _SCHEDULED_RENDER_TASKS:
+        # 渲染槽位空出后立即调度下一个视频合成任务
+        worker_runtime.run(release_render_slot(task_id))
+        worker_runtime.run(dispatch_ready(celery_app.send_task))
+    if tracked:
+        fields = {"state": state, "stage": status, "finished_at": datetime.now(timezone.utc)}
+        if state == "SUCCESS":
+            fields.update(progress=100, result=serialize_result(retval), error=None)
+        worker_runtime.run(record_task_run(task_id, task.name, **fields))
+
+
+@task_failure.connect
+def _record_task_failure(task_id=None, exception=None, sender=None, **kwargs):
+    """任务失败：记录错误信息"""
+    if _tracked(sender):
+        worker_runtime.run(record_task_run(task_id, sender.name, error=format_task_error(exception)))
+
+
+@task_retry.connect
+def _record_task_retry(request=None, reason=None, sender=None, **kwargs):
+    """任务重试：记录重试次数和触发重试的错误"""
+    if _tracked(sender) and request is not None:
+        worker_runtime.run(record_task_run(
+            request.id,
+            sender.name,
+            state="RETRY",
+            stage="retry",
+            retries=(request.retries or 0) + 1,
+            error=format_task_error(reason),
+        ))
 
 
 @celery_app.task(
@@ -182,7 +343,14 @@ def generate_prompts(self, chapter_id: str, api_key_id: str, style: str, model:
         Dict[str, Any]: 生成结果，包含统计信息
     """
     logger.info(f"Celery任务开始: generate_prompts (chapter_id={chapter_id})")
-    result = run_async_task(prompt_service.generate_prompts_batch(chapter_id, api_key_id, style, model, custom_prompt))
+    result = run_async_task(run_exclusive(
+        "generate_prompts",
+        chapter_id,
+        self.request.id,
+        prompt_service.generate_prompts_batch(
+            chapter_id, api_key_id, style, model, custom_prompt, progress=ProgressTracker(self.request.id)
+        ),
+    ))
     logger.info(f"Celery任务成功: generate_prompts (chapter_id={chapter_id})")
     return result
 
@@ -212,11 +380,51 @@ def generate_prompts_by_ids(self, sentence_ids: List[str], api_key_id: str, styl
         Dict[str, Any]: 生成结果
     """
     logger.info(f"Celery任务开始: generate_prompts_by_ids (sentence_ids={sentence_ids})")
-    result = run_async_task(prompt_service.generate_prompts_by_ids(sentence_ids, api_key_id, style, model, custom_prompt))
+    result = run_async_task(run_exclusive(
+        "generate_prompts_by_ids",
+        batch_resource_id(sentence_ids),
+        self.request.id,
+        prompt_service.generate_prompts_by_ids(
+            sentence_ids, api_key_id, style, model, custom_prompt, progress=ProgressTracker(self.request.id)
+        ),
+    ))
     logger.info(f"Celery任务成功: generate_prompts_by_ids (chapter_id={sentence_ids})")
     return result
 
 
+def dispatch_generation_batch(batch_id: str, chunk_indexes: List[int]):
+    """
+    构造批量生成的 chord：每个分片一个子任务，全部完成后汇总
+
+    Args:
+        batch_id: 批次ID（即编排任务的任务ID）
+        chunk_indexes: 需要执行的分片序号
+
+    Returns:
+        Celery 签名（编排任务用 self.replace 替换为该签名，重试失败时直接 apply_async）
+    """
+    return chord(
+        [generation_chunk.si(batch_id, chunk_index) for chunk_index in chunk_indexes],
+        finalize_generation_batch.si(batch_id),
+    )
+
+
+def _start_generation_batch(task, kind: GenerationKind, api_key_id: str, sentences_ids: List[str], params: Dict[str, Any]):
+    """创建批次并把编排任务替换为分片 chord；分片全部完成后 chord 回调的结果即本任务结果"""
+    operation = task.name.split(".", 1)[1]
+    batch_id = task.request.id
+    chunk_indexes = run_async_task(prepare_generation_batch(
+        operation, batch_id, kind, api_key_id, sentences_ids, params, batch_resource_id(sentences_ids)
+    ))
+    if chunk_indexes is None:
+        return {"skipped": True, "reason": "duplicate"}
+    if not chunk_indexes:
+        return run_async_task(complete_generation_batch(batch_id))
+
+    logger.info(f"{operation} 批次 {batch_id} 拆分为 {len(chunk_indexes)} 个分片")
+    raise task.replace(dispatch_generation_batch(batch_id, chunk_indexes))
+
+
 @celery_app.task(
     bind=True,
     max_retries=1,
@@ -229,7 +437,7 @@ def generate_images(self, api_key_id: str, sentences_ids: list[str], model: str
     """
     为章节或指定句子批量生成图片的 Celery 任务
 
-    该任务仅负责调用服务层的图片生成逻辑，不包含业务逻辑。
+    按 GENERATION_CHUNK_SIZE 拆分为分片子任务执行，见 src.services.generation_batch。
 
     Args:
         api_key_id: API密钥ID
@@ -239,12 +447,8 @@ def generate_images(self, api_key_id: str, sentences_ids: list[str], model: str
     Returns:
         Dict[str, Any]: 生成结果，包含统计信息
     """
-
     logger.info(f"Celery任务开始: generate_images (sentences_ids={sentences_ids})")
-
-    result = run_async_task(image_service.generate_images(api_key_id, sentences_ids, model))
-    logger.info(f"Celery任务成功: generate_images (sentences_ids={sentences_ids})")
-    return result
+    return _start_generation_batch(self, GenerationKind.IMAGE, api_key_id, sentences_ids, {"model": model})
 
 
 @celery_app.task(
@@ -259,7 +463,7 @@ def generate_audio(self, api_key_id: str, sentences_ids: list[str], voice: str =
     """
     为章节或指定句子批量生成音频的 Celery 任务
 
-    该任务仅负责调用服务层的音频生成逻辑，不包含业务逻辑。
+    按 GENERATION_CHUNK_SIZE 拆分为分片子任务执行，见 src.services.generation_batch。
 
     Args:
         api_key_id: API密钥ID
@@ -270,14 +474,171 @@ def generate_audio(self, api_key_id: str, sentences_ids: list[str], voice: str =
     Returns:
         Dict[str, Any]: 生成结果，包含统计信息
     """
-    from src.services.audio import audio_service
-
     logger.info(f"Celery任务开始: generate_audio (sentences_ids={sentences_ids})")
+    return _start_generation_batch(
+        self, GenerationKind.AUDIO, api_key_id, sentences_ids, {"voice": voice, "model": model}
+    )
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=2,
+    retry_backoff=True,
+    retry_jitter=True,
+    name="generate.generation_chunk"
+)
+def generation_chunk(self, batch_id: str, chunk_index: int) -> Dict[str, Any]:
+    """
+    执行批量生成的一个分片
+
+    单个句子的失败在分片内重试；分片整体异常（数据库、存储不可用等）时重试子任务，
+    重试耗尽后把分片内未成功的句子标记为失败并正常返回，保证 chord 回调照常汇总。
+
+    Args:
+        batch_id: 批次ID
+        chunk_index: 分片序号
+
+    Returns:
+        Dict[str, Any]: 分片统计
+    """
+    try:
+        return run_async_task(run_generation_chunk(batch_id, chunk_index))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        logger.error(f"生成批次 {batch_id} 分片 {chunk_index} 重试耗尽: {e}", exc_info=True)
+        run_async_task(fail_generation_chunk(batch_id, chunk_index, f"{type(e).__name__}: {e}"))
+        return {"chunk": chunk_index, "error": str(e)}
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=3,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_jitter=True,
+    name="generate.finalize_generation_batch"
+)
+def finalize_generation_batch(self, batch_id: str) -> Dict[str, Any]:
+    """
+    批量生成的 chord 回调：汇总分片结果并释放任务锁
+
+    Args:
+        batch_id: 批次ID
+
+    Returns:
+        Dict[str, Any]: 生成结果，包含统计信息
+    """
+    result = run_async_task(complete_generation_batch(batch_id))
+    logger.info(f"Celery任务成功: finalize_generation_batch (batch_id={batch_id}, result={result})")
+    return result
+
+def build_pipeline_canvas(pipeline_id: str, image_batch_id: str, audio_batch_id: str, plan: Dict[str, List[int]]):
+    """
+    构造章节流水线的 canvas
+
+    音频分片与“提示词分片 → 图片分片”链并行执行（按句子分片建立依赖，
+    某个分片的提示词完成后立即生成该分片图片），全部完成后汇总素材节点，
+    素材节点成功时视频合成进入渲染公平调度（见 pipeline_media_done）。
+
+    Args:
+        pipeline_id: 流水线ID
+        image_batch_id: 图片生成批次ID
+        audio_batch_id: 音频生成批次ID
+        plan: 待执行的分片 {audio_chunks, image_chunks}（见 ChapterPipelineService.plan）
+
+    Returns:
+        Celery 签名
+    """
+    header = [generation_chunk.si(audio_batch_id, chunk_index) for chunk_index in plan["audio_chunks"]]
+    header += [
+        chain(pipeline_prompts_chunk.si(pipeline_id, chunk_index), generation_chunk.si(image_batch_id, chunk_index))
+        for chunk_index in plan["image_chunks"]
+    ]
+    tail = pipeline_media_done.si(pipeline_id)
+    return chord(header, tail) if header else tail
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=2,
+    retry_backoff=True,
+    retry_jitter=True,
+    name="generate.pipeline_prompts_chunk"
+)
+def pipeline_prompts_chunk(self, pipeline_id: str, chunk_index: int) -> Dict[str, Any]:
+    """
+    章节流水线：为一个图片分片生成提示词
+
+    重试耗尽后把对应图片分片标记为失败并正常返回，保证后续图片分片和 chord 回调照常执行。
+
+    Args:
+        pipeline_id: 流水线ID
+        chunk_index: 分片序号
+
+    Returns:
+        Dict[str, Any]: 分片统计
+    """
+    try:
+        return run_async_task(run_pipeline_prompts_chunk(pipeline_id, chunk_index))
+    except Exception as e:
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
+        logger.error(f"流水线 {pipeline_id} 提示词分片 {chunk_index} 重试耗尽: {e}", exc_info=True)
+        run_async_task(fail_pipeline_prompts_chunk(pipeline_id, chunk_index, f"{type(e).__name__}: {e}"))
+        return {"chunk": chunk_index, "error": str(e)}
+
+
+@celery_app.task(
+    bind=True,
+    max_retries=3,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_jitter=True,
+    name="generate.pipeline_media_done"
+)
+def pipeline_media_done(self, pipeline_id: str) -> Dict[str, Any]:
+    """
+    章节流水线的 chord 回调：汇总图片、音频批次，更新素材节点状态，
+    素材节点成功时把视频合成（pipeline_synthesize_video）加入渲染公平调度
 
-    result = run_async_task(audio_service.generate_audio(api_key_id, sentences_ids, voice, model))
-    logger.info(f"Celery任务成功: generate_audio (sentences_ids={sentences_ids})")
+    Args:
+        pipeline_id: 流水线ID
+
+    Returns:
+        Dict[str, Any]: 素材节点统计（video 为视频合成的调度信息）
+    """
+    result = run_async_task(complete_pipeline_media(pipeline_id))
+    if result["status"] == PipelineStatus.RUNNING.value:
+        result["video"] = run_async_task(
+            queue_pipeline_video(pipeline_id, pipeline_synthesize_video, celery_app.send_task)
+        )
+    logger.info(f"Celery任务成功: pipeline_media_done (pipeline_id={pipeline_id}, status={result['status']})")
     return result
 
+
+@celery_app.task(
+    bind=True,
+    name="generate.pipeline_synthesize_video",
+    time_limit=3600,  # 1小时硬超时
+    soft_time_limit=3300  # 55分钟软超时
+)
+def pipeline_synthesize_video(self, pipeline_id: str) -> Dict[str, Any]:
+    """
+    章节流水线：合成视频（由渲染调度投递，占用一个 render 槽位；流水线已结束时跳过；
+    失败记录在流水线上，可从该节点继续）
+
+    Args:
+        pipeline_id: 流水线ID
+
+    Returns:
+        Dict[str, Any]: 流水线结果
+    """
+    result = run_async_task(run_pipeline_video(pipeline_id))
+    logger.info(f"Celery任务结束: pipeline_synthesize_video (pipeline_id={pipeline_id}, status={result['status']})")
+    return result
+
+
 @celery_app.task(
     bind=True,
     max_retries=1,
@@ -288,7 +649,7 @@ def generate_audio(self, api_key_id: str, sentences_ids: list[str], voice: str =
     time_limit=3600,  # 1小时硬超时
     soft_time_limit=3300  # 55分钟软超时
 )
-def synthesize_video(self, video_task_id: str):
+def synthesize_video(self, video_task_id: str, chapter_id: Optional[str] = None):
     """
     视频合成的 Celery 任务
 
@@ -296,6 +657,7 @@ def synthesize_video(self, video_task_id: str):
 
     Args:
         video_task_id: 视频任务ID
+        chapter_id: 章节ID（持有章节的视频合成锁；旧版本投递的消息没有该参数，不加锁执行）
 
     Returns:
         Dict[str, Any]: 合成结果，包含统计信息
@@ -303,11 +665,170 @@ def synthesize_video(self, video_task_id: str):
     from src.services.video_synthesis import video_synthesis_service
 
     logger.info(f"Celery任务开始: synthesize_video (video_task_id={video_task_id})")
-    result = run_async_task(video_synthesis_service.synthesize_video(video_task_id))
+    coro = video_synthesis_service.synthesize_video(video_task_id)
+    if chapter_id:
+        coro = run_exclusive("synthesize_video", chapter_id, video_task_id, coro)
+    result = run_async_task(coro)
     logger.info(f"Celery任务成功: synthesize_video (video_task_id={video_task_id})")
     return result
 
 
+@celery_app.task(
+    bind=True,
+    name="maintenance.storage_gc",
+    time_limit=6 * 3600,
+    soft_time_limit=6 * 3600 - 300
+)
+def storage_gc(
+    self,
+    dry_run: bool = True,
+    prefixes: List[str] = None,
+    grace_hours: int = None,
+    max_deletes_per_second: int = None
+) -> Dict[str, Any]:
+    """
+    存储垃圾回收（标记-清除）的 Celery 任务
+
+    Args:
+        dry_run: 试运行，只生成报告不删除
+        prefixes: 参与回收的前缀
+        grace_hours: 宽限期（小时）
+        max_deletes_per_second: 删除速率上限
+
+    Returns:
+        Dict[str, Any]: 回收报告
+    """
+    from src.services.storage_gc import run_storage_gc
+
+    logger.info(f"Celery任务开始: storage_gc (dry_run={dry_run})")
+    result = run_async_task(run_storage_gc(dry_run, prefixes, grace_hours, max_deletes_per_second))
+    logger.info(f"Celery任务成功: storage_gc (dry_run={dry_run})")
+    return result
+
+
+@celery_app.task(
+    bind=True,
+    name="maintenance.migrate_storage",
+    time_limit=24 * 3600,
+    soft_time_limit=24 * 3600 - 300
+)
+def migrate_storage(self, migration_id: str) -> Dict[str, Any]:
+    """
+    存储源迁移的 Celery 任务（中断后重新投递会从断点继续）
+
+    Args:
+        migration_id: 迁移记录ID
+
+    Returns:
+        Dict[str, Any]: 迁移记录
+    """
+    from src.services.storage_migration import run_storage_migration
+
+    logger.info(f"Celery任务开始: migrate_storage (migration_id={migration_id})")
+    result = run_async_task(run_storage_migration(migration_id))
+    logger.info(f"Celery任务结束: migrate_storage (migration_id={migration_id}, status={result['status']})")
+    return result
+
+
+@celery_app.task(
+    bind=True,
+    name="file_processing.validate_direct_upload",
+    time_limit=1800,
+    soft_time_limit=1700
+)
+def validate_direct_upload(self, upload_id: str) -> Dict[str, Any]:
+    """
+    校验直传到对象存储的文件（大小、文件头、编码/格式、SHA-256），
+    通过后登记文件，项目文件创建项目并投递 process_uploaded_file
+
+    Args:
+        upload_id: 上传会话ID
+
+    Returns:
+        Dict[str, Any]: 会话信息
+    """
+    from src.services.resumable_upload import ResumableUploadService
+
+    logger.info(f"Celery任务开始: validate_direct_upload (upload_id={upload_id})")
+    result = run_async_task(ResumableUploadService().validate_direct_upload(upload_id))
+    logger.info(f"Celery任务结束: validate_direct_upload (upload_id={upload_id}, status={result['status']})")
+    return result
+
+
+@celery_app.task(
+    bind=True,
+    name="maintenance.expire_upload_sessions",
+    track=False
+)
+def expire_upload_sessions(self) -> Dict[str, Any]:
+    """
+    中止已过期断点续传会话遗留的未完成分片上传
+
+    Returns:
+        Dict[str, Any]: {"aborted": 中止数量}
+    """
+    from src.services.resumable_upload import ResumableUploadService
+
+    aborted = run_async_task(ResumableUploadService().expire_stale_uploads())
+    logger.info(f"Celery任务成功: expire_upload_sessions (aborted={aborted})")
+    return {"aborted": aborted}
+
+
+@celery_app.task(
+    bind=True,
+    name="maintenance.release_waiting_tasks",
+    track=False
+)
+def release_waiting_tasks(self) -> Dict[str, int]:
+    """
+    按用户轮转放行准入等待列表中的任务（见 src.core.admission；任务结束时已即时放行，此处兜底）
+
+    Returns:
+        Dict[str, int]: {队列名: 放行数量}
+    """
+    # 同一时刻只有一个放行者（release_waiting 内部加锁），避免重复投递同一个等待任务
+    result = run_async_task(release_waiting(celery_app.send_task))
+    logger.info(f"Celery任务成功: release_waiting_tasks ({result})")
+    return result
+
+
+@celery_app.task(
+    bind=True,
+    name="maintenance.dispatch_render_jobs",
+    track=False
+)
+def dispatch_render_jobs(self) -> Dict[str, int]:
+    """
+    按公平调度投递排队中的视频合成任务（见 src.core.render_scheduler；槽位释放时已即时调度，此处兜底）
+
+    Returns:
+        Dict[str, int]: {"dispatched": 投递数量}
+    """
+    dispatched = run_async_task(dispatch_ready(celery_app.send_task))
+    if dispatched:
+        logger.info(f"Celery任务成功: dispatch_render_jobs (dispatched={dispatched})")
+    return {"dispatched": dispatched}
+
+
+@celery_app.task(
+    bind=True,
+    name="maintenance.purge_task_runs",
+    track=False
+)
+def purge_task_runs(self) -> Dict[str, int]:
+    """
+    删除超过保留期（TASK_RUN_RETENTION_DAYS）的任务执行记录
+
+    Returns:
+        Dict[str, int]: {"removed": 删除数量}
+    """
+    from src.services.task_run import purge_task_runs as purge
+
+    removed = run_async_task(purge())
+    logger.info(f"Celery任务成功: purge_task_runs (removed={removed})")
+    return {"removed": removed}
+
+
 # ---------------------------
 # 导出的任务列表
 # ---------------------------
@@ -321,4 +842,11 @@ __all__ = [
     'generate_images',
     'generate_audio',
     'synthesize_video',  # 新增
+    'storage_gc',
+    'migrate_storage',
+    'validate_direct_upload',
+    'expire_upload_sessions',
+    'release_waiting_tasks',
+    'dispatch_render_jobs',
+    'purge_task_runs',
 ]
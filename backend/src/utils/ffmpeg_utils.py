@@ -2,10 +2,13 @@
 FFmpeg工具函数 - 视频处理相关的FFmpeg操作
 """
 
+import os
+import signal
 import subprocess
 from pathlib import Path
 from typing import List, Optional, Tuple
 
+from src.core.cancellation import current_scope
 from src.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -99,6 +102,9 @@ def run_ffmpeg_command(command: List[str], timeout: int = 300) -> Tuple[bool, st
     """
     执行FFmpeg命令
 
+    FFmpeg 在独立的进程组中运行：超时或任务取消（见 src.core.cancellation）时终止整个进程组。
+    阻塞直到命令结束，异步代码中应通过 asyncio.to_thread 调用。
+
     Args:
         command: FFmpeg命令列表
         timeout: 超时时间（秒），默认300秒
@@ -106,24 +112,39 @@ def run_ffmpeg_command(command: List[str], timeout: int = 300) -> Tuple[bool, st
     Returns:
         (是否成功, 标准输出, 标准错误)
     """
+    scope = current_scope()
     try:
         logger.info(f"执行FFmpeg命令: {' '.join(command)}")
 
-        result = subprocess.run(
+        process = subprocess.Popen(
             command,
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
-            timeout=timeout
+            start_new_session=True
         )
-
-        success = result.returncode == 0
+        if scope is not None:
+            scope.register_process(process)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.communicate()
+            raise
+        finally:
+            if scope is not None:
+                scope.unregister_process(process)
+
+        success = process.returncode == 0
 
         if success:
             logger.info("FFmpeg命令执行成功")
+        elif scope is not None and scope.requested:
+            logger.info("FFmpeg命令已因任务取消而终止")
         else:
-            logger.error(f"FFmpeg命令执行失败: {result.stderr}")
+            logger.error(f"FFmpeg命令执行失败: {stderr}")
 
-        return success, result.stdout, result.stderr
+        return success, stdout, stderr
 
     except subprocess.TimeoutExpired:
         error_msg = f"FFmpeg命令执行超时（{timeout}秒）"
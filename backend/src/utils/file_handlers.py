@@ -5,6 +5,7 @@
 
 import hashlib
 import tempfile
+import zipfile
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 
@@ -13,6 +14,7 @@ import magic
 from fastapi import UploadFile
 
 from src.core.logging import get_logger
+from src.utils.encoding_detector import FileEncodingDetector
 
 logger = get_logger(__name__)
 
@@ -140,38 +142,30 @@ class FileHandler:
         return cls.SUPPORTED_MIME_TYPES.get(mime_type)
 
     @classmethod
-    async def validate_file(cls, file: UploadFile) -> Tuple[str, Dict[str, Any]]:
+    def validate_declared_file(cls, filename: str, file_size: int) -> Tuple[str, Dict[str, Any]]:
         """
-        验证上传的文件 - 整合了安全检查和类型验证
-
-        Args:
-            file: 上传的文件
+        按文件名和大小验证文件（不读取内容，断点续传在接收数据前调用）
 
         Returns:
-            Tuple[文件类型, 文件信息]
+            Tuple[按扩展名推断的文件类型, 文件类型配置]
 
         Raises:
             FileProcessingError: 文件验证失败
         """
-        if not file.filename:
+        if not filename:
             raise FileProcessingError("文件名不能为空")
 
         # 验证文件名安全性
-        if not cls.validate_filename(file.filename):
+        if not cls.validate_filename(filename):
             raise FileProcessingError("文件名包含非法字符或不符合规范")
 
-        # 检查文件大小
-        file.file.seek(0, 2)  # 移动到文件末尾
-        file_size = file.file.tell()
-        file.file.seek(0)  # 重置到文件开头
-
         if file_size == 0:
             raise FileProcessingError("文件不能为空")
 
         # 从扩展名推断文件类型
-        file_type_ext = cls.get_file_type_from_extension(file.filename)
+        file_type_ext = cls.get_file_type_from_extension(filename)
         if not file_type_ext:
-            raise FileProcessingError(f"不支持的文件扩展名: {Path(file.filename).suffix}")
+            raise FileProcessingError(f"不支持的文件扩展名: {Path(filename).suffix}")
 
         # 检查文件类型大小限制
         file_config = cls.FILE_TYPE_CONFIG.get(file_type_ext)
@@ -181,13 +175,27 @@ class FileHandler:
                 f"文件大小超过{file_config['description']}限制，最大允许 {max_size_mb}MB"
             )
 
-        # 读取文件开头用于MIME类型检测
-        file_content = file.file.read(1024)
-        file.file.seek(0)  # 重置到文件开头
+        return file_type_ext, file_config
 
+    @classmethod
+    def validate_file_head(cls, filename: str, file_type_ext: str, head: bytes) -> Tuple[str, Optional[str]]:
+        """
+        根据文件开头的内容检测MIME类型并做安全检查
+
+        Args:
+            filename: 文件名
+            file_type_ext: 按扩展名推断的文件类型
+            head: 文件开头的字节（至少1024字节，文件更小时为全部内容）
+
+        Returns:
+            Tuple[最终文件类型, 检测到的MIME类型]
+
+        Raises:
+            FileProcessingError: 文件验证失败
+        """
         # 检测MIME类型
         try:
-            mime_type = magic.from_buffer(file_content, mime=True)
+            mime_type = magic.from_buffer(head[:1024], mime=True)
             file_type_mime = cls.get_file_type_from_mime(mime_type)
         except Exception as e:
             logger.warning(f"MIME类型检测失败: {e}")
@@ -195,7 +203,7 @@ class FileHandler:
             file_type_mime = None
 
         # 安全检查
-        security_error = cls.validate_file_security(file.filename, mime_type)
+        security_error = cls.validate_file_security(filename, mime_type)
         if security_error:
             raise FileProcessingError(security_error)
 
@@ -204,11 +212,71 @@ class FileHandler:
             logger.warning(f"文件类型不匹配: 扩展名={file_type_ext}, MIME={file_type_mime or mime_type}")
             # 以MIME类型为准，如果支持的话
             if file_type_mime in cls.SUPPORTED_EXTENSIONS.values():
-                file_type = file_type_mime
-            else:
-                raise FileProcessingError(f"不支持的文件类型: {mime_type}")
-        else:
-            file_type = file_type_ext
+                return file_type_mime, mime_type
+            raise FileProcessingError(f"不支持的文件类型: {mime_type}")
+
+        return file_type_ext, mime_type
+
+    @classmethod
+    def verify_file_format(cls, file_path: str, file_type: str) -> None:
+        """
+        校验本地文件的编码/容器格式（用于未经本服务接收的直传文件）
+
+        - txt / md: 能识别出文本编码
+        - docx: 有效的ZIP且包含 word/document.xml
+        - epub: 有效的ZIP，mimetype 为 application/epub+zip 且包含 META-INF/container.xml
+
+        Raises:
+            FileProcessingError: 格式无效
+        """
+        if file_type in ('txt', 'md'):
+            with open(file_path, 'rb') as f:
+                sample = f.read(64 * 1024)
+            if not FileEncodingDetector().detect_encoding(sample):
+                raise FileProcessingError("无法识别文本文件编码")
+            return
+
+        if file_type in ('docx', 'epub'):
+            if not zipfile.is_zipfile(file_path):
+                raise FileProcessingError(f"{file_type} 文件已损坏或格式无效")
+            try:
+                with zipfile.ZipFile(file_path) as archive:
+                    names = set(archive.namelist())
+                    if file_type == 'docx' and 'word/document.xml' not in names:
+                        raise FileProcessingError("docx 文件缺少正文内容")
+                    if file_type == 'epub':
+                        mimetype = archive.read('mimetype').strip() if 'mimetype' in names else b''
+                        if mimetype != b'application/epub+zip' or 'META-INF/container.xml' not in names:
+                            raise FileProcessingError("epub 文件结构无效")
+            except zipfile.BadZipFile:
+                raise FileProcessingError(f"{file_type} 文件已损坏或格式无效")
+
+    @classmethod
+    async def validate_file(cls, file: UploadFile) -> Tuple[str, Dict[str, Any]]:
+        """
+        验证上传的文件 - 整合了安全检查和类型验证
+
+        Args:
+            file: 上传的文件
+
+        Returns:
+            Tuple[文件类型, 文件信息]
+
+        Raises:
+            FileProcessingError: 文件验证失败
+        """
+        # 检查文件大小
+        file.file.seek(0, 2)  # 移动到文件末尾
+        file_size = file.file.tell()
+        file.file.seek(0)  # 重置到文件开头
+
+        file_type_ext, file_config = cls.validate_declared_file(file.filename, file_size)
+
+        # 读取文件开头用于MIME类型检测
+        file_content = file.file.read(1024)
+        file.file.seek(0)  # 重置到文件开头
+
+        file_type, mime_type = cls.validate_file_head(file.filename, file_type_ext, file_content)
 
         # 计算文件哈希
         file_hash = await cls.calculate_file_hash(file)
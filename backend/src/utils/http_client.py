@@ -0,0 +1,243 @@
+"""
+资源下载HTTP客户端
+
+按事件循环缓存一个带连接池的 aiohttp 会话（与Redis客户端相同，连接不能跨事件循环复用），
+同一提供商的多次下载复用TCP/TLS连接。
+
+download_to_storage 把远程资源边下载边上传到对象存储：网络数据按块读取，
+再按分片上传，单个资源的内存占用只与分片大小相关，不再整体缓冲。
+"""
+
+import asyncio
+import mimetypes
+import random
+import uuid
+import weakref
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+from src.core.config import settings
+from src.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = weakref.WeakKeyDictionary()
+
+# 可重试的HTTP状态码
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+# 暂存前缀（内容寻址提交前的临时对象，由存储GC兜底清理）
+ASSET_STAGING_PREFIX = "resumable/assets/"
+
+# 文件头魔数 -> Content-Type
+_MAGIC_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"ID3", "audio/mpeg"),
+    (b"\xff\xfb", "audio/mpeg"),
+    (b"OggS", "audio/ogg"),
+)
+
+_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "audio/mpeg": ".mp3",
+    "audio/wav": ".wav",
+    "audio/ogg": ".ogg",
+}
+
+
+class AssetDownloadError(Exception):
+    """资源下载失败"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """获取当前事件循环的共享HTTP会话"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=settings.ASSET_FETCH_POOL_SIZE,
+                limit_per_host=settings.ASSET_FETCH_POOL_SIZE_PER_HOST,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=settings.ASSET_FETCH_TIMEOUT_SECONDS,
+                sock_connect=10,
+            ),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_http_session() -> None:
+    """关闭当前事件循环的共享HTTP会话（应用关闭或 Celery 任务结束时调用）"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
+
+
+def sniff_content_type(head: bytes, declared: Optional[str] = None) -> str:
+    """
+    根据文件头识别Content-Type，无法识别时使用响应头声明的类型
+
+    提供商返回的 Content-Type 常为 application/octet-stream 或与实际格式不符，以文件头为准。
+    """
+    for magic, content_type in _MAGIC_TYPES:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    declared = (declared or "").split(";")[0].strip().lower()
+    return declared or "application/octet-stream"
+
+
+def extension_for(content_type: str) -> str:
+    """Content-Type 对应的扩展名"""
+    return _EXTENSIONS.get(content_type) or mimetypes.guess_extension(content_type) or ""
+
+
+async def _body_chunks(
+    first: bytes,
+    response: aiohttp.ClientResponse,
+    chunk_size: int,
+    max_bytes: int,
+) -> AsyncIterator[bytes]:
+    """逐块产出响应体，超过大小上限时中止"""
+    received = len(first)
+    yield first
+    async for chunk in response.content.iter_chunked(chunk_size):
+        received += len(chunk)
+        if received > max_bytes:
+            raise AssetDownloadError(f"资源超过大小上限 {max_bytes} 字节")
+        yield chunk
+
+
+async def _download_once(
+    url: str,
+    storage,
+    user_id: str,
+    kind: Optional[str],
+    dedup: bool,
+    max_bytes: int,
+    chunk_size: int,
+) -> Dict[str, Any]:
+    """下载一次并流式上传"""
+    async with get_http_session().get(url) as response:
+        if response.status != 200:
+            raise AssetDownloadError(
+                f"下载失败: HTTP {response.status}",
+                retryable=response.status in _RETRYABLE_STATUS,
+            )
+        if response.content_length and response.content_length > max_bytes:
+            raise AssetDownloadError(f"资源超过大小上限 {max_bytes} 字节（{response.content_length}）")
+
+        # 读取首块用于识别类型
+        first = await response.content.read(chunk_size)
+        if not first:
+            raise AssetDownloadError("下载内容为空", retryable=True)
+        content_type = sniff_content_type(first, response.headers.get("Content-Type"))
+        filename = f"{uuid.uuid4()}{extension_for(content_type)}"
+
+        dedup = dedup and settings.STORAGE_DEDUP_ENABLED
+        object_key = f"{ASSET_STAGING_PREFIX}{filename}" if dedup else None
+        result = await storage.upload_stream(
+            user_id,
+            _body_chunks(first, response, chunk_size, max_bytes),
+            filename,
+            object_key=object_key,
+            content_type=content_type,
+            metadata={"source": "download"},
+            concurrency=1,
+            kind=kind,
+            catalog=not dedup,
+        )
+
+    if dedup:
+        result = await storage.commit_staged_object(
+            result["object_key"],
+            user_id=user_id,
+            size=result["size"],
+            sha256=result["sha256"],
+            content_type=content_type,
+            kind=kind,
+            dedup=True,
+        )
+    result["content_type"] = content_type
+    return result
+
+
+async def download_to_storage(
+    url: str,
+    storage,
+    user_id: str,
+    kind: Optional[str] = None,
+    dedup: bool = False,
+    max_bytes: Optional[int] = None,
+    max_retries: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    下载远程资源并流式上传到对象存储
+
+    连接错误、超时和 408/429/5xx 按指数退避重试；其余错误（4xx、超过大小上限）直接失败。
+    每次重试都从头下载，失败的分片上传由存储客户端中止。
+
+    Args:
+        url: 资源URL
+        storage: S3Storage 实例
+        user_id: 用户ID
+        kind: 对象类型（写入对象目录）
+        dedup: 是否按内容寻址存放（先上传到暂存键，哈希确定后提交）
+        max_bytes: 大小上限（默认 ASSET_FETCH_MAX_BYTES）
+        max_retries: 最大重试次数（默认 ASSET_FETCH_MAX_RETRIES）
+
+    Returns:
+        与 upload_file 相同结构的上传结果，另含识别出的 content_type
+
+    Raises:
+        AssetDownloadError: 下载失败或超过大小上限
+    """
+    max_bytes = max_bytes or settings.ASSET_FETCH_MAX_BYTES
+    max_retries = settings.ASSET_FETCH_MAX_RETRIES if max_retries is None else max_retries
+    chunk_size = settings.ASSET_FETCH_CHUNK_SIZE
+
+    delay = 1.0
+    for attempt in range(max_retries + 1):
+        try:
+            return await _download_once(url, storage, user_id, kind, dedup, max_bytes, chunk_size)
+        except AssetDownloadError as e:
+            if not e.retryable or attempt == max_retries:
+                raise
+            error = e
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == max_retries:
+                raise AssetDownloadError(f"下载失败: {e!r}") from e
+            error = e
+
+        sleep_time = delay + random.random() * 0.5
+        logger.warning(f"[Download] {error}，{sleep_time:.2f} 秒后重试 attempt={attempt + 1}/{max_retries} url={url}")
+        await asyncio.sleep(sleep_time)
+        delay = min(delay * 2, 20)
+
+
+__all__ = [
+    "AssetDownloadError",
+    "ASSET_STAGING_PREFIX",
+    "get_http_session",
+    "close_http_session",
+    "sniff_content_type",
+    "extension_for",
+    "download_to_storage",
+]
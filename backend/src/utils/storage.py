@@ -1,13 +1,24 @@
 """
 S3兼容对象存储客户端 - 支持动态配置
 支持: AWS S3, MinIO, 阿里云OSS, 腾讯云COS, 华为云OBS等
+
+boto3 是同步库，所有网络调用都通过有界的存储I/O线程池执行，避免阻塞事件循环。
 """
 
+import asyncio
+import functools
+import hashlib
 import json
+import mimetypes
+import threading
+import time
+import urllib.parse
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Set, Tuple, TypeVar
 
 import boto3
 from botocore.config import Config
@@ -19,6 +30,51 @@ from src.core.logging import get_logger
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+# 存储I/O线程池（延迟创建，进程内共享）
+_storage_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_storage_executor() -> ThreadPoolExecutor:
+    """获取存储I/O线程池"""
+    global _storage_executor
+    if _storage_executor is None:
+        _storage_executor = ThreadPoolExecutor(
+            max_workers=settings.STORAGE_IO_MAX_WORKERS,
+            thread_name_prefix="storage-io",
+        )
+    return _storage_executor
+
+
+async def run_in_storage_executor(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    在存储I/O线程池中执行阻塞调用
+
+    Args:
+        func: 同步函数（通常是boto3客户端方法）
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        函数返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_storage_executor(),
+        functools.partial(func, *args, **kwargs),
+    )
+
+
+def _as_uuid(value: Any) -> Optional[uuid.UUID]:
+    """转换为UUID，无法转换时返回None（如系统任务使用的非UUID用户标识）"""
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
 
 class StorageError(Exception):
     """存储异常"""
@@ -57,6 +113,19 @@ class StorageConfig:
             secure=data.get("secure", False),
         )
 
+    @classmethod
+    def from_source(cls, source) -> "StorageConfig":
+        """从 StorageSource 记录创建配置"""
+        return cls(
+            provider=source.provider,
+            endpoint=source.endpoint,
+            access_key=source.access_key,
+            secret_key=source.secret_key,
+            bucket=source.bucket,
+            region=source.region,
+            secure=source.secure,
+        )
+
     @classmethod
     def from_env(cls) -> "StorageConfig":
         """从环境变量创建配置"""
@@ -81,18 +150,126 @@ class StorageConfig:
             "secure": self.secure,
         }
 
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, StorageConfig):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __hash__(self) -> int:
+        return hash(tuple(self.to_dict().values()))
+
     @property
     def endpoint_url(self) -> str:
         protocol = "https" if self.secure else "http"
         return f"{protocol}://{self.endpoint}"
 
 
+class PresignedUrlCache:
+    """
+    预签名URL缓存（LRU）
+
+    以 (配置代, 对象键, 有效期) 为键缓存已签名的URL，在有效期的前 reuse_ratio 部分内复用，
+    保证返回给调用方的URL至少还有 (1 - reuse_ratio) 的有效期。
+    复用同一个URL既省去重复的HMAC签名，也让浏览器缓存在轮询之间生效。
+    """
+
+    def __init__(self, max_size: int, reuse_ratio: float):
+        self._max_size = max_size
+        self._reuse_ratio = reuse_ratio
+        self._entries: "OrderedDict[Tuple[int, str, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, generation: int, object_key: str, expires_seconds: int) -> Optional[str]:
+        """获取仍可复用的URL"""
+        key = (generation, object_key, expires_seconds)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            url, reuse_until = entry
+            if time.time() >= reuse_until:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return url
+
+    def put(self, generation: int, object_key: str, expires_seconds: int, url: str, signed_at: float) -> None:
+        """缓存新签名的URL"""
+        key = (generation, object_key, expires_seconds)
+        reuse_until = signed_at + expires_seconds * self._reuse_ratio
+        with self._lock:
+            self._entries[key] = (url, reuse_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, object_key: Optional[str] = None) -> None:
+        """使缓存失效，不指定对象键时清空全部"""
+        with self._lock:
+            if object_key is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[1] == object_key]:
+                del self._entries[key]
+
+    def invalidate_many(self, object_keys: Iterable[str]) -> None:
+        """批量使缓存失效（单次遍历）"""
+        keys = set(object_keys)
+        if not keys:
+            return
+        with self._lock:
+            for key in [k for k in self._entries if k[1] in keys]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
 class S3Storage:
-    """S3兼容对象存储客户端"""
+    """
+    S3兼容对象存储客户端
+
+    boto3 客户端是线程安全的，同一配置代（generation）内所有I/O线程共享一个客户端，
+    其连接池大小不小于I/O线程数，并开启TCP keep-alive。
+    存储桶存在性检查结果按配置代缓存，reload_config 切换到不同的配置后失效。
+
+    存储源迁移的过渡期内可设置回退存储（set_fallback）：读取对象时目标不存在则改从回退存储读取；
+    预签名URL按对象实际所在的存储签名。对象所在存储由 resolve_signing_sources 在存储线程池中确认并缓存，
+    签名本身不发起网络请求。
+    """
 
     def __init__(self, config: Optional[StorageConfig] = None):
         self._config = config or StorageConfig.from_env()
         self._client = None
+        self._client_lock = threading.Lock()
+        # 配置代，每次切换配置时递增
+        self._generation = 0
+        self._bucket_checked_generation: Optional[int] = None
+        self._stats = {
+            "clients_created": 0,
+            "requests": 0,
+            "in_flight": 0,
+            "peak_in_flight": 0,
+            "bucket_checks": 0,
+            "bucket_check_cache_hits": 0,
+        }
+        self._presign_cache = PresignedUrlCache(
+            max_size=settings.STORAGE_PRESIGN_CACHE_SIZE,
+            reuse_ratio=settings.STORAGE_PRESIGN_REUSE_RATIO,
+        )
+        # 迁移过渡期的读取回退存储
+        self._fallback: Optional["S3Storage"] = None
+        # 过渡期内对象所在存储 {对象键: 是否在当前存储}，切换配置或回退存储时清空
+        self._signing_sources: "OrderedDict[str, bool]" = OrderedDict()
+        self._signing_checks: Set[str] = set()
+        self._signing_lock = threading.Lock()
 
     @property
     def config(self) -> StorageConfig:
@@ -100,41 +277,120 @@ class S3Storage:
 
     @config.setter
     def config(self, value: StorageConfig):
-        self._config = value
-        self._client = None  # 重置客户端
+        self.reload_config(value)
+
+    @property
+    def max_pool_connections(self) -> int:
+        """客户端连接池大小"""
+        return max(settings.STORAGE_MAX_POOL_CONNECTIONS, settings.STORAGE_IO_MAX_WORKERS)
 
     @property
     def client(self):
         if self._client is None:
-            self._client = boto3.client(
-                "s3",
-                endpoint_url=self._config.endpoint_url,
-                aws_access_key_id=self._config.access_key,
-                aws_secret_access_key=self._config.secret_key,
-                region_name=self._config.region,
-                config=Config(signature_version="s3v4"),
-            )
+            with self._client_lock:
+                if self._client is None:
+                    self._client = boto3.client(
+                        "s3",
+                        endpoint_url=self._config.endpoint_url,
+                        aws_access_key_id=self._config.access_key,
+                        aws_secret_access_key=self._config.secret_key,
+                        region_name=self._config.region,
+                        config=Config(
+                            signature_version="s3v4",
+                            max_pool_connections=self.max_pool_connections,
+                            tcp_keepalive=settings.STORAGE_TCP_KEEPALIVE,
+                        ),
+                    )
+                    self._stats["clients_created"] += 1
         return self._client
 
     @property
     def bucket_name(self) -> str:
         return self._config.bucket
 
+    async def _run_call(self, func: Callable[[], T]) -> T:
+        """在线程池中执行阻塞调用，并记录连接池使用统计"""
+        stats = self._stats
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        stats["peak_in_flight"] = max(stats["peak_in_flight"], stats["in_flight"])
+        try:
+            return await run_in_storage_executor(func)
+        finally:
+            stats["in_flight"] -= 1
+
+    async def _run(self, method: str, **kwargs) -> Any:
+        """在线程池中调用boto3客户端方法"""
+        return await self._run_call(lambda: getattr(self.client, method)(**kwargs))
+
     def reload_config(self, config: StorageConfig):
-        """重新加载配置"""
-        self._config = config
-        self._client = None
+        """
+        重新加载配置
+
+        配置与当前相同时不做任何改动（Worker 定期从数据库刷新配置，不应丢弃客户端和各项缓存）。
+        """
+        if config == self._config:
+            return
+        with self._client_lock:
+            self._config = config
+            self._client = None
+            self._generation += 1
+        self._presign_cache.invalidate()
+        self._forget_signing_sources()
         logger.info(f"存储配置已更新: provider={config.provider}, endpoint={config.endpoint}")
 
+    @property
+    def fallback(self) -> Optional["S3Storage"]:
+        return self._fallback
+
+    def set_fallback(self, fallback: Optional["S3Storage"]) -> None:
+        """设置读取回退存储（None 表示关闭）"""
+        self._fallback = fallback
+        # 缓存中可能有按回退存储签名的URL
+        self._presign_cache.invalidate()
+        self._forget_signing_sources()
+        if fallback is not None:
+            logger.info(f"已启用读取回退: {fallback.config.endpoint}/{fallback.bucket_name}")
+
+    @staticmethod
+    def _is_not_found(error: ClientError) -> bool:
+        """是否为对象不存在错误"""
+        return error.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+    def _should_fall_back(self, error: ClientError) -> bool:
+        """对象在当前存储中不存在且配置了回退存储"""
+        return self._fallback is not None and self._is_not_found(error)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池使用统计"""
+        max_connections = self.max_pool_connections
+        return {
+            **self._stats,
+            "generation": self._generation,
+            "max_pool_connections": max_connections,
+            "io_max_workers": settings.STORAGE_IO_MAX_WORKERS,
+            "utilization": round(self._stats["in_flight"] / max_connections, 4),
+            "peak_utilization": round(self._stats["peak_in_flight"] / max_connections, 4),
+            "bucket_checked": self._bucket_checked_generation == self._generation,
+            "presign_cache": self._presign_cache.stats(),
+        }
+
     async def ensure_bucket_exists(self) -> None:
-        """确保存储桶存在"""
+        """确保存储桶存在（结果按配置代缓存）"""
+        generation = self._generation
+        if self._bucket_checked_generation == generation:
+            self._stats["bucket_check_cache_hits"] += 1
+            return
+
+        self._stats["bucket_checks"] += 1
         try:
-            self.client.head_bucket(Bucket=self.bucket_name)
+            await self._run("head_bucket", Bucket=self.bucket_name)
         except ClientError as e:
             error_code = e.response.get("Error", {}).get("Code")
             if error_code == "404":
                 try:
-                    self.client.create_bucket(
+                    await self._run(
+                        "create_bucket",
                         Bucket=self.bucket_name,
                         CreateBucketConfiguration={"LocationConstraint": self._config.region}
                         if self._config.region != "us-east-1" else {}
@@ -147,6 +403,100 @@ class S3Storage:
                 logger.error(f"检查存储桶失败: {e}")
                 raise StorageError(f"存储桶访问失败: {str(e)}")
 
+        # 检查期间配置可能已切换，只缓存检查时的配置代
+        self._bucket_checked_generation = generation
+
+    async def _catalog_record(
+        self,
+        object_key: str,
+        size: int,
+        etag: Optional[str] = None,
+        sha256: Optional[str] = None,
+        content_type: Optional[str] = None,
+        owner_id: Optional[str] = None,
+        kind: Optional[str] = None,
+        project_id: Optional[str] = None
+    ) -> None:
+        """
+        将对象写入 object_catalog（独立短事务，尽力而为）
+
+        目录写入失败只记录日志，不影响上传结果；对象目录可通过 sync_object_catalog 从存储桶重建。
+        """
+        if not settings.STORAGE_CATALOG_ENABLED:
+            return
+        try:
+            from src.core.database import get_async_db
+            from src.models.object_catalog import ObjectCatalog
+
+            async with get_async_db() as db:
+                await ObjectCatalog.upsert(
+                    db,
+                    object_key=object_key,
+                    bucket=self.bucket_name,
+                    size=size,
+                    etag=etag,
+                    sha256=sha256,
+                    content_type=content_type,
+                    kind=kind,
+                    owner_id=_as_uuid(owner_id),
+                    project_id=_as_uuid(project_id),
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"写入对象目录失败 {object_key}: {e}")
+
+    async def _catalog_remove(self, object_keys: List[str]) -> None:
+        """从 object_catalog 删除对象记录（尽力而为）"""
+        if not settings.STORAGE_CATALOG_ENABLED or not object_keys:
+            return
+        try:
+            from src.core.database import get_async_db
+            from src.models.object_catalog import ObjectCatalog
+
+            async with get_async_db() as db:
+                await ObjectCatalog.remove(db, self.bucket_name, object_keys)
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"删除对象目录记录失败 {object_keys[:3]}: {e}")
+
+    async def _blob_acquire(self, sha256: str) -> Optional[str]:
+        """内容已存在时增加引用计数并返回已有对象键"""
+        from src.core.database import get_async_db
+        from src.models.storage_blob import StorageBlob
+
+        async with get_async_db() as db:
+            object_key = await StorageBlob.acquire(db, self.bucket_name, sha256)
+            await db.commit()
+        return object_key
+
+    async def _blob_register(self, sha256: str, object_key: str, size: int, content_type: str) -> str:
+        """登记新上传的内容，返回规范对象键"""
+        from src.core.database import get_async_db
+        from src.models.storage_blob import StorageBlob
+
+        async with get_async_db() as db:
+            canonical_key = await StorageBlob.register(
+                db, self.bucket_name, sha256, object_key, size, content_type
+            )
+            await db.commit()
+        return canonical_key
+
+    async def _blob_forget(self, object_keys: List[str]) -> None:
+        """对象被直接删除时移除对应的内容记录，避免后续上传命中已不存在的对象"""
+        from src.models.storage_blob import StorageBlob
+
+        blob_keys = [key for key in object_keys if StorageBlob.is_blob_key(key)]
+        if not blob_keys:
+            return
+        try:
+            from src.core.database import get_async_db
+
+            async with get_async_db() as db:
+                await StorageBlob.forget(db, self.bucket_name, blob_keys)
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"删除内容记录失败 {blob_keys[:3]}: {e}")
+
     def generate_object_key(self, user_id: str, filename: str, prefix: str = "uploads") -> str:
         """生成对象键"""
         file_ext = Path(filename).suffix
@@ -159,19 +509,29 @@ class S3Storage:
         user_id: str,
         file: UploadFile,
         object_key: Optional[str] = None,
-        metadata: Optional[Dict[str, str]] = None
+        metadata: Optional[Dict[str, str]] = None,
+        kind: Optional[str] = None,
+        project_id: Optional[str] = None,
+        dedup: bool = False
     ) -> Dict[str, Any]:
-        """上传文件"""
+        """
+        上传文件（kind / project_id 写入对象目录，kind 缺省时按对象键推断）
+
+        dedup=True 且启用 STORAGE_DEDUP_ENABLED 时按内容寻址存放到 blobs/<sha256><ext>（忽略 object_key），
+        内容已存在则只增加引用计数、不再上传；引用方删除时应调用 release_files 而不是 delete_file。
+        """
+        from src.models.storage_blob import StorageBlob
+
         try:
             await self.ensure_bucket_exists()
 
-            if not object_key:
+            dedup = dedup and settings.STORAGE_DEDUP_ENABLED
+            if not object_key and not dedup:
                 object_key = self.generate_object_key(user_id, file.filename)
 
             if metadata is None:
                 metadata = {}
 
-            import urllib.parse
             encoded_filename = urllib.parse.quote(file.filename or "", safe="") if file.filename else ""
 
             metadata.update({
@@ -181,73 +541,493 @@ class S3Storage:
                 "user_id": str(user_id),
             })
 
-            file.file.seek(0, 2)
-            file_size = file.file.tell()
-            file.file.seek(0)
-
-            self.client.upload_fileobj(
-                file.file,
-                self.bucket_name,
-                object_key,
+            def _hash_file() -> Tuple[int, str]:
+                file.file.seek(0)
+                hasher = hashlib.sha256()
+                for chunk in iter(lambda: file.file.read(1024 * 1024), b""):
+                    hasher.update(chunk)
+                size = file.file.tell()
+                file.file.seek(0)
+                return size, hasher.hexdigest()
+
+            file_size, sha256 = await run_in_storage_executor(_hash_file)
+            content_type = file.content_type or "application/octet-stream"
+
+            if dedup:
+                existing_key = await self._blob_acquire(sha256)
+                if existing_key:
+                    logger.info(f"内容已存在，复用对象: {existing_key}, 大小: {file_size} bytes")
+                    return self._upload_result(existing_key, file_size, sha256, deduplicated=True)
+                object_key = StorageBlob.build_key(sha256, Path(file.filename or "").suffix)
+
+            await self._run(
+                "upload_fileobj",
+                Fileobj=file.file,
+                Bucket=self.bucket_name,
+                Key=object_key,
                 ExtraArgs={
-                    "ContentType": file.content_type or "application/octet-stream",
+                    "ContentType": content_type,
                     "Metadata": metadata,
                 }
             )
 
             logger.info(f"文件上传成功: {object_key}, 大小: {file_size} bytes")
 
-            return {
-                "bucket": self.bucket_name,
-                "object_key": object_key,
-                "size": file_size,
-                "url": self.get_presigned_url(object_key),
-            }
+            if dedup:
+                canonical_key = await self._blob_register(sha256, object_key, file_size, content_type)
+                if canonical_key != object_key:
+                    # 并发上传了相同内容（扩展名不同），保留先登记的对象
+                    await self._run("delete_object", Bucket=self.bucket_name, Key=object_key)
+                    return self._upload_result(canonical_key, file_size, sha256, deduplicated=True)
+
+            await self._catalog_record(
+                object_key=object_key,
+                size=file_size,
+                sha256=sha256,
+                content_type=content_type,
+                # 共享内容不归属于单个用户
+                owner_id=None if dedup else user_id,
+                kind=kind,
+                project_id=None if dedup else project_id,
+            )
+
+            return self._upload_result(object_key, file_size, sha256)
 
         except ClientError as e:
             logger.error(f"上传失败: {e}")
             raise StorageError(f"文件上传失败: {str(e)}")
 
-    async def upload_file_from_path(
+    def _upload_result(
+        self,
+        object_key: str,
+        size: int,
+        sha256: str,
+        deduplicated: bool = False
+    ) -> Dict[str, Any]:
+        """构建上传结果"""
+        return {
+            "bucket": self.bucket_name,
+            "object_key": object_key,
+            "size": size,
+            "sha256": sha256,
+            "deduplicated": deduplicated,
+            "url": self.get_presigned_url(object_key),
+        }
+
+    def _build_upload_metadata(
+        self,
+        user_id: str,
+        original_filename: str,
+        content_type: str,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> Dict[str, str]:
+        """构建上传对象的元数据"""
+        metadata = dict(metadata or {})
+        metadata.update({
+            "original_filename": urllib.parse.quote(original_filename or "", safe=""),
+            "content_type": content_type,
+            "upload_time": datetime.now().isoformat(),
+            "user_id": str(user_id),
+        })
+        return metadata
+
+    async def _upload_parts(
+        self,
+        object_key: str,
+        parts: AsyncIterator[bytes],
+        extra_args: Dict[str, Any],
+        concurrency: int
+    ) -> Tuple[int, str]:
+        """
+        分片并行上传
+
+        只有一个分片时直接 put_object；否则使用 multipart upload，
+        同时在途的分片不超过 concurrency 个，内存占用上限约为 (concurrency + 1) * 分片大小。
+
+        Args:
+            object_key: 对象键
+            parts: 分片数据的异步迭代器（除最后一片外每片不小于5MB）
+            extra_args: 传给 put_object / create_multipart_upload 的参数
+            concurrency: 并发上传的分片数
+
+        Returns:
+            (总大小, ETag)
+        """
+        first = await anext(parts, None) or b""
+        second = await anext(parts, None)
+        if second is None:
+            response = await self._run(
+                "put_object", Bucket=self.bucket_name, Key=object_key, Body=first, **extra_args
+            )
+            return len(first), response.get("ETag", "").strip('"')
+
+        async def _all_parts():
+            yield first
+            yield second
+            async for part in parts:
+                yield part
+
+        upload = await self._run(
+            "create_multipart_upload", Bucket=self.bucket_name, Key=object_key, **extra_args
+        )
+        upload_id = upload["UploadId"]
+        semaphore = asyncio.Semaphore(concurrency)
+        etags: Dict[int, str] = {}
+        tasks: List[asyncio.Task] = []
+
+        async def _send(part_number: int, body: bytes) -> None:
+            try:
+                response = await self._run(
+                    "upload_part",
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    UploadId=upload_id,
+                    PartNumber=part_number,
+                    Body=body,
+                )
+                etags[part_number] = response["ETag"]
+            finally:
+                semaphore.release()
+
+        total_size = 0
+        try:
+            part_number = 0
+            async for body in _all_parts():
+                await semaphore.acquire()
+                # 已有分片失败时尽早终止，不再读取后续数据
+                for task in tasks:
+                    if task.done() and task.exception():
+                        semaphore.release()
+                        raise task.exception()
+                part_number += 1
+                total_size += len(body)
+                tasks.append(asyncio.create_task(_send(part_number, body)))
+                del body
+
+            await asyncio.gather(*tasks)
+            response = await self._run(
+                "complete_multipart_upload",
+                Bucket=self.bucket_name,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [{"PartNumber": n, "ETag": etags[n]} for n in sorted(etags)]
+                },
+            )
+            return total_size, response.get("ETag", "").strip('"')
+
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await self._run(
+                    "abort_multipart_upload",
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    UploadId=upload_id,
+                )
+            except Exception as abort_error:
+                logger.warning(f"中止分片上传失败: {object_key}, {abort_error}")
+            raise
+
+    async def create_multipart_upload(
+        self,
+        object_key: str,
+        content_type: str,
+        user_id: str,
+        original_filename: str
+    ) -> str:
+        """创建分片上传会话，返回 UploadId（断点续传使用）"""
+        await self.ensure_bucket_exists()
+        try:
+            response = await self._run(
+                "create_multipart_upload",
+                Bucket=self.bucket_name,
+                Key=object_key,
+                ContentType=content_type,
+                Metadata=self._build_upload_metadata(user_id, original_filename, content_type),
+            )
+        except ClientError as e:
+            raise StorageError(f"创建分片上传失败: {e}")
+        return response["UploadId"]
+
+    async def upload_part(self, object_key: str, upload_id: str, part_number: int, body: bytes) -> str:
+        """上传单个分片，返回分片ETag（同一分片号重复上传时覆盖）"""
+        try:
+            response = await self._run(
+                "upload_part",
+                Bucket=self.bucket_name,
+                Key=object_key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+        except ClientError as e:
+            raise StorageError(f"上传分片失败: {e}")
+        return response["ETag"]
+
+    async def complete_multipart_upload(
+        self,
+        object_key: str,
+        upload_id: str,
+        parts: List[Tuple[int, str]]
+    ) -> str:
+        """合并分片，返回对象ETag"""
+        try:
+            response = await self._run(
+                "complete_multipart_upload",
+                Bucket=self.bucket_name,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={
+                    "Parts": [{"PartNumber": n, "ETag": etag} for n, etag in sorted(parts)]
+                },
+            )
+        except ClientError as e:
+            raise StorageError(f"合并分片失败: {e}")
+        return response.get("ETag", "").strip('"')
+
+    async def abort_multipart_upload(self, object_key: str, upload_id: str) -> bool:
+        """中止分片上传并释放已上传的分片"""
+        try:
+            await self._run(
+                "abort_multipart_upload", Bucket=self.bucket_name, Key=object_key, UploadId=upload_id
+            )
+            return True
+        except ClientError as e:
+            logger.warning(f"中止分片上传失败: {object_key}, {e}")
+            return False
+
+    async def abort_stale_multipart_uploads(self, prefix: str, older_than: datetime) -> int:
+        """
+        中止指定前缀下早于 older_than 发起的未完成分片上传
+
+        Returns:
+            中止的分片上传数
+        """
+        aborted = 0
+        params: Dict[str, Any] = {"Bucket": self.bucket_name, "Prefix": prefix}
+        while True:
+            response = await self._run("list_multipart_uploads", **params)
+            for upload in response.get("Uploads", []):
+                initiated = upload.get("Initiated")
+                if initiated and initiated < older_than:
+                    if await self.abort_multipart_upload(upload["Key"], upload["UploadId"]):
+                        aborted += 1
+            if not response.get("IsTruncated"):
+                break
+            params["KeyMarker"] = response.get("NextKeyMarker")
+            params["UploadIdMarker"] = response.get("NextUploadIdMarker")
+        if aborted:
+            logger.info(f"中止过期分片上传: {aborted} 个 (prefix={prefix})")
+        return aborted
+
+    async def commit_staged_object(
+        self,
+        staging_key: str,
+        user_id: str,
+        size: int,
+        sha256: str,
+        content_type: str,
+        object_key: Optional[str] = None,
+        kind: Optional[str] = None,
+        dedup: bool = False
+    ) -> Dict[str, Any]:
+        """
+        将已上传到暂存键的对象转为正式对象（服务端复制，不经过本进程）
+
+        dedup=True 时与 upload_file 相同按内容寻址存放：内容已存在则只增加引用计数并删除暂存对象。
+
+        Returns:
+            与 upload_file 相同结构的上传结果
+        """
+        from src.models.storage_blob import StorageBlob
+
+        dedup = dedup and settings.STORAGE_DEDUP_ENABLED
+        if dedup:
+            existing_key = await self._blob_acquire(sha256)
+            if existing_key:
+                await self._run("delete_object", Bucket=self.bucket_name, Key=staging_key)
+                return self._upload_result(existing_key, size, sha256, deduplicated=True)
+            object_key = StorageBlob.build_key(sha256, Path(staging_key).suffix)
+        elif not object_key:
+            object_key = staging_key
+
+        if object_key != staging_key:
+            try:
+                await self._run(
+                    "copy_object",
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    CopySource={"Bucket": self.bucket_name, "Key": staging_key},
+                )
+                await self._run("delete_object", Bucket=self.bucket_name, Key=staging_key)
+            except ClientError as e:
+                raise StorageError(f"提交上传对象失败: {e}")
+
+        if dedup:
+            canonical_key = await self._blob_register(sha256, object_key, size, content_type)
+            if canonical_key != object_key:
+                await self._run("delete_object", Bucket=self.bucket_name, Key=object_key)
+                return self._upload_result(canonical_key, size, sha256, deduplicated=True)
+
+        await self._catalog_record(
+            object_key=object_key,
+            size=size,
+            sha256=sha256,
+            content_type=content_type,
+            owner_id=None if dedup else user_id,
+            kind=kind,
+        )
+        return self._upload_result(object_key, size, sha256)
+
+    async def upload_from_path(
         self,
         user_id: str,
         file_path: str,
         original_filename: str,
         object_key: Optional[str] = None,
-        metadata: Optional[Dict[str, str]] = None
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+        part_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        kind: Optional[str] = None,
+        project_id: Optional[str] = None
     ) -> Dict[str, Any]:
-        """从本地路径上传文件"""
-        try:
-            if not object_key:
-                object_key = self.generate_object_key(user_id, original_filename)
+        """
+        从本地路径分片并行上传文件，不把整个文件读入内存
+
+        Args:
+            user_id: 用户ID
+            file_path: 本地文件路径
+            original_filename: 原始文件名
+            object_key: 对象键（可选，默认自动生成）
+            content_type: MIME类型（可选，默认按文件名推断）
+            metadata: 附加元数据
+            part_size: 分片大小（默认 STORAGE_MULTIPART_PART_SIZE）
+            concurrency: 并发分片数（默认 STORAGE_MULTIPART_CONCURRENCY）
+            kind: 对象类型（写入对象目录，缺省按对象键推断）
+            project_id: 所属项目ID（写入对象目录）
+
+        Returns:
+            上传结果，包含 object_key、size、etag、sha256 和 url
+        """
+        part_size = part_size or settings.STORAGE_MULTIPART_PART_SIZE
+        hasher = hashlib.sha256()
+
+        def _read_part(f) -> bytes:
+            body = f.read(part_size)
+            hasher.update(body)
+            return body
+
+        async def _file_parts():
+            with open(file_path, "rb") as f:
+                while True:
+                    body = await run_in_storage_executor(_read_part, f)
+                    if not body:
+                        break
+                    yield body
+
+        return await self._upload_stream_parts(
+            user_id, _file_parts(), hasher, original_filename, object_key,
+            content_type, metadata, concurrency, kind, project_id
+        )
 
-            if metadata is None:
-                metadata = {}
+    async def upload_stream(
+        self,
+        user_id: str,
+        chunks: AsyncIterator[bytes],
+        original_filename: str,
+        object_key: Optional[str] = None,
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None,
+        part_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        kind: Optional[str] = None,
+        project_id: Optional[str] = None,
+        catalog: bool = True
+    ) -> Dict[str, Any]:
+        """
+        从异步数据流分片并行上传，块大小任意，内部重新切分为分片
+
+        参数和返回值同 upload_from_path；catalog=False 时不写入对象目录（暂存对象）
+        """
+        part_size = part_size or settings.STORAGE_MULTIPART_PART_SIZE
+        hasher = hashlib.sha256()
+
+        async def _stream_parts():
+            buffer = bytearray()
+            async for chunk in chunks:
+                hasher.update(chunk)
+                buffer += chunk
+                while len(buffer) >= part_size:
+                    yield bytes(buffer[:part_size])
+                    del buffer[:part_size]
+            if buffer:
+                yield bytes(buffer)
+
+        return await self._upload_stream_parts(
+            user_id, _stream_parts(), hasher, original_filename, object_key,
+            content_type, metadata, concurrency, kind, project_id, catalog
+        )
 
-            file_size = Path(file_path).stat().st_size
+    async def _upload_stream_parts(
+        self,
+        user_id: str,
+        parts: AsyncIterator[bytes],
+        hasher: "hashlib._Hash",
+        original_filename: str,
+        object_key: Optional[str],
+        content_type: Optional[str],
+        metadata: Optional[Dict[str, str]],
+        concurrency: Optional[int],
+        kind: Optional[str] = None,
+        project_id: Optional[str] = None,
+        catalog: bool = True
+    ) -> Dict[str, Any]:
+        """upload_from_path / upload_stream 的公共实现"""
+        try:
+            await self.ensure_bucket_exists()
 
-            import urllib.parse
-            encoded_filename = urllib.parse.quote(original_filename or "", safe="")
+            if not object_key:
+                object_key = self.generate_object_key(user_id, original_filename)
 
-            metadata.update({
-                "original_filename": encoded_filename,
-                "upload_time": datetime.now().isoformat(),
-                "user_id": str(user_id),
-            })
+            content_type = (
+                content_type
+                or mimetypes.guess_type(original_filename or "")[0]
+                or "application/octet-stream"
+            )
+            extra_args = {
+                "ContentType": content_type,
+                "Metadata": self._build_upload_metadata(user_id, original_filename, content_type, metadata),
+            }
 
-            self.client.upload_file(
-                file_path,
-                self.bucket_name,
-                object_key,
-                ExtraArgs={"Metadata": metadata}
+            file_size, etag = await self._upload_parts(
+                object_key, parts, extra_args, concurrency or settings.STORAGE_MULTIPART_CONCURRENCY
             )
 
             logger.info(f"文件上传成功: {object_key}, 大小: {file_size} bytes")
 
+            sha256 = hasher.hexdigest()
+            if catalog:
+                await self._catalog_record(
+                    object_key=object_key,
+                    size=file_size,
+                    etag=etag,
+                    sha256=sha256,
+                    content_type=content_type,
+                    owner_id=user_id,
+                    kind=kind,
+                    project_id=project_id,
+                )
+
             return {
                 "bucket": self.bucket_name,
                 "object_key": object_key,
                 "size": file_size,
+                "etag": etag,
+                "sha256": sha256,
                 "url": self.get_presigned_url(object_key),
             }
 
@@ -255,52 +1035,527 @@ class S3Storage:
             logger.error(f"上传失败: {e}")
             raise StorageError(f"文件上传失败: {str(e)}")
 
+    async def upload_file_from_path(
+        self,
+        user_id: str,
+        file_path: str,
+        original_filename: str,
+        object_key: Optional[str] = None,
+        metadata: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """从本地路径上传文件（兼容旧接口，等同于 upload_from_path）"""
+        return await self.upload_from_path(
+            user_id, file_path, original_filename, object_key=object_key, metadata=metadata
+        )
+
+    def get_public_url(self, object_key: str) -> Optional[str]:
+        """
+        获取公开访问URL（公共读或CDN模式）
+
+        配置了 STORAGE_PUBLIC_BASE_URL 时返回稳定的无签名URL，否则返回None
+        """
+        base_url = settings.STORAGE_PUBLIC_BASE_URL
+        if not base_url:
+            return None
+        return f"{base_url.rstrip('/')}/{urllib.parse.quote(object_key)}"
+
     def get_presigned_url(
         self,
         object_key: str,
         expires: timedelta = timedelta(hours=1)
     ) -> str:
-        """获取预签名URL"""
+        """获取预签名URL（带缓存，公共读模式下返回稳定URL）"""
+        public_url = self.get_public_url(object_key)
+        if public_url:
+            return public_url
+
+        expires_seconds = int(expires.total_seconds())
+        generation = self._generation
+        url = self._presign_cache.get(generation, object_key, expires_seconds)
+        if url:
+            return url
+
         try:
-            url = self.client.generate_presigned_url(
+            client, bucket, cacheable = self.client, self.bucket_name, True
+            fallback = self._fallback
+            if fallback is not None:
+                on_primary = self._signing_source(object_key)
+                if on_primary is None:
+                    on_primary, cacheable = self._resolve_signing_source_now(object_key)
+                if not on_primary:
+                    # 过渡期内尚未复制到当前存储的对象，按回退存储签名
+                    client, bucket = fallback.client, fallback.bucket_name
+            signed_at = time.time()
+            url = client.generate_presigned_url(
                 "get_object",
-                Params={"Bucket": self.bucket_name, "Key": object_key},
-                ExpiresIn=int(expires.total_seconds()),
+                Params={"Bucket": bucket, "Key": object_key},
+                ExpiresIn=expires_seconds,
             )
+            if cacheable:
+                self._presign_cache.put(generation, object_key, expires_seconds, url, signed_at)
             return url
         except ClientError as e:
             logger.error(f"获取预签名URL失败: {e}")
             raise StorageError(f"获取预签名URL失败: {str(e)}")
 
+    def _signing_source(self, object_key: str) -> Optional[bool]:
+        """缓存的对象所在存储：True 在当前存储，False 在回退存储，None 未确认"""
+        with self._signing_lock:
+            on_primary = self._signing_sources.get(object_key)
+            if on_primary is not None:
+                self._signing_sources.move_to_end(object_key)
+            return on_primary
+
+    def _remember_signing_source(self, object_key: str, on_primary: bool) -> None:
+        with self._signing_lock:
+            self._signing_sources[object_key] = on_primary
+            self._signing_sources.move_to_end(object_key)
+            while len(self._signing_sources) > settings.STORAGE_PRESIGN_CACHE_SIZE:
+                self._signing_sources.popitem(last=False)
+
+    def _forget_signing_sources(self) -> None:
+        with self._signing_lock:
+            self._signing_sources.clear()
+
+    def _check_signing_source(self, object_key: str) -> bool:
+        """
+        检查对象是否在当前存储并缓存结果（阻塞调用，只在存储线程池或事件循环之外执行）
+
+        检查出错（对象不存在以外的错误）时按在当前存储处理。
+        """
+        try:
+            self.client.head_object(Bucket=self.bucket_name, Key=object_key)
+            on_primary = True
+        except ClientError as e:
+            on_primary = not self._is_not_found(e)
+        self._remember_signing_source(object_key, on_primary)
+        return on_primary
+
+    def _resolve_signing_source_now(self, object_key: str) -> Tuple[bool, bool]:
+        """
+        同步签名时遇到未确认所在存储的对象
+
+        事件循环线程内不发起网络请求：先按当前存储签名（URL不缓存），同时在存储线程池中后台检查，
+        之后的签名使用检查结果；不在事件循环内（同步线程）时直接检查。
+
+        Returns:
+            (是否按当前存储签名, 签名结果是否可缓存)
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return self._check_signing_source(object_key), True
+
+        with self._signing_lock:
+            if object_key in self._signing_checks:
+                return True, False
+            self._signing_checks.add(object_key)
+
+        def _done(future: "asyncio.Future") -> None:
+            with self._signing_lock:
+                self._signing_checks.discard(object_key)
+            if not future.cancelled() and future.exception() is not None:
+                logger.warning(f"检查对象所在存储失败 {object_key}: {future.exception()}")
+
+        loop.run_in_executor(get_storage_executor(), self._check_signing_source, object_key).add_done_callback(_done)
+        return True, False
+
+    async def resolve_signing_sources(self, object_keys: Iterable[Optional[str]]) -> None:
+        """
+        签名前批量确认对象所在存储（仅设置了回退存储时生效）
+
+        在存储线程池中并发检查尚未确认的对象，之后的同步签名直接使用缓存结果。
+        批量返回URL的接口应先调用本方法。
+        """
+        if self._fallback is None:
+            return
+        keys = [key for key in dict.fromkeys(k for k in object_keys if k) if self._signing_source(key) is None]
+        if keys:
+            await asyncio.gather(*(self._run_call(functools.partial(self._check_signing_source, key)) for key in keys))
+
+    def get_presigned_put_url(
+        self,
+        object_key: str,
+        content_type: str,
+        expires: timedelta = timedelta(hours=1)
+    ) -> str:
+        """
+        获取直传用的预签名PUT URL（不缓存）
+
+        客户端上传时必须携带相同的 Content-Type 请求头；预签名PUT无法限制大小，
+        上传完成后需在服务端校验对象大小。
+        """
+        try:
+            return self.client.generate_presigned_url(
+                "put_object",
+                Params={"Bucket": self.bucket_name, "Key": object_key, "ContentType": content_type},
+                ExpiresIn=int(expires.total_seconds()),
+            )
+        except ClientError as e:
+            raise StorageError(f"获取上传URL失败: {str(e)}")
+
+    def get_presigned_part_urls(
+        self,
+        object_key: str,
+        upload_id: str,
+        part_count: int,
+        expires: timedelta = timedelta(hours=1)
+    ) -> List[str]:
+        """获取分片直传用的预签名 upload_part URL（按分片号1..part_count排列）"""
+        try:
+            return [
+                self.client.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": self.bucket_name,
+                        "Key": object_key,
+                        "UploadId": upload_id,
+                        "PartNumber": part_number,
+                    },
+                    ExpiresIn=int(expires.total_seconds()),
+                )
+                for part_number in range(1, part_count + 1)
+            ]
+        except ClientError as e:
+            raise StorageError(f"获取分片上传URL失败: {str(e)}")
+
+    def get_presigned_urls(
+        self,
+        object_keys: Iterable[str],
+        expires: timedelta = timedelta(hours=1)
+    ) -> Dict[str, str]:
+        """
+        批量获取预签名URL
+
+        Args:
+            object_keys: 对象键列表（重复和空值会被忽略）
+            expires: 有效期
+
+        Returns:
+            {对象键: URL}
+        """
+        return {
+            key: self.get_presigned_url(key, expires)
+            for key in dict.fromkeys(k for k in object_keys if k)
+        }
+
     async def download_file(self, object_key: str) -> bytes:
-        """下载文件"""
+        """下载文件（整个对象读入内存，仅适用于小文件；大文件请使用 download_stream / download_to_path）"""
         try:
-            response = self.client.get_object(Bucket=self.bucket_name, Key=object_key)
-            return response["Body"].read()
+            def _read() -> bytes:
+                response = self.client.get_object(Bucket=self.bucket_name, Key=object_key)
+                return response["Body"].read()
+
+            return await self._run_call(_read)
         except ClientError as e:
+            if self._should_fall_back(e):
+                return await self._fallback.download_file(object_key)
             logger.error(f"下载文件失败: {e}")
             raise StorageError(f"下载文件失败: {str(e)}")
 
-    async def download_file_to_path(self, object_key: str, dest_path: str) -> None:
-        """下载文件到指定路径"""
+    @staticmethod
+    def _range_header(offset: int, length: Optional[int]) -> Dict[str, str]:
+        """构建HTTP Range参数"""
+        if not offset and length is None:
+            return {}
+        end = "" if length is None else str(offset + length - 1)
+        return {"Range": f"bytes={offset}-{end}"}
+
+    async def download_stream(
+        self,
+        object_key: str,
+        chunk_size: Optional[int] = None,
+        offset: int = 0,
+        length: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        流式下载对象，逐块产出数据
+
+        Args:
+            object_key: 对象键
+            chunk_size: 每块大小（默认 STORAGE_DOWNLOAD_CHUNK_SIZE）
+            offset: 起始偏移
+            length: 读取长度（None 表示读到末尾）
+
+        Yields:
+            数据块
+        """
+        chunk_size = chunk_size or settings.STORAGE_DOWNLOAD_CHUNK_SIZE
+        try:
+            response = await self._run(
+                "get_object",
+                Bucket=self.bucket_name,
+                Key=object_key,
+                **self._range_header(offset, length)
+            )
+        except ClientError as e:
+            if self._should_fall_back(e):
+                async for chunk in self._fallback.download_stream(object_key, chunk_size, offset, length):
+                    yield chunk
+                return
+            logger.error(f"下载文件失败: {e}")
+            raise StorageError(f"下载文件失败: {str(e)}")
+
+        body = response["Body"]
+        try:
+            while True:
+                chunk = await self._run_call(lambda: body.read(chunk_size))
+                if not chunk:
+                    break
+                yield chunk
+        finally:
+            body.close()
+
+    async def download_range(self, object_key: str, offset: int, length: int) -> bytes:
+        """
+        下载对象的指定字节范围
+
+        Args:
+            object_key: 对象键
+            offset: 起始偏移
+            length: 读取长度
+
+        Returns:
+            该范围内的数据
+        """
+        try:
+            def _read() -> bytes:
+                response = self.client.get_object(
+                    Bucket=self.bucket_name,
+                    Key=object_key,
+                    **self._range_header(offset, length)
+                )
+                return response["Body"].read()
+
+            return await self._run_call(_read)
+        except ClientError as e:
+            if self._should_fall_back(e):
+                return await self._fallback.download_range(object_key, offset, length)
+            logger.error(f"下载文件失败: {e}")
+            raise StorageError(f"下载文件失败: {str(e)}")
+
+    def _download_part_to_file(self, object_key: str, dest_path: str, offset: int, length: int) -> None:
+        """（在I/O线程中执行）下载一个字节范围并写入文件对应位置"""
+        response = self.client.get_object(
+            Bucket=self.bucket_name,
+            Key=object_key,
+            **self._range_header(offset, length)
+        )
+        body = response["Body"]
+        chunk_size = settings.STORAGE_DOWNLOAD_CHUNK_SIZE
+        try:
+            with open(dest_path, "r+b") as f:
+                f.seek(offset)
+                while True:
+                    chunk = body.read(chunk_size)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+        finally:
+            body.close()
+
+    async def download_to_path(
+        self,
+        object_key: str,
+        dest_path: str,
+        part_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> int:
+        """
+        并行分段下载对象到本地文件
+
+        大于一个分片的对象按字节范围并行下载，各段直接写入文件对应位置，
+        内存占用只与块大小和并发数相关。
+
+        Args:
+            object_key: 对象键
+            dest_path: 目标路径
+            part_size: 分段大小（默认 STORAGE_MULTIPART_PART_SIZE）
+            concurrency: 并发分段数（默认 STORAGE_MULTIPART_CONCURRENCY）
+
+        Returns:
+            下载的字节数
+        """
+        part_size = part_size or settings.STORAGE_MULTIPART_PART_SIZE
+        concurrency = concurrency or settings.STORAGE_MULTIPART_CONCURRENCY
         try:
             Path(dest_path).parent.mkdir(parents=True, exist_ok=True)
-            self.client.download_file(self.bucket_name, object_key, dest_path)
-            logger.info(f"文件下载成功: {object_key} -> {dest_path}")
+            try:
+                head = await self._run("head_object", Bucket=self.bucket_name, Key=object_key)
+            except ClientError as e:
+                if self._should_fall_back(e):
+                    return await self._fallback.download_to_path(object_key, dest_path, part_size, concurrency)
+                raise
+            size = head["ContentLength"]
+
+            # 预分配文件，各分段按偏移写入
+            with open(dest_path, "wb") as f:
+                f.truncate(size)
+
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def _fetch(offset: int) -> None:
+                async with semaphore:
+                    await self._run_call(
+                        lambda: self._download_part_to_file(
+                            object_key, dest_path, offset, min(part_size, size - offset)
+                        )
+                    )
+
+            await asyncio.gather(*(_fetch(offset) for offset in range(0, size, part_size)))
+
+            logger.info(f"文件下载成功: {object_key} -> {dest_path}, 大小: {size} bytes")
+            return size
         except ClientError as e:
             logger.error(f"下载文件失败: {e}")
             raise StorageError(f"下载文件失败: {str(e)}")
 
+    async def download_file_to_path(self, object_key: str, dest_path: str) -> None:
+        """下载文件到指定路径（兼容旧接口，等同于 download_to_path）"""
+        await self.download_to_path(object_key, dest_path)
+
     async def delete_file(self, object_key: str) -> bool:
         """删除文件"""
         try:
-            self.client.delete_object(Bucket=self.bucket_name, Key=object_key)
+            await self._run("delete_object", Bucket=self.bucket_name, Key=object_key)
+            self._presign_cache.invalidate(object_key)
+            await self._catalog_remove([object_key])
+            await self._blob_forget([object_key])
             logger.info(f"文件删除成功: {object_key}")
             return True
         except ClientError as e:
             logger.error(f"删除文件失败: {e}")
             return False
 
+    async def _delete_objects(self, object_keys: List[str]) -> Dict[str, List[str]]:
+        """
+        批量删除对象（DeleteObjects，每次调用最多1000个键），不处理目录/缓存等附带记录
+
+        Returns:
+            {deleted: [对象键], failed: [对象键]}
+        """
+        deleted: List[str] = []
+        failed: List[str] = []
+        for start in range(0, len(object_keys), 1000):
+            batch = object_keys[start:start + 1000]
+            try:
+                response = await self._run(
+                    "delete_objects",
+                    Bucket=self.bucket_name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+            except ClientError as e:
+                logger.error(f"批量删除文件失败: {e}")
+                failed.extend(batch)
+                continue
+
+            # Quiet 模式下只返回失败的键
+            errors = {err["Key"] for err in response.get("Errors", [])}
+            for err in response.get("Errors", [])[:5]:
+                logger.warning(f"删除文件失败 {err.get('Key')}: {err.get('Code')} {err.get('Message')}")
+            failed.extend(key for key in batch if key in errors)
+            deleted.extend(key for key in batch if key not in errors)
+        return {"deleted": deleted, "failed": failed}
+
+    async def delete_files(self, object_keys: List[str]) -> Dict[str, List[str]]:
+        """
+        批量删除文件（DeleteObjects，每次调用最多1000个键）
+
+        Returns:
+            {deleted: [对象键], failed: [对象键]}
+        """
+        result = await self._delete_objects(object_keys)
+        deleted = result["deleted"]
+        if deleted:
+            self._presign_cache.invalidate_many(deleted)
+            await self._catalog_remove(deleted)
+            await self._blob_forget(deleted)
+            logger.info(f"批量删除文件成功: {len(deleted)} 个")
+        return result
+
+    async def release_files(self, object_keys: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        释放对象引用：blobs/ 下的共享内容递减引用计数，归零时才删除；其他对象直接删除
+
+        Args:
+            object_keys: 引用方持有的对象键（同一共享内容被引用多次时应重复出现）
+
+        Returns:
+            {deleted: [已删除的键], failed: [删除失败的键], released: [仍被引用、仅递减计数的键]}
+        """
+        from src.models.storage_blob import StorageBlob
+
+        keys = [key for key in object_keys if key]
+        blob_keys = [key for key in keys if StorageBlob.is_blob_key(key)]
+        plain_keys = list(dict.fromkeys(key for key in keys if not StorageBlob.is_blob_key(key)))
+
+        result = await self.delete_files(plain_keys) if plain_keys else {"deleted": [], "failed": []}
+        deleted, failed = list(result["deleted"]), list(result["failed"])
+        if not blob_keys:
+            return {"deleted": deleted, "failed": failed, "released": []}
+
+        from src.core.database import get_async_db
+
+        freed_deleted: List[str] = []
+        async with get_async_db() as db:
+            freed = await StorageBlob.release(db, self.bucket_name, blob_keys)
+            if freed:
+                # 计数归零的行在提交前保持行锁：先删除对象再提交，
+                # 并发上传相同内容会等待提交后重新上传，而不会命中已删除的对象
+                outcome = await self._delete_objects(freed)
+                freed_deleted = outcome["deleted"]
+                failed.extend(outcome["failed"])
+                await StorageBlob.forget(db, self.bucket_name, freed_deleted)
+            await db.commit()
+
+        if freed_deleted:
+            self._presign_cache.invalidate_many(freed_deleted)
+            await self._catalog_remove(freed_deleted)
+            deleted.extend(freed_deleted)
+            logger.info(f"共享内容引用归零，已删除: {len(freed_deleted)} 个")
+
+        released = sorted(set(blob_keys) - set(freed))
+        return {"deleted": deleted, "failed": failed, "released": released}
+
+    async def release_replaced_files(self, object_keys: Iterable[str]) -> None:
+        """
+        释放被重新生成的内容覆盖的旧对象（引用方提交新键之后调用，尽力而为）
+
+        内容未变时新旧键相同，但上传已为其增加了一次引用，同样需要释放一次。
+        """
+        keys = [key for key in object_keys if key]
+        if not keys:
+            return
+        try:
+            await self.release_files(keys)
+        except Exception as e:
+            logger.warning(f"释放被覆盖的对象失败 {keys[:3]}: {e}")
+
+    async def reclaim_blobs(self, object_keys: List[str], cutoff: datetime) -> Dict[str, List[str]]:
+        """
+        回收未被引用的共享内容（供存储GC使用）
+
+        在锁定 storage_blobs 记录的同一事务内复核：引用计数大于0或更新时间晚于 cutoff 的内容保留，
+        其余对象删除后移除记录再提交，与 acquire 互斥，避免删除上传刚命中的内容。
+
+        Returns:
+            {deleted: [已删除的键], failed: [删除失败的键], kept: [复核后保留的键]}
+        """
+        from src.core.database import get_async_db
+        from src.models.storage_blob import StorageBlob
+
+        async with get_async_db() as db:
+            kept = await StorageBlob.lock_in_use(db, self.bucket_name, object_keys, cutoff)
+            doomed = [key for key in object_keys if key not in kept]
+            outcome = await self._delete_objects(doomed) if doomed else {"deleted": [], "failed": []}
+            await StorageBlob.forget(db, self.bucket_name, outcome["deleted"])
+            await db.commit()
+
+        if outcome["deleted"]:
+            self._presign_cache.invalidate_many(outcome["deleted"])
+            await self._catalog_remove(outcome["deleted"])
+        return {"deleted": outcome["deleted"], "failed": outcome["failed"], "kept": sorted(kept)}
+
     async def copy_file(
         self,
         source_object_key: str,
@@ -311,7 +1566,8 @@ class S3Storage:
         try:
             copy_source = {"Bucket": self.bucket_name, "Key": source_object_key}
             extra_args = {"MetadataDirective": "REPLACE", "Metadata": metadata} if metadata else {}
-            self.client.copy_object(
+            await self._run(
+                "copy_object",
                 Bucket=self.bucket_name,
                 Key=dest_object_key,
                 CopySource=copy_source,
@@ -323,41 +1579,149 @@ class S3Storage:
             logger.error(f"复制文件失败: {e}")
             return False
 
-    async def list_files(
-        self,
-        prefix: str,
-        limit: int = 100
-    ) -> List[Dict[str, Any]]:
-        """列出文件"""
-        try:
-            response = self.client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=prefix,
-                MaxKeys=limit
-            )
+    def shares_account_with(self, other: "S3Storage") -> bool:
+        """两个存储是否位于同一服务和账号下（可以使用服务端复制）"""
+        return (
+            self._config.endpoint_url == other.config.endpoint_url
+            and self._config.access_key == other.config.access_key
+        )
 
-            files = []
-            for obj in response.get("Contents", []):
-                if obj["Key"].endswith("/"):
-                    continue
-                files.append({
-                    "object_key": obj["Key"],
-                    "size": obj["Size"],
-                    "last_modified": obj["LastModified"].isoformat() if obj.get("LastModified") else None,
-                    "etag": obj.get("ETag", "").strip('"'),
-                    "url": self.get_presigned_url(obj["Key"]),
-                })
+    async def copy_from(self, source: "S3Storage", object_key: str) -> str:
+        """
+        从另一个存储复制对象到当前存储（对象键不变）
+
+        同一服务和账号下使用服务端复制（大对象由boto3自动分片复制，数据不经过本机）；
+        否则从源存储流式读取并分片上传，内存占用只与分片大小相关。
+
+        Returns:
+            复制方式：server / stream
+        """
+        if self.shares_account_with(source):
+            await self._run_call(lambda: self.client.copy(
+                {"Bucket": source.bucket_name, "Key": object_key},
+                self.bucket_name,
+                object_key,
+            ))
+            return "server"
+
+        def _stream() -> None:
+            response = source.client.get_object(Bucket=source.bucket_name, Key=object_key)
+            body = response["Body"]
+            extra_args = {"Metadata": response.get("Metadata", {})}
+            if response.get("ContentType"):
+                extra_args["ContentType"] = response["ContentType"]
+            try:
+                self.client.upload_fileobj(body, self.bucket_name, object_key, ExtraArgs=extra_args)
+            finally:
+                body.close()
+
+        await self._run_call(_stream)
+        return "stream"
+
+    @staticmethod
+    def _object_info(obj: Dict[str, Any]) -> Dict[str, Any]:
+        """list_objects_v2 条目转为文件信息"""
+        return {
+            "object_key": obj["Key"],
+            "size": obj["Size"],
+            "last_modified": obj["LastModified"].isoformat() if obj.get("LastModified") else None,
+            "etag": obj.get("ETag", "").strip('"'),
+        }
 
-            return files
+    async def list_files_page(
+        self,
+        prefix: str,
+        page_size: Optional[int] = None,
+        continuation_token: Optional[str] = None,
+        with_urls: bool = True,
+        start_after: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        分页列出文件（单次 list_objects_v2 调用）
+
+        Args:
+            prefix: 对象键前缀
+            page_size: 每页数量（上限 STORAGE_LIST_PAGE_SIZE）
+            continuation_token: 上一页返回的 next_token
+            with_urls: 是否为每个对象生成预签名URL
+            start_after: 只列出字典序大于该键的对象（用于断点续扫）
+
+        Returns:
+            {files, next_token, is_truncated}；next_token 为None表示已是最后一页
+        """
+        page_size = min(page_size or settings.STORAGE_LIST_PAGE_SIZE, settings.STORAGE_LIST_PAGE_SIZE)
+        params = {"Bucket": self.bucket_name, "Prefix": prefix, "MaxKeys": page_size}
+        if continuation_token:
+            params["ContinuationToken"] = continuation_token
+        if start_after:
+            params["StartAfter"] = start_after
 
+        try:
+            response = await self._run("list_objects_v2", **params)
         except ClientError as e:
             logger.error(f"列出文件失败: {e}")
             raise StorageError(f"列出文件失败: {str(e)}")
 
+        files = [self._object_info(obj) for obj in response.get("Contents", []) if not obj["Key"].endswith("/")]
+        if with_urls:
+            if self._fallback is not None:
+                # 列出的对象都在当前存储，无需再检查
+                for f in files:
+                    self._remember_signing_source(f["object_key"], True)
+            urls = self.get_presigned_urls(f["object_key"] for f in files)
+            for f in files:
+                f["url"] = urls[f["object_key"]]
+
+        is_truncated = bool(response.get("IsTruncated"))
+        return {
+            "files": files,
+            "next_token": response.get("NextContinuationToken") if is_truncated else None,
+            "is_truncated": is_truncated,
+        }
+
+    async def iter_files(
+        self,
+        prefix: str,
+        page_size: Optional[int] = None,
+        start_after: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐页遍历前缀下的全部对象（不生成URL），内存占用只与单页大小相关
+
+        对象按键的字典序返回；指定 start_after 时从该键之后开始。
+
+        Yields:
+            文件信息（object_key, size, last_modified, etag）
+        """
+        token = None
+        while True:
+            page = await self.list_files_page(prefix, page_size, token, with_urls=False, start_after=start_after)
+            for file_info in page["files"]:
+                yield file_info
+            token = page["next_token"]
+            if not token:
+                break
+
+    async def list_files(
+        self,
+        prefix: str,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        """列出文件（自动翻页，最多返回 limit 个）"""
+        files: List[Dict[str, Any]] = []
+        token = None
+        while len(files) < limit:
+            page = await self.list_files_page(prefix, limit - len(files), token)
+            files.extend(page["files"])
+            token = page["next_token"]
+            if not token:
+                break
+        return files
+
     async def get_file_info(self, object_key: str) -> Optional[Dict[str, Any]]:
         """获取文件信息"""
         try:
-            response = self.client.head_object(Bucket=self.bucket_name, Key=object_key)
+            response = await self._run("head_object", Bucket=self.bucket_name, Key=object_key)
             return {
                 "object_key": object_key,
                 "size": response["ContentLength"],
@@ -371,18 +1735,41 @@ class S3Storage:
             logger.error(f"获取文件信息失败: {e}")
             return None
 
+    async def stat_object(self, object_key: str) -> Optional[Dict[str, Any]]:
+        """
+        获取对象元数据（不生成URL，供媒体分发做条件请求/Range校验）
+
+        Returns:
+            {size, etag, last_modified(datetime), content_type}；对象不存在时返回None
+        """
+        try:
+            response = await self._run("head_object", Bucket=self.bucket_name, Key=object_key)
+        except ClientError as e:
+            if self._is_not_found(e):
+                return await self._fallback.stat_object(object_key) if self._fallback else None
+            logger.error(f"获取对象元数据失败: {e}")
+            raise StorageError(f"获取对象元数据失败: {str(e)}")
+        return {
+            "size": response["ContentLength"],
+            "etag": response.get("ETag", "").strip('"'),
+            "last_modified": response.get("LastModified"),
+            "content_type": response.get("ContentType"),
+        }
+
     async def file_exists(self, object_key: str) -> bool:
         """检查文件是否存在"""
         try:
-            self.client.head_object(Bucket=self.bucket_name, Key=object_key)
+            await self._run("head_object", Bucket=self.bucket_name, Key=object_key)
             return True
-        except ClientError:
+        except ClientError as e:
+            if self._should_fall_back(e):
+                return await self._fallback.file_exists(object_key)
             return False
 
     async def test_connection(self) -> Dict[str, Any]:
         """测试存储连接"""
         try:
-            self.client.list_buckets()
+            await self._run("list_buckets")
             return {"success": True, "message": "连接成功"}
         except ClientError as e:
             return {"success": False, "message": str(e)}
@@ -412,25 +1799,22 @@ async def reload_storage_config_from_db(db_session) -> None:
     source = result.scalar_one_or_none()
 
     if source:
-        config = StorageConfig(
-            provider=source.provider,
-            endpoint=source.endpoint,
-            access_key=source.access_key,
-            secret_key=source.secret_key,
-            bucket=source.bucket,
-            region=source.region,
-            secure=source.secure,
-        )
-        storage_client.reload_config(config)
+        storage_client.reload_config(StorageConfig.from_source(source))
         logger.info(f"已加载存储源: {source.name}")
 
+        from src.services.storage_migration import apply_dual_read
+        await apply_dual_read(db_session, storage_client, source.id)
+
 
 __all__ = [
     "S3Storage",
+    "PresignedUrlCache",
     "MinIOStorage",
     "StorageConfig",
     "StorageError",
     "storage_client",
     "get_storage_client",
+    "get_storage_executor",
+    "run_in_storage_executor",
     "reload_storage_config_from_db",
 ]
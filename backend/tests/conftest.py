@@ -411,4 +411,11 @@ def setup_mocks(monkeypatch):
     try:
         monkeypatch.setattr("src.tasks.file_processing.celery_app", AsyncMock())
     except AttributeError:
-        pass
\ No newline at end of file
+        pass
+
+
+@pytest.fixture(autouse=True)
+def disable_object_catalog(monkeypatch):
+    """单元测试中不写对象目录（需要真实数据库）"""
+    from src.core.config import settings
+    monkeypatch.setattr(settings, "STORAGE_CATALOG_ENABLED", False)
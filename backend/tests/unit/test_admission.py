@@ -0,0 +1,263 @@
+"""
+任务准入控制测试（Redis 使用内存替身）
+"""
+
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.core import admission, task_lock
+from src.core.admission import release_admission, release_waiting, submit_task
+from src.core.config import settings
+from src.core.exceptions import TooManyRequestsError
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def rpush(self, *args):
+        self.calls.append(("rpush", args))
+
+    def sadd(self, *args):
+        self.calls.append(("sadd", args))
+
+    def expire(self, *args):
+        self.calls.append(("expire", args))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+class FakeRedis:
+    """支持准入脚本、列表和集合的内存Redis"""
+
+    def __init__(self):
+        self.zsets = {}
+        self.store = {}
+        self.lists = {}
+        self.sets = {}
+        self.depth = {}
+        self.ttls = {}
+
+    async def eval(self, script, numkeys, *args):
+        if script == admission.ADMIT_SCRIPT:
+            zkey, slot_key, now, expiry, limit, task_id, slot, ttl = args
+            zset = self.zsets.setdefault(zkey, {})
+            for member in [m for m, score in zset.items() if score <= now]:
+                del zset[member]
+            if task_id in zset:
+                return 1
+            if len(zset) >= int(limit):
+                return 0
+            zset[task_id] = expiry
+            self.store[slot_key] = slot
+            return 1
+        if script == admission.RELEASE_SCRIPT:
+            slot_key, prefix = args
+            slot = self.store.pop(slot_key, None)
+            if slot is None:
+                return 0
+            suffix, task_id = slot.split("|", 1)
+            self.zsets.get(prefix + suffix, {}).pop(task_id, None)
+            return 1
+        if script == task_lock.RELEASE_SCRIPT:
+            key, holder = args
+            if self.store.get(key) == holder:
+                del self.store[key]
+                return 1
+            return 0
+        raise AssertionError("unexpected script")
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def llen(self, key):
+        if key in self.depth:
+            return self.depth[key]
+        return len(self.lists.get(key, []))
+
+    async def rpush(self, key, value):
+        self.lists.setdefault(key, []).append(value)
+        return len(self.lists[key])
+
+    async def lindex(self, key, index):
+        items = self.lists.get(key, [])
+        return items[index] if items else None
+
+    async def lpop(self, key):
+        return self.lists[key].pop(0)
+
+    async def sadd(self, key, member):
+        self.sets.setdefault(key, set()).add(member)
+        return 1
+
+    async def srem(self, key, member):
+        self.sets.get(key, set()).discard(member)
+        return 1
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return 1
+
+    async def smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakeTask:
+    def __init__(self, name):
+        self.name = name
+        self.sent = []
+
+    def apply_async(self, args=(), kwargs=None, task_id=None):
+        self.sent.append((args, kwargs, task_id))
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(admission, "get_redis_client", lambda: fake)
+    monkeypatch.setattr(admission, "get_broker_redis_client", lambda: fake)
+    monkeypatch.setattr(task_lock, "get_redis_client", lambda: fake)
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(settings, "ADMISSION_MAX_QUEUE_DEPTH", {"llm-io": 10, "render": 10})
+    monkeypatch.setattr(settings, "ADMISSION_MAX_INFLIGHT_PER_USER", {"llm-io": 2, "render": 1})
+    monkeypatch.setattr(settings, "ADMISSION_TYPICAL_TASK_SECONDS", {"llm-io": 160, "render": 600})
+    monkeypatch.setattr(settings, "ADMISSION_MAX_WAITING_PER_USER", 2)
+    return fake
+
+
+async def test_user_inflight_limit_returns_429_until_released(redis):
+    task = FakeTask("generate.generate_images")
+    await submit_task(task, args=("a",), task_id="t1", user_id="u1")
+    await submit_task(task, args=("b",), task_id="t2", user_id="u1")
+
+    with pytest.raises(TooManyRequestsError) as exc:
+        await submit_task(task, args=("c",), task_id="t3", user_id="u1")
+    assert exc.value.status_code == 429
+    assert exc.value.details["reason"] == "user_inflight"
+    # 160秒 / llm-io 并发16
+    assert exc.value.retry_after == 10
+
+    # 其他用户不受影响
+    await submit_task(task, task_id="t4", user_id="u2")
+
+    assert await release_admission("t1") is True
+    assert await release_admission("t1") is False
+    await submit_task(task, args=("c",), task_id="t3", user_id="u1")
+    assert [sent[2] for sent in task.sent] == ["t1", "t2", "t4", "t3"]
+
+
+async def test_queue_depth_rejects_with_estimate(redis):
+    redis.depth["llm-io"] = 13
+    task = FakeTask("generate.generate_audio")
+
+    with pytest.raises(TooManyRequestsError) as exc:
+        await submit_task(task, task_id="t1", user_id="u1")
+    assert exc.value.details["reason"] == "queue_depth"
+    assert exc.value.retry_after == 40  # 超出4个 × 160秒 / 16
+    assert task.sent == []
+
+
+async def test_waiting_list_released_round_robin(redis):
+    task = FakeTask("generate.synthesize_video")
+    await submit_task(task, args=("v1",), task_id="v1", user_id="u1", allow_waiting=True)
+    queued = [
+        await submit_task(task, args=(f"v{i}",), task_id=f"v{i}", user_id="u1", allow_waiting=True)
+        for i in (2, 3)
+    ]
+    assert [(a.waiting, a.position) for a in queued] == [(True, 1), (True, 2)]
+    with pytest.raises(TooManyRequestsError):
+        await submit_task(task, task_id="v4", user_id="u1", allow_waiting=True)
+
+    await submit_task(task, args=("w1",), task_id="w1", user_id="u2", allow_waiting=True)
+    await submit_task(task, args=("w2",), task_id="w2", user_id="u2", allow_waiting=True)
+
+    sent = []
+    send = lambda name, args, kwargs, task_id: sent.append(task_id)
+
+    # 两个用户都没有空闲名额
+    assert await release_waiting(send) == {"llm-io": 0, "render": 0}
+
+    await release_admission("v1")
+    await release_admission("w1")
+    assert (await release_waiting(send))["render"] == 2
+    assert sent == ["v2", "w2"]
+
+    await release_admission("v2")
+    await release_admission("w2")
+    await release_waiting(send)
+    assert sent == ["v2", "w2", "v3"]
+    # 等待列表已空的用户从轮转集合中移除
+    assert redis.sets["admission:waiting-users:render"] == set()
+
+    # 放行锁已释放
+    assert "task-lock:release_waiting_tasks:all" not in redis.store
+
+
+async def test_release_skipped_while_another_releaser_holds_lock(redis):
+    task = FakeTask("generate.synthesize_video")
+    await submit_task(task, task_id="v1", user_id="u1", allow_waiting=True)
+    await submit_task(task, task_id="v2", user_id="u1", allow_waiting=True)
+    await release_admission("v1")
+    sent = []
+    send = lambda name, args, kwargs, task_id: sent.append(task_id)
+
+    redis.store["task-lock:release_waiting_tasks:all"] = "other"
+    assert await release_waiting(send, queues=["render"]) == {"render": 0}
+    assert sent == []
+
+    del redis.store["task-lock:release_waiting_tasks:all"]
+    assert await release_waiting(send, queues=["render"]) == {"render": 1}
+    assert sent == ["v2"]
+
+
+async def test_expired_waiting_tasks_dropped_instead_of_sent(redis, monkeypatch):
+    publish = AsyncMock()
+    monkeypatch.setattr(admission, "publish_progress", publish)
+    task = FakeTask("generate.generate_images")
+    for task_id in ("t1", "t2", "t3", "t4"):
+        await submit_task(task, task_id=task_id, user_id="u1", allow_waiting=True)
+    # 等待列表的键随每次入队续期，且长于提交锁的排队有效期
+    assert redis.ttls["admission:waiting:llm-io:u1"] == settings.ADMISSION_WAITING_TTL_SECONDS
+    assert settings.ADMISSION_WAITING_TTL_SECONDS > settings.TASK_LOCK_QUEUED_TTL_SECONDS
+
+    waiting = redis.lists["admission:waiting:llm-io:u1"]
+    stale = json.loads(waiting[0])
+    stale["enqueued_at"] -= settings.ADMISSION_WAITING_TTL_SECONDS + 1
+    waiting[0] = json.dumps(stale)
+    await release_admission("t1")
+    sent = []
+    send = lambda name, args, kwargs, task_id: sent.append(task_id)
+
+    assert await release_waiting(send, queues=["llm-io"]) == {"llm-io": 1}
+    assert sent == ["t4"]
+    assert publish.await_args.args == ("t3", "finished")
+    assert publish.await_args.kwargs["status"] == "expired"
+
+
+async def test_redis_failure_does_not_block_dispatch(monkeypatch):
+    def broken():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", True)
+    monkeypatch.setattr(admission, "get_broker_redis_client", broken)
+    task = FakeTask("generate.generate_images")
+    result = await submit_task(task, task_id="t1", user_id="u1")
+    assert result.waiting is False
+    assert task.sent == [((), {}, "t1")]
+
+
+def test_too_many_requests_error_carries_retry_after():
+    error = TooManyRequestsError("busy", retry_after=30, details={"queue": "render"})
+    assert error.status_code == 429
+    assert error.retry_after == 30
+    assert error.details == {"retry_after": 30, "queue": "render"}
@@ -0,0 +1,109 @@
+"""
+协作式任务取消测试（Redis 使用内存替身）
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.core import cancellation
+from src.core.cancellation import CancellationScope, TaskCancelled, checkpoint, request_cancel
+from src.utils.ffmpeg_utils import run_ffmpeg_command
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.store)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(cancellation, "get_redis_client", lambda: fake)
+    return fake
+
+
+async def _cancel_later(task_id, delay=0.02):
+    await asyncio.sleep(delay)
+    await request_cancel(task_id)
+
+
+async def test_watcher_interrupts_pending_await(redis):
+    asyncio.create_task(_cancel_later("t1"))
+    started = time.monotonic()
+
+    with pytest.raises(TaskCancelled) as exc:
+        async with CancellationScope("t1", poll_interval=0.01):
+            await asyncio.sleep(30)
+
+    assert exc.value.task_id == "t1"
+    assert time.monotonic() - started < 5
+    # 取消已被作用域消化，之后的 await 不受影响
+    await asyncio.sleep(0)
+
+
+async def test_checkpoint_raises_only_inside_scope(redis):
+    await request_cancel("t2")
+    await checkpoint()
+
+    async with CancellationScope("t3", poll_interval=10) as scope:
+        await checkpoint()
+        assert scope.requested is False
+
+    with pytest.raises(TaskCancelled):
+        async with CancellationScope("t2", poll_interval=10):
+            await checkpoint()
+
+
+async def test_checkpoint_in_child_cancels_siblings(redis):
+    finished = []
+
+    async def _slow():
+        await asyncio.sleep(30)
+        finished.append("slow")
+
+    async def _checked():
+        await request_cancel("t4")
+        await checkpoint()
+        finished.append("checked")
+
+    with pytest.raises(TaskCancelled):
+        async with CancellationScope("t4", poll_interval=10):
+            await asyncio.gather(_slow(), _checked(), return_exceptions=True)
+
+    assert finished == []
+
+
+async def test_ffmpeg_process_group_killed_on_cancel(redis):
+    asyncio.create_task(_cancel_later("t5", delay=0.2))
+    started = time.monotonic()
+
+    with pytest.raises(TaskCancelled):
+        async with CancellationScope("t5", poll_interval=0.01) as scope:
+            await asyncio.to_thread(run_ffmpeg_command, ["sleep", "30"], 60)
+
+    # 进程被终止后线程随即返回并注销进程
+    for _ in range(100):
+        if not scope._processes:
+            break
+        await asyncio.sleep(0.02)
+    assert not scope._processes
+    assert time.monotonic() - started < 5
+
+
+async def test_disarmed_scope_only_stops_at_checkpoints(redis):
+    async with CancellationScope("t6", poll_interval=0.01) as scope:
+        scope.disarm()
+        await request_cancel("t6")
+        await asyncio.sleep(0.05)
+        assert scope.requested is False
+        with pytest.raises(TaskCancelled):
+            await scope.check()
@@ -0,0 +1,232 @@
+"""
+章节流水线测试：canvas 编排、节点状态和失败分片处理（数据库使用替身）
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.core import progress
+from src.core.exceptions import BusinessLogicError, TooManyRequestsError
+from src.models.chapter_pipeline import ChapterPipeline, PipelineNode, PipelineNodeStatus, PipelineStatus
+from src.services import chapter_pipeline
+from src.services.chapter_pipeline import ChapterPipelineService
+from src.tasks import task as tasks
+from src.tasks.queues import queue_for
+
+
+@pytest.fixture(autouse=True)
+def runtime(monkeypatch):
+    """任务在临时事件循环中执行，不启动 Worker 运行时（数据库引擎等）"""
+    monkeypatch.setattr(tasks, "worker_runtime", SimpleNamespace(run=asyncio.run))
+    monkeypatch.setattr(tasks, "publish_progress", AsyncMock())
+
+
+def _pipeline(**kwargs):
+    values = {
+        "id": "p-1",
+        "status": PipelineStatus.PENDING.value,
+        "prompts_status": PipelineNodeStatus.PENDING.value,
+        "images_status": PipelineNodeStatus.PENDING.value,
+        "audio_status": PipelineNodeStatus.PENDING.value,
+        "video_status": PipelineNodeStatus.PENDING.value,
+    }
+    values.update(kwargs)
+    return ChapterPipeline(**values)
+
+
+def test_canvas_runs_audio_alongside_per_chunk_prompt_image_chains():
+    canvas = tasks.build_pipeline_canvas("p-1", "img", "aud", {"audio_chunks": [0, 1], "image_chunks": [0, 1]})
+
+    header = canvas.tasks
+    audio = [sig for sig in header if sig.task == "generate.generation_chunk"]
+    assert [sig.args for sig in audio] == [("aud", 0), ("aud", 1)]
+
+    chains = [sig for sig in header if sig.task != "generate.generation_chunk"]
+    assert len(chains) == 2
+    for chunk_index, link in enumerate(chains):
+        prompts, images = link.tasks
+        assert (prompts.task, prompts.args) == ("generate.pipeline_prompts_chunk", ("p-1", chunk_index))
+        assert (images.task, images.args) == ("generate.generation_chunk", ("img", chunk_index))
+
+    # 视频合成不在 canvas 中，由素材汇总回调加入渲染公平调度
+    assert canvas.body.task == "generate.pipeline_media_done"
+
+
+def test_canvas_without_pending_chunks_only_runs_media_done():
+    canvas = tasks.build_pipeline_canvas("p-1", "img", "aud", {"audio_chunks": [], "image_chunks": []})
+    assert (canvas.task, canvas.args) == ("generate.pipeline_media_done", ("p-1",))
+
+
+def test_media_done_queues_video_through_render_scheduler(monkeypatch):
+    monkeypatch.setattr(tasks, "complete_pipeline_media", AsyncMock(return_value={"status": "running"}))
+    queue = AsyncMock(return_value={"render_task_id": "r-1", "queue_position": 2})
+    monkeypatch.setattr(tasks, "queue_pipeline_video", queue)
+
+    result = tasks.pipeline_media_done.apply(args=("p-1",)).get()
+
+    assert result["video"]["queue_position"] == 2
+    queue.assert_awaited_once_with("p-1", tasks.pipeline_synthesize_video, tasks.celery_app.send_task)
+
+    queue.reset_mock()
+    monkeypatch.setattr(tasks, "complete_pipeline_media", AsyncMock(return_value={"status": "failed"}))
+    tasks.pipeline_media_done.apply(args=("p-1",)).get()
+    queue.assert_not_awaited()
+
+
+def test_pipeline_video_releases_render_slot(monkeypatch):
+    monkeypatch.setattr(tasks, "record_task_run", AsyncMock())
+    monkeypatch.setattr(tasks, "release_admission", AsyncMock(return_value=True))
+    monkeypatch.setattr(tasks.settings, "ADMISSION_ENABLED", False)
+    release = AsyncMock(return_value=True)
+    dispatch = AsyncMock(return_value=1)
+    monkeypatch.setattr(tasks, "release_render_slot", release)
+    monkeypatch.setattr(tasks, "dispatch_ready", dispatch)
+
+    tasks._publish_task_finished(task_id="r-1", task=tasks.pipeline_synthesize_video, state="SUCCESS", retval={})
+
+    release.assert_awaited_once_with("r-1")
+    dispatch.assert_awaited_once_with(tasks.celery_app.send_task)
+
+
+def test_pipeline_video_runs_on_render_queue():
+    assert queue_for("generate.pipeline_synthesize_video") == "render"
+    assert queue_for("generate.pipeline_prompts_chunk") == "llm-io"
+
+
+async def test_start_marks_only_nodes_with_pending_work(monkeypatch):
+    service = ChapterPipelineService(SimpleNamespace())
+    monkeypatch.setattr(service, "plan", AsyncMock(return_value={"audio_chunks": [], "image_chunks": [3]}))
+    monkeypatch.setattr(service, "commit", AsyncMock())
+    pipeline = _pipeline(audio_status=PipelineNodeStatus.COMPLETED.value)
+
+    plan = await service.start(pipeline)
+
+    assert plan["image_chunks"] == [3]
+    assert pipeline.status == PipelineStatus.RUNNING.value
+    assert pipeline.node_status(PipelineNode.PROMPTS) == PipelineNodeStatus.RUNNING.value
+    assert pipeline.node_status(PipelineNode.IMAGES) == PipelineNodeStatus.RUNNING.value
+    assert pipeline.node_status(PipelineNode.AUDIO) == PipelineNodeStatus.COMPLETED.value
+
+
+async def test_resume_requires_failed_pipeline():
+    service = ChapterPipelineService(SimpleNamespace())
+    with pytest.raises(BusinessLogicError):
+        await service.prepare_resume(_pipeline(status=PipelineStatus.RUNNING.value))
+
+
+def test_exhausted_prompts_chunk_fails_image_chunk_and_returns(monkeypatch):
+    """提示词分片重试耗尽时正常返回，后续图片分片和 chord 回调照常执行"""
+    monkeypatch.setattr(tasks, "run_pipeline_prompts_chunk", AsyncMock(side_effect=RuntimeError("llm down")))
+    fail = AsyncMock()
+    monkeypatch.setattr(tasks, "fail_pipeline_prompts_chunk", fail)
+
+    result = tasks.pipeline_prompts_chunk.apply(
+        args=("p-1", 2), retries=tasks.pipeline_prompts_chunk.max_retries
+    ).get()
+
+    assert result == {"chunk": 2, "error": "llm down"}
+    assert fail.await_args.args[:2] == ("p-1", 2)
+
+
+@pytest.fixture
+def published(monkeypatch):
+    """使用真实的 publish_progress，只替换 Redis，记录发布的事件"""
+    events = []
+
+    class _Pipeline:
+        def set(self, key, value, ex=None):
+            pass
+
+        def publish(self, channel, payload):
+            events.append(json.loads(payload))
+
+        async def execute(self):
+            return []
+
+    monkeypatch.setattr(progress, "get_redis_client", lambda: SimpleNamespace(pipeline=lambda transaction: _Pipeline()))
+    monkeypatch.setattr(chapter_pipeline, "TaskLock", lambda *args: SimpleNamespace(release=AsyncMock(), extend=AsyncMock()))
+    return events
+
+
+def _running_service(monkeypatch, pipeline):
+    service = ChapterPipelineService(SimpleNamespace())
+    monkeypatch.setattr(service, "get_pipeline", AsyncMock(return_value=pipeline))
+    monkeypatch.setattr(service, "commit", AsyncMock())
+    return service
+
+
+async def test_complete_media_publishes_node_statuses(monkeypatch, published):
+    pipeline = _pipeline(status=PipelineStatus.RUNNING.value, user_id="u-1", image_batch_id="b-1", audio_batch_id="b-2")
+    service = _running_service(monkeypatch, pipeline)
+    monkeypatch.setattr(service, "execute", AsyncMock(return_value=SimpleNamespace(first=lambda: None)))
+    monkeypatch.setattr(chapter_pipeline, "GenerationBatchService", lambda db: SimpleNamespace(
+        finalize=AsyncMock(return_value={"status": "completed", "failed": 0})
+    ))
+
+    result = await service.complete_media("p-1")
+
+    assert result["status"] == PipelineStatus.RUNNING.value
+    assert published[-1]["stage"] == "video"
+    assert published[-1]["nodes"]["video"] == PipelineNodeStatus.RUNNING.value
+    assert published[-1]["user_id"] == "u-1"
+
+
+async def test_run_video_publishes_finished(monkeypatch, published):
+    pipeline = _pipeline(status=PipelineStatus.RUNNING.value, user_id="u-1", chapter_id="c-1", video_task_id="v-1")
+    service = _running_service(monkeypatch, pipeline)
+    monkeypatch.setattr(chapter_pipeline, "run_exclusive", AsyncMock(return_value={"success": 3}))
+
+    result = await service.run_video("p-1")
+
+    assert result["status"] == PipelineStatus.COMPLETED.value
+    assert published[-1]["stage"] == "finished"
+    assert published[-1]["nodes"]["video"] == PipelineNodeStatus.COMPLETED.value
+
+
+async def test_queue_video_enqueues_with_chapter_cost(monkeypatch, published):
+    pipeline = _pipeline(status=PipelineStatus.RUNNING.value, user_id="u-1", chapter_id="c-1")
+    service = _running_service(monkeypatch, pipeline)
+    monkeypatch.setattr(service, "get", AsyncMock(return_value=SimpleNamespace(sentence_count=40)))
+    enqueue = AsyncMock(return_value={"queue_position": 1, "eta_seconds": 30.0})
+    monkeypatch.setattr(chapter_pipeline, "enqueue_render", enqueue)
+    send = object()
+
+    result = await service.queue_video("p-1", tasks.pipeline_synthesize_video, send)
+
+    assert result["queue_position"] == 1
+    kwargs = enqueue.await_args.kwargs
+    assert enqueue.await_args.args == (tasks.pipeline_synthesize_video,)
+    assert kwargs["args"] == ("p-1",)
+    assert kwargs["task_id"] == result["render_task_id"]
+    assert (kwargs["user_id"], kwargs["sentence_count"], kwargs["send"]) == ("u-1", 40, send)
+
+
+async def test_queue_video_fails_pipeline_when_user_queue_is_full(monkeypatch, published):
+    pipeline = _pipeline(status=PipelineStatus.RUNNING.value, user_id="u-1", chapter_id="c-1")
+    service = _running_service(monkeypatch, pipeline)
+    monkeypatch.setattr(service, "get", AsyncMock(return_value=None))
+    monkeypatch.setattr(chapter_pipeline, "enqueue_render", AsyncMock(
+        side_effect=TooManyRequestsError("排队中的视频任务过多，请稍后重试", retry_after=60)
+    ))
+
+    result = await service.queue_video("p-1", tasks.pipeline_synthesize_video, None)
+
+    assert result["status"] == PipelineStatus.FAILED.value
+    assert pipeline.video_status == PipelineNodeStatus.FAILED.value
+    assert published[-1]["stage"] == "finished"
+
+
+async def test_fail_publishes_error(monkeypatch, published):
+    pipeline = _pipeline(status=PipelineStatus.RUNNING.value, user_id="u-1", chapter_id="c-1")
+    service = _running_service(monkeypatch, pipeline)
+
+    await service._fail(pipeline, "节点失败: images")
+
+    assert pipeline.status == PipelineStatus.FAILED.value
+    assert published[-1]["status"] == PipelineStatus.FAILED.value
+    assert published[-1]["message"] == "节点失败: images"
+
@@ -0,0 +1,166 @@
+"""
+数据库会话使用测试：事务空闲监控、会话并发使用检查、视频合成按阶段使用短会话
+
+环境中没有 PostgreSQL，空闲监控使用同步 SQLite 引擎，视频合成使用会话替身记录每个会话的持有时长。
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core import cancellation, database, progress
+from src.core.database import ConcurrentSessionUseError, GuardedAsyncSession, TransactionIdleMonitor
+from src.models import ChapterStatus, VideoTaskStatus
+from src.services import video_synthesis
+from src.services.video_synthesis import VideoSynthesisService
+
+# 渲染单句视频的耗时，以及单个会话允许持有的最长时间
+RENDER_SECONDS = 0.3
+MAX_SESSION_SECONDS = 0.1
+
+
+def test_idle_monitor_measures_idle_in_transaction(monkeypatch):
+    warnings = []
+    monkeypatch.setattr(database.logger, "warning", warnings.append)
+    engine = create_engine("sqlite://")
+    monitor = TransactionIdleMonitor(warn_seconds=0.05)
+    monitor.install(engine)
+
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        conn.commit()
+    assert monitor.max_idle_seconds < 0.05
+    assert warnings == []
+
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        time.sleep(0.1)
+        conn.commit()
+    assert monitor.max_idle_seconds >= 0.1
+    assert len(warnings) == 1
+
+    monitor.reset()
+    assert monitor.max_idle_seconds == 0.0
+
+
+async def test_guarded_session_rejects_concurrent_use(monkeypatch):
+    async def _slow_execute(self, statement, *args, **kwargs):
+        await asyncio.sleep(0.01)
+        return statement
+
+    monkeypatch.setattr(AsyncSession, "execute", _slow_execute)
+    session = GuardedAsyncSession()
+
+    # 同一协程内顺序和嵌套使用不受影响
+    assert await session.execute("a") == "a"
+    async with session._exclusive("outer"):
+        assert await session.execute("b") == "b"
+
+    with pytest.raises(ConcurrentSessionUseError):
+        await asyncio.gather(session.execute("c"), session.execute("d"))
+    await asyncio.sleep(0.02)
+
+
+class FakeSession:
+    def __init__(self, sentences):
+        self.sentences = sentences
+
+    async def get(self, model, ident):
+        return self.sentences[ident]
+
+    async def commit(self):
+        pass
+
+
+class FakeVideoTaskService:
+    def __init__(self, task, statuses):
+        self.task = task
+        self.statuses = statuses
+
+    async def get_video_task_by_id(self, task_id):
+        return self.task
+
+    async def update_task_status(self, task_id, status):
+        self.task.status = status.value
+        self.statuses.append(status.value)
+
+    async def update_task_progress(self, task_id, value):
+        pass
+
+    async def mark_task_completed(self, task_id, video_key, duration):
+        self.statuses.append(VideoTaskStatus.COMPLETED.value)
+
+
+class FakeStorage:
+    def generate_object_key(self, user_id, filename, prefix):
+        return f"{prefix}/{filename}"
+
+    async def upload_from_path(self, user_id, file_path, original_filename=None, object_key=None, **kwargs):
+        return {"object_key": object_key}
+
+
+async def test_synthesize_video_holds_no_session_while_rendering(monkeypatch):
+    sentences = {
+        str(uuid.uuid4()): SimpleNamespace(
+            order_index=i, content=f"句子{i}", image_url="img", audio_url="audio",
+            sentence_video_key=None, has_valid_cache=lambda: False,
+            save_video_cache=lambda key, duration: None,
+        )
+        for i in range(3)
+    }
+    for sentence_id, sentence in sentences.items():
+        sentence.id = sentence_id
+    task = SimpleNamespace(
+        id="v1", user_id="u1", project_id="p1", chapter_id="c1", background_id=None, api_key_id=None,
+        status=VideoTaskStatus.PENDING.value, cancel_requested_at=None, total_sentences=0,
+        get_gen_setting=lambda: {},
+    )
+    chapter = SimpleNamespace(id="c1", status=ChapterStatus.MATERIALS_PREPARED.value)
+    statuses = []
+    held = []
+
+    @asynccontextmanager
+    async def _get_async_db():
+        opened = time.monotonic()
+        try:
+            yield FakeSession(sentences)
+        finally:
+            held.append(time.monotonic() - opened)
+
+    async def _render(sentence, temp_dir, index, **kwargs):
+        await asyncio.sleep(RENDER_SECONDS)
+        path = temp_dir / f"{index}.mp4"
+        path.write_bytes(b"video")
+        return path
+
+    monkeypatch.setattr(video_synthesis, "get_async_db", _get_async_db)
+    monkeypatch.setattr(video_synthesis, "VideoTaskService", lambda db: FakeVideoTaskService(task, statuses))
+    monkeypatch.setattr(video_synthesis, "ChapterService", lambda db: SimpleNamespace(
+        get_chapter_by_id=AsyncMock(return_value=chapter),
+        get_sentences=AsyncMock(return_value=list(sentences.values())),
+    ))
+    monkeypatch.setattr(video_synthesis, "check_ffmpeg_installed", lambda: True)
+    monkeypatch.setattr(video_synthesis, "concatenate_videos", lambda paths, output, concat_file: True)
+    monkeypatch.setattr(video_synthesis, "get_audio_duration", lambda path: 5.0)
+    monkeypatch.setattr(video_synthesis.video_composition_service, "synthesize_sentence_video", _render)
+    monkeypatch.setattr(progress, "publish_progress", AsyncMock())
+    monkeypatch.setattr(cancellation, "is_cancel_requested", AsyncMock(return_value=False))
+
+    service = VideoSynthesisService()
+    service.storage_client = FakeStorage()
+    started = time.monotonic()
+    result = await service.synthesize_video("v1")
+
+    assert result["success"] == 3 and result["failed"] == 0
+    assert statuses[-1] == VideoTaskStatus.COMPLETED.value
+    assert time.monotonic() - started >= RENDER_SECONDS
+    # 准备、每句缓存写入、状态更新和完成各自使用短会话，渲染期间不持有会话
+    assert len(held) >= 3 + 4
+    assert max(held) < MAX_SESSION_SECONDS
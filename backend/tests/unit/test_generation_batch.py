@@ -0,0 +1,225 @@
+"""
+分片批量生成测试：单句重试、分片规划和 chord 编排（数据库与Provider使用替身）
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from celery.exceptions import Ignore
+
+from src.models.generation_batch import GenerationItem, GenerationItemStatus, GenerationKind
+from src.services import generation_batch
+from src.services.generation_batch import attempt_item, plan_chunks
+from src.tasks import task as tasks
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录退避等待时长，不真正等待"""
+    recorded = []
+
+    async def _sleep(seconds):
+        recorded.append(seconds)
+
+    monkeypatch.setattr(generation_batch.asyncio, "sleep", _sleep)
+    monkeypatch.setattr(generation_batch.random, "random", lambda: 0.0)
+    return recorded
+
+
+@pytest.fixture(autouse=True)
+def runtime(monkeypatch):
+    """任务在临时事件循环中执行，不启动 Worker 运行时（数据库引擎等）"""
+    monkeypatch.setattr(tasks, "worker_runtime", SimpleNamespace(run=asyncio.run))
+    monkeypatch.setattr(tasks, "publish_progress", AsyncMock())
+
+
+def _item(attempts=0):
+    return GenerationItem(sentence_id="s", status=GenerationItemStatus.PENDING.value, attempts=attempts)
+
+
+def test_plan_chunks_keeps_submission_order():
+    assert plan_chunks(5, 2) == [0, 0, 1, 1, 2]
+    assert plan_chunks(3, 50) == [0, 0, 0]
+    assert plan_chunks(0, 50) == []
+
+
+async def test_attempt_item_retries_with_backoff_until_success(sleeps):
+    generate = AsyncMock(side_effect=[RuntimeError("rate limited"), RuntimeError("timeout"), "key"])
+    item = _item()
+
+    assert await attempt_item(item, generate, max_attempts=3, base_delay=1.0)
+    assert item.status == GenerationItemStatus.SUCCEEDED
+    assert item.attempts == 3
+    assert item.last_error is None
+    assert item.finished_at is not None
+    assert sleeps == [1.0, 2.0]
+
+
+async def test_attempt_item_marks_failed_after_max_attempts(sleeps):
+    generate = AsyncMock(side_effect=RuntimeError("content policy"))
+    item = _item()
+
+    assert not await attempt_item(item, generate, max_attempts=2, base_delay=1.0)
+    assert item.status == GenerationItemStatus.FAILED
+    assert item.attempts == 2
+    assert "content policy" in item.last_error
+    # 最后一次失败后不再等待
+    assert sleeps == [1.0]
+
+
+async def test_attempt_item_counts_attempts_across_redeliveries(sleeps):
+    """子任务重投时已用掉的尝试次数继续累计"""
+    generate = AsyncMock(side_effect=RuntimeError("boom"))
+    item = _item(attempts=2)
+
+    assert not await attempt_item(item, generate, max_attempts=3, base_delay=1.0)
+    assert generate.await_count == 1
+    assert item.attempts == 3
+
+
+def _bound_task(name, task_id):
+    return SimpleNamespace(name=name, request=SimpleNamespace(id=task_id), replace=lambda sig: Ignore())
+
+
+def test_generation_batch_replaced_by_chunk_chord(monkeypatch):
+    prepare = AsyncMock(return_value=[0, 2])
+    monkeypatch.setattr(tasks, "prepare_generation_batch", prepare)
+    replaced = []
+
+    def _replace(sig):
+        replaced.append(sig)
+        return Ignore()
+
+    task = SimpleNamespace(name="generate.generate_images", request=SimpleNamespace(id="batch-1"), replace=_replace)
+    with pytest.raises(Ignore):
+        tasks._start_generation_batch(task, GenerationKind.IMAGE, "key", [uuid.uuid4().hex, uuid.uuid4().hex], {"model": None})
+
+    operation, batch_id, kind = prepare.await_args.args[:3]
+    assert (operation, batch_id, kind) == ("generate_images", "batch-1", GenerationKind.IMAGE)
+    sig = replaced[0]
+    assert [s.args for s in sig.tasks] == [("batch-1", 0), ("batch-1", 2)]
+    assert all(s.immutable for s in sig.tasks)
+    assert sig.body.task == "generate.finalize_generation_batch"
+    assert sig.body.args == ("batch-1",)
+
+
+def test_generation_batch_skipped_when_lock_held(monkeypatch):
+    monkeypatch.setattr(tasks, "prepare_generation_batch", AsyncMock(return_value=None))
+
+    result = tasks._start_generation_batch(
+        _bound_task("generate.generate_audio", "batch-2"), GenerationKind.AUDIO, "key", [uuid.uuid4().hex], {}
+    )
+    assert result["skipped"] is True
+
+
+def test_generation_batch_without_pending_chunks_finalizes_directly(monkeypatch):
+    monkeypatch.setattr(tasks, "prepare_generation_batch", AsyncMock(return_value=[]))
+    complete = AsyncMock(return_value={"batch_id": "batch-3", "total": 1, "success": 1, "failed": 0})
+    monkeypatch.setattr(tasks, "complete_generation_batch", complete)
+
+    result = tasks._start_generation_batch(
+        _bound_task("generate.generate_images", "batch-3"), GenerationKind.IMAGE, "key", [uuid.uuid4().hex], {}
+    )
+    assert result["success"] == 1
+    complete.assert_awaited_once_with("batch-3")
+
+
+def test_exhausted_chunk_marks_items_failed_and_returns(monkeypatch):
+    """分片重试耗尽时正常返回，chord 回调照常汇总"""
+    monkeypatch.setattr(tasks, "run_generation_chunk", AsyncMock(side_effect=RuntimeError("db down")))
+    fail = AsyncMock()
+    monkeypatch.setattr(tasks, "fail_generation_chunk", fail)
+
+    result = tasks.generation_chunk.apply(args=("batch-4", 1), retries=tasks.generation_chunk.max_retries).get()
+
+    assert result == {"chunk": 1, "error": "db down"}
+    fail.assert_awaited_once()
+    assert fail.await_args.args[:2] == ("batch-4", 1)
+
+
+async def test_cancelled_batch_skips_chunks_and_finalizes_as_cancelled(monkeypatch):
+    """已请求取消的批次：分片跳过，汇总时标记为已取消并保留成功数"""
+    from datetime import datetime, timezone
+
+    from src.models.generation_batch import GenerationBatch
+
+    batch = GenerationBatch(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), kind=GenerationKind.IMAGE.value, api_key_id=uuid.uuid4(),
+        lock_resource="res", status="running", chunk_size=50, total=3,
+        cancel_requested_at=datetime.now(timezone.utc),
+    )
+    service = generation_batch.GenerationBatchService(AsyncMock())
+    monkeypatch.setattr(service, "get_batch", AsyncMock(return_value=batch))
+    monkeypatch.setattr(service, "execute", AsyncMock(return_value=SimpleNamespace(all=lambda: [(_item(), None)])))
+
+    report = await service.run_chunk(str(batch.id), 0)
+    assert report == {"chunk": 0, "succeeded": 0, "failed": 0, "cancelled": True}
+
+    monkeypatch.setattr(service, "count_items", AsyncMock(return_value={"succeeded": 1, "pending": 2}))
+    monkeypatch.setattr(service, "commit", AsyncMock())
+    monkeypatch.setattr(generation_batch, "APIKeyService", lambda db: SimpleNamespace(update_usage=AsyncMock()))
+    monkeypatch.setattr(generation_batch, "TaskLock", lambda *args: SimpleNamespace(release=AsyncMock()))
+    monkeypatch.setattr(generation_batch, "release_admission", AsyncMock())
+    monkeypatch.setattr(generation_batch, "publish_progress", AsyncMock())
+
+    summary = await service.finalize(str(batch.id))
+    assert summary["status"] == "cancelled"
+    assert (summary["success"], summary["failed"]) == (1, 0)
+
+
+async def test_chunk_releases_objects_replaced_by_regeneration(monkeypatch):
+    """提交后释放被覆盖的旧图片：只释放本次生成成功的句子原来的对象（内容未变时新旧键相同也要释放一次）"""
+    from src.core.config import settings
+    from src.models.generation_batch import GenerationBatch
+    from src.services import image
+
+    batch = GenerationBatch(
+        id=uuid.uuid4(), user_id=uuid.uuid4(), kind=GenerationKind.IMAGE.value, api_key_id=uuid.uuid4(),
+        lock_resource="res", status="running", chunk_size=50, total=3,
+    )
+    sentences = [
+        SimpleNamespace(id="s1", image_url="blobs/old.png"),
+        SimpleNamespace(id="s2", image_url="blobs/same.png"),
+        SimpleNamespace(id="s3", image_url="blobs/kept.png"),
+    ]
+    rows = [(_item(), sentence) for sentence in sentences]
+    new_keys = {"s1": "blobs/new.png", "s2": "blobs/same.png"}
+
+    async def _generate(sentence, *args):
+        if sentence.id not in new_keys:
+            raise RuntimeError("content policy")
+        sentence.image_url = new_keys[sentence.id]
+
+    class _Scope:
+        requested = False
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    storage = SimpleNamespace(release_replaced_files=AsyncMock())
+    monkeypatch.setattr(settings, "GENERATION_ITEM_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(image, "generate_sentence_image", _generate)
+    monkeypatch.setattr(generation_batch, "get_storage_client", AsyncMock(return_value=storage))
+    monkeypatch.setattr(generation_batch, "TaskLock", lambda *args: SimpleNamespace(extend=AsyncMock()))
+    monkeypatch.setattr(generation_batch, "APIKeyService", lambda db: SimpleNamespace(get_api_key_by_id=AsyncMock(
+        return_value=SimpleNamespace(provider="openai", get_api_key=lambda: "key", base_url=None)
+    )))
+    monkeypatch.setattr(generation_batch, "ProviderFactory", SimpleNamespace(create=lambda **kwargs: object()))
+    monkeypatch.setattr(generation_batch, "CancellationScope", lambda batch_id: _Scope())
+    service = generation_batch.GenerationBatchService(AsyncMock())
+    monkeypatch.setattr(service, "get_batch", AsyncMock(return_value=batch))
+    monkeypatch.setattr(service, "execute", AsyncMock(return_value=SimpleNamespace(all=lambda: rows)))
+    for name in ("end_transaction", "commit", "_publish"):
+        monkeypatch.setattr(service, name, AsyncMock())
+
+    report = await service.run_chunk(str(batch.id), 0)
+
+    assert (report["succeeded"], report["failed"]) == (2, 1)
+    assert list(storage.release_replaced_files.await_args.args[0]) == ["blobs/old.png", "blobs/same.png"]
+
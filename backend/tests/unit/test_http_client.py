@@ -0,0 +1,115 @@
+"""
+资源下载客户端测试
+"""
+
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.core.config import settings
+from src.utils import http_client
+from src.utils.http_client import AssetDownloadError, download_to_storage, sniff_content_type
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\0" * 1000
+
+
+@pytest.fixture
+async def server():
+    calls = {"flaky": 0}
+
+    async def image(request):
+        return web.Response(body=PNG, content_type="application/octet-stream")
+
+    async def flaky(request):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            return web.Response(status=503)
+        return web.Response(body=PNG)
+
+    async def huge(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for _ in range(10):
+            await response.write(b"\xff\xd8\xff" + b"x" * 1000)
+        return response
+
+    async def missing(request):
+        return web.Response(status=404)
+
+    app = web.Application()
+    app.router.add_get("/image", image)
+    app.router.add_get("/flaky", flaky)
+    app.router.add_get("/huge", huge)
+    app.router.add_get("/missing", missing)
+    server = TestServer(app)
+    await server.start_server()
+    server.calls = calls
+    yield server
+    await http_client.close_http_session()
+    await server.close()
+
+
+@pytest.fixture
+def storage():
+    storage = Mock()
+    storage.received = []
+
+    async def upload_stream(user_id, chunks, filename, **kwargs):
+        async for chunk in chunks:
+            storage.received.append(chunk)
+        return {"object_key": kwargs.get("object_key") or f"uploads/{filename}", "size": 0, "sha256": "abc"}
+
+    storage.upload_stream = AsyncMock(side_effect=upload_stream)
+    storage.commit_staged_object = AsyncMock(return_value={"object_key": "blobs/abc.png", "deduplicated": False})
+    return storage
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    monkeypatch.setattr(settings, "ASSET_FETCH_CHUNK_SIZE", 256)
+    monkeypatch.setattr(http_client.random, "random", lambda: 0)
+    monkeypatch.setattr(http_client.asyncio, "sleep", AsyncMock())
+
+
+class TestSniffContentType:
+    """文件头识别"""
+
+    def test_magic_overrides_declared_type(self):
+        assert sniff_content_type(PNG, "image/jpeg") == "image/png"
+        assert sniff_content_type(b"RIFF\0\0\0\0WEBPVP8 ", None) == "image/webp"
+        assert sniff_content_type(b"unknown", "image/jpeg; charset=binary") == "image/jpeg"
+        assert sniff_content_type(b"unknown") == "application/octet-stream"
+
+
+class TestDownloadToStorage:
+    """流式下载到存储"""
+
+    async def test_streams_in_chunks_and_commits_content_addressed(self, server, storage):
+        result = await download_to_storage(str(server.make_url("/image")), storage, "user-1", dedup=True)
+
+        assert b"".join(storage.received) == PNG
+        assert max(len(chunk) for chunk in storage.received) <= 256
+        kwargs = storage.upload_stream.await_args.kwargs
+        assert kwargs["content_type"] == "image/png"
+        assert kwargs["object_key"].startswith(http_client.ASSET_STAGING_PREFIX)
+        assert kwargs["object_key"].endswith(".png")
+        assert kwargs["catalog"] is False
+        storage.commit_staged_object.assert_awaited_once()
+        assert result["object_key"] == "blobs/abc.png"
+        assert result["content_type"] == "image/png"
+
+    async def test_retries_retryable_status(self, server, storage):
+        await download_to_storage(str(server.make_url("/flaky")), storage, "user-1")
+
+        assert server.calls["flaky"] == 2
+        storage.upload_stream.assert_awaited_once()
+        storage.commit_staged_object.assert_not_awaited()
+
+    async def test_size_cap_and_client_errors_not_retried(self, server, storage):
+        with pytest.raises(AssetDownloadError, match="大小上限"):
+            await download_to_storage(str(server.make_url("/huge")), storage, "user-1", max_bytes=5000)
+        with pytest.raises(AssetDownloadError, match="404"):
+            await download_to_storage(str(server.make_url("/missing")), storage, "user-1")
+        assert storage.upload_stream.await_count == 1
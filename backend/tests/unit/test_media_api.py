@@ -0,0 +1,108 @@
+"""
+媒体分发API单元测试
+"""
+
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.api.v1.media import RangeNotSatisfiable, parse_range_header, serve_object
+
+
+class TestParseRangeHeader:
+    """Range请求头解析测试"""
+
+    def test_missing_header(self):
+        assert parse_range_header(None, 100) is None
+
+    def test_closed_range(self):
+        assert parse_range_header("bytes=0-9", 100) == (0, 9)
+
+    def test_open_ended_range(self):
+        assert parse_range_header("bytes=90-", 100) == (90, 99)
+
+    def test_suffix_range(self):
+        assert parse_range_header("bytes=-10", 100) == (90, 99)
+        assert parse_range_header("bytes=-500", 100) == (0, 99)
+
+    def test_end_clamped_to_size(self):
+        assert parse_range_header("bytes=50-1000", 100) == (50, 99)
+
+    def test_multi_range_falls_back_to_full(self):
+        assert parse_range_header("bytes=0-1,5-9", 100) is None
+
+    def test_malformed_header_ignored(self):
+        assert parse_range_header("items=0-1", 100) is None
+        assert parse_range_header("bytes=abc", 100) is None
+        assert parse_range_header("bytes=9-1", 100) is None
+
+    def test_unsatisfiable(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=100-", 100)
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range_header("bytes=-0", 100)
+
+
+class TestServeObject:
+    """对象分发测试"""
+
+    @pytest.fixture
+    def stat(self):
+        return {
+            "size": 3600 * 1024 * 1024,
+            "etag": "abc123",
+            "last_modified": datetime(2025, 1, 1, tzinfo=timezone.utc),
+            "content_type": "video/mp4",
+        }
+
+    @staticmethod
+    def _request(headers=None, method="GET"):
+        request = Mock()
+        request.method = method
+        request.headers = headers or {}
+        return request
+
+    async def test_range_request_streams_only_requested_bytes(self, stat):
+        with patch("src.api.v1.media.storage_client") as storage:
+            storage.stat_object = AsyncMock(return_value=stat)
+            response = await serve_object(self._request({"range": "bytes=1000-1999"}), "videos/a.mp4")
+
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 1000-1999/{stat['size']}"
+        assert response.headers["content-length"] == "1000"
+        storage.download_stream.assert_called_once_with("videos/a.mp4", offset=1000, length=1000)
+
+    async def test_if_none_match_returns_304(self, stat):
+        with patch("src.api.v1.media.storage_client") as storage:
+            storage.stat_object = AsyncMock(return_value=stat)
+            response = await serve_object(self._request({"if-none-match": '"abc123"'}), "videos/a.mp4")
+
+        assert response.status_code == 304
+        storage.download_stream.assert_not_called()
+
+    async def test_stale_if_range_returns_full_object(self, stat):
+        headers = {"range": "bytes=0-99", "if-range": '"old-etag"'}
+        with patch("src.api.v1.media.storage_client") as storage:
+            storage.stat_object = AsyncMock(return_value=stat)
+            response = await serve_object(self._request(headers), "videos/a.mp4")
+
+        assert response.status_code == 200
+        storage.download_stream.assert_called_once_with("videos/a.mp4", offset=0, length=stat["size"])
+
+    async def test_unsatisfiable_range_returns_416(self, stat):
+        with patch("src.api.v1.media.storage_client") as storage:
+            storage.stat_object = AsyncMock(return_value=stat)
+            response = await serve_object(self._request({"range": f"bytes={stat['size']}-"}), "videos/a.mp4")
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{stat['size']}"
+
+    async def test_head_request_has_no_body(self, stat):
+        with patch("src.api.v1.media.storage_client") as storage:
+            storage.stat_object = AsyncMock(return_value=stat)
+            response = await serve_object(self._request({"range": "bytes=0-9"}, method="HEAD"), "videos/a.mp4")
+
+        assert response.status_code == 206
+        assert response.headers["content-length"] == "10"
+        storage.download_stream.assert_not_called()
@@ -0,0 +1,238 @@
+"""
+任务进度事件总线测试（Redis 使用内存替身）
+"""
+
+import asyncio
+import fnmatch
+import json
+
+import pytest
+
+from src.api import websocket as ws
+from src.core import progress as progress_module
+from src.core.progress import ProgressTracker, gather_with_progress, get_last_progress, publish_progress
+
+
+class FakePubSub:
+    def __init__(self, redis):
+        self.redis = redis
+        self.patterns = []
+        self.queue = asyncio.Queue()
+
+    async def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+        self.redis.pubsubs.append(self)
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        if self in self.redis.pubsubs:
+            self.redis.pubsubs.remove(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def set(self, key, value, ex=None):
+        self.ops.append(self.redis.set(key, value, ex=ex))
+
+    def publish(self, channel, data):
+        self.ops.append(self.redis.publish(channel, data))
+
+    async def execute(self):
+        return [await op for op in self.ops]
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttl = {}
+        self.published = []
+        self.pubsubs = []
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.ttl[key] = ex
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def publish(self, channel, data):
+        self.published.append((channel, json.loads(data)))
+        receivers = 0
+        for pubsub in self.pubsubs:
+            for pattern in pubsub.patterns:
+                if fnmatch.fnmatchcase(channel, pattern):
+                    pubsub.queue.put_nowait({"type": "pmessage", "pattern": pattern, "channel": channel, "data": data})
+                    receivers += 1
+        return receivers
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return FakePubSub(self)
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    def updates(self):
+        return [m for m in self.sent if m["type"] == "task_update"]
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(progress_module, "get_redis_client", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def owners():
+    """任务所属用户 {task_id: user_id}（替代数据库查询）"""
+    return {}
+
+
+@pytest.fixture
+def manager(monkeypatch, owners):
+    async def _resolve(task_id):
+        return owners.get(task_id)
+
+    fresh = ws.ConnectionManager(owner_resolver=_resolve)
+    monkeypatch.setattr(ws, "manager", fresh)
+    return fresh
+
+
+async def _wait_for_listener(redis):
+    for _ in range(50):
+        if redis.pubsubs:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def _wait_for_updates(socket):
+    for _ in range(50):
+        if socket.updates():
+            return
+        await asyncio.sleep(0.01)
+
+
+async def test_publish_stores_last_state(redis):
+    await publish_progress("t1", "generate_images", percent=150, current=3, total=10, sentence_index=7)
+
+    channel, event = redis.published[0]
+    assert channel == "task-progress:t1"
+    assert event["percent"] == 100.0
+    assert event["sentence_index"] == 7
+    assert "eta_seconds" not in event
+    assert await get_last_progress("t1") == event
+    assert redis.ttl["task-progress:last:t1"] > 0
+
+
+async def test_tracker_reports_stage_range_and_eta(redis):
+    tracker = ProgressTracker("t2", user_id="u1", min_interval=0)
+
+    async def _item(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await gather_with_progress(
+        [_item(i) for i in range(4)], tracker, "synthesizing_videos", [10, 11, 12, 13], start=10, end=80,
+    )
+
+    assert results == [0, 1, 2, 3]
+    events = [event for _, event in redis.published]
+    assert events[0]["stage"] == "synthesizing_videos"
+    assert events[0]["percent"] == 10.0
+    assert [e["current"] for e in events[1:]] == [1, 2, 3, 4]
+    assert events[-1]["percent"] == 80.0
+    assert events[-1]["eta_seconds"] == 0
+    assert all(e["user_id"] == "u1" for e in events)
+
+
+async def test_tracker_throttles_intermediate_updates(redis):
+    tracker = ProgressTracker("t3", min_interval=60)
+    await tracker.stage("generate_audio", total=5)
+    for _ in range(5):
+        await tracker.advance()
+
+    # 阶段开始 + 最后一项（中间项被节流）
+    assert [e.get("current") for _, e in redis.published] == [0, 5]
+
+
+async def test_bridge_fans_out_and_replays(redis, manager, owners):
+    owners["t4"] = "u1"
+    socket_a, socket_b = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(socket_a, "u1", "a")
+    await manager.connect(socket_b, "u2", "b")
+    await manager.subscribe_to_task("u1", "a", "t4")
+    await manager.subscribe_to_task("u2", "b", "t4")
+
+    # 订阅他人任务被拒绝
+    assert socket_b.sent[-1]["type"] == "error"
+    assert "u2" not in manager.get_task_subscribers("t4")
+
+    listener = asyncio.create_task(progress_module.listen_progress(ws.forward_progress_event))
+    try:
+        await _wait_for_listener(redis)
+        # 大部分事件不带 user_id，按任务归属转发
+        await publish_progress("t4", "generate_images", percent=40)
+        await _wait_for_updates(socket_a)
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+    assert socket_a.updates()[0]["percent"] == 40.0
+    assert socket_b.updates() == []
+
+    # 新连接订阅时回放最新状态
+    socket_c = FakeWebSocket()
+    await manager.connect(socket_c, "u1", "c")
+    await manager.subscribe_to_task("u1", "c", "t4")
+    replay = socket_c.updates()[0]
+    assert replay["replay"] is True
+    assert replay["stage"] == "generate_images"
+
+
+async def test_unresolved_owner_gets_nothing_until_known(redis, manager, owners):
+    """刚提交的任务尚无记录：先保留订阅，确定归属之前不回放、不转发"""
+    await publish_progress("t6", "started", status="started")
+    socket_a, socket_b = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(socket_a, "u1", "a")
+    await manager.connect(socket_b, "u2", "b")
+    await manager.subscribe_to_task("u1", "a", "t6")
+    await manager.subscribe_to_task("u2", "b", "t6")
+    assert socket_a.updates() == [] and socket_b.updates() == []
+
+    await ws.forward_progress_event({"task_id": "t6", "stage": "running", "percent": 10})
+    assert socket_a.updates() == [] and socket_b.updates() == []
+
+    owners["t6"] = "u1"
+    await ws.forward_progress_event({"task_id": "t6", "stage": "running", "percent": 20})
+    assert [u["percent"] for u in socket_a.updates()] == [20]
+    assert socket_b.updates() == []
+    assert manager.task_owners["t6"] == "u1"
+
+    manager.disconnect("u1", "a")
+    manager.disconnect("u2", "b")
+    assert "t6" not in manager.task_subscriptions and "t6" not in manager.task_owners
+
+
+async def test_publish_failure_does_not_raise(monkeypatch):
+    def _broken():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(progress_module, "get_redis_client", _broken)
+    assert await publish_progress("t5", "started") is None
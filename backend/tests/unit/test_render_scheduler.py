@@ -0,0 +1,207 @@
+"""
+视频合成公平调度测试（Redis 使用内存替身）
+"""
+
+import pytest
+
+from src.core import render_scheduler, task_lock
+from src.core.config import settings
+from src.core.exceptions import TooManyRequestsError
+from src.core.render_scheduler import (
+    RenderJob,
+    cancel_render,
+    dispatch_ready,
+    enqueue_render,
+    queue_positions,
+    release_render_slot,
+    schedule_order,
+)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+        return call
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class FakeRedis:
+    """支持字符串和有序集合的内存Redis"""
+
+    def __init__(self):
+        self.store = {}
+        self.zsets = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        return True
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    async def delete(self, key):
+        return int(self.store.pop(key, None) is not None)
+
+    async def eval(self, script, numkeys, key, holder, *args):
+        assert script == task_lock.RELEASE_SCRIPT
+        if self.store.get(key) == holder:
+            del self.store[key]
+            return 1
+        return 0
+
+    async def zadd(self, key, mapping, nx=False):
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if nx and member in zset:
+                continue
+            zset[member] = float(score)
+        return len(mapping)
+
+    async def zrem(self, key, member):
+        return int(self.zsets.get(key, {}).pop(member, None) is not None)
+
+    async def zcard(self, key):
+        return len(self.zsets.get(key, {}))
+
+    async def zrange(self, key, start, end, withscores=False):
+        items = sorted(self.zsets.get(key, {}).items(), key=lambda item: (item[1], item[0]))
+        return items if withscores else [member for member, _ in items]
+
+    async def zremrangebyscore(self, key, low, high):
+        zset = self.zsets.get(key, {})
+        for member in [m for m, score in zset.items() if score <= high]:
+            del zset[member]
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakeTask:
+    name = "generate.synthesize_video"
+
+
+def _job(task_id, user, cost=60.0, priority=0, enqueued_at=0.0):
+    return RenderJob(task_id, user, FakeTask.name, [task_id], {}, cost, priority, enqueued_at)
+
+
+@pytest.fixture(autouse=True)
+def scheduler_settings(monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_SCHEDULER_ENABLED", True)
+    monkeypatch.setattr(settings, "RENDER_SCHEDULER_SLOTS", 2)
+    monkeypatch.setattr(settings, "RENDER_SECONDS_PER_SENTENCE", 1.0)
+    monkeypatch.setattr(settings, "RENDER_PRIORITY_BOOST_SECONDS", 600.0)
+    monkeypatch.setattr(settings, "RENDER_AGING_FACTOR", 1.0)
+    monkeypatch.setattr(settings, "RENDER_MAX_PENDING_PER_USER", 3)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(render_scheduler, "get_redis_client", lambda: fake)
+    monkeypatch.setattr(task_lock, "get_redis_client", lambda: fake)
+    return fake
+
+
+def test_light_user_is_not_blocked_by_heavy_batch():
+    heavy = [_job(f"h{i}", "heavy", cost=600, enqueued_at=i) for i in range(5)]
+    light = [_job("l1", "light", cost=600, enqueued_at=10)]
+
+    order = [s.job.task_id for s in schedule_order({"heavy": heavy, "light": light}, {}, 0.0, now=10)]
+
+    assert order[:3] == ["h0", "l1", "h1"]
+
+
+def test_small_jobs_and_priority_go_first():
+    jobs = {
+        "a": [_job("big", "a", cost=3000)],
+        "b": [_job("small", "b", cost=60)],
+        "c": [_job("preview", "c", cost=1200, priority=2)],
+    }
+    order = [s.job.task_id for s in schedule_order(jobs, {}, 0.0, now=0)]
+    assert order == ["preview", "small", "big"]
+
+
+def test_aging_prevents_starvation():
+    # heavy 用户已消耗大量虚拟时间：刚等待时新用户优先，等待足够久后 heavy 的队首任务先调度
+    vtimes = {"heavy": 3000.0}
+    waited_briefly = {
+        "heavy": [_job("old", "heavy", cost=60, enqueued_at=0)],
+        "new": [_job("fresh", "new", cost=60, enqueued_at=100)],
+    }
+    assert schedule_order(waited_briefly, vtimes, 0.0, now=100)[0].job.task_id == "fresh"
+
+    waited_long = {
+        "heavy": [_job("old", "heavy", cost=60, enqueued_at=0)],
+        "new": [_job("fresh", "new", cost=60, enqueued_at=5000)],
+    }
+    assert schedule_order(waited_long, vtimes, 0.0, now=5000)[0].job.task_id == "old"
+
+
+def test_eta_uses_slot_free_times():
+    jobs = {"a": [_job("a1", "a", cost=100), _job("a2", "a", cost=100, enqueued_at=1)]}
+    order = schedule_order(jobs, {}, 0.0, now=0, slot_free_at=[30.0, 50.0])
+    assert [(s.job.task_id, s.eta_seconds) for s in order] == [("a1", 30.0), ("a2", 50.0)]
+
+
+async def test_dispatch_only_when_slots_free(redis):
+    sent = []
+    send = lambda name, args, kwargs, task_id: sent.append(task_id)
+
+    for i in range(3):
+        await enqueue_render(FakeTask(), args=(f"a{i}",), task_id=f"a{i}", user_id="ua", sentence_count=100)
+    await enqueue_render(FakeTask(), args=("b0",), task_id="b0", user_id="ub", sentence_count=100)
+
+    assert await dispatch_ready(send) == 2
+    assert sent == ["a0", "b0"]
+    assert (await queue_positions(["a1", "a2", "b0"])) == {
+        "a1": {"queue_position": 1, "eta_seconds": pytest.approx(100.0, abs=1)},
+        "a2": {"queue_position": 2, "eta_seconds": pytest.approx(100.0, abs=1)},
+    }
+
+    # 槽位已满，不再投递
+    assert await dispatch_ready(send) == 0
+    assert await release_render_slot("a0") is True
+    assert await dispatch_ready(send) == 1
+    assert sent == ["a0", "b0", "a1"]
+    # 调度锁已释放
+    assert "task-lock:render_scheduler:dispatch" not in redis.store
+
+
+async def test_enqueue_rejects_over_pending_limit_and_cancel(redis):
+    for i in range(3):
+        await enqueue_render(FakeTask(), task_id=f"t{i}", user_id="u1", sentence_count=10)
+
+    with pytest.raises(TooManyRequestsError) as exc:
+        await enqueue_render(FakeTask(), task_id="t3", user_id="u1")
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after >= 1
+
+    assert await cancel_render("t1") is True
+    assert await cancel_render("t1") is False
+    assert await redis.zrange("render-sched:jobs:u1", 0, -1) == ["t0", "t2"]
+    await enqueue_render(FakeTask(), task_id="t3", user_id="u1")
+
+
+async def test_disabled_scheduler_dispatches_directly(monkeypatch):
+    monkeypatch.setattr(settings, "RENDER_SCHEDULER_ENABLED", False)
+    calls = []
+
+    class DirectTask(FakeTask):
+        def apply_async(self, args, kwargs, task_id):
+            calls.append(task_id)
+
+    result = await enqueue_render(DirectTask(), args=("v1",), task_id="v1", user_id="u1")
+    assert calls == ["v1"]
+    assert result == {"queue_position": None, "eta_seconds": None}
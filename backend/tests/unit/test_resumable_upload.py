@@ -0,0 +1,293 @@
+"""
+断点续传服务测试
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.core.config import settings
+from src.core.exceptions import BusinessLogicError, ConflictError, FileUploadError
+from src.services import resumable_upload
+from src.services.resumable_upload import ResumableUploadService, UploadPurpose, UploadStatus
+
+
+class FakeRedis:
+    """只实现服务用到的命令"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return False
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+async def _body(data: bytes, piece: int = 3):
+    for start in range(0, len(data), piece):
+        yield data[start:start + piece]
+
+
+@pytest.fixture
+def storage():
+    storage = Mock()
+    storage.create_multipart_upload = AsyncMock(return_value="s3-upload-id")
+    storage.upload_part = AsyncMock(side_effect=lambda key, uid, n, body: f"etag-{n}")
+    storage.complete_multipart_upload = AsyncMock(return_value="etag")
+    storage.abort_multipart_upload = AsyncMock(return_value=True)
+    storage.delete_file = AsyncMock(return_value=True)
+    storage.generate_object_key = Mock(return_value="uploads/u/20250101/x.txt")
+    storage.commit_staged_object = AsyncMock(
+        side_effect=lambda staging_key, **kw: {"object_key": "blobs/x.txt", "deduplicated": False}
+    )
+    return storage
+
+
+@pytest.fixture
+def service(storage, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE", 10)
+    resumable_upload._hashers.clear()
+    return ResumableUploadService(storage=storage, redis_client=FakeRedis())
+
+
+CONTENT = b"hello world, resumable!"  # 23 bytes -> 10 + 10 + 3
+
+
+class TestResumableUpload:
+    """断点续传测试"""
+
+    async def _upload_all(self, service, upload_id, content=CONTENT):
+        offset = 0
+        while offset < len(content):
+            chunk = content[offset:offset + 10]
+            session = await service.append_chunk(upload_id, "user-1", offset, _body(chunk))
+            offset = session["offset"]
+        return session
+
+    async def test_chunks_become_parts_and_complete_uses_incremental_hash(self, service, storage):
+        session = await service.create_session(
+            "user-1", "novel.txt", len(CONTENT), UploadPurpose.PROJECT_FILE,
+            sha256=hashlib.sha256(CONTENT).hexdigest(),
+        )
+        await self._upload_all(service, session["upload_id"])
+
+        result = await service.complete(session["upload_id"], "user-1", db_session=None)
+
+        assert [c.args[2] for c in storage.upload_part.await_args_list] == [1, 2, 3]
+        parts = storage.complete_multipart_upload.await_args.args[2]
+        assert parts == [(1, "etag-1"), (2, "etag-2"), (3, "etag-3")]
+        assert result["sha256"] == hashlib.sha256(CONTENT).hexdigest()
+        assert result["object_key"] == "blobs/x.txt"
+        assert result["file_type"] == "txt"
+        storage.download_stream.assert_not_called()
+
+        # 重复完成返回相同结果
+        assert await service.complete(session["upload_id"], "user-1", db_session=None) == result
+        storage.commit_staged_object.assert_awaited_once()
+
+    async def test_offset_mismatch_reports_server_offset(self, service):
+        session = await service.create_session("user-1", "novel.txt", len(CONTENT), UploadPurpose.PROJECT_FILE)
+        await service.append_chunk(session["upload_id"], "user-1", 0, _body(CONTENT[:10]))
+
+        with pytest.raises(ConflictError) as exc:
+            await service.append_chunk(session["upload_id"], "user-1", 0, _body(CONTENT[:10]))
+        assert exc.value.details == {"offset": 10}
+
+    async def test_oversized_and_short_chunks_rejected(self, service, storage):
+        session = await service.create_session("user-1", "novel.txt", len(CONTENT), UploadPurpose.PROJECT_FILE)
+
+        with pytest.raises(BusinessLogicError):
+            await service.append_chunk(session["upload_id"], "user-1", 0, _body(CONTENT[:15]))
+        with pytest.raises(BusinessLogicError):
+            await service.append_chunk(session["upload_id"], "user-1", 0, _body(CONTENT[:5]))
+        storage.upload_part.assert_not_awaited()
+        assert (await service.get_session(session["upload_id"], "user-1"))["offset"] == 0
+
+    async def test_chunk_checksum_verified(self, service):
+        session = await service.create_session("user-1", "novel.txt", len(CONTENT), UploadPurpose.PROJECT_FILE)
+        bad = "sha256 " + base64.b64encode(hashlib.sha256(b"other").digest()).decode()
+        good = "sha256 " + base64.b64encode(hashlib.sha256(CONTENT[:10]).digest()).decode()
+
+        with pytest.raises(BusinessLogicError):
+            await service.append_chunk(session["upload_id"], "user-1", 0, _body(CONTENT[:10]), bad)
+        result = await service.append_chunk(session["upload_id"], "user-1", 0, _body(CONTENT[:10]), good)
+        assert result["offset"] == 10
+
+    async def test_hash_recomputed_from_storage_after_restart(self, service, storage):
+        async def download_stream(key):
+            yield CONTENT[:7]
+            yield CONTENT[7:]
+
+        storage.download_stream = Mock(side_effect=download_stream)
+        session = await service.create_session(
+            "user-1", "novel.txt", len(CONTENT), UploadPurpose.PROJECT_FILE, sha256="0" * 64
+        )
+        await self._upload_all(service, session["upload_id"])
+        resumable_upload._hashers.clear()
+
+        with pytest.raises(BusinessLogicError):
+            await service.complete(session["upload_id"], "user-1", db_session=None)
+        storage.download_stream.assert_called_once()
+        storage.delete_file.assert_awaited_once()
+        storage.commit_staged_object.assert_not_awaited()
+
+    async def test_declared_metadata_validated_before_upload(self, service, storage):
+        with pytest.raises(FileUploadError):
+            await service.create_session("user-1", "virus.exe", 10, UploadPurpose.PROJECT_FILE)
+        with pytest.raises(BusinessLogicError):
+            await service.create_session("user-1", "song.mp3", 60 * 1024 * 1024, UploadPurpose.BGM)
+        storage.create_multipart_upload.assert_not_awaited()
+
+    async def test_bgm_first_chunk_must_be_audio(self, service, storage):
+        session = await service.create_session("user-1", "song.mp3", len(CONTENT), UploadPurpose.BGM, name="bgm")
+
+        with pytest.raises(FileUploadError):
+            await service.append_chunk(session["upload_id"], "user-1", 0, _body(CONTENT[:10]))
+        storage.upload_part.assert_not_awaited()
+        storage.abort_multipart_upload.assert_awaited_once()
+
+
+def test_incremental_hashers_safe_across_executor_threads(monkeypatch):
+    """多个上传的分片在线程池中并发续算，LRU 淘汰不丢失或串用哈希状态"""
+    monkeypatch.setattr(resumable_upload, "_MAX_HASHERS", 8)
+    resumable_upload._hashers.clear()
+    chunks = [bytes([i]) * 64 for i in range(50)]
+
+    def upload(upload_id):
+        offset = 0
+        for chunk in chunks:
+            resumable_upload._update_hasher(upload_id, offset, chunk)
+            offset += len(chunk)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(upload, [f"u{i}" for i in range(32)]))
+
+    expected = hashlib.sha256(b"".join(chunks)).hexdigest()
+    assert 0 < len(resumable_upload._hashers) <= 8
+    for upload_id in list(resumable_upload._hashers):
+        offset, hasher = resumable_upload._hasher_state(upload_id)
+        assert (offset, hasher.hexdigest()) == (64 * 50, expected)
+
+
+class TestDirectUpload:
+    """直传测试"""
+
+    async def test_small_file_gets_single_presigned_put(self, service, storage):
+        storage.get_presigned_put_url = Mock(return_value="https://s3/put")
+
+        session = await service.create_direct_session("user-1", "novel.txt", 8, UploadPurpose.PROJECT_FILE)
+
+        assert session["mode"] == "direct"
+        assert session["upload"] == {
+            "method": "PUT",
+            "url": "https://s3/put",
+            "headers": {"Content-Type": "text/plain"},
+        }
+        storage.create_multipart_upload.assert_not_awaited()
+
+    async def test_large_file_gets_part_urls_and_complete_enqueues_validation(self, service, storage):
+        storage.get_presigned_part_urls = Mock(side_effect=lambda key, uid, count, expires: [
+            f"https://s3/part/{n}" for n in range(1, count + 1)
+        ])
+        session = await service.create_direct_session("user-1", "novel.txt", len(CONTENT), UploadPurpose.PROJECT_FILE)
+        upload_id = session["upload_id"]
+
+        assert session["upload"]["method"] == "multipart"
+        assert [p["part_number"] for p in session["upload"]["parts"]] == [1, 2, 3]
+
+        with pytest.raises(BusinessLogicError):
+            await service.complete_direct(upload_id, "user-1", [(1, "a"), (2, "b")])
+        with pytest.raises(ConflictError):
+            await service.append_chunk(upload_id, "user-1", 0, _body(CONTENT[:10]))
+
+        enqueued = []
+
+        async def _saved_status():
+            return json.loads(await service.redis.get(f"upload_session:{upload_id}"))["status"]
+
+        with patch("src.tasks.task.validate_direct_upload") as task:
+            # 投递时校验中状态必须已写入，快速执行的Worker不会读到旧状态
+            task.apply_async.side_effect = lambda **kw: enqueued.append((kw, asyncio.ensure_future(_saved_status())))
+            result = await service.complete_direct(upload_id, "user-1", [(1, "a"), (2, "b"), (3, "c")])
+
+        (kwargs, status), = enqueued
+        assert kwargs == {"args": (upload_id,), "task_id": result["task_id"]}
+        assert await status == UploadStatus.VALIDATING.value
+        assert result["status"] == UploadStatus.VALIDATING.value
+        storage.complete_multipart_upload.assert_awaited_once()
+
+    async def test_size_mismatch_fails_and_deletes_staging(self, service, storage):
+        storage.get_presigned_put_url = Mock(return_value="https://s3/put")
+        storage.stat_object = AsyncMock(return_value={"size": 9999})
+        storage.download_to_path = AsyncMock()
+        session = await service.create_direct_session("user-1", "novel.txt", 8, UploadPurpose.PROJECT_FILE)
+        with patch("src.tasks.task.validate_direct_upload") as task:
+            await service.complete_direct(session["upload_id"], "user-1")
+
+        result = await service.validate_direct_upload(session["upload_id"])
+
+        assert result["status"] == UploadStatus.FAILED.value
+        assert "文件大小不符" in result["error"]
+        storage.delete_file.assert_awaited_once()
+        storage.download_to_path.assert_not_awaited()
+        storage.commit_staged_object.assert_not_awaited()
+
+    async def test_bgm_content_checked_and_staging_deleted(self, service, storage):
+        storage.get_presigned_put_url = Mock(return_value="https://s3/put")
+        storage.stat_object = AsyncMock(return_value={"size": 8})
+
+        async def _download(key, path):
+            with open(path, "wb") as f:
+                f.write(content)
+
+        storage.download_to_path = AsyncMock(side_effect=_download)
+
+        # 文件头不是音频；文件头正确但无法解析
+        for content, error in ((b"<html>xx", "不是有效的MP3音频"), (b"ID3" + b"\0" * 5, "无法解析音频文件")):
+            storage.delete_file.reset_mock()
+            session = await service.create_direct_session("user-1", "song.mp3", 8, UploadPurpose.BGM, name="bgm")
+            with patch("src.tasks.task.validate_direct_upload") as task:
+                    await service.complete_direct(session["upload_id"], "user-1")
+
+            result = await service.validate_direct_upload(session["upload_id"])
+
+            assert result["status"] == UploadStatus.FAILED.value
+            assert error in result["error"]
+            storage.delete_file.assert_awaited_once()
+        storage.commit_staged_object.assert_not_awaited()
+
+    async def test_validation_result_not_written_over_changed_session(self, service, storage):
+        storage.get_presigned_put_url = Mock(return_value="https://s3/put")
+        session = await service.create_direct_session("user-1", "novel.txt", 8, UploadPurpose.PROJECT_FILE)
+        upload_id = session["upload_id"]
+        key = f"upload_session:{upload_id}"
+        with patch("src.tasks.task.validate_direct_upload"):
+            await service.complete_direct(upload_id, "user-1")
+
+        async def _stat(staging_key):
+            # 校验期间会话已被其他写入改为完成（例如重复投递的任务先写入了结果）
+            stored = json.loads(await service.redis.get(key))
+            stored.update(status=UploadStatus.COMPLETED.value, result={"object_key": "blobs/x.txt"})
+            await service.redis.set(key, json.dumps(stored))
+            return {"size": 9999}
+
+        storage.stat_object = AsyncMock(side_effect=_stat)
+        result = await service.validate_direct_upload(upload_id)
+
+        stored = json.loads(await service.redis.get(key))
+        assert result["status"] == stored["status"] == UploadStatus.COMPLETED.value
+        assert stored.get("error") is None
+        assert await service.redis.get(f"{key}:lock") is None
@@ -2,14 +2,18 @@
 存储服务单元测试
 """
 
+import hashlib
+import io
 import pytest
 import tempfile
 import os
 from pathlib import Path
 from unittest.mock import Mock, AsyncMock, patch
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-from src.utils.storage import MinIOStorage, StorageError, StorageConfig
+from fastapi import UploadFile
+
+from src.utils.storage import MinIOStorage, S3Storage, StorageError, StorageConfig
 from src.core.config import settings
 
 
@@ -484,5 +488,578 @@ class TestStorageIntegration:
         assert await storage.file_exists(object_key) is False
 
 
+
+class TestStorageNonBlocking:
+    """存储I/O不阻塞事件循环测试"""
+
+    @staticmethod
+    def _slow_client(delay: float):
+        """构造每次调用都同步阻塞 delay 秒的boto3客户端"""
+        import time
+
+        def _blocking(*args, **kwargs):
+            time.sleep(delay)
+            return {"Body": Mock(read=Mock(return_value=b"x" * 1024))}
+
+        client = Mock()
+        client.head_bucket.side_effect = _blocking
+        client.upload_fileobj.side_effect = _blocking
+        client.get_object.side_effect = _blocking
+        client.generate_presigned_url.return_value = "http://test-url"
+        return client
+
+    async def test_event_loop_responsive_during_transfers(self):
+        """大文件传输期间事件循环仍能调度其他协程"""
+        import asyncio
+        import io
+
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._slow_client(0.3)
+
+        upload = Mock()
+        upload.filename = "large.mp4"
+        upload.content_type = "video/mp4"
+        upload.file = io.BytesIO(b"0" * 1024)
+
+        ticks = 0
+        stop = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not stop.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        await asyncio.gather(
+            storage.upload_file("user123", upload),
+            storage.download_file("videos/large.mp4"),
+        )
+        stop.set()
+        await ticker_task
+
+        # 阻塞调用若在事件循环线程执行，ticker 在 ~0.6s 内几乎无法运行
+        assert ticks >= 20
+
+    async def test_concurrent_calls_overlap(self):
+        """并发存储调用在线程池中并行执行"""
+        import asyncio
+        import time
+
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._slow_client(0.2)
+
+        start = time.monotonic()
+        await asyncio.gather(*(storage.download_file(f"k{i}") for i in range(5)))
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 0.2 * 5
+
+
+
+class TestStorageClientPooling:
+    """存储客户端连接池与存储桶缓存测试"""
+
+    async def test_bucket_check_cached_per_generation(self):
+        """存储桶检查结果在配置未变化时复用"""
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = Mock()
+
+        await storage.ensure_bucket_exists()
+        await storage.ensure_bucket_exists()
+
+        storage._client.head_bucket.assert_called_once_with(Bucket="test-bucket")
+        assert storage.get_pool_stats()["bucket_check_cache_hits"] == 1
+
+    async def test_reload_config_invalidates_bucket_cache(self):
+        """切换配置后重新检查存储桶"""
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = Mock()
+        await storage.ensure_bucket_exists()
+
+        storage.reload_config(StorageConfig(bucket="other-bucket"))
+        new_client = Mock()
+        storage._client = new_client
+        await storage.ensure_bucket_exists()
+
+        new_client.head_bucket.assert_called_once_with(Bucket="other-bucket")
+        assert storage.get_pool_stats()["generation"] == 1
+
+    async def test_reload_same_config_keeps_client_and_caches(self):
+        """重新加载相同配置时保留客户端、配置代和存储桶检查结果"""
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        client = Mock()
+        storage._client = client
+        await storage.ensure_bucket_exists()
+
+        storage.reload_config(StorageConfig(bucket="test-bucket"))
+        await storage.ensure_bucket_exists()
+
+        assert storage._client is client
+        assert storage.get_pool_stats()["generation"] == 0
+        client.head_bucket.assert_called_once()
+
+    def test_client_uses_configured_pool(self):
+        """客户端连接池不小于I/O线程数"""
+        with patch('src.utils.storage.boto3') as mock_boto3:
+            storage = S3Storage(StorageConfig(bucket="test-bucket"))
+            _ = storage.client
+
+            client_config = mock_boto3.client.call_args.kwargs["config"]
+            assert client_config.max_pool_connections >= settings.STORAGE_IO_MAX_WORKERS
+            assert storage.get_pool_stats()["clients_created"] == 1
+
+
+
+class TestPresignedUrlCache:
+    """预签名URL缓存测试"""
+
+    def _storage(self):
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = Mock()
+        storage._client.generate_presigned_url.side_effect = lambda *a, **kw: f"http://signed/{kw['Params']['Key']}"
+        return storage
+
+    def test_url_reused_until_near_expiry(self):
+        """同一对象和有效期的URL在复用窗口内保持稳定"""
+        storage = self._storage()
+
+        first = storage.get_presigned_url("a.png")
+        second = storage.get_presigned_url("a.png")
+
+        assert first == second
+        storage._client.generate_presigned_url.assert_called_once()
+
+    def test_url_resigned_after_reuse_window(self):
+        """超过复用窗口后重新签名"""
+        storage = self._storage()
+
+        with patch('src.utils.storage.time.time', return_value=1000.0):
+            storage.get_presigned_url("a.png", timedelta(hours=1))
+        with patch('src.utils.storage.time.time', return_value=1000.0 + 3600 * 0.9):
+            storage.get_presigned_url("a.png", timedelta(hours=1))
+
+        assert storage._client.generate_presigned_url.call_count == 2
+
+    def test_batch_signing_deduplicates(self):
+        """批量签名忽略重复和空键"""
+        storage = self._storage()
+
+        urls = storage.get_presigned_urls(["a.png", "b.png", "a.png", None, ""])
+
+        assert urls == {"a.png": "http://signed/a.png", "b.png": "http://signed/b.png"}
+        assert storage._client.generate_presigned_url.call_count == 2
+
+    def test_reload_config_invalidates_cache(self):
+        """切换存储配置后重新签名"""
+        storage = self._storage()
+        storage.get_presigned_url("a.png")
+
+        client = storage._client
+        storage.reload_config(StorageConfig(bucket="other-bucket"))
+        storage._client = client
+        storage.get_presigned_url("a.png")
+
+        assert client.generate_presigned_url.call_count == 2
+
+    def test_public_base_url_skips_signing(self):
+        """公共读模式返回稳定URL且不签名"""
+        storage = self._storage()
+
+        with patch.object(settings, "STORAGE_PUBLIC_BASE_URL", "https://cdn.example.com/"):
+            url = storage.get_presigned_url("videos/章节 1.mp4")
+
+        assert url == "https://cdn.example.com/videos/%E7%AB%A0%E8%8A%82%201.mp4"
+        storage._client.generate_presigned_url.assert_not_called()
+
+
+
+class TestMultipartUpload:
+    """分片并行上传测试"""
+
+    @staticmethod
+    def _multipart_client(received: list):
+        """构造记录分片大小、丢弃分片数据的客户端"""
+        client = Mock()
+        client.create_multipart_upload.return_value = {"UploadId": "upload-1"}
+
+        def _upload_part(**kwargs):
+            received.append((kwargs["PartNumber"], len(kwargs["Body"])))
+            return {"ETag": f'"etag-{kwargs["PartNumber"]}"'}
+
+        # 使用普通函数而非Mock，避免Mock记录调用参数而持有分片数据
+        client.upload_part = _upload_part
+        client.complete_multipart_upload.return_value = {"ETag": '"final-etag"'}
+        client.put_object.return_value = {"ETag": '"single-etag"'}
+        client.generate_presigned_url.return_value = "http://test-url"
+        return client
+
+    async def test_large_sparse_file_bounded_memory(self, tmp_path):
+        """上传大文件时进程RSS保持平稳"""
+        import asyncio
+        import hashlib
+        import psutil
+
+        part_size = 8 * 1024 * 1024
+        file_size = 512 * 1024 * 1024
+        sparse_file = tmp_path / "large.mp4"
+        with open(sparse_file, "wb") as f:
+            f.truncate(file_size)
+
+        received = []
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._multipart_client(received)
+
+        process = psutil.Process()
+        baseline = process.memory_info().rss
+        peak = baseline
+        done = asyncio.Event()
+
+        async def sample_rss():
+            nonlocal peak
+            while not done.is_set():
+                peak = max(peak, process.memory_info().rss)
+                await asyncio.sleep(0.005)
+
+        sampler = asyncio.create_task(sample_rss())
+        result = await storage.upload_from_path(
+            "user123", str(sparse_file), "large.mp4",
+            part_size=part_size, concurrency=4
+        )
+        done.set()
+        await sampler
+
+        assert result["size"] == file_size
+        assert len(received) == file_size // part_size
+        assert [n for n, _ in sorted(received)] == list(range(1, len(received) + 1))
+        expected = hashlib.sha256()
+        for _ in range(file_size // part_size):
+            expected.update(b"\0" * part_size)
+        assert result["sha256"] == expected.hexdigest()
+        # 内存增长应只与分片大小和并发数相关，与文件大小无关
+        assert peak - baseline < part_size * 8
+        storage._client.complete_multipart_upload.assert_called_once()
+
+    async def test_small_file_uses_single_put(self, tmp_path):
+        """小于一个分片的文件直接 put_object"""
+        small_file = tmp_path / "small.mp3"
+        small_file.write_bytes(b"abc")
+
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._multipart_client([])
+
+        result = await storage.upload_from_path("user123", str(small_file), "small.mp3")
+
+        assert result["size"] == 3
+        assert result["etag"] == "single-etag"
+        put_kwargs = storage._client.put_object.call_args.kwargs
+        assert put_kwargs["ContentType"] == "audio/mpeg"
+        storage._client.create_multipart_upload.assert_not_called()
+
+    async def test_upload_stream_rechunks_and_aborts_on_failure(self):
+        """流式上传按分片切分，失败时中止分片上传"""
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._multipart_client([])
+        storage._client.upload_part = Mock(side_effect=Exception("network"))
+
+        async def chunks():
+            for _ in range(40):
+                yield b"x" * (1024 * 1024)
+
+        with pytest.raises(Exception, match="network"):
+            await storage.upload_stream(
+                "user123", chunks(), "image.png", part_size=5 * 1024 * 1024, concurrency=2
+            )
+
+        storage._client.abort_multipart_upload.assert_called_once()
+
+
+
+class TestStreamingDownload:
+    """流式与分段下载测试"""
+
+    @staticmethod
+    def _object_client(data: bytes, requested_ranges: list):
+        """构造支持 Range 请求的内存对象客户端"""
+        import io
+
+        def _get_object(**kwargs):
+            start, end = 0, len(data) - 1
+            if "Range" in kwargs:
+                requested_ranges.append(kwargs["Range"])
+                first, last = kwargs["Range"][len("bytes="):].split("-")
+                start = int(first)
+                end = int(last) if last else len(data) - 1
+            return {"Body": io.BytesIO(data[start:end + 1])}
+
+        client = Mock()
+        client.get_object = _get_object
+        client.head_object.return_value = {"ContentLength": len(data)}
+        return client
+
+    async def test_download_to_path_parallel_ranges(self, tmp_path):
+        """大对象按字节范围并行下载并正确拼接"""
+        data = bytes(range(256)) * 4096  # 1MB
+        ranges = []
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._object_client(data, ranges)
+
+        dest = tmp_path / "out" / "video.mp4"
+        size = await storage.download_to_path("videos/a.mp4", str(dest), part_size=100 * 1024, concurrency=3)
+
+        assert size == len(data)
+        assert dest.read_bytes() == data
+        assert len(ranges) == -(-len(data) // (100 * 1024))
+
+    async def test_download_stream_chunks(self):
+        """流式下载按块产出"""
+        data = b"a" * 2500
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._object_client(data, [])
+
+        chunks = [chunk async for chunk in storage.download_stream("k", chunk_size=1000)]
+
+        assert [len(c) for c in chunks] == [1000, 1000, 500]
+        assert b"".join(chunks) == data
+
+    async def test_download_range(self):
+        """下载指定字节范围"""
+        data = b"0123456789"
+        ranges = []
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._object_client(data, ranges)
+
+        assert await storage.download_range("k", 3, 4) == b"3456"
+        assert ranges == ["bytes=3-6"]
+
+
+
+class TestPagedListing:
+    """分页列举测试"""
+
+    @staticmethod
+    def _paged_client(keys: list, calls: list):
+        """构造按 MaxKeys / ContinuationToken 分页返回的客户端"""
+        def _list_objects_v2(**kwargs):
+            calls.append(kwargs)
+            start = int(kwargs.get("ContinuationToken", 0))
+            end = start + kwargs["MaxKeys"]
+            page = keys[start:end]
+            response = {
+                "Contents": [{"Key": k, "Size": 1, "ETag": '"e"'} for k in page],
+                "IsTruncated": end < len(keys),
+            }
+            if end < len(keys):
+                response["NextContinuationToken"] = str(end)
+            return response
+
+        client = Mock()
+        client.list_objects_v2 = _list_objects_v2
+        client.generate_presigned_url.return_value = "http://test-url"
+        return client
+
+    async def test_list_files_page_returns_next_token(self):
+        keys = [f"uploads/u/{i}.txt" for i in range(5)]
+        calls = []
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._paged_client(keys, calls)
+
+        first = await storage.list_files_page("uploads/u/", page_size=2)
+        second = await storage.list_files_page("uploads/u/", page_size=2, continuation_token=first["next_token"])
+
+        assert [f["object_key"] for f in first["files"]] == keys[:2]
+        assert [f["object_key"] for f in second["files"]] == keys[2:4]
+        assert calls[1]["ContinuationToken"] == first["next_token"]
+
+    async def test_iter_files_walks_all_pages_without_signing(self):
+        keys = [f"uploads/u/{i}.txt" for i in range(2500)]
+        calls = []
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._paged_client(keys, calls)
+
+        seen = [f["object_key"] async for f in storage.iter_files("uploads/u/")]
+
+        assert seen == keys
+        assert len(calls) == 3
+        storage._client.generate_presigned_url.assert_not_called()
+
+    async def test_list_files_continues_past_first_page(self):
+        keys = [f"uploads/u/{i}.txt" for i in range(1500)]
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = self._paged_client(keys, [])
+
+        files = await storage.list_files("uploads/u/", limit=1200)
+
+        assert len(files) == 1200
+
+
+class TestObjectCatalogHooks:
+    """对象目录写入测试"""
+
+    async def test_upload_and_delete_update_catalog(self, tmp_path):
+        from src.models.object_catalog import ObjectKind
+
+        path = tmp_path / "a.mp4"
+        path.write_bytes(b"x" * 10)
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = Mock()
+        storage._client.put_object.return_value = {"ETag": '"etag"'}
+        storage._client.generate_presigned_url.return_value = "http://test-url"
+        storage._catalog_record = AsyncMock()
+        storage._catalog_remove = AsyncMock()
+
+        result = await storage.upload_from_path(
+            "user-1", str(path), "a.mp4", object_key="videos/a.mp4",
+            kind=ObjectKind.VIDEO, project_id="project-1"
+        )
+        await storage.delete_file("videos/a.mp4")
+
+        recorded = storage._catalog_record.await_args.kwargs
+        assert recorded["object_key"] == "videos/a.mp4"
+        assert recorded["sha256"] == result["sha256"]
+        assert recorded["kind"] == ObjectKind.VIDEO
+        assert recorded["project_id"] == "project-1"
+        storage._catalog_remove.assert_awaited_once_with(["videos/a.mp4"])
+
+    async def test_delete_files_batches_and_reports_failures(self):
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = Mock()
+        storage._client.delete_objects.side_effect = [
+            {"Errors": [{"Key": "k-3", "Code": "AccessDenied"}]},
+            {},
+        ]
+        storage._catalog_remove = AsyncMock()
+        keys = [f"k-{i}" for i in range(1500)]
+
+        result = await storage.delete_files(keys)
+
+        assert storage._client.delete_objects.call_count == 2
+        first_batch = storage._client.delete_objects.call_args_list[0].kwargs["Delete"]["Objects"]
+        assert len(first_batch) == 1000
+        assert result["failed"] == ["k-3"]
+        assert len(result["deleted"]) == 1499
+        removed = [key for call in storage._catalog_remove.await_args_list for key in call.args[0]]
+        assert "k-3" not in removed and len(removed) == 1499
+
+    def test_kind_inferred_from_key(self):
+        from src.models.object_catalog import ObjectKind
+
+        assert ObjectKind.infer("bgm/u/x.mp3") == ObjectKind.BGM
+        assert ObjectKind.infer("sentence_videos/s.mp4") == ObjectKind.SENTENCE_VIDEO
+        assert ObjectKind.infer("uploads/u/20250101/x.png") == ObjectKind.IMAGE
+        assert ObjectKind.infer("uploads/u/20250101/x.txt") == ObjectKind.UPLOAD
+
+
+class TestContentDedup:
+    """内容寻址去重测试"""
+
+    def _storage(self):
+        storage = S3Storage(StorageConfig(bucket="test-bucket"))
+        storage._client = Mock()
+        storage._client.generate_presigned_url.return_value = "http://test-url"
+        storage._catalog_record = AsyncMock()
+        storage._catalog_remove = AsyncMock()
+        return storage
+
+    def _upload(self, content=b"same content", filename="a.txt"):
+        return UploadFile(filename=filename, file=io.BytesIO(content))
+
+    async def test_existing_content_skips_upload(self):
+        storage = self._storage()
+        storage._blob_acquire = AsyncMock(return_value="blobs/abc.txt")
+        storage._blob_register = AsyncMock()
+
+        result = await storage.upload_file("user-1", self._upload(), dedup=True)
+
+        assert result["object_key"] == "blobs/abc.txt"
+        assert result["deduplicated"] is True
+        storage._client.upload_fileobj.assert_not_called()
+        storage._blob_register.assert_not_awaited()
+
+    async def test_new_content_stored_by_hash(self):
+        storage = self._storage()
+        storage._blob_acquire = AsyncMock(return_value=None)
+        storage._blob_register = AsyncMock(side_effect=lambda sha, key, size, ct: key)
+
+        result = await storage.upload_file("user-1", self._upload(filename="Novel.TXT"), dedup=True)
+
+        sha256 = hashlib.sha256(b"same content").hexdigest()
+        assert result["object_key"] == f"blobs/{sha256}.txt"
+        assert result["deduplicated"] is False
+        assert storage._client.upload_fileobj.call_args.kwargs["Key"] == f"blobs/{sha256}.txt"
+        assert storage._catalog_record.await_args.kwargs["owner_id"] is None
+
+    async def test_dedup_disabled_uses_regular_key(self, monkeypatch):
+        monkeypatch.setattr(settings, "STORAGE_DEDUP_ENABLED", False)
+        storage = self._storage()
+        storage._blob_acquire = AsyncMock()
+
+        result = await storage.upload_file("user-1", self._upload(), object_key="uploads/u/a.txt", dedup=True)
+
+        assert result["object_key"] == "uploads/u/a.txt"
+        storage._blob_acquire.assert_not_awaited()
+
+    async def test_release_files_only_deletes_unreferenced_blobs(self):
+        from contextlib import asynccontextmanager
+
+        from src.models.storage_blob import StorageBlob
+
+        storage = self._storage()
+        storage._client.delete_objects.return_value = {}
+        storage._blob_forget = AsyncMock()
+        db = AsyncMock()
+
+        @asynccontextmanager
+        async def fake_db():
+            yield db
+
+        with patch("src.core.database.get_async_db", fake_db), \
+                patch.object(StorageBlob, "release", AsyncMock(return_value=["blobs/b.png"])) as release, \
+                patch.object(StorageBlob, "forget", AsyncMock()) as forget:
+            result = await storage.release_files(
+                ["uploads/u/a.txt", "blobs/a.mp3", "blobs/a.mp3", "blobs/b.png", None]
+            )
+
+        assert release.await_args.args[2] == ["blobs/a.mp3", "blobs/a.mp3", "blobs/b.png"]
+        forget.assert_awaited_once_with(db, "test-bucket", ["blobs/b.png"])
+        db.commit.assert_awaited_once()
+        assert sorted(result["deleted"]) == ["blobs/b.png", "uploads/u/a.txt"]
+        assert result["released"] == ["blobs/a.mp3"]
+
+    async def test_reclaim_blobs_rechecks_rows_under_lock(self):
+        from contextlib import asynccontextmanager
+
+        from src.models.storage_blob import StorageBlob
+
+        storage = self._storage()
+        storage._client.delete_objects.return_value = {}
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=24)
+        db = AsyncMock()
+        db.execute.return_value = [
+            ("blobs/shared.mp3", 1, cutoff - timedelta(hours=1)),
+            ("blobs/fresh.png", 0, cutoff + timedelta(minutes=5)),
+            ("blobs/old.png", 0, cutoff - timedelta(hours=1)),
+        ]
+
+        @asynccontextmanager
+        async def fake_db():
+            yield db
+
+        with patch("src.core.database.get_async_db", fake_db), \
+                patch.object(StorageBlob, "forget", AsyncMock()) as forget:
+            result = await storage.reclaim_blobs(
+                ["blobs/shared.mp3", "blobs/fresh.png", "blobs/old.png", "blobs/orphan.png"], cutoff
+            )
+
+        # 引用计数大于0或宽限期内更新过的内容在行锁下保留
+        assert result["kept"] == ["blobs/fresh.png", "blobs/shared.mp3"]
+        assert result["deleted"] == ["blobs/old.png", "blobs/orphan.png"]
+        deleted = storage._client.delete_objects.call_args.kwargs["Delete"]["Objects"]
+        assert [item["Key"] for item in deleted] == ["blobs/old.png", "blobs/orphan.png"]
+        assert "FOR UPDATE" in str(db.execute.await_args.args[0])
+        forget.assert_awaited_once_with(db, "test-bucket", ["blobs/old.png", "blobs/orphan.png"])
+        db.commit.assert_awaited_once()
+
+
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
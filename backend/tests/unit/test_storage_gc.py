@@ -0,0 +1,173 @@
+"""
+存储垃圾回收测试
+"""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+
+from src.services import storage_gc
+from src.services.storage_gc import StorageGarbageCollector, referenced_columns
+
+
+def _fake_storage(objects):
+    """按前缀返回对象的假存储客户端"""
+    storage = Mock()
+    storage.bucket_name = "test-bucket"
+
+    async def iter_files(prefix, page_size=None):
+        for item in objects:
+            if item["object_key"].startswith(prefix):
+                yield item
+
+    storage.iter_files = iter_files
+    storage.delete_files = AsyncMock(
+        side_effect=lambda keys: {"deleted": list(keys), "failed": []}
+    )
+    storage.reclaim_blobs = AsyncMock(
+        side_effect=lambda keys, cutoff: {"deleted": list(keys), "failed": [], "kept": []}
+    )
+    return storage
+
+
+def _obj(key, hours_ago, size=10):
+    modified = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+    return {"object_key": key, "size": size, "last_modified": modified.isoformat()}
+
+
+class TestStorageGarbageCollector:
+    """标记-清除测试"""
+
+    @pytest.fixture
+    def objects(self):
+        return [
+            _obj("uploads/u/keep.png", 48),
+            _obj("uploads/u/old.png", 48, size=100),
+            _obj("uploads/u/new.png", 1),
+            _obj("videos/u/late-ref.mp4", 48),
+            _obj("sentence_videos/s.mp4", 48, size=5),
+        ]
+
+    async def test_dry_run_reports_without_deleting(self, objects):
+        storage = _fake_storage(objects)
+        collector = StorageGarbageCollector(storage)
+        collector._still_referenced = AsyncMock(return_value=set())
+
+        report = await collector.sweep(
+            {"uploads/u/keep.png"}, prefixes=["uploads/", "videos/", "sentence_videos/"],
+            grace_hours=24, dry_run=True,
+        )
+
+        assert report["scanned"] == 5
+        assert report["skipped_recent"] == 1
+        assert report["candidates"] == 3
+        assert report["candidate_bytes"] == 115
+        assert report["deleted"] == 0
+        storage.delete_files.assert_not_awaited()
+
+    async def test_sweep_rechecks_references_before_delete(self, objects):
+        storage = _fake_storage(objects)
+        collector = StorageGarbageCollector(storage)
+        collector._still_referenced = AsyncMock(return_value={"videos/u/late-ref.mp4"})
+
+        report = await collector.sweep(
+            {"uploads/u/keep.png"}, prefixes=["uploads/", "videos/", "sentence_videos/"],
+            grace_hours=24, dry_run=False, max_deletes_per_second=100000,
+        )
+
+        deleted = [key for call in storage.delete_files.await_args_list for key in call.args[0]]
+        assert sorted(deleted) == ["sentence_videos/s.mp4", "uploads/u/old.png"]
+        assert report["rescued"] == 1
+        assert report["deleted_bytes"] == 105
+        assert report["by_prefix"]["uploads/"]["deleted"] == 1
+
+    async def test_sweep_flushes_in_batches_of_1000(self):
+        storage = _fake_storage([_obj(f"uploads/u/{i}.bin", 48, size=1) for i in range(2500)])
+        collector = StorageGarbageCollector(storage)
+        collector._still_referenced = AsyncMock(return_value=set())
+
+        report = await collector.sweep(
+            set(), prefixes=["uploads/"], grace_hours=24, dry_run=False, max_deletes_per_second=10 ** 6,
+        )
+
+        sizes = [len(call.args[0]) for call in storage.delete_files.await_args_list]
+        assert sizes == [1000, 1000, 500]
+        assert report["deleted"] == 2500
+        assert len(report["sample"]) == 100
+
+    async def test_blobs_rechecked_against_reference_counts(self):
+        storage = _fake_storage([_obj("uploads/u/old.png", 48), _obj("blobs/a.png", 48), _obj("blobs/b.mp3", 48)])
+        storage.reclaim_blobs = AsyncMock(
+            return_value={"deleted": ["blobs/b.mp3"], "failed": [], "kept": ["blobs/a.png"]}
+        )
+        collector = StorageGarbageCollector(storage)
+        collector._still_referenced = AsyncMock(return_value=set())
+
+        report = await collector.sweep(
+            set(), prefixes=["uploads/", "blobs/"], grace_hours=24, dry_run=False, max_deletes_per_second=10 ** 6,
+        )
+
+        # 共享内容不走直接删除，交给 reclaim_blobs 在行锁下按引用计数和更新时间复核
+        deleted = [key for call in storage.delete_files.await_args_list for key in call.args[0]]
+        assert deleted == ["uploads/u/old.png"]
+        keys, cutoff = storage.reclaim_blobs.await_args.args
+        assert keys == ["blobs/a.png", "blobs/b.mp3"]
+        assert cutoff < datetime.now(timezone.utc) - timedelta(hours=23)
+        assert report["deleted"] == 2
+        assert report["rescued"] == 1
+
+
+class TestShortSessions:
+    """长时间运行的回收不持有数据库会话"""
+
+    @pytest.fixture
+    def sessions(self, monkeypatch):
+        """替换 get_async_db：记录打开的会话数和当前是否持有会话"""
+        state = SimpleNamespace(opened=0, active=0)
+
+        async def _stream(rows):
+            for row in rows:
+                yield row
+
+        @asynccontextmanager
+        async def _get_async_db():
+            state.opened += 1
+            state.active += 1
+            db = Mock()
+            db.stream_scalars = AsyncMock(side_effect=lambda query: _stream(["uploads/u/a.png"]))
+            db.execute = AsyncMock(return_value=[])
+            try:
+                yield db
+            finally:
+                state.active -= 1
+
+        monkeypatch.setattr(storage_gc, "get_async_db", _get_async_db)
+        return state
+
+    async def test_mark_uses_a_session_per_query(self, sessions):
+        collector = StorageGarbageCollector(_fake_storage([]))
+
+        referenced = await collector.mark()
+
+        assert referenced == {"uploads/u/a.png"}
+        # 每个引用列一个会话，另加头像查询
+        assert sessions.opened == len(referenced_columns()) + 1
+        assert sessions.active == 0
+
+    async def test_sweep_deletes_without_holding_a_session(self, sessions):
+        storage = _fake_storage([_obj(f"uploads/u/{i}.bin", 48, size=1) for i in range(1500)])
+        held = []
+        storage.delete_files = AsyncMock(
+            side_effect=lambda keys: held.append(sessions.active) or {"deleted": list(keys), "failed": []}
+        )
+        collector = StorageGarbageCollector(storage)
+
+        await collector.sweep(set(), prefixes=["uploads/"], grace_hours=24, dry_run=False,
+                              max_deletes_per_second=10 ** 6)
+
+        # 每批复核一个短会话，删除（及限速等待）时不持有会话
+        assert sessions.opened == 2
+        assert held == [0, 0]
@@ -0,0 +1,262 @@
+"""
+存储源迁移测试
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+
+import pytest
+from botocore.exceptions import ClientError
+
+from src.models.storage_migration import StorageMigration, StorageMigrationStatus
+from src.services.storage_migration import StorageMigrationService, apply_dual_read, objects_match
+from src.utils.storage import S3Storage, StorageConfig
+
+
+def _not_found():
+    return ClientError({"Error": {"Code": "404"}}, "HeadObject")
+
+
+class TestObjectsMatch:
+    """对象一致性校验"""
+
+    def test_size_and_etag(self):
+        source = {"size": 10, "etag": "abc"}
+        assert objects_match(source, {"size": 10, "etag": "abc"})
+        assert not objects_match(source, {"size": 10, "etag": "def"})
+        assert not objects_match(source, {"size": 11, "etag": "abc"})
+        assert not objects_match(source, None)
+
+    def test_multipart_etag_compares_size_only(self):
+        assert objects_match({"size": 10, "etag": "abc-3"}, {"size": 10, "etag": "def"})
+        assert not objects_match({"size": 10, "etag": "abc-3"}, {"size": 9, "etag": "abc-3"})
+
+
+class TestDualRead:
+    """过渡期读取回退"""
+
+    async def test_stat_and_stream_fall_back_when_missing(self):
+        storage = S3Storage(StorageConfig(bucket="new"))
+        storage._client = Mock()
+        storage._client.head_object = Mock(side_effect=_not_found())
+        storage._client.get_object = Mock(side_effect=ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject"))
+
+        fallback = Mock()
+        fallback.stat_object = AsyncMock(return_value={"size": 3})
+
+        async def stream(*args, **kwargs):
+            yield b"old"
+
+        fallback.download_stream = Mock(side_effect=stream)
+
+        assert await storage.stat_object("a.png") is None
+        storage.set_fallback(fallback)
+
+        assert await storage.stat_object("a.png") == {"size": 3}
+        assert [chunk async for chunk in storage.download_stream("a.png")] == [b"old"]
+
+    async def test_other_errors_do_not_fall_back(self):
+        storage = S3Storage(StorageConfig(bucket="new"))
+        storage._client = Mock()
+        storage._client.head_object = Mock(side_effect=ClientError({"Error": {"Code": "403"}}, "HeadObject"))
+        fallback = Mock()
+        fallback.file_exists = AsyncMock(return_value=True)
+        storage.set_fallback(fallback)
+
+        assert await storage.file_exists("a.png") is False
+        fallback.file_exists.assert_not_awaited()
+
+    @staticmethod
+    def _dual_read_storage():
+        """new.png 已在当前存储，old.png 尚未复制"""
+        storage = S3Storage(StorageConfig(bucket="new"))
+        storage._client = Mock()
+        storage._client.head_object = Mock(
+            side_effect=lambda Bucket, Key: (_ for _ in ()).throw(_not_found()) if Key == "old.png" else {}
+        )
+        storage._client.generate_presigned_url = Mock(side_effect=lambda *a, **kw: f"http://new/{kw['Params']['Key']}")
+        fallback = S3Storage(StorageConfig(bucket="old"))
+        fallback._client = Mock()
+        fallback._client.generate_presigned_url = Mock(side_effect=lambda *a, **kw: f"http://old/{kw['Params']['Key']}")
+        storage.set_fallback(fallback)
+        return storage
+
+    def test_presigned_url_signed_where_object_is(self):
+        # 不在事件循环内：签名时直接检查
+        storage = self._dual_read_storage()
+
+        assert storage.get_presigned_url("old.png") == "http://old/old.png"
+        assert storage.get_presigned_url("new.png") == "http://new/new.png"
+        # 结果随URL缓存，复用窗口内不再检查
+        storage.get_presigned_url("old.png")
+        assert storage._client.head_object.call_count == 2
+
+        # 关闭回退后不再使用按回退存储签名的URL
+        storage.set_fallback(None)
+        assert storage.get_presigned_url("old.png") == "http://new/old.png"
+
+    async def test_batch_signing_resolves_sources_off_the_event_loop(self):
+        storage = self._dual_read_storage()
+
+        await storage.resolve_signing_sources(["old.png", "new.png", "old.png", None])
+        assert storage._client.head_object.call_count == 2
+        assert storage.get_presigned_urls(["old.png", "new.png"]) == {
+            "old.png": "http://old/old.png",
+            "new.png": "http://new/new.png",
+        }
+        # 签名只使用已确认的结果
+        assert storage._client.head_object.call_count == 2
+        assert storage._signing_checks == set()
+
+    async def test_unresolved_key_in_event_loop_checked_in_background(self):
+        storage = self._dual_read_storage()
+
+        # 事件循环内不阻塞检查：先按当前存储签名且不缓存，检查在存储线程池中完成
+        assert storage.get_presigned_url("old.png") == "http://new/old.png"
+        for _ in range(100):
+            if storage._signing_source("old.png") is not None:
+                break
+            await asyncio.sleep(0.01)
+        assert storage.get_presigned_url("old.png") == "http://old/old.png"
+        assert storage._client.head_object.call_count == 1
+
+    async def test_apply_dual_read_keeps_unchanged_fallback(self):
+        source = SimpleNamespace(**StorageConfig(endpoint="old:9000", bucket="old").to_dict())
+        db = Mock()
+        db.execute = AsyncMock(return_value=Mock(scalar_one_or_none=Mock(return_value=source)))
+        storage = S3Storage(StorageConfig(bucket="new"))
+
+        await apply_dual_read(db, storage, "target")
+        fallback = storage.fallback
+        await apply_dual_read(db, storage, "target")
+        assert storage.fallback is fallback
+        assert fallback.config.bucket == "old"
+
+        db.execute.return_value.scalar_one_or_none.return_value = None
+        await apply_dual_read(db, storage, "target")
+        assert storage.fallback is None
+
+
+class TestCopyFrom:
+    """跨存储复制"""
+
+    async def test_same_account_uses_server_side_copy(self):
+        source = S3Storage(StorageConfig(endpoint="s3:9000", bucket="old"))
+        target = S3Storage(StorageConfig(endpoint="s3:9000", bucket="new"))
+        target._client = Mock()
+
+        assert await target.copy_from(source, "uploads/a.txt") == "server"
+        target._client.copy.assert_called_once_with({"Bucket": "old", "Key": "uploads/a.txt"}, "new", "uploads/a.txt")
+
+    async def test_other_account_streams(self):
+        source = S3Storage(StorageConfig(endpoint="old:9000", bucket="old"))
+        target = S3Storage(StorageConfig(endpoint="new:9000", bucket="new"))
+        body = Mock()
+        source._client = Mock()
+        source._client.get_object = Mock(return_value={"Body": body, "ContentType": "text/plain", "Metadata": {}})
+        target._client = Mock()
+
+        assert await target.copy_from(source, "uploads/a.txt") == "stream"
+        target._client.upload_fileobj.assert_called_once_with(
+            body, "new", "uploads/a.txt", ExtraArgs={"Metadata": {}, "ContentType": "text/plain"}
+        )
+        target._client.copy.assert_not_called()
+        body.close.assert_called_once()
+
+
+class TestMigrationBatch:
+    """批次迁移与断点"""
+
+    @pytest.fixture
+    def service(self):
+        service = StorageMigrationService(db_session=Mock())
+        service.commit = AsyncMock()
+        service.db_session.refresh = AsyncMock()
+        return service
+
+    @pytest.fixture
+    def migration(self):
+        return StorageMigration(
+            status=StorageMigrationStatus.RUNNING, copied=0, copied_bytes=0, skipped=0, failed=0
+        )
+
+    async def test_counts_outcomes_and_advances_checkpoint(self, service, migration):
+        source = Mock()
+        target = Mock()
+        stats = {
+            "a": [{"size": 1, "etag": "x"}],                      # 已一致：跳过
+            "b": [None, {"size": 2, "etag": "y"}],                # 复制成功
+            "c": [None, {"size": 999, "etag": "z"}],              # 复制后校验失败
+        }
+        target.stat_object = AsyncMock(side_effect=lambda key: stats[key].pop(0))
+        target.copy_from = AsyncMock(return_value="server")
+        batch = [
+            {"object_key": "a", "size": 1, "etag": "x"},
+            {"object_key": "b", "size": 2, "etag": "y"},
+            {"object_key": "c", "size": 3, "etag": "z"},
+        ]
+
+        assert await service._process_batch(migration, source, target, batch) is True
+
+        assert (migration.copied, migration.copied_bytes, migration.skipped, migration.failed) == (1, 2, 1, 1)
+        assert migration.last_key == "c"
+        assert migration.last_error.startswith("c:")
+        assert [c.args[1] for c in target.copy_from.await_args_list] == ["b", "c"]
+        service.commit.assert_awaited_once()
+
+    async def test_stops_after_batch_when_cancelled(self, service, migration):
+        target = Mock()
+        target.stat_object = AsyncMock(return_value={"size": 1, "etag": "x"})
+
+        async def cancelled(obj, attrs):
+            obj.status = StorageMigrationStatus.CANCELLED
+
+        service.db_session.refresh = AsyncMock(side_effect=cancelled)
+
+        result = await service._process_batch(migration, Mock(), target, [{"object_key": "a", "size": 1, "etag": "x"}])
+
+        assert result is False
+        assert migration.last_key == "a"
+
+
+class TestBlobRecords:
+    """内容寻址对象记录复制"""
+
+    async def test_copy_recounts_target_references(self, monkeypatch):
+        from src.models.storage_blob import StorageBlob
+
+        blob = SimpleNamespace(sha256="a" * 64, object_key="blobs/a.png", size=3, content_type="image/png", ref_count=1)
+
+        async def _stream(query):
+            yield blob
+
+        db = Mock()
+        db.stream_scalars = AsyncMock(return_value=_stream(None))
+        service = StorageMigrationService(db)
+        monkeypatch.setattr(service, "execute", AsyncMock(return_value=Mock(rowcount=0)))
+        monkeypatch.setattr(service, "commit", AsyncMock())
+        recount = AsyncMock()
+        monkeypatch.setattr(StorageBlob, "recount", recount)
+
+        await service._copy_blob_records("old", "new")
+
+        # 已有记录不覆盖，复制后按实际引用重新计算目标桶的计数
+        assert recount.await_args.args[:2] == (db, "new")
+        service.commit.assert_awaited_once()
+
+    async def test_recount_counts_references_per_key(self):
+        from sqlalchemy.dialects import postgresql
+
+        from src.models.sentence import Sentence
+        from src.models.storage_blob import StorageBlob
+
+        db = Mock()
+        db.execute = AsyncMock()
+
+        await StorageBlob.recount(db, "new", [Sentence.image_url, Sentence.audio_url])
+
+        counted, zeroed = [str(call.args[0].compile(dialect=postgresql.dialect())) for call in db.execute.await_args_list]
+        assert "UNION ALL" in counted and "count(*)" in counted and "GROUP BY" in counted
+        assert "NOT IN" in zeroed
+
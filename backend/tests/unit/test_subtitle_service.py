@@ -0,0 +1,100 @@
+"""
+字幕服务单元测试
+"""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.services.subtitle_service import SubtitleService, align_characters
+
+
+def _make_subtitle(words):
+    """根据 (word, start, end) 列表构造字幕数据"""
+    return {
+        "segments": [
+            {
+                "text": "".join(w for w, _, _ in words),
+                "start": words[0][1],
+                "end": words[-1][2],
+                "words": [{"word": w, "start": s, "end": e} for w, s, e in words],
+            }
+        ]
+    }
+
+
+class TestAlignCharacters:
+    """字符对齐测试"""
+
+    def test_identical(self):
+        ops = align_characters(list("你好世界"), list("你好世界"))
+        assert [op for op, _, _ in ops] == ["match"] * 4
+
+    def test_substitution(self):
+        ops = align_characters(list("他望著"), list("他望着"))
+        assert ("sub", 2, 2) in ops
+
+    def test_insertion_and_deletion(self):
+        ops = align_characters(list("我们的心"), list("我的心"))
+        assert [op for op, _, _ in ops] == ["match", "del", "match", "match"]
+
+        ops = align_characters(list("我心"), list("我的心"))
+        assert [op for op, _, _ in ops] == ["match", "ins", "match"]
+        assert ops[1] == ("ins", -1, 1)
+
+
+class TestLocalSubtitleCorrection:
+    """本地字幕纠错测试"""
+
+    def test_substitutes_homophones_and_keeps_timestamps(self):
+        service = SubtitleService()
+        data = _make_subtitle([("他", 0.0, 0.2), ("望著", 0.2, 0.5), ("远方，", 0.5, 0.9), ("听见一语", 0.9, 1.5)])
+
+        corrected, confidence = service.correct_subtitle_locally(data, "他望着远方，听见呓语。", min_confidence=0.5)
+
+        words = corrected["segments"][0]["words"]
+        assert [w["word"] for w in words] == ["他", "望着", "远方，", "听见呓语"]
+        assert [(w["start"], w["end"]) for w in words] == [(0.0, 0.2), (0.2, 0.5), (0.5, 0.9), (0.9, 1.5)]
+        assert corrected["segments"][0]["text"] == "他望着远方，听见呓语"
+        assert 0.5 <= confidence < 1.0
+
+    def test_missing_characters_attach_to_previous_word(self):
+        service = SubtitleService()
+        data = _make_subtitle([("我的", 0.0, 0.4), ("心", 0.4, 0.6)])
+
+        corrected, _ = service.correct_subtitle_locally(data, "我的心啊", min_confidence=0.5)
+
+        assert corrected["segments"][0]["words"][-1]["word"] == "心啊"
+
+    def test_low_confidence_leaves_subtitle_untouched(self):
+        service = SubtitleService()
+        data = _make_subtitle([("完全", 0.0, 0.4), ("不同", 0.4, 0.8)])
+
+        corrected, confidence = service.correct_subtitle_locally(data, "今天天气很好", min_confidence=0.8)
+
+        assert confidence < 0.8
+        assert [w["word"] for w in corrected["segments"][0]["words"]] == ["完全", "不同"]
+
+    async def test_llm_skipped_when_alignment_confident(self):
+        service = SubtitleService()
+        data = _make_subtitle([("他", 0.0, 0.2), ("望著", 0.2, 0.5), ("远方", 0.5, 0.9)])
+        api_key = Mock()
+
+        with patch("src.services.subtitle_service.ProviderFactory") as mock_factory:
+            corrected = await service.correct_subtitle_with_llm(data, "他望着远方", api_key)
+
+        mock_factory.create.assert_not_called()
+        assert corrected["segments"][0]["text"] == "他望着远方"
+
+    async def test_llm_used_when_alignment_not_confident(self):
+        service = SubtitleService()
+        data = _make_subtitle([("完全", 0.0, 0.4), ("不同", 0.4, 0.8)])
+        api_key = Mock(provider="deepseek", base_url=None)
+
+        provider = Mock()
+        provider.completions = AsyncMock(side_effect=Exception("network"))
+        with patch("src.services.subtitle_service.ProviderFactory") as mock_factory:
+            mock_factory.create.return_value = provider
+            await service.correct_subtitle_with_llm(data, "今天天气很好", api_key)
+
+        provider.completions.assert_awaited_once()
@@ -0,0 +1,162 @@
+"""
+任务去重投递与分布式锁测试（Redis 使用内存替身）
+"""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from src.core import task_lock
+from src.core.config import settings
+from src.core.task_lock import TaskLock, batch_resource_id, run_exclusive, task_submission
+
+
+class FakeRedis:
+    """支持 SET NX / GET / 锁脚本的内存Redis；每次调用让出事件循环以模拟并发交错"""
+
+    def __init__(self):
+        self.store = {}
+        self.ttl = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        await asyncio.sleep(0)
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        self.ttl[key] = ex
+        return True
+
+    async def get(self, key):
+        await asyncio.sleep(0)
+        return self.store.get(key)
+
+    async def eval(self, script, numkeys, key, holder, *args):
+        await asyncio.sleep(0)
+        if self.store.get(key) != holder:
+            return 0
+        if script == task_lock.RELEASE_SCRIPT:
+            del self.store[key]
+            self.ttl.pop(key, None)
+        elif script == task_lock.EXTEND_SCRIPT:
+            self.ttl[key] = int(args[0]) / 1000
+        return 1
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(task_lock, "get_redis_client", lambda: fake)
+    return fake
+
+
+def test_batch_resource_id_ignores_order_and_format():
+    a, b = uuid.uuid4(), uuid.uuid4()
+    assert batch_resource_id([a, b]) == batch_resource_id([b.hex, str(a)])
+    assert batch_resource_id([a]) != batch_resource_id([a, b])
+
+
+async def test_concurrent_submissions_dispatch_once(redis):
+    dispatched = []
+
+    async def _submit():
+        async with task_submission("generate_images", "res-1", "u1") as submission:
+            if not submission.duplicate:
+                await asyncio.sleep(0.01)
+                dispatched.append(submission.task_id)
+            return submission
+
+    submissions = await asyncio.gather(*(_submit() for _ in range(10)))
+
+    assert len(dispatched) == 1
+    assert {s.task_id for s in submissions} == set(dispatched)
+    assert sum(not s.duplicate for s in submissions) == 1
+    assert redis.ttl["task-lock:generate_images:res-1"] == settings.TASK_LOCK_QUEUED_TTL_SECONDS
+
+
+async def test_idempotency_key_returns_same_task_after_completion(redis):
+    async with task_submission("generate_audio", "res-2", "u1", idempotency_key="k1") as first:
+        pass
+    # 任务执行完毕释放锁
+    await TaskLock("generate_audio", "res-2", first.task_id).release()
+
+    async with task_submission("generate_audio", "res-2", "u1", idempotency_key="k1") as again:
+        pass
+    async with task_submission("generate_audio", "res-2", "u1") as fresh:
+        pass
+
+    assert again.duplicate and again.task_id == first.task_id
+    assert not fresh.duplicate and fresh.task_id != first.task_id
+
+
+async def test_failed_dispatch_releases_claim(redis):
+    with pytest.raises(RuntimeError):
+        async with task_submission("generate_prompts", "ch-1", "u1", idempotency_key="k2") as submission:
+            raise RuntimeError("broker down")
+
+    assert "task-lock:generate_prompts:ch-1" not in redis.store
+    assert not any(key.startswith("idempotency:") for key in redis.store)
+
+    async with task_submission("generate_prompts", "ch-1", "u1", idempotency_key="k2") as retry:
+        pass
+    assert not retry.duplicate and retry.task_id != submission.task_id
+
+
+async def test_run_exclusive_adopts_claim_and_renews(redis, monkeypatch):
+    monkeypatch.setattr(settings, "TASK_LOCK_TTL_SECONDS", 0.03)
+    async with task_submission("synthesize_video", "ch-2", "u1") as submission:
+        pass
+    key = "task-lock:synthesize_video:ch-2"
+    renewals = []
+
+    async def _work():
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            renewals.append(redis.ttl[key])
+        return {"ok": True}
+
+    assert await run_exclusive("synthesize_video", "ch-2", submission.task_id, _work()) == {"ok": True}
+    # 接管后租期由排队有效期缩短为执行租期，并由心跳续期
+    assert all(ttl == pytest.approx(0.03) for ttl in renewals)
+    assert key not in redis.store
+
+
+async def test_run_exclusive_skips_when_other_task_holds_lock(redis):
+    async with task_submission("generate_images", "res-3", "u1") as running:
+        pass
+    ran = []
+
+    async def _work():
+        ran.append(True)
+
+    result = await run_exclusive("generate_images", "res-3", "another-task", _work())
+
+    assert result == {"skipped": True, "reason": "duplicate", "running_task_id": running.task_id}
+    assert ran == []
+    assert redis.store["task-lock:generate_images:res-3"] == running.task_id
+
+
+async def test_prompt_endpoint_concurrent_requests_share_task(redis, monkeypatch):
+    from src.api.v1 import prompt as prompt_api
+
+    calls = []
+    monkeypatch.setattr(settings, "ADMISSION_ENABLED", False)
+    monkeypatch.setattr(
+        prompt_api.generate_prompts_by_ids, "apply_async",
+        lambda args, task_id, **options: calls.append(task_id) or SimpleNamespace(id=task_id),
+    )
+    request = SimpleNamespace(
+        sentence_ids=[uuid.uuid4(), uuid.uuid4()], api_key_id=uuid.uuid4(),
+        style="cinematic", model=None, custom_prompt=None,
+    )
+    user = SimpleNamespace(id=uuid.uuid4())
+
+    endpoint = next(route.endpoint for route in prompt_api.router.routes if route.path == "/generate-prompts-ids")
+
+    responses = await asyncio.gather(*(
+        endpoint(current_user=user, db=None, idempotency_key=None, request=request) for _ in range(5)
+    ))
+
+    assert len(calls) == 1
+    assert {r.task_id for r in responses} == {calls[0]}
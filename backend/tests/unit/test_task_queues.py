@@ -0,0 +1,64 @@
+"""
+Celery 队列路由测试
+"""
+
+import pytest
+
+from src.tasks.queues import QUEUES, QueueAnnotation, queue_for
+from src.tasks.task import celery_app
+
+
+@pytest.mark.parametrize(
+    "task_name, queue",
+    [
+        ("file_processing.process_uploaded_file", "ingest"),
+        ("file_processing.validate_direct_upload", "ingest"),
+        ("generate.generate_prompts", "llm-io"),
+        ("generate.generate_images", "llm-io"),
+        ("generate.generate_audio", "llm-io"),
+        ("generate.synthesize_video", "render"),
+        ("transcribe.transcribe_chapter", "transcribe"),
+        ("maintenance.storage_gc", "maintenance"),
+        ("maintenance.release_waiting_tasks", "scheduling"),
+        ("maintenance.dispatch_render_jobs", "scheduling"),
+        ("unknown.task", "ingest"),
+    ],
+)
+def test_routes(task_name, queue):
+    assert queue_for(task_name) == queue
+    assert celery_app.amqp.router.route({}, task_name)["queue"].name == queue
+
+
+def test_all_registered_tasks_have_declared_queue():
+    declared = {q.name for q in celery_app.conf.task_queues}
+    for name in celery_app.tasks:
+        if not name.startswith("celery."):
+            assert queue_for(name) in declared
+
+
+def test_annotation_keeps_explicit_time_limits():
+    video = celery_app.tasks["generate.synthesize_video"]
+    assert (video.time_limit, video.soft_time_limit) == (3600, 3300)
+
+    gc = celery_app.tasks["maintenance.storage_gc"]
+    assert gc.acks_late is False
+    assert gc.time_limit == 6 * 3600
+
+    expire = celery_app.tasks["maintenance.expire_upload_sessions"]
+    assert expire.time_limit == QUEUES["maintenance"].time_limit
+
+
+def test_annotation_without_queue_limits_uses_global_defaults():
+    class _Task:
+        name = "generate.generate_images"
+        time_limit = None
+        soft_time_limit = None
+
+    assert QueueAnnotation().annotate(_Task()) == {"acks_late": True}
+
+
+def test_periodic_scheduling_messages_expire():
+    for entry in ("release-waiting-tasks", "dispatch-render-jobs"):
+        schedule = celery_app.conf.beat_schedule[entry]
+        assert queue_for(schedule["task"]) == "scheduling"
+        assert schedule["options"]["expires"] == schedule["schedule"]
@@ -0,0 +1,166 @@
+"""
+任务执行记录测试：信号写入、归属解析和批量状态（数据库与Redis使用替身）
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.models.task_run import TaskRun
+from src.models.video_task import VideoTask
+from src.services import task_run
+from src.services.task_run import TaskRunService, format_task_error, serialize_result
+from src.tasks import task as tasks
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """记录信号写入的任务记录，不连接数据库和Redis"""
+    calls = []
+
+    async def _record(task_id, task_name, arguments=None, **fields):
+        calls.append((task_id, task_name, arguments, fields))
+
+    monkeypatch.setattr(tasks, "worker_runtime", SimpleNamespace(run=asyncio.run))
+    monkeypatch.setattr(tasks, "publish_progress", AsyncMock())
+    monkeypatch.setattr(tasks, "record_task_run", _record)
+    monkeypatch.setattr(tasks, "release_admission", AsyncMock(return_value=True))
+    monkeypatch.setattr(tasks, "release_waiting", AsyncMock(return_value={}))
+    return calls
+
+
+def test_task_arguments_bind_positional_args_by_name():
+    arguments = tasks._task_arguments(tasks.synthesize_video, ("v-1",), {"chapter_id": "c-1"})
+    assert arguments == {"video_task_id": "v-1", "chapter_id": "c-1"}
+
+
+def test_prerun_records_started_with_arguments(recorded):
+    tasks._publish_task_started(
+        task_id="t-1", task=tasks.generate_prompts, args=("c-1", "k-1", "cinematic"), kwargs={}
+    )
+
+    task_id, name, arguments, fields = recorded[0]
+    assert (task_id, name) == ("t-1", "generate.generate_prompts")
+    assert arguments["chapter_id"] == "c-1"
+    assert fields["state"] == "STARTED"
+    assert fields["progress"] == 0
+
+
+def test_postrun_records_result_and_skips_replaced_tasks(recorded):
+    tasks._publish_task_finished(task_id="t-1", task=tasks.generate_images, state="IGNORED", retval=None)
+    assert recorded == []
+
+    tasks._publish_task_finished(
+        task_id="t-1", task=tasks.generate_images, state="SUCCESS", retval={"total": 2, "success": 2}
+    )
+    fields = recorded[0][3]
+    assert fields["state"] == "SUCCESS"
+    assert fields["progress"] == 100
+    assert fields["result"] == '{"total": 2, "success": 2}'
+
+
+def test_postrun_releases_waiting_tasks_of_same_queue(recorded, monkeypatch):
+    monkeypatch.setattr(tasks.settings, "ADMISSION_ENABLED", True)
+    tasks._publish_task_finished(task_id="t-3", task=tasks.generate_images, state="FAILURE", retval=None)
+
+    tasks.release_admission.assert_awaited_once_with("t-3")
+    tasks.release_waiting.assert_awaited_once_with(tasks.celery_app.send_task, queues=["llm-io"])
+
+def test_retry_and_failure_record_errors(recorded):
+    request = SimpleNamespace(id="t-2", retries=0)
+    tasks._record_task_retry(request=request, reason=RuntimeError("timeout"), sender=tasks.generate_audio)
+    tasks._record_task_failure(task_id="t-2", exception=ValueError("bad key"), sender=tasks.generate_audio)
+
+    assert recorded[0][3] == {"state": "RETRY", "stage": "retry", "retries": 1, "error": "RuntimeError: timeout"}
+    assert recorded[1][3] == {"error": "ValueError: bad key"}
+
+
+def test_builtin_celery_tasks_are_not_recorded(recorded):
+    builtin = SimpleNamespace(name="celery.chord_unlock", request=SimpleNamespace(retries=0))
+    tasks._publish_task_started(task_id="t-3", task=builtin, args=(), kwargs={})
+    assert recorded == []
+
+
+def test_periodic_maintenance_tasks_are_not_tracked(recorded):
+    for task in (tasks.release_waiting_tasks, tasks.dispatch_render_jobs, tasks.purge_task_runs):
+        tasks._publish_task_started(task_id="t-4", task=task, args=(), kwargs={})
+        tasks._publish_task_finished(task_id="t-4", task=task, state="SUCCESS", retval={"dispatched": 0})
+
+    assert recorded == []
+    tasks.publish_progress.assert_not_awaited()
+    assert tasks._tracked(tasks.storage_gc)
+
+
+async def test_purge_deletes_expired_runs_in_batches(monkeypatch):
+    service = TaskRunService(SimpleNamespace())
+    rowcounts = iter([2, 2, 1])
+    execute = AsyncMock(side_effect=lambda stmt: SimpleNamespace(rowcount=next(rowcounts)))
+    monkeypatch.setattr(service, "execute", execute)
+    monkeypatch.setattr(service, "commit", AsyncMock())
+
+    removed = await service.purge(datetime.now(timezone.utc), batch_size=2)
+
+    assert removed == 5
+    assert execute.await_count == 3
+    assert service.commit.await_count == 3
+    assert str(execute.await_args.args[0]).startswith("DELETE FROM task_runs")
+
+
+def test_serialize_result_keeps_only_small_dicts():
+    assert serialize_result({"success": 1}) == '{"success": 1}'
+    assert serialize_result("done") is None
+    assert serialize_result({"data": "x" * 10000}) is None
+    assert format_task_error(None) is None
+
+
+async def test_resolve_scope_from_video_task(monkeypatch):
+    user_id, project_id, chapter_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    service = TaskRunService(SimpleNamespace())
+    video_task = VideoTask(user_id=user_id, project_id=project_id, chapter_id=chapter_id)
+    monkeypatch.setattr(service, "get", AsyncMock(return_value=video_task))
+
+    scope = await service.resolve_scope({"video_task_id": "v-1", "chapter_id": "ignored"})
+
+    assert scope == {"user_id": user_id, "project_id": project_id, "chapter_id": chapter_id}
+
+
+async def test_task_owner_checks_each_kind_of_task_id(monkeypatch):
+    service = TaskRunService(SimpleNamespace())
+    owner = uuid.uuid4()
+    # 依次查询视频任务、章节流水线、生成批次：第三次命中
+    results = iter([None, None, owner])
+    execute = AsyncMock(side_effect=lambda stmt: SimpleNamespace(scalar=lambda: next(results)))
+    monkeypatch.setattr(service, "execute", execute)
+
+    assert await service.task_owner(str(uuid.uuid4())) == str(owner)
+    assert execute.await_count == 3
+    assert await service.task_owner("not-a-uuid") is None
+
+
+async def test_bulk_status_overlays_live_progress_and_fills_unknown_ids(monkeypatch):
+    running_id, done_id, queued_id = (str(uuid.uuid4()) for _ in range(3))
+    now = datetime.now(timezone.utc)
+    runs = [
+        TaskRun(id=uuid.UUID(running_id), task_name="generate.generate_images", state="STARTED",
+                stage="started", progress=0, retries=0, updated_at=now),
+        TaskRun(id=uuid.UUID(done_id), task_name="generate.generate_audio", state="SUCCESS",
+                stage="success", progress=100, retries=0, result='{"success": 3}', updated_at=now),
+    ]
+    service = TaskRunService(SimpleNamespace())
+    monkeypatch.setattr(service, "list_runs", AsyncMock(return_value=runs))
+    live = AsyncMock(return_value={running_id: {"stage": "generate_images", "percent": 42.5, "message": "3/7"}})
+    monkeypatch.setattr(task_run, "get_last_progress_many", live)
+
+    statuses = await service.bulk_status("u-1", task_ids=[running_id, done_id, queued_id])
+
+    # 只为进行中的任务读取实时进度
+    assert live.await_args.args[0] == [running_id]
+    by_id = {status["task_id"]: status for status in statuses}
+    assert by_id[running_id]["progress"] == 42
+    assert by_id[running_id]["stage"] == "generate_images"
+    assert by_id[done_id]["result"] == {"success": 3}
+    assert by_id[queued_id]["state"] == "PENDING"
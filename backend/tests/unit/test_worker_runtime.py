@@ -0,0 +1,128 @@
+"""
+Worker 异步运行时测试
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from src.services.provider.factory import ProviderFactory
+from src.tasks.runtime import WorkerRuntime
+
+
+class _Runtime(WorkerRuntime):
+    """不连接数据库的运行时"""
+
+    def __init__(self):
+        super().__init__()
+        self.setup_calls = 0
+        self.teardown_calls = 0
+
+    async def _setup(self):
+        self.setup_calls += 1
+        self._storage_loaded_at = float("inf")
+
+    async def _teardown(self):
+        self.teardown_calls += 1
+
+
+@pytest.fixture
+def runtime():
+    runtime = _Runtime()
+    yield runtime
+    runtime.stop()
+
+
+class TestWorkerRuntime:
+    """长期事件循环"""
+
+    def test_tasks_share_one_loop_and_setup_runs_once(self, runtime):
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = runtime.run(current_loop())
+        second = runtime.run(current_loop())
+
+        assert first is second is runtime.loop
+        assert runtime.setup_calls == 1
+
+    def test_exceptions_propagate_and_loop_survives(self, runtime):
+        async def fail():
+            raise ValueError("boom")
+
+        async def ok():
+            return 42
+
+        with pytest.raises(ValueError, match="boom"):
+            runtime.run(fail())
+        assert runtime.run(ok()) == 42
+
+    def test_interrupted_caller_cancels_coroutine(self, runtime, monkeypatch):
+        runtime.start()
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        class Interrupt(BaseException):
+            """模拟 Celery 软超时打断等待结果的调用线程"""
+
+        def interrupted(self, timeout=None):
+            raise Interrupt()
+
+        monkeypatch.setattr(concurrent.futures.Future, "result", interrupted)
+        with pytest.raises(Interrupt):
+            runtime.run(slow())
+        monkeypatch.undo()
+
+        assert cancelled.wait(2)
+
+    def test_stop_runs_teardown(self):
+        runtime = _Runtime()
+        runtime.start()
+        runtime.stop()
+
+        assert runtime.teardown_calls == 1
+        assert not runtime.running
+
+
+class TestProviderCache:
+    """Provider 按事件循环缓存"""
+
+    async def test_same_key_reuses_provider(self):
+        first = ProviderFactory.create("openai", "sk-1", max_concurrency=20)
+        second = ProviderFactory.create("OpenAI", "sk-1", max_concurrency=20)
+        other = ProviderFactory.create("openai", "sk-2", max_concurrency=20)
+
+        assert first is second
+        assert other is not first
+
+
+def test_concurrent_first_runs_wait_for_setup():
+    """threads 池中多个线程同时触发惰性启动：只初始化一次，且任务不会早于初始化执行"""
+    ready = threading.Event()
+
+    class _SlowRuntime(_Runtime):
+        async def _setup(self):
+            await asyncio.sleep(0.05)
+            await super()._setup()
+            ready.set()
+
+    runtime = _SlowRuntime()
+
+    async def _job():
+        return ready.is_set()
+
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: runtime.run(_job()), range(8)))
+        assert results == [True] * 8
+        assert runtime.setup_calls == 1
+    finally:
+        runtime.stop()